@@ -0,0 +1,136 @@
+"""Partition summary_usage by month
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8b9c0d1e2f3'
+down_revision: Union[str, None] = 'f7a8b9c0d1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 当月から何か月先までパーティションを作成するか（以降はscripts/manage_usage_partitions.pyで作成）
+MONTHS_AHEAD = 3
+
+COLUMNS = """
+    app_type VARCHAR(50),
+    document_types VARCHAR(100),
+    model_detail VARCHAR(100),
+    provider VARCHAR(20),
+    department VARCHAR(100),
+    doctor VARCHAR(100),
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    processing_time INTEGER,
+    time_to_first_token FLOAT
+"""
+
+COLUMN_NAMES = """
+    id, date, app_type, document_types, model_detail, provider, department, doctor,
+    input_tokens, output_tokens, processing_time, time_to_first_token
+"""
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def create_indexes() -> None:
+    op.create_index('ix_summary_usage_date_id', 'summary_usage', ['date', 'id'])
+    op.create_index(
+        'ix_summary_usage_date_provider_document_types',
+        'summary_usage',
+        ['date', 'provider', 'document_types']
+    )
+
+
+def drop_indexes() -> None:
+    op.drop_index('ix_summary_usage_date_provider_document_types', table_name='summary_usage')
+    op.drop_index('ix_summary_usage_date_id', table_name='summary_usage')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # テーブル全体を書き換えるため、アプリケーションを停止した状態で実行する
+    bind = op.get_bind()
+
+    # 1. 既存のテーブルを退避（インデックス・主キー名は新しいテーブルで使用する）
+    drop_indexes()
+    op.rename_table('summary_usage', 'summary_usage_legacy')
+    op.execute("ALTER TABLE summary_usage_legacy RENAME CONSTRAINT summary_usage_pkey TO summary_usage_legacy_pkey")
+
+    # 2. dateによるレンジパーティションのテーブルを作成（idの採番は既存のシーケンスを引き継ぐ）
+    op.execute(f"""
+        CREATE TABLE summary_usage (
+            id INTEGER NOT NULL DEFAULT nextval('summary_usage_id_seq'),
+            date TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            {COLUMNS},
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("CREATE TABLE summary_usage_default PARTITION OF summary_usage DEFAULT")
+
+    # 3. 既存の最古の月から当月のMONTHS_AHEADか月先まで、JSTの月単位でパーティションを作成
+    today = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).date()
+    oldest = bind.execute(
+        sa.text("SELECT MIN((date AT TIME ZONE 'Asia/Tokyo')::date) FROM summary_usage_legacy")
+    ).scalar()
+    month = (oldest or today).replace(day=1)
+    last_month = add_months(today.replace(day=1), MONTHS_AHEAD)
+    while month <= last_month:
+        next_month = add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE summary_usage_{month:%Y_%m} PARTITION OF summary_usage "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+09') TO ('{next_month.isoformat()} 00:00:00+09')"
+        )
+        month = next_month
+
+    # 4. 既存のレコードを移し替え（dateがNULLのレコードは移行時の日時にする）
+    op.execute(f"""
+        INSERT INTO summary_usage ({COLUMN_NAMES})
+        SELECT id, COALESCE(date, now()), app_type, document_types, model_detail, provider, department, doctor,
+               input_tokens, output_tokens, processing_time, time_to_first_token
+        FROM summary_usage_legacy
+    """)
+
+    # 5. シーケンスの所有者を付け替えて旧テーブルを削除
+    op.execute("ALTER SEQUENCE summary_usage_id_seq OWNED BY summary_usage.id")
+    op.drop_table('summary_usage_legacy')
+
+    # 6. 親テーブルに作成したインデックスは各パーティションにも作成される
+    create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 1. パーティションのテーブルを退避
+    drop_indexes()
+    op.rename_table('summary_usage', 'summary_usage_partitioned')
+    op.execute("ALTER TABLE summary_usage_partitioned RENAME CONSTRAINT summary_usage_pkey TO summary_usage_partitioned_pkey")
+
+    # 2. パーティションのないテーブルを作成してレコードを移し替え
+    op.execute(f"""
+        CREATE TABLE summary_usage (
+            id INTEGER NOT NULL DEFAULT nextval('summary_usage_id_seq'),
+            date TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            {COLUMNS},
+            PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"INSERT INTO summary_usage ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM summary_usage_partitioned")
+
+    # 3. シーケンスの所有者を付け替えてパーティションごと削除
+    op.execute("ALTER SEQUENCE summary_usage_id_seq OWNED BY summary_usage.id")
+    op.execute("DROP TABLE summary_usage_partitioned CASCADE")
+
+    create_indexes()
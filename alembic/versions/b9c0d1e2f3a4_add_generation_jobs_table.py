@@ -0,0 +1,62 @@
+"""Add generation_jobs table
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c0d1e2f3a4'
+down_revision: Union[str, None] = 'a8b9c0d1e2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. ワーカーが実行する文書作成ジョブのテーブルを作成
+    op.create_table(
+        'generation_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('input_text', sa.Text(), nullable=False),
+        sa.Column('additional_info', sa.Text(), nullable=True),
+        sa.Column('previous_record', sa.Text(), nullable=True),
+        sa.Column('department', sa.String(length=100), nullable=True),
+        sa.Column('document_type', sa.String(length=100), nullable=True),
+        sa.Column('doctor', sa.String(length=100), nullable=True),
+        sa.Column('selected_model', sa.String(length=50), nullable=True),
+        sa.Column('model_explicitly_selected', sa.Boolean(), nullable=True, server_default=sa.false()),
+        sa.Column('partial_output', sa.Text(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('worker_id', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token')
+    )
+
+    # 2. 未実行のジョブを古い順に取得するための部分インデックスと、生存確認が途絶えたジョブの検索用インデックスを作成
+    op.create_index(
+        'ix_generation_jobs_pending_created_at', 'generation_jobs', ['created_at'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index('ix_generation_jobs_status_heartbeat_at', 'generation_jobs', ['status', 'heartbeat_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_generation_jobs_status_heartbeat_at', table_name='generation_jobs')
+    op.drop_index('ix_generation_jobs_pending_created_at', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
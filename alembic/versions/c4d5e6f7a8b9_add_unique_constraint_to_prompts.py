@@ -0,0 +1,42 @@
+"""Add unique constraint on department, document_type and doctor to prompts
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d5e6f7a8b9'
+down_revision: Union[str, None] = 'b3f1c2d4e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. 同時作成で重複したレコードは最新のもの（IDが最大のもの）だけを残す
+    op.execute("""
+        DELETE FROM prompts p
+        USING prompts q
+        WHERE p.department = q.department
+          AND p.document_type = q.document_type
+          AND p.doctor = q.doctor
+          AND p.id < q.id
+    """)
+
+    # 2. ON CONFLICTの対象となるユニーク制約を追加
+    op.create_unique_constraint(
+        'unique_prompt_per_department_document_type_doctor',
+        'prompts',
+        ['department', 'document_type', 'doctor']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('unique_prompt_per_department_document_type_doctor', 'prompts', type_='unique')
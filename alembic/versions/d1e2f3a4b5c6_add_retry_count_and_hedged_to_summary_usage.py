@@ -0,0 +1,31 @@
+"""Add retry_count and hedged columns to summary_usage
+
+Revision ID: d1e2f3a4b5c6
+Revises: c0d1e2f3a4b5
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e2f3a4b5c6'
+down_revision: Union[str, None] = 'c0d1e2f3a4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # パーティションテーブルへの列追加は各パーティションにも反映される
+    op.add_column('summary_usage', sa.Column('retry_count', sa.Integer(), nullable=True))
+    op.add_column('summary_usage', sa.Column('hedged', sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('summary_usage', 'hedged')
+    op.drop_column('summary_usage', 'retry_count')
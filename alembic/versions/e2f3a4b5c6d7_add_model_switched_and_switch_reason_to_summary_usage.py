@@ -0,0 +1,30 @@
+"""Add model_switched and switch_reason columns to summary_usage
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f3a4b5c6d7'
+down_revision: Union[str, None] = 'd1e2f3a4b5c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('summary_usage', sa.Column('model_switched', sa.Boolean(), nullable=True))
+    op.add_column('summary_usage', sa.Column('switch_reason', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('summary_usage', 'switch_reason')
+    op.drop_column('summary_usage', 'model_switched')
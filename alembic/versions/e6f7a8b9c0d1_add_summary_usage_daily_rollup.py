@@ -0,0 +1,66 @@
+"""Add summary_usage_daily rollup table
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd5e6f7a8b9c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. JSTの日付・モデル・文書タイプ・診療科・医師ごとのロールアップテーブルを作成
+    op.create_table(
+        'summary_usage_daily',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usage_date', sa.Date(), nullable=False),
+        sa.Column('model_detail', sa.String(length=100), nullable=True),
+        sa.Column('document_types', sa.String(length=100), nullable=True),
+        sa.Column('department', sa.String(length=100), nullable=True),
+        sa.Column('doctor', sa.String(length=100), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('processing_time', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        # NULLの文書タイプ等も同じ集計単位として扱う（PostgreSQL 15以降）
+        sa.UniqueConstraint(
+            'usage_date', 'model_detail', 'document_types', 'department', 'doctor',
+            name='unique_summary_usage_daily_dimensions',
+            postgresql_nulls_not_distinct=True
+        )
+    )
+
+    # 2. 既存の使用量を集計してロールアップを作成
+    op.execute("""
+        INSERT INTO summary_usage_daily (
+            usage_date, model_detail, document_types, department, doctor,
+            count, input_tokens, output_tokens, processing_time
+        )
+        SELECT
+            (date AT TIME ZONE 'Asia/Tokyo')::date,
+            model_detail, document_types, department, doctor,
+            COUNT(id),
+            COALESCE(SUM(input_tokens), 0),
+            COALESCE(SUM(output_tokens), 0),
+            COALESCE(SUM(processing_time), 0)
+        FROM summary_usage
+        GROUP BY (date AT TIME ZONE 'Asia/Tokyo')::date, model_detail, document_types, department, doctor
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('summary_usage_daily')
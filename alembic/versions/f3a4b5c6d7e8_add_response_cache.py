@@ -0,0 +1,48 @@
+"""Add response_cache table and cache columns
+
+Revision ID: f3a4b5c6d7e8
+Revises: e2f3a4b5c6d7
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a4b5c6d7e8'
+down_revision: Union[str, None] = 'e2f3a4b5c6d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. プロセス間で共有する応答キャッシュのテーブルを作成
+    op.create_table(
+        'response_cache',
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=False),
+        sa.Column('input_tokens', sa.Integer(), nullable=True),
+        sa.Column('output_tokens', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index('ix_response_cache_created_at', 'response_cache', ['created_at'])
+
+    # 2. 応答キャッシュの結果を返したかを記録するカラムと、ジョブごとにキャッシュを使用するかのカラムを追加
+    op.add_column('summary_usage', sa.Column('cache_hit', sa.Boolean(), nullable=True))
+    op.add_column(
+        'generation_jobs',
+        sa.Column('use_response_cache', sa.Boolean(), server_default=sa.text('true'), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generation_jobs', 'use_response_cache')
+    op.drop_column('summary_usage', 'cache_hit')
+    op.drop_index('ix_response_cache_created_at', table_name='response_cache')
+    op.drop_table('response_cache')
@@ -0,0 +1,85 @@
+"""Add provider column and filter indexes to summary_usage
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a8b9c0d1e2'
+down_revision: Union[str, None] = 'e6f7a8b9c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# バックフィルで1回のUPDATEが対象とするidの範囲
+BACKFILL_BATCH_SIZE = 10000
+
+# services.usage_rollup.detect_providerと同じ順序で判定する
+PROVIDER_CASE = """
+    CASE
+        WHEN model_detail ILIKE '%claude%' THEN 'claude'
+        WHEN model_detail ILIKE '%gemini%' THEN 'gemini'
+    END
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. providerカラムを追加（デフォルト値なしのためテーブルは書き換えない）
+    op.add_column('summary_usage', sa.Column('provider', sa.String(length=20), nullable=True))
+    op.add_column('summary_usage_daily', sa.Column('provider', sa.String(length=20), nullable=True))
+
+    # 2. ロールアップは件数が少ないため一度に更新
+    op.execute(f"UPDATE summary_usage_daily SET provider = {PROVIDER_CASE}")
+
+    with op.get_context().autocommit_block():
+        # 3. summary_usageはidの範囲ごとに更新・コミットし、行ロックを長時間保持しない
+        bind = op.get_bind()
+        min_id, max_id = bind.execute(sa.text("SELECT MIN(id), MAX(id) FROM summary_usage")).one()
+        if min_id is not None:
+            for batch_start in range(min_id, max_id + 1, BACKFILL_BATCH_SIZE):
+                bind.execute(
+                    sa.text(f"""
+                        UPDATE summary_usage SET provider = {PROVIDER_CASE}
+                        WHERE id >= :batch_start AND id < :batch_end AND provider IS NULL
+                    """),
+                    {"batch_start": batch_start, "batch_end": batch_start + BACKFILL_BATCH_SIZE}
+                )
+
+        # 4. 書き込みを止めないようCONCURRENTLYでインデックスを作成
+        op.create_index(
+            'ix_summary_usage_date_provider_document_types',
+            'summary_usage',
+            ['date', 'provider', 'document_types'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_summary_usage_daily_usage_date_provider_document_types',
+            'summary_usage_daily',
+            ['usage_date', 'provider', 'document_types'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_summary_usage_daily_usage_date_provider_document_types',
+            table_name='summary_usage_daily',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_summary_usage_date_provider_document_types',
+            table_name='summary_usage',
+            postgresql_concurrently=True
+        )
+
+    op.drop_column('summary_usage_daily', 'provider')
+    op.drop_column('summary_usage', 'provider')
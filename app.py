@@ -1,5 +1,6 @@
 import streamlit as st
 
+from database.notifier import start_prompt_change_listener
 from ui_components.navigation import load_user_settings
 from utils.env_loader import load_environment_variables
 from utils.error_handlers import handle_error
@@ -9,6 +10,7 @@ from views.prompt_management_page import prompt_management_ui
 from views.statistics_page import usage_statistics_ui
 
 load_environment_variables()
+start_prompt_change_listener()
 
 st.set_page_config(
     page_title="主治医意見書作成アプリ",
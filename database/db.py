@@ -1,7 +1,8 @@
 import os
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, insert, literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 
@@ -196,6 +197,80 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def bulk_insert(self, model_class: Type[Base], rows: List[Dict[str, Any]],
+                    on_write: Optional[Callable[[Any, List[Dict[str, Any]]], None]] = None) -> int:
+        """
+        複数レコードを1回のexecutemanyで挿入する（挿入後のSELECTは行わない）
+
+        Args:
+            model_class: 挿入対象のモデルクラス
+            rows: 挿入するデータの辞書のリスト
+            on_write: 同じトランザクションで実行する追加の書き込み（セッションと挿入するレコードを受け取る）
+
+        Returns:
+            挿入した件数
+        """
+        if not rows:
+            return 0
+
+        session = self.get_session()
+        try:
+            session.execute(insert(model_class), rows)
+            if on_write is not None:
+                on_write(session, rows)
+            session.commit()
+            return len(rows)
+
+        except Exception as e:
+            session.rollback()
+            raise DatabaseError(MESSAGES["DATABASE_BULK_INSERT_ERROR"].format(error=str(e)))
+        finally:
+            session.close()
+
+    def insert_missing(self, model_class: Type[Base], key_columns: List[str], rows: List[Dict[str, Any]]) -> int:
+        """
+        キーが未登録のレコードだけを1トランザクションで一括挿入する
+
+        既存のキーを1回のクエリで取得し、未登録のレコードをメモリ上で求めてから挿入する。
+        PostgreSQLでは同時に実行された他のワーカーと重複しないようON CONFLICT DO NOTHINGを付ける。
+
+        Args:
+            model_class: 挿入対象のモデルクラス
+            key_columns: レコードを一意に識別するカラム名のリスト
+            rows: 挿入候補のデータの辞書のリスト
+
+        Returns:
+            挿入した件数
+        """
+        if not rows:
+            return 0
+
+        session = self.get_session()
+        try:
+            key_attributes = [getattr(model_class, key) for key in key_columns]
+            existing_keys = set(session.query(*key_attributes).all())
+            missing_rows = [row for row in rows if tuple(row[key] for key in key_columns) not in existing_keys]
+
+            if not missing_rows:
+                return 0
+
+            if self._supports_on_conflict(session):
+                primary_keys = list(model_class.__table__.primary_key.columns)
+                stmt = pg_insert(model_class).on_conflict_do_nothing(index_elements=key_columns)
+                inserted = len(session.execute(stmt.returning(*primary_keys), missing_rows).all())
+            else:
+                session.execute(insert(model_class), missing_rows)
+                inserted = len(missing_rows)
+
+            session.commit()
+            return inserted
+
+        except Exception as e:
+            session.rollback()
+            raise DatabaseError(MESSAGES["DATABASE_BULK_INSERT_ERROR"].format(error=str(e)))
+        finally:
+            session.close()
+
     def update(self, model_class: Type[Base], filters: Dict[str, Any],
                update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -236,40 +311,87 @@ class DatabaseManager:
             session.close()
 
     def upsert(self, model_class: Type[Base], filters: Dict[str, Any],
-               data: Dict[str, Any]) -> Dict[str, Any]:
+               data: Dict[str, Any], insert_only: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         レコードを挿入または更新する
 
         Args:
             model_class: 対象のモデルクラス
-            filters: 検索条件の辞書
+            filters: 検索条件の辞書（一意制約のカラムと一致させる）
             data: 挿入/更新するデータの辞書
+            insert_only: 挿入時のみ設定するデータの辞書
 
         Returns:
             挿入/更新されたレコードの辞書形式
         """
+        record, _ = self.upsert_with_status(model_class, filters, data, insert_only)
+        return record
+
+    def upsert_with_status(self, model_class: Type[Base], filters: Dict[str, Any], data: Dict[str, Any],
+                           insert_only: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        レコードを挿入または更新し、新規作成したかどうかも返す
+
+        PostgreSQLではINSERT ... ON CONFLICT ... DO UPDATE ... RETURNINGの1文で実行するため、
+        ワーカー間で同時に実行しても重複レコードは作成されない。
+
+        Returns:
+            (挿入/更新されたレコードの辞書形式, 新規作成した場合はTrue)のタプル
+        """
         session = self.get_session()
         try:
-            query = session.query(model_class)
+            if self._supports_on_conflict(session):
+                record, created = self._upsert_on_conflict(session, model_class, filters, data, insert_only or {})
+            else:
+                record, created = self._upsert_select_then_write(session, model_class, filters, data, insert_only or {})
 
-            for key, value in filters.items():
-                if hasattr(model_class, key):
-                    query = query.filter(getattr(model_class, key) == value)
+            session.commit()
+            return record, created
 
-            record = query.first()
+        except Exception as e:
+            session.rollback()
+            raise DatabaseError(MESSAGES["DATABASE_UPSERT_ERROR"].format(error=str(e)))
+        finally:
+            session.close()
+
+    def upsert_many(self, model_class: Type[Base], rows: List[Dict[str, Any]], conflict_columns: List[str],
+                    update_columns: Optional[List[str]] = None) -> int:
+        """
+        複数レコードを1トランザクションで挿入または更新する
 
-            if record:
-                for key, value in data.items():
-                    if hasattr(record, key):
-                        setattr(record, key, value)
+        Args:
+            model_class: 対象のモデルクラス
+            rows: 挿入/更新するデータの辞書のリスト
+            conflict_columns: 一意制約のカラム名のリスト
+            update_columns: 既存レコードで更新するカラム名のリスト（省略時は一意制約以外のすべて）
+
+        Returns:
+            挿入/更新した件数
+        """
+        if not rows:
+            return 0
+
+        if update_columns is None:
+            update_columns = [key for key in rows[0] if key not in conflict_columns]
+
+        session = self.get_session()
+        try:
+            if self._supports_on_conflict(session):
+                stmt = pg_insert(model_class)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict_columns,
+                    set_=self._conflict_update_values(model_class, stmt, update_columns, conflict_columns)
+                )
+                session.execute(stmt, rows)
             else:
-                merged_data = {**filters, **data}
-                record = model_class(**merged_data)
-                session.add(record)
+                for row in rows:
+                    filters = {key: row[key] for key in conflict_columns}
+                    data = {key: row[key] for key in update_columns if key in row}
+                    insert_only = {key: value for key, value in row.items() if key not in filters and key not in data}
+                    self._upsert_select_then_write(session, model_class, filters, data, insert_only)
 
             session.commit()
-            session.refresh(record)
-            return self._model_to_dict(record)
+            return len(rows)
 
         except Exception as e:
             session.rollback()
@@ -277,6 +399,61 @@ class DatabaseManager:
         finally:
             session.close()
 
+    @staticmethod
+    def _supports_on_conflict(session) -> bool:
+        return session.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def _conflict_update_values(model_class: Type[Base], stmt, update_columns: List[str],
+                                conflict_columns: List[str]) -> Dict[str, Any]:
+        table = model_class.__table__
+        set_ = {key: stmt.excluded[key] for key in update_columns if key in table.columns}
+
+        # ON CONFLICT DO UPDATEではonupdateが適用されないため明示的に設定する
+        for column in table.columns:
+            if column.onupdate is not None and column.name not in set_ and column.onupdate.is_clause_element:
+                set_[column.name] = column.onupdate.arg
+
+        # 更新するカラムがない場合もRETURNINGで既存レコードを返せるよう、一意制約のカラムを同じ値で更新する
+        if not set_:
+            set_ = {conflict_columns[0]: stmt.excluded[conflict_columns[0]]}
+        return set_
+
+    def _upsert_on_conflict(self, session, model_class: Type[Base], filters: Dict[str, Any], data: Dict[str, Any],
+                            insert_only: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        table = model_class.__table__
+        stmt = pg_insert(model_class).values(**{**insert_only, **filters, **data})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(filters.keys()),
+            set_=self._conflict_update_values(model_class, stmt, list(data.keys()), list(filters.keys()))
+        ).returning(*table.columns, literal_column("(xmax = 0)").label("inserted"))
+
+        row = session.execute(stmt).one()._mapping
+        return {c.name: row[c.name] for c in table.columns}, bool(row["inserted"])
+
+    def _upsert_select_then_write(self, session, model_class: Type[Base], filters: Dict[str, Any],
+                                  data: Dict[str, Any], insert_only: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        query = session.query(model_class)
+
+        for key, value in filters.items():
+            if hasattr(model_class, key):
+                query = query.filter(getattr(model_class, key) == value)
+
+        record = query.first()
+        created = record is None
+
+        if record:
+            for key, value in data.items():
+                if hasattr(record, key):
+                    setattr(record, key, value)
+        else:
+            record = model_class(**{**insert_only, **filters, **data})
+            session.add(record)
+
+        session.flush()
+        session.refresh(record)
+        return self._model_to_dict(record), created
+
     def delete(self, model_class: Type[Base], filters: Dict[str, Any]) -> bool:
         """
         レコードを削除する
@@ -1,4 +1,18 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.sql import func
 
@@ -32,20 +46,133 @@ class Prompt(Base):
     created_at = Column(DateTime(timezone=True), default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        UniqueConstraint('department', 'document_type', 'doctor', name='unique_prompt_per_department_document_type_doctor'),
+    )
+
 
 class SummaryUsage(Base):
+    """使用量の記録（dateによる月別のレンジパーティション。パーティションはdatabase/partitions.pyで管理）"""
     __tablename__ = 'summary_usage'
 
-    id = Column(Integer, primary_key=True)
-    date = Column(DateTime(timezone=True), default=func.now())
+    # パーティションキーを主キーに含める必要があるため(id, date)を主キーにする
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(DateTime(timezone=True), primary_key=True, default=func.now())
     app_type = Column(String(50))
     document_types = Column(String(100))
     model_detail = Column(String(100))
+    # model_detailから判定したAPIプロバイダー（claude / gemini）。統計画面のAIモデルの絞り込みに使用
+    provider = Column(String(20))
     department = Column(String(100))
     doctor = Column(String(100))
     input_tokens = Column(Integer)
     output_tokens = Column(Integer)
     processing_time = Column(Integer)
+    time_to_first_token = Column(Float)
+    # 一時的なエラーによる再試行回数と、ヘッジリクエスト（遅い応答に対して追加で送った呼び出し）が採用されたか
+    retry_count = Column(Integer)
+    hedged = Column(Boolean)
+    # モデルを切り替えたかと、その理由（token_threshold: 入力が長い / circuit_open: プロバイダーの障害）
+    model_switched = Column(Boolean)
+    switch_reason = Column(String(50))
+    # 応答キャッシュの結果を返したか（APIを呼び出していないためトークン数は0）
+    cache_hit = Column(Boolean)
+
+    __table_args__ = (
+        # 統計画面の詳細レコードを(date, id)の降順でキーセットページングするためのインデックス
+        Index('ix_summary_usage_date_id', 'date', 'id'),
+        # 期間・AIモデル・文書名による絞り込み用のインデックス
+        Index('ix_summary_usage_date_provider_document_types', 'date', 'provider', 'document_types'),
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
+
+
+class SummaryUsageDaily(Base):
+    """summary_usageをJSTの日付・モデル・文書タイプ・診療科・医師ごとに集計したロールアップ"""
+    __tablename__ = 'summary_usage_daily'
+
+    id = Column(Integer, primary_key=True)
+    usage_date = Column(Date, nullable=False)
+    model_detail = Column(String(100))
+    # model_detailから判定されるため集計単位には含めない
+    provider = Column(String(20))
+    document_types = Column(String(100))
+    department = Column(String(100))
+    doctor = Column(String(100))
+    count = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    processing_time = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint(
+            'usage_date', 'model_detail', 'document_types', 'department', 'doctor',
+            name='unique_summary_usage_daily_dimensions',
+            postgresql_nulls_not_distinct=True
+        ),
+        Index('ix_summary_usage_daily_usage_date_provider_document_types', 'usage_date', 'provider', 'document_types'),
+    )
+
+
+class GenerationJob(Base):
+    """文書作成ジョブ（ワーカーがSELECT ... FOR UPDATE SKIP LOCKEDで取得して実行する）"""
+    __tablename__ = 'generation_jobs'
+
+    id = Column(Integer, primary_key=True)
+    # 画面からジョブを参照するための推測できないキー（URLのクエリパラメータに保持する）
+    token = Column(String(64), nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default='pending')
+    input_text = Column(Text, nullable=False)
+    additional_info = Column(Text)
+    previous_record = Column(Text)
+    department = Column(String(100))
+    document_type = Column(String(100))
+    doctor = Column(String(100))
+    selected_model = Column(String(50))
+    model_explicitly_selected = Column(Boolean, default=False)
+    use_response_cache = Column(Boolean, default=True)
+    partial_output = Column(Text)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100))
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # 未実行のジョブを古い順に取得するための部分インデックス
+        Index('ix_generation_jobs_pending_created_at', 'created_at', postgresql_where=text("status = 'pending'")),
+        # 生存確認が途絶えた実行中のジョブの検索用
+        Index('ix_generation_jobs_status_heartbeat_at', 'status', 'heartbeat_at'),
+    )
+
+
+class RateLimitBucket(Base):
+    """プロセス間で共有するLLM呼び出しの利用上限のトークンバケット（external_service/rate_limiter.py）"""
+    __tablename__ = 'rate_limit_buckets'
+
+    bucket_key = Column(String(200), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+
+
+class ResponseCacheEntry(Base):
+    """プロセス間で共有する生成結果の応答キャッシュ（external_service/response_cache.py）"""
+    __tablename__ = 'response_cache'
+
+    # プロバイダー・モデル・プロンプト・生成パラメータのSHA-256
+    cache_key = Column(String(64), primary_key=True)
+    summary = Column(Text, nullable=False)
+    input_tokens = Column(Integer)
+    output_tokens = Column(Integer)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+
+    __table_args__ = (
+        Index('ix_response_cache_created_at', 'created_at'),
+    )
 
 
 class EvaluationPrompt(Base):
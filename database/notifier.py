@@ -0,0 +1,161 @@
+import json
+import select
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from database.db import DatabaseManager
+from utils.config import PROMPT_CHANGE_LISTENER_ENABLED
+
+PROMPT_CHANGE_CHANNEL = "prompt_changes"
+
+# keysがNoneの場合は通知を取りこぼした可能性があるため、すべてのキャッシュを破棄する
+ChangeHandler = Callable[[Optional[Dict[str, Any]]], None]
+
+
+def notify_prompt_change(table: str, keys: Dict[str, Any]) -> None:
+    """
+    プロンプトの変更を他のワーカーに通知する
+
+    通知に失敗しても書き込み自体は成功しているため、例外は送出しない。
+    """
+    if not PROMPT_CHANGE_LISTENER_ENABLED:
+        return
+
+    try:
+        engine = DatabaseManager.get_instance().get_engine()
+        payload = json.dumps({"table": table, "keys": keys}, ensure_ascii=False)
+
+        with engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": PROMPT_CHANGE_CHANNEL, "payload": payload}
+            )
+    except Exception as e:
+        print(f"プロンプト変更の通知に失敗しました: {str(e)}")
+
+
+class PromptChangeListener:
+    """
+    PostgreSQLのLISTEN/NOTIFYでプロンプトの変更を受け取り、登録されたハンドラーを呼び出すバックグラウンドスレッド
+    """
+
+    def __init__(self, poll_interval: float = 5.0, max_backoff: float = 60.0):
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, List[ChangeHandler]] = {}
+        self._poll_interval = poll_interval
+        self._max_backoff = max_backoff
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._received = 0
+
+    def register_handler(self, table: str, handler: ChangeHandler) -> None:
+        with self._lock:
+            handlers = self._handlers.setdefault(table, [])
+            if handler not in handlers:
+                handlers.append(handler)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="prompt-change-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"running": self.is_running(), "received": self._received}
+
+    def dispatch(self, payload: str) -> None:
+        """通知のペイロードを解析し、対象テーブルのハンドラーを呼び出す"""
+        try:
+            message = json.loads(payload)
+            table = message["table"]
+            keys = message.get("keys") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"不正なプロンプト変更通知を無視しました: {str(e)}")
+            return
+
+        self._received += 1
+        with self._lock:
+            handlers = list(self._handlers.get(table, []))
+
+        for handler in handlers:
+            try:
+                handler(keys)
+            except Exception as e:
+                print(f"プロンプト変更通知の処理に失敗しました ({table}): {str(e)}")
+
+    def reset_all(self) -> None:
+        """接続が切れている間の通知を取りこぼした可能性があるため、すべてのハンドラーにリセットを要求する"""
+        with self._lock:
+            handlers = [handler for table_handlers in self._handlers.values() for handler in table_handlers]
+
+        for handler in handlers:
+            try:
+                handler(None)
+            except Exception as e:
+                print(f"プロンプトキャッシュのリセットに失敗しました: {str(e)}")
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                print(f"プロンプト変更通知の受信が中断されました。{backoff:.0f}秒後に再接続します: {str(e)}")
+                self.reset_all()
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+
+    def _listen(self) -> None:
+        engine = DatabaseManager.get_instance().get_engine()
+
+        # 常時接続を保持するため、コネクションプールから切り離して使用する
+        raw_connection = engine.raw_connection()
+        raw_connection.detach()
+        dbapi_connection = raw_connection.dbapi_connection
+
+        try:
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"LISTEN {PROMPT_CHANGE_CHANNEL}")
+
+            # LISTEN開始前の変更を取りこぼさないよう、開始時点でキャッシュを破棄する
+            self.reset_all()
+
+            last_check = time.monotonic()
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([dbapi_connection], [], [], self._poll_interval)
+
+                if not readable:
+                    # 無通信時も定期的に接続を確認する
+                    if time.monotonic() - last_check >= self._poll_interval:
+                        cursor.execute("SELECT 1")
+                        last_check = time.monotonic()
+                    continue
+
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notification = dbapi_connection.notifies.pop(0)
+                    self.dispatch(notification.payload)
+        finally:
+            raw_connection.close()
+
+
+prompt_change_listener = PromptChangeListener()
+
+
+def start_prompt_change_listener() -> None:
+    """設定で有効な場合のみリスナーを開始する（Streamlitの再実行で何度呼ばれてもよい）"""
+    if PROMPT_CHANGE_LISTENER_ENABLED:
+        prompt_change_listener.start()
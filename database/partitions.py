@@ -0,0 +1,219 @@
+import datetime
+import gzip
+import os
+import re
+from typing import List, Optional
+
+import pytz
+from sqlalchemy import text
+
+from database.db import DatabaseManager
+from utils.constants import MESSAGES
+from utils.exceptions import DatabaseError
+
+JST = pytz.timezone('Asia/Tokyo')
+
+PARTITIONED_TABLE = "summary_usage"
+# どの月別パーティションにも該当しない日時のレコードの格納先（月別パーティションの作成漏れで挿入が失敗しないようにする）
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+PARTITION_NAME_PATTERN = re.compile(rf"^{PARTITIONED_TABLE}_(\d{{4}})_(\d{{2}})$")
+
+RETIRE_ACTIONS = ["detach", "archive", "drop"]
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARTITIONED_TABLE}_{month:%Y_%m}"
+
+
+def partition_month(name: str) -> Optional[datetime.date]:
+    """パーティション名から対象月を取得する（月別パーティションでない場合はNone）"""
+    match = PARTITION_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime.date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_bound(month: datetime.date) -> str:
+    """統計画面の集計と揃えるため、JSTの月初0時を境界にする"""
+    return f"{month.isoformat()} 00:00:00+09"
+
+
+def create_partition_sql(month: datetime.date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARTITIONED_TABLE} "
+        f"FOR VALUES FROM ('{partition_bound(month)}') TO ('{partition_bound(add_months(month, 1))}')"
+    )
+
+
+def expired_partitions(names: List[str], retention_months: int, today: datetime.date) -> List[str]:
+    """当月を除いてretention_monthsか月より前の月別パーティションを古い順に返す"""
+    if retention_months <= 0:
+        return []
+
+    cutoff = add_months(month_start(today), -retention_months)
+    expired = [(partition_month(name), name) for name in names]
+    return [name for month, name in sorted(item for item in expired if item[0]) if month < cutoff]
+
+
+def list_partitions(conn) -> List[str]:
+    rows = conn.execute(
+        text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+        """),
+        {"table": PARTITIONED_TABLE}
+    )
+    return [row[0] for row in rows]
+
+
+def create_default_partition_sql() -> str:
+    return f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARTITIONED_TABLE} DEFAULT"
+
+
+def ensure_default_partition() -> None:
+    """
+    デフォルトパーティションだけを作成する（起動時に使用）
+
+    月別パーティションはデフォルトパーティションに該当月のレコードがあると作成できないため、
+    起動時には作成せず、ensure_partitionsを定期的に実行して作成する。
+    """
+    engine = DatabaseManager.get_instance().get_engine()
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(create_default_partition_sql()))
+    except Exception as e:
+        raise DatabaseError(MESSAGES["DATABASE_PARTITION_ERROR"].format(error=str(e)))
+
+
+def default_partition_has_rows(conn, month: datetime.date) -> bool:
+    """デフォルトパーティションに該当月のレコードがあるか"""
+    return bool(conn.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            f"WHERE date >= '{partition_bound(month)}' AND date < '{partition_bound(add_months(month, 1))}')"
+        )
+    ).scalar())
+
+
+def ensure_partitions(months_ahead: int, today: Optional[datetime.date] = None) -> List[str]:
+    """
+    当月からmonths_aheadか月先までの月別パーティションと、デフォルトパーティションを作成する
+
+    デフォルトパーティションに該当月のレコードがある月は作成できないため、警告を表示して作成しない
+    （該当月のレコードはデフォルトパーティションに格納されたままになる）。
+
+    Returns:
+        作成したパーティション名のリスト
+    """
+    current = month_start(today or datetime.datetime.now(JST).date())
+    engine = DatabaseManager.get_instance().get_engine()
+    created = []
+
+    try:
+        with engine.begin() as conn:
+            existing = set(list_partitions(conn))
+
+            if DEFAULT_PARTITION not in existing:
+                conn.execute(text(create_default_partition_sql()))
+                created.append(DEFAULT_PARTITION)
+
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                if partition_name(month) in existing:
+                    continue
+                if DEFAULT_PARTITION in existing and default_partition_has_rows(conn, month):
+                    print(f"警告: {DEFAULT_PARTITION}に{month:%Y年%m月}のレコードがあるため、"
+                          f"{partition_name(month)}を作成しませんでした")
+                    continue
+                conn.execute(text(create_partition_sql(month)))
+                created.append(partition_name(month))
+
+        return created
+
+    except Exception as e:
+        raise DatabaseError(MESSAGES["DATABASE_PARTITION_ERROR"].format(error=str(e)))
+
+
+def archive_partition(name: str, archive_dir: str) -> str:
+    """切り離したパーティションをCSV.gzに書き出す"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+
+    raw_connection = DatabaseManager.get_instance().get_engine().raw_connection()
+    try:
+        with raw_connection.cursor() as cursor, gzip.open(path, "wb") as f:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        raw_connection.commit()
+    finally:
+        raw_connection.close()
+
+    return path
+
+
+def retire_expired_partitions(
+        retention_months: int,
+        action: str = "detach",
+        archive_dir: Optional[str] = None,
+        today: Optional[datetime.date] = None,
+        dry_run: bool = False
+) -> List[str]:
+    """
+    保持期間を過ぎた月別パーティションをsummary_usageから切り離す
+
+    切り離した月もsummary_usage_dailyの集計は残るため、統計画面の前日までの集計は変わらない。
+    ただし切り離した月をcompact_usage_rollupで再集計するとロールアップが消えるため対象にしないこと。
+
+    Args:
+        retention_months: 当月を除いて保持する月数
+        action: detach（別テーブルとして残す）/ archive（CSV.gzに書き出して削除）/ drop（削除）
+        archive_dir: archiveの書き出し先
+        today: 基準日（省略時はJSTの当日）
+        dry_run: Trueの場合は対象を返すだけで変更しない
+
+    Returns:
+        対象のパーティション名のリスト
+    """
+    if action not in RETIRE_ACTIONS:
+        raise ValueError(f"actionは{', '.join(RETIRE_ACTIONS)}のいずれかを指定してください: {action}")
+    if action == "archive" and not archive_dir:
+        raise ValueError("archiveにはarchive_dirの指定が必要です")
+
+    engine = DatabaseManager.get_instance().get_engine()
+
+    try:
+        with engine.connect() as conn:
+            names = expired_partitions(list_partitions(conn), retention_months,
+                                       today or datetime.datetime.now(JST).date())
+
+        if dry_run:
+            return names
+
+        for name in names:
+            # パーティションごとにコミットし、親テーブルのロックを短く保つ
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name}"))
+
+            if action == "archive":
+                path = archive_partition(name, archive_dir)
+                print(f"{name}を{path}に書き出しました")
+
+            if action in ("archive", "drop"):
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP TABLE {name}"))
+
+        return names
+
+    except Exception as e:
+        raise DatabaseError(MESSAGES["DATABASE_PARTITION_ERROR"].format(error=str(e)))
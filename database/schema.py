@@ -4,6 +4,7 @@ from subprocess import PIPE, run
 
 from database.db import DatabaseManager
 from database.models import Base
+from database.partitions import ensure_default_partition
 from utils.constants import MESSAGES
 from utils.exceptions import DatabaseError
 
@@ -38,6 +39,9 @@ def create_tables():
         db_manager = DatabaseManager.get_instance()
         engine = db_manager.get_engine()
         Base.metadata.create_all(engine)
+        # summary_usageはパーティションがないと挿入できないため、デフォルトパーティションをあわせて作成する
+        # （月別パーティションはscripts/manage_usage_partitions.pyとワーカーの定期処理で作成する）
+        ensure_default_partition()
         return True
     except Exception as e:
         raise DatabaseError(MESSAGES["DATABASE_TABLE_CREATE_ERROR"].format(error=str(e)))
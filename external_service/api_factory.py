@@ -1,9 +1,15 @@
+import time
 from enum import Enum
-from typing import Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from external_service.base_api import BaseAPIClient
+from external_service.circuit_breaker import circuit_breakers
 from external_service.claude_api import ClaudeAPIClient
+from external_service.client_registry import client_registry
 from external_service.gemini_api import GeminiAPIClient
+from external_service.rate_limiter import estimate_tokens, rate_limiter
+from external_service.response_cache import response_cache
+from external_service.scheduler import llm_scheduler
 from utils.constants import DEFAULT_DOCUMENT_TYPE, MESSAGES
 from utils.exceptions import APIError
 
@@ -31,7 +37,76 @@ class APIFactory:
             return client_mapping[provider]()
         else:
             raise APIError(MESSAGES["UNSUPPORTED_API_PROVIDER"].format(provider=provider))
+
+    @staticmethod
+    def provider_name(provider: Union[APIProvider, str]) -> str:
+        return provider.value if isinstance(provider, APIProvider) else provider.lower()
+
+    @staticmethod
+    def get_client_pool_stats() -> Dict[str, Any]:
+        """プール済みSDKクライアントのヒット率などの統計を返す"""
+        return client_registry.get_stats()
+
+    @staticmethod
+    def get_scheduler_stats() -> Dict[str, Any]:
+        """プロバイダーごとの実行中・待機中の呼び出し数と、診療科/医師ごとの待機数を返す"""
+        return llm_scheduler.get_stats()
     
+    @staticmethod
+    def get_circuit_breaker_stats() -> Dict[str, Any]:
+        """プロバイダーごとのサーキットブレーカーの状態と直近のエラー率を返す"""
+        return circuit_breakers.get_stats()
+
+    @staticmethod
+    def get_response_cache_stats() -> Dict[str, Any]:
+        """応答キャッシュのヒット数・ミス数と保存先の読み書きに失敗した回数を返す"""
+        return response_cache.get_stats()
+
+    @staticmethod
+    def get_rate_limiter_stats() -> Dict[str, Any]:
+        """利用上限による待機の回数・時間とトークンバケットの残量を返す"""
+        return rate_limiter.get_stats()
+
+    @staticmethod
+    def call_with_limits(provider: Union[APIProvider, str],
+                         department: str,
+                         doctor: str,
+                         model_name: Optional[str],
+                         estimated_tokens: int,
+                         call: Callable[[], Tuple[str, int, int]]) -> Tuple[str, int, int]:
+        """
+        利用上限の予約とスケジューラーの実行枠を確保して呼び出し、実際のトークン数で精算する
+
+        利用上限の残量を待つ間に実行枠を占有しないよう、予約してから実行枠を確保する。
+        実行枠を確保できずにAPIを呼び出さなかった場合は、予約したトークン数を戻す。
+        サーキットブレーカーが遮断中の場合は待たずにAPIErrorを送出する。
+        結果と応答時間（実行枠・利用上限の待機時間を除く）をサーキットブレーカーに記録する。
+        """
+        provider_name = APIFactory.provider_name(provider)
+        breaker = circuit_breakers.acquire(provider_name)
+        try:
+            reservation = rate_limiter.acquire(provider_name, model_name, estimated_tokens)
+            called = False
+            try:
+                with llm_scheduler.slot(provider_name, department, doctor):
+                    called = True
+                    start = time.monotonic()
+                    summary, input_tokens, output_tokens = call()
+                    latency = time.monotonic() - start
+            except Exception:
+                if not called:
+                    rate_limiter.reconcile(reservation, 0)
+                raise
+            rate_limiter.reconcile(reservation, input_tokens + output_tokens)
+        except Exception as e:
+            if breaker:
+                breaker.record_error(e)
+            raise
+
+        if breaker:
+            breaker.record_success(latency)
+        return summary, input_tokens, output_tokens
+
     @staticmethod
     def generate_summary_with_provider(provider: Union[APIProvider, str],
                                      medical_text: str,
@@ -40,13 +115,65 @@ class APIFactory:
                                      document_type: str = DEFAULT_DOCUMENT_TYPE,
                                      doctor: str = "default",
                                      model_name: str = None,
-                                     previous_record: str = ""):
+                                     previous_record: str = "",
+                                     call_stats: Optional[Dict[str, Any]] = None,
+                                     use_cache: bool = True):
         client = APIFactory.create_client(provider)
-        return client.generate_summary(
-            medical_text, additional_info, department,
-            document_type, doctor, model_name, previous_record
-        )
+        # 応答キャッシュの結果を返す場合は実行枠と利用上限を消費しない
+        result = client.get_cached_summary(
+            medical_text, additional_info, department, document_type, doctor, model_name, previous_record
+        ) if use_cache and response_cache.enabled else None
+        if result is None:
+            result = APIFactory.call_with_limits(
+                provider, department, doctor, model_name,
+                estimate_tokens(medical_text, additional_info, previous_record),
+                lambda: client.generate_summary(
+                    medical_text, additional_info, department,
+                    document_type, doctor, model_name, previous_record, use_cache=use_cache
+                )
+            )
+        if call_stats is not None:
+            # 再試行回数・ヘッジリクエストの採用有無・応答キャッシュの使用有無（使用量の記録用）
+            call_stats.update(client.last_call_stats)
+        return result
+
+    @staticmethod
+    def generate_summary_stream_with_provider(provider: Union[APIProvider, str],
+                                              medical_text: str,
+                                              additional_info: str = "",
+                                              department: str = "default",
+                                              document_type: str = DEFAULT_DOCUMENT_TYPE,
+                                              doctor: str = "default",
+                                              model_name: str = None,
+                                              previous_record: str = "",
+                                              on_delta: Optional[Callable[[str], None]] = None,
+                                              call_stats: Optional[Dict[str, Any]] = None,
+                                              use_cache: bool = True):
+        client = APIFactory.create_client(provider)
+        result = client.get_cached_summary(
+            medical_text, additional_info, department, document_type, doctor, model_name, previous_record
+        ) if use_cache and response_cache.enabled else None
+        if result is not None:
+            # 応答キャッシュの結果は一括で画面に渡す
+            if on_delta:
+                on_delta(result[0])
+        else:
+            result = APIFactory.call_with_limits(
+                provider, department, doctor, model_name,
+                estimate_tokens(medical_text, additional_info, previous_record),
+                lambda: client.generate_summary_stream(
+                    medical_text, additional_info, department,
+                    document_type, doctor, model_name, previous_record, on_delta, use_cache=use_cache
+                )
+            )
+        if call_stats is not None:
+            call_stats.update(client.last_call_stats)
+        return result
 
 
 def generate_summary(provider: str, medical_text: str, **kwargs):
     return APIFactory.generate_summary_with_provider(provider, medical_text, **kwargs)
+
+
+def generate_summary_stream(provider: str, medical_text: str, **kwargs):
+    return APIFactory.generate_summary_stream_with_provider(provider, medical_text, **kwargs)
@@ -1,16 +1,23 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Tuple, Optional
+from typing import Any, Callable, Dict, Generator, Optional, Tuple
 
+from external_service.response_cache import response_cache, response_cache_key
+from external_service.retry_policy import AttemptCancelled, get_retry_policy
 from utils.config import get_config
-from utils.constants import DEFAULT_DOCUMENT_TYPE
+from utils.constants import DEFAULT_DOCUMENT_TYPE, MESSAGES
 from utils.exceptions import APIError
 from utils.prompt_manager import get_prompt
 
 
 class BaseAPIClient(ABC):
+    # 再試行の設定（RETRY_*_{PROVIDER}）とレイテンシの実績を共有する単位
+    provider = "default"
+
     def __init__(self, api_key: str, default_model: str):
         self.api_key = api_key
         self.default_model = default_model
+        self.last_call_stats: Dict[str, Any] = {"retry_count": 0, "hedged": False, "cache_hit": False}
     
     @abstractmethod
     def initialize(self) -> bool:
@@ -19,6 +26,22 @@ class BaseAPIClient(ABC):
     @abstractmethod
     def _generate_content(self, prompt: str, model_name: str) -> Tuple[str, int, int]:
         pass
+
+    def _generate_content_stream(self, prompt: str, model_name: str) -> Generator[str, None, Tuple[int, int]]:
+        """
+        プロンプトから要約をストリーミング生成します。
+        ストリーミングに対応していないクライアントでは生成結果を一括で返します。
+        Args:
+            prompt: 生成用プロンプト
+            model_name: 使用するモデル名
+        Yields:
+            str: 生成されたテキストの差分
+        Returns:
+            Tuple[int, int]: (入力トークン数, 出力トークン数)
+        """
+        summary_text, input_tokens, output_tokens = self._generate_content(prompt, model_name)
+        yield summary_text
+        return input_tokens, output_tokens
     
     def create_summary_prompt(self, medical_text: str, additional_info: str = "",
                             department: str = "default", document_type: str = DEFAULT_DOCUMENT_TYPE,
@@ -34,12 +57,63 @@ class BaseAPIClient(ABC):
         prompt = f"{prompt_template}\n\n【前回の記載】\n{previous_record}\n\n【カルテ情報】\n{medical_text}\n\n【追加情報】\n{additional_info}"
         return prompt
     
+    def generation_params(self) -> Dict[str, Any]:
+        """プロンプト以外で生成結果に影響するパラメータ（応答キャッシュのキーに含める）"""
+        return {}
+
+    def _cache_key(self, prompt: str, model_name: str) -> str:
+        return response_cache_key(self.provider, model_name, prompt, self.generation_params())
+
     def get_model_name(self, department: str, document_type: str, doctor: str) -> str:
         prompt_data = get_prompt(department, document_type, doctor)
         return prompt_data.get("selected_model") if prompt_data and prompt_data.get(
             "selected_model") else self.default_model
     
-    def generate_summary(
+    def _attempt(self, prompt: str, model_name: str, streaming: bool,
+                 emit: Callable[[str], None], cancelled: threading.Event) -> Tuple[str, int, int]:
+        """1回分の呼び出し。cancelledが設定された場合はストリームを閉じて中断する"""
+        if not streaming:
+            return self._generate_content(prompt, model_name)
+
+        stream = self._generate_content_stream(prompt, model_name)
+        chunks = []
+        try:
+            while True:
+                if cancelled.is_set():
+                    raise AttemptCancelled()
+                try:
+                    delta = next(stream)
+                except StopIteration as stop:
+                    input_tokens, output_tokens = stop.value
+                    break
+
+                if delta:
+                    chunks.append(delta)
+                    emit(delta)
+        finally:
+            stream.close()
+
+        return "".join(chunks), input_tokens, output_tokens
+
+    def _execute(self, prompt: str, model_name: str, streaming: bool,
+                 on_delta: Optional[Callable[[str], None]] = None, use_cache: bool = True) -> Tuple[str, int, int]:
+        """
+        再試行・期限・ヘッジリクエストの方針に従って呼び出し、再試行回数などをlast_call_statsに記録する
+
+        use_cacheがFalseの場合と生成結果が空の場合は応答キャッシュに保存しない。
+        """
+        result, self.last_call_stats = get_retry_policy(self.provider).execute(
+            lambda emit, cancelled: self._attempt(prompt, model_name, streaming, emit, cancelled),
+            on_delta,
+            streaming
+        )
+        self.last_call_stats["cache_hit"] = False
+        summary = result[0]
+        if use_cache and summary.strip() and summary != MESSAGES["EMPTY_RESPONSE"]:
+            response_cache.set(self._cache_key(prompt, model_name), *result)
+        return result
+
+    def get_cached_summary(
             self, medical_text: str,
             additional_info: str = "",
             department: str = "default",
@@ -47,6 +121,40 @@ class BaseAPIClient(ABC):
             doctor: str = "default",
             model_name: Optional[str] = None,
             previous_record: str = ""
+    ) -> Optional[Tuple[str, int, int]]:
+        """
+        応答キャッシュに同じリクエストの結果があれば返す（APIは呼び出さないためトークン数は0）
+
+        キャッシュが無効の場合や結果がない場合はNoneを返す。
+        """
+        if not response_cache.enabled:
+            return None
+
+        try:
+            if not model_name:
+                model_name = self.get_model_name(department, document_type, doctor)
+            prompt = self.create_summary_prompt(
+                medical_text, additional_info, department, document_type, doctor, previous_record
+            )
+        except Exception as e:
+            raise APIError(f"{self.__class__.__name__}でエラーが発生しました: {str(e)}")
+
+        cached = response_cache.get(self._cache_key(prompt, model_name))
+        if cached is None:
+            return None
+
+        self.last_call_stats = {"retry_count": 0, "hedged": False, "cache_hit": True}
+        return cached["summary"], 0, 0
+
+    def generate_summary(
+            self, medical_text: str,
+            additional_info: str = "",
+            department: str = "default",
+            document_type: str = DEFAULT_DOCUMENT_TYPE,
+            doctor: str = "default",
+            model_name: Optional[str] = None,
+            previous_record: str = "",
+            use_cache: bool = True
     ) -> Tuple[str, int, int]:
         try:
             self.initialize()
@@ -56,7 +164,33 @@ class BaseAPIClient(ABC):
 
             prompt = self.create_summary_prompt(medical_text, additional_info, department, document_type, doctor, previous_record)
 
-            return self._generate_content(prompt, model_name)
+            return self._execute(prompt, model_name, streaming=False, use_cache=use_cache)
+
+        except APIError as e:
+            raise e
+        except Exception as e:
+            raise APIError(f"{self.__class__.__name__}でエラーが発生しました: {str(e)}")
+
+    def generate_summary_stream(
+            self, medical_text: str,
+            additional_info: str = "",
+            department: str = "default",
+            document_type: str = DEFAULT_DOCUMENT_TYPE,
+            doctor: str = "default",
+            model_name: Optional[str] = None,
+            previous_record: str = "",
+            on_delta: Optional[Callable[[str], None]] = None,
+            use_cache: bool = True
+    ) -> Tuple[str, int, int]:
+        try:
+            self.initialize()
+
+            if not model_name:
+                model_name = self.get_model_name(department, document_type, doctor)
+
+            prompt = self.create_summary_prompt(medical_text, additional_info, department, document_type, doctor, previous_record)
+
+            return self._execute(prompt, model_name, streaming=True, on_delta=on_delta, use_cache=use_cache)
 
         except APIError as e:
             raise e
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from external_service.retry_policy import DeadlineExceededError, is_retryable_error
+from utils.config import (
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_OPEN_SECONDS,
+    CIRCUIT_BREAKER_PROBE_SUCCESSES,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+    CIRCUIT_BREAKER_WINDOW_SIZE,
+)
+from utils.constants import MESSAGES
+from utils.exceptions import APIError
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """
+    プロバイダー側の障害とみなすエラー（一時的なエラーと期限切れ）かどうかを判定する
+
+    入力内容やプロンプトによるエラーで他の診療科の呼び出しまで遮断しないよう、それ以外のエラーは数えない。
+    """
+    return isinstance(error, DeadlineExceededError) or is_retryable_error(error)
+
+
+class CircuitBreaker:
+    """
+    プロバイダーごとのサーキットブレーカー
+
+    closed: 直近window_size件の呼び出しのエラー率または遅い呼び出しの割合が閾値以上になるとopenにする。
+    open: 呼び出しを受け付けず、呼び出し元は他のプロバイダーに切り替える。open_seconds秒後にhalf_openにする。
+    half_open: 試験的な呼び出しを1件ずつ受け付け、probe_successes回続けて成功するとclosedに戻す。
+    失敗した場合や遅い場合は再びopenにする。
+    """
+
+    def __init__(
+            self,
+            provider: str,
+            window_size: int = CIRCUIT_BREAKER_WINDOW_SIZE,
+            min_calls: int = CIRCUIT_BREAKER_MIN_CALLS,
+            failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_seconds: float = CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate: float = CIRCUIT_BREAKER_SLOW_CALL_RATE,
+            open_seconds: float = CIRCUIT_BREAKER_OPEN_SECONDS,
+            probe_successes: int = CIRCUIT_BREAKER_PROBE_SUCCESSES,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.provider = provider
+        self._min_calls = max(min_calls, 1)
+        self._failure_rate = failure_rate
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_call_rate = slow_call_rate
+        self._open_seconds = open_seconds
+        self._probe_successes = max(probe_successes, 1)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (失敗したか, 遅かったか)
+        self._window: deque = deque(maxlen=max(window_size, 1))
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_succeeded = 0
+        self._opened = 0
+        self._rejected = 0
+
+    def _refresh(self) -> str:
+        if self._state == STATE_OPEN and self._clock() - self._opened_at >= self._open_seconds:
+            self._state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+            self._probe_succeeded = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._refresh()
+
+    def is_available(self) -> bool:
+        """呼び出しを受け付けられる状態か（状態は変えない。振り分け先の判定に使用する）"""
+        with self._lock:
+            state = self._refresh()
+            return state == STATE_CLOSED or (state == STATE_HALF_OPEN and not self._probe_in_flight)
+
+    def acquire(self) -> bool:
+        """呼び出しを開始してよいか。half_openでは試験的な呼び出しとして1件だけ受け付ける"""
+        with self._lock:
+            state = self._refresh()
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def _open(self) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self._window.clear()
+        self._opened += 1
+        print(f"{self.provider}の呼び出しを{self._open_seconds:.0f}秒間遮断します")
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                if failed or slow:
+                    self._open()
+                    return
+                self._probe_succeeded += 1
+                if self._probe_succeeded >= self._probe_successes:
+                    self._state = STATE_CLOSED
+                    self._window.clear()
+                    print(f"{self.provider}の呼び出しの遮断を解除しました")
+                return
+
+            if self._state == STATE_OPEN:
+                # 遮断する前に開始した呼び出しの結果は数えない
+                return
+
+            self._window.append((failed, slow))
+            if len(self._window) < self._min_calls:
+                return
+            failures = sum(1 for call_failed, _ in self._window if call_failed)
+            slow_calls = sum(1 for _, call_slow in self._window if call_slow)
+            if (failures / len(self._window) >= self._failure_rate
+                    or slow_calls / len(self._window) >= self._slow_call_rate):
+                self._open()
+
+    def record_success(self, latency: float) -> None:
+        self._record(False, latency > self._slow_call_seconds)
+
+    def record_failure(self) -> None:
+        self._record(True, False)
+
+    def record_ignored(self) -> None:
+        """プロバイダー側の障害ではないエラーの場合（試験的な呼び出しの枠だけ解放する）"""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_error(self, error: BaseException) -> None:
+        if is_provider_failure(error):
+            self.record_failure()
+        else:
+            self.record_ignored()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._refresh()
+            calls = len(self._window)
+            return {
+                "state": state,
+                "calls": calls,
+                "failure_rate": sum(1 for failed, _ in self._window if failed) / calls if calls else 0.0,
+                "slow_call_rate": sum(1 for _, slow in self._window if slow) / calls if calls else 0.0,
+                "opened": self._opened,
+                "rejected": self._rejected,
+            }
+
+
+class CircuitBreakerRegistry:
+    """プロバイダーごとのサーキットブレーカー（プロセス内で共有する）"""
+
+    def __init__(self, enabled: bool = CIRCUIT_BREAKER_ENABLED, **options: Any):
+        self.enabled = enabled
+        self._options = options
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = self._breakers[provider] = CircuitBreaker(provider, **self._options)
+            return breaker
+
+    def is_available(self, provider: str) -> bool:
+        return not self.enabled or self.get(provider).is_available()
+
+    def acquire(self, provider: str) -> Optional[CircuitBreaker]:
+        """呼び出し前に確認し、遮断中の場合はタイムアウトを待たずにAPIErrorを送出する（無効の場合はNone）"""
+        if not self.enabled:
+            return None
+        breaker = self.get(provider)
+        if not breaker.acquire():
+            raise APIError(MESSAGES["CIRCUIT_OPEN"].format(provider=provider))
+        return breaker
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.provider: breaker.get_stats() for breaker in breakers}
+
+
+circuit_breakers = CircuitBreakerRegistry()
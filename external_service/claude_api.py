@@ -1,10 +1,11 @@
 import os
-from typing import Tuple
+from typing import Any, Dict, Generator, Tuple
 
 from anthropic import AnthropicBedrock
 from dotenv import load_dotenv
 
 from external_service.base_api import BaseAPIClient
+from external_service.client_registry import client_registry, credential_fingerprint
 from utils.constants import MESSAGES
 from utils.exceptions import APIError
 
@@ -12,6 +13,9 @@ load_dotenv()
 
 
 class ClaudeAPIClient(BaseAPIClient):
+    provider = "claude"
+    MAX_TOKENS = 6000
+
     def __init__(self):
         self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
         self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
@@ -29,16 +33,27 @@ class ClaudeAPIClient(BaseAPIClient):
             if not self.anthropic_model:
                 raise APIError(MESSAGES["ANTHROPIC_MODEL_MISSING"])
 
-            self.client = AnthropicBedrock(
-                aws_access_key=self.aws_access_key_id,
-                aws_secret_key=self.aws_secret_access_key,
-                aws_region=self.aws_region,
+            registry_key = (
+                "claude",
+                self.aws_region,
+                credential_fingerprint(self.aws_access_key_id, self.aws_secret_access_key),
+            )
+            self.client = client_registry.get_or_create(
+                registry_key,
+                lambda: AnthropicBedrock(
+                    aws_access_key=self.aws_access_key_id,
+                    aws_secret_key=self.aws_secret_access_key,
+                    aws_region=self.aws_region,
+                )
             )
             return True
 
         except Exception as e:
             raise APIError(MESSAGES["BEDROCK_INIT_ERROR"].format(error=str(e)))
 
+    def generation_params(self) -> Dict[str, Any]:
+        return {"max_tokens": self.MAX_TOKENS}
+
     def _generate_content(self, prompt: str, model_name: str) -> Tuple[str, int, int]:
         """
         プロンプトから要約を生成します。
@@ -53,7 +68,7 @@ class ClaudeAPIClient(BaseAPIClient):
         try:
             response = self.client.messages.create(
                 model=model_name,
-                max_tokens=6000,
+                max_tokens=self.MAX_TOKENS,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
@@ -71,3 +86,25 @@ class ClaudeAPIClient(BaseAPIClient):
 
         except Exception as e:
             raise APIError(MESSAGES["BEDROCK_API_ERROR"].format(error=str(e)))
+
+    def _generate_content_stream(self, prompt: str, model_name: str) -> Generator[str, None, Tuple[int, int]]:
+        try:
+            with self.client.messages.stream(
+                model=model_name,
+                max_tokens=self.MAX_TOKENS,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+
+                final_message = stream.get_final_message()
+
+            if not final_message.content:
+                yield MESSAGES["EMPTY_RESPONSE"]
+
+            return final_message.usage.input_tokens, final_message.usage.output_tokens
+
+        except Exception as e:
+            raise APIError(MESSAGES["BEDROCK_API_ERROR"].format(error=str(e)))
@@ -0,0 +1,141 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from utils.config import CLIENT_CREDENTIAL_REFRESH_INTERVAL
+
+
+def credential_fingerprint(*secrets: Optional[str]) -> str:
+    """認証情報からレジストリのキーに使うハッシュ値を生成する（秘密情報そのものはキーに含めない）"""
+    digest = hashlib.sha256()
+    for secret in secrets:
+        digest.update((secret or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class ClientRegistry:
+    """
+    プロバイダー・リージョン・認証情報ごとにSDKクライアントを1つだけ保持するスレッドセーフなレジストリ
+
+    SDKクライアントは内部にHTTPコネクションプールを持つため、使い回すことで
+    リクエストごとのTLSハンドシェイクや認証トークンの発行を避けられる。
+    """
+
+    def __init__(self, refresh_interval: float = CLIENT_CREDENTIAL_REFRESH_INTERVAL):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._clients: Dict[Hashable, Any] = {}
+        self._refreshers: Dict[Hashable, Callable[[Any], None]] = {}
+        self._refresh_interval = refresh_interval
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_errors = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any],
+                      refresher: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        キーに対応するクライアントを返す。未作成の場合はfactoryで作成して登録する
+
+        Args:
+            key: プロバイダー・リージョン・認証情報を表すキー
+            factory: クライアントを生成する関数
+            refresher: プール済みオブジェクトを受け取り、認証情報をバックグラウンドで更新する関数
+
+        Returns:
+            プール済みのクライアント
+        """
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._hits += 1
+                return client
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # 生成処理は重いため、同じキーの生成だけを直列化する
+        with key_lock:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is not None:
+                    self._hits += 1
+                    return client
+                self._misses += 1
+
+            client = factory()
+
+            with self._lock:
+                self._clients[key] = client
+                if refresher is not None:
+                    self._refreshers[key] = refresher
+
+        if refresher is not None:
+            self._ensure_refresh_thread()
+        return client
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._clients.pop(key, None)
+            self._refreshers.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._refreshers.clear()
+            self._hits = 0
+            self._misses = 0
+            self._refreshes = 0
+            self._refresh_errors = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "size": len(self._clients),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "refreshes": self._refreshes,
+                "refresh_errors": self._refresh_errors,
+            }
+
+    def refresh_credentials(self) -> None:
+        """登録済みの認証情報更新関数をすべて実行する"""
+        with self._lock:
+            refreshers = [(key, refresher, self._clients.get(key)) for key, refresher in self._refreshers.items()]
+
+        for key, refresher, client in refreshers:
+            if client is None:
+                continue
+            try:
+                refresher(client)
+                with self._lock:
+                    self._refreshes += 1
+            except Exception as e:
+                with self._lock:
+                    self._refresh_errors += 1
+                print(f"認証情報の更新に失敗しました ({key[0] if isinstance(key, tuple) else key}): {str(e)}")
+
+    def shutdown(self) -> None:
+        self._stop_event.set()
+
+    def _ensure_refresh_thread(self) -> None:
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop,
+                name="client-credential-refresh",
+                daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.wait(self._refresh_interval):
+            self.refresh_credentials()
+
+
+client_registry = ClientRegistry()
@@ -1,58 +1,101 @@
+import datetime
 import json
 import os
-from typing import Tuple
+from typing import Generator, Tuple
 
 from google import genai
+from google.auth.transport.requests import Request
 from google.genai import types
 from google.oauth2 import service_account
 
 from external_service.base_api import BaseAPIClient
-from utils.config import GEMINI_MODEL, GEMINI_THINKING_LEVEL, GOOGLE_PROJECT_ID, GOOGLE_LOCATION
+from external_service.client_registry import client_registry, credential_fingerprint
+from utils.config import (
+    CLIENT_CREDENTIAL_REFRESH_INTERVAL,
+    GEMINI_MODEL,
+    GEMINI_THINKING_LEVEL,
+    GOOGLE_LOCATION,
+    GOOGLE_PROJECT_ID,
+)
 from utils.constants import MESSAGES
 from utils.exceptions import APIError
 
 
+def _load_service_account_credentials(google_credentials_json: str) -> service_account.Credentials:
+    try:
+        credentials_dict = json.loads(google_credentials_json)
+
+        credentials = service_account.Credentials.from_service_account_info(
+            credentials_dict,
+            scopes=['https://www.googleapis.com/auth/cloud-platform']
+        )
+        # 初回リクエストでのトークン発行を避けるため、作成時に取得しておく
+        credentials.refresh(Request())
+        return credentials
+
+    except json.JSONDecodeError as e:
+        raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_JSON_PARSE_ERROR"].format(error=str(e)))
+    except KeyError as e:
+        raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_FIELD_MISSING"].format(error=str(e)))
+    except Exception as e:
+        raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_ERROR"].format(error=str(e)))
+
+
+def _refresh_service_account_credentials(credentials: service_account.Credentials) -> None:
+    """有効期限が次回の更新周期までに切れる場合、バックグラウンドでトークンを再発行する"""
+    margin = datetime.timedelta(seconds=CLIENT_CREDENTIAL_REFRESH_INTERVAL * 2)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    if credentials.valid and credentials.expiry and credentials.expiry - now > margin:
+        return
+    credentials.refresh(Request())
+
+
+def get_vertex_client() -> genai.Client:
+    """プロジェクト・リージョン・認証情報ごとにプールされたVertex AIクライアントを取得する"""
+    if not GOOGLE_PROJECT_ID:
+        raise APIError(MESSAGES["VERTEX_AI_PROJECT_MISSING"])
+
+    google_credentials_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
+    fingerprint = credential_fingerprint(google_credentials_json)
+
+    if google_credentials_json:
+        credentials = client_registry.get_or_create(
+            ("google_credentials", fingerprint),
+            lambda: _load_service_account_credentials(google_credentials_json),
+            refresher=_refresh_service_account_credentials
+        )
+
+        return client_registry.get_or_create(
+            ("gemini", GOOGLE_PROJECT_ID, GOOGLE_LOCATION, fingerprint),
+            lambda: genai.Client(
+                vertexai=True,
+                project=GOOGLE_PROJECT_ID,
+                location=GOOGLE_LOCATION,
+                credentials=credentials
+            )
+        )
+
+    return client_registry.get_or_create(
+        ("gemini", GOOGLE_PROJECT_ID, GOOGLE_LOCATION, fingerprint),
+        lambda: genai.Client(
+            vertexai=True,
+            project=GOOGLE_PROJECT_ID,
+            location=GOOGLE_LOCATION,
+        )
+    )
+
+
 class GeminiAPIClient(BaseAPIClient):
+    provider = "gemini"
+
     def __init__(self):
         super().__init__(None, GEMINI_MODEL)
         self.client = None
 
     def initialize(self) -> bool:
         try:
-            if not GOOGLE_PROJECT_ID:
-                raise APIError(MESSAGES["VERTEX_AI_PROJECT_MISSING"])
-
-            google_credentials_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
-            
-            if google_credentials_json:
-                try:
-                    credentials_dict = json.loads(google_credentials_json)
-
-                    credentials = service_account.Credentials.from_service_account_info(
-                        credentials_dict,
-                        scopes=['https://www.googleapis.com/auth/cloud-platform']
-                    )
-
-                    self.client = genai.Client(
-                        vertexai=True,
-                        project=GOOGLE_PROJECT_ID,
-                        location=GOOGLE_LOCATION,
-                        credentials=credentials
-                    )
-                    
-                except json.JSONDecodeError as e:
-                    raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_JSON_PARSE_ERROR"].format(error=str(e)))
-                except KeyError as e:
-                    raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_FIELD_MISSING"].format(error=str(e)))
-                except Exception as e:
-                    raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_ERROR"].format(error=str(e)))
-            else:
-                self.client = genai.Client(
-                    vertexai=True,
-                    project=GOOGLE_PROJECT_ID,
-                    location=GOOGLE_LOCATION,
-                )
-            
+            self.client = get_vertex_client()
             return True
         except APIError:
             raise
@@ -81,3 +124,24 @@ class GeminiAPIClient(BaseAPIClient):
             return summary_text, input_tokens, output_tokens
         except Exception as e:
             raise APIError(MESSAGES["VERTEX_AI_API_ERROR"].format(error=str(e)))
+
+    def _generate_content_stream(self, prompt: str, model_name: str) -> Generator[str, None, Tuple[int, int]]:
+        try:
+            input_tokens = 0
+            output_tokens = 0
+
+            for chunk in self.client.models.generate_content_stream(
+                model=model_name,
+                contents=prompt
+            ):
+                if getattr(chunk, 'text', None):
+                    yield chunk.text
+
+                # 使用量は最後のチャンクに累計値が入る
+                if getattr(chunk, 'usage_metadata', None):
+                    input_tokens = chunk.usage_metadata.prompt_token_count or 0
+                    output_tokens = chunk.usage_metadata.candidates_token_count or 0
+
+            return input_tokens, output_tokens
+        except Exception as e:
+            raise APIError(MESSAGES["VERTEX_AI_API_ERROR"].format(error=str(e)))
@@ -1,13 +1,10 @@
-import json
-import os
 from typing import Tuple
 
-from google import genai
 from google.genai import types
-from google.oauth2 import service_account
 
 from external_service.base_api import BaseAPIClient
-from utils.config import GEMINI_EVALUATION_MODEL, GEMINI_THINKING_LEVEL, GOOGLE_PROJECT_ID, GOOGLE_LOCATION
+from external_service.gemini_api import get_vertex_client
+from utils.config import GEMINI_EVALUATION_MODEL, GEMINI_THINKING_LEVEL
 from utils.constants import MESSAGES
 from utils.exceptions import APIError
 
@@ -19,40 +16,7 @@ class GeminiAPIClient(BaseAPIClient):
 
     def initialize(self) -> bool:
         try:
-            if not GOOGLE_PROJECT_ID:
-                raise APIError(MESSAGES["VERTEX_AI_PROJECT_MISSING"])
-
-            google_credentials_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
-            
-            if google_credentials_json:
-                try:
-                    credentials_dict = json.loads(google_credentials_json)
-
-                    credentials = service_account.Credentials.from_service_account_info(
-                        credentials_dict,
-                        scopes=['https://www.googleapis.com/auth/cloud-platform']
-                    )
-
-                    self.client = genai.Client(
-                        vertexai=True,
-                        project=GOOGLE_PROJECT_ID,
-                        location=GOOGLE_LOCATION,
-                        credentials=credentials
-                    )
-                    
-                except json.JSONDecodeError as e:
-                    raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_JSON_PARSE_ERROR"].format(error=str(e)))
-                except KeyError as e:
-                    raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_FIELD_MISSING"].format(error=str(e)))
-                except Exception as e:
-                    raise APIError(MESSAGES["VERTEX_AI_CREDENTIALS_ERROR"].format(error=str(e)))
-            else:
-                self.client = genai.Client(
-                    vertexai=True,
-                    project=GOOGLE_PROJECT_ID,
-                    location=GOOGLE_LOCATION,
-                )
-            
+            self.client = get_vertex_client()
             return True
         except APIError:
             raise
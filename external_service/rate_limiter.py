@@ -0,0 +1,231 @@
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database.db import DatabaseManager
+from database.models import RateLimitBucket
+from utils.config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_MAX_WAIT,
+    RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE,
+    RATE_LIMIT_RPM,
+    RATE_LIMIT_TPM,
+)
+from utils.constants import MESSAGES
+from utils.exceptions import APIError, DatabaseError
+
+RATE_LIMIT_BACKENDS = ["memory", "postgres"]
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """入力テキストのトークン数の目安（文字数。モデルの自動切り替えと利用上限の予約で使用する）"""
+    return sum(len(text or "") for text in texts)
+
+
+class MemoryBucketStore:
+    """プロセス内のスレッドで共有するトークンバケット"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, capacity: float, rate: float, amount: float) -> float:
+        """
+        経過時間分を補充してからamountを差し引き、残量を返す（負の値は不足分）
+
+        amountが負の場合は返却として扱い、残量はcapacityを超えない。
+        """
+        with self._lock:
+            now = self._clock()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, min(capacity, tokens + (now - updated) * rate) - amount)
+            self._buckets[key] = (tokens, now)
+            return tokens
+
+    def get_levels(self) -> Dict[str, float]:
+        with self._lock:
+            return {key: tokens for key, (tokens, _) in self._buckets.items()}
+
+
+class PostgresBucketStore:
+    """
+    rate_limit_bucketsテーブルで全プロセスに共有するトークンバケット
+
+    補充・差し引きを1つのINSERT ... ON CONFLICT DO UPDATEで行うため、行ロックにより同時に呼び出しても残量がずれない。
+    """
+
+    def take(self, key: str, capacity: float, rate: float, amount: float) -> float:
+        try:
+            elapsed = func.extract('epoch', func.clock_timestamp() - RateLimitBucket.updated_at)
+            refilled = func.least(capacity, RateLimitBucket.tokens + elapsed * rate)
+            stmt = pg_insert(RateLimitBucket).values(
+                bucket_key=key,
+                tokens=min(capacity, capacity - amount),
+                updated_at=func.clock_timestamp()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[RateLimitBucket.bucket_key],
+                set_={
+                    "tokens": func.least(capacity, refilled - amount),
+                    "updated_at": func.clock_timestamp(),
+                }
+            ).returning(RateLimitBucket.tokens)
+
+            engine = DatabaseManager.get_instance().get_engine()
+            with engine.begin() as conn:
+                return float(conn.execute(stmt).scalar_one())
+        except Exception as e:
+            raise DatabaseError(MESSAGES["DATABASE_RATE_LIMIT_ERROR"].format(error=str(e)))
+
+    def get_levels(self) -> Dict[str, float]:
+        return {}
+
+
+class Reservation:
+    __slots__ = ("provider", "model", "tokens")
+
+    def __init__(self, provider: str, model: str, tokens: int):
+        self.provider = provider
+        self.model = model
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """
+    プロバイダー・モデルごとの1分あたりのリクエスト数（RPM）とトークン数（TPM）のトークンバケットによる利用上限
+
+    呼び出し前に入力の推定トークン数と出力トークン数の目安を予約し、残量が不足する場合は
+    補充されるまで待機してから呼び出す（上限を超えたリクエストを失敗させずに間隔を空けて送る）。
+    完了後は実際のトークン数との差を精算する。待機時間がmax_waitを超える場合は予約を取り消してAPIErrorを送出する。
+    """
+
+    def __init__(
+            self,
+            rpm_limits: Optional[Dict[str, float]] = None,
+            tpm_limits: Optional[Dict[str, float]] = None,
+            store: Any = None,
+            max_wait: float = RATE_LIMIT_MAX_WAIT,
+            output_token_estimate: int = RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        self._rpm_limits = rpm_limits or {}
+        self._tpm_limits = tpm_limits or {}
+        self._store = store or MemoryBucketStore()
+        self._max_wait = max_wait
+        self._output_token_estimate = output_token_estimate
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._waited = 0
+        self._wait_time = 0.0
+        self._rejected = 0
+        self._store_errors = 0
+
+    @staticmethod
+    def _limit(limits: Dict[str, float], provider: str, model: str) -> Optional[float]:
+        """「プロバイダー/モデル」、プロバイダーの順に上限を探す"""
+        return limits.get(f"{provider}/{model}", limits.get(provider))
+
+    @staticmethod
+    def _bucket_key(provider: str, model: str, kind: str) -> str:
+        return f"{provider}/{model}:{kind}"
+
+    def _take(self, key: str, limit: float, amount: float) -> float:
+        return self._store.take(key, limit, limit / 60.0, amount)
+
+    def _release(self, taken: List[Tuple[str, float, float]]) -> None:
+        """予約を取り消す（取り消せなかった分は時間の経過とともに補充される）"""
+        for key, limit, amount in taken:
+            try:
+                self._take(key, limit, -amount)
+            except DatabaseError as e:
+                with self._lock:
+                    self._store_errors += 1
+                print(f"利用上限の予約の取り消しに失敗しました: {str(e)}")
+
+    def acquire(self, provider: str, model: Optional[str], estimated_input_tokens: int) -> Reservation:
+        """リクエスト数とトークン数を予約し、利用上限に収まるまで待機する"""
+        model = model or "default"
+        rpm = self._limit(self._rpm_limits, provider, model)
+        tpm = self._limit(self._tpm_limits, provider, model)
+        reserved_tokens = estimated_input_tokens + self._output_token_estimate
+        if tpm:
+            # 1分間の上限を超える予約はいつまでも満たされないため、上限までに抑える
+            reserved_tokens = min(reserved_tokens, int(tpm))
+
+        taken: List[Tuple[str, float, float]] = []
+        wait = 0.0
+        try:
+            for kind, limit, amount in (("rpm", rpm, 1), ("tpm", tpm, reserved_tokens)):
+                if not limit:
+                    continue
+                key = self._bucket_key(provider, model, kind)
+                remaining = self._take(key, limit, amount)
+                taken.append((key, limit, amount))
+                wait = max(wait, -remaining / (limit / 60.0))
+        except DatabaseError as e:
+            # 共有の記録に失敗しても文書作成は止めない（プロバイダー側の上限で制限される）
+            with self._lock:
+                self._store_errors += 1
+            print(f"利用上限の予約に失敗したため、待機せずに実行します: {str(e)}")
+            self._release(taken)
+            return Reservation(provider, model, 0)
+
+        if wait > self._max_wait:
+            self._release(taken)
+            with self._lock:
+                self._rejected += 1
+            raise APIError(MESSAGES["RATE_LIMIT_EXCEEDED"].format(wait_seconds=math.ceil(wait)))
+
+        with self._lock:
+            self._reserved += 1
+            if wait > 0:
+                self._waited += 1
+                self._wait_time += wait
+
+        if wait > 0:
+            self._sleep(wait)
+
+        return Reservation(provider, model, reserved_tokens if tpm else 0)
+
+    def reconcile(self, reservation: Reservation, actual_tokens: int) -> None:
+        """予約したトークン数と実際のトークン数（入力+出力）の差を精算する"""
+        tpm = self._limit(self._tpm_limits, reservation.provider, reservation.model)
+        if not tpm or not reservation.tokens:
+            return
+
+        difference = actual_tokens - reservation.tokens
+        if not difference:
+            return
+
+        try:
+            self._take(self._bucket_key(reservation.provider, reservation.model, "tpm"), tpm, difference)
+        except DatabaseError as e:
+            with self._lock:
+                self._store_errors += 1
+            print(f"利用上限の精算に失敗しました: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "reserved": self._reserved,
+                "waited": self._waited,
+                "total_wait_time": self._wait_time,
+                "rejected": self._rejected,
+                "store_errors": self._store_errors,
+                "levels": self._store.get_levels(),
+            }
+
+
+def create_bucket_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend not in RATE_LIMIT_BACKENDS:
+        raise ValueError(f"RATE_LIMIT_BACKENDは{', '.join(RATE_LIMIT_BACKENDS)}のいずれかを指定してください: {backend}")
+    return PostgresBucketStore() if backend == "postgres" else MemoryBucketStore()
+
+
+rate_limiter = RateLimiter(RATE_LIMIT_RPM, RATE_LIMIT_TPM, create_bucket_store())
@@ -0,0 +1,230 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql import func
+
+from database.db import DatabaseManager
+from database.models import ResponseCacheEntry
+from utils.cache import TTLLRUCache
+from utils.config import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+from utils.constants import MESSAGES
+from utils.exceptions import DatabaseError
+
+RESPONSE_CACHE_BACKENDS = ["memory", "disk", "postgres"]
+
+
+def response_cache_key(provider: str, model_name: Optional[str], prompt: str, params: Dict[str, Any]) -> str:
+    """プロバイダー・モデル・最終的なプロンプト・生成パラメータのSHA-256"""
+    payload = json.dumps(
+        {"provider": provider, "model": model_name, "prompt": prompt, "params": params},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryResponseStore:
+    """プロセス内のLRU+TTL"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_MAX_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self._cache = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        found, value = self._cache.get(key)
+        return dict(value) if found else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache.set(key, dict(value))
+
+    def purge(self) -> int:
+        return 0
+
+
+class DiskResponseStore:
+    """
+    ディレクトリにキーごとのJSONファイルとして保存する（同じサーバーのプロセス間で共有し、再起動後も残る）
+
+    一時ファイルに書き込んでから置き換えるため、読み込み中のファイルが書きかけになることはない。
+    """
+
+    def __init__(self, directory: str = RESPONSE_CACHE_DIR, ttl: float = RESPONSE_CACHE_TTL,
+                 clock: Callable[[], float] = time.time):
+        self._directory = Path(directory)
+        self._ttl = ttl
+        self._clock = clock
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self._clock() - entry.get("created_at", 0) > self._ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": self._clock(), "value": value}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def purge(self) -> int:
+        """有効期限を過ぎたファイルを削除し、削除した件数を返す"""
+        purged = 0
+        for path in self._directory.glob("*/*.json"):
+            if self._clock() - path.stat().st_mtime > self._ttl:
+                path.unlink(missing_ok=True)
+                purged += 1
+        return purged
+
+
+class PostgresResponseStore:
+    """response_cacheテーブルで全プロセスに共有する"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL):
+        self._ttl = ttl
+
+    def _expires_before(self):
+        return func.now() - datetime.timedelta(seconds=self._ttl)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            stmt = select(
+                ResponseCacheEntry.summary, ResponseCacheEntry.input_tokens, ResponseCacheEntry.output_tokens
+            ).where(
+                ResponseCacheEntry.cache_key == key,
+                ResponseCacheEntry.created_at >= self._expires_before()
+            )
+            engine = DatabaseManager.get_instance().get_engine()
+            with engine.connect() as conn:
+                row = conn.execute(stmt).first()
+        except Exception as e:
+            raise DatabaseError(MESSAGES["DATABASE_RESPONSE_CACHE_ERROR"].format(error=str(e)))
+
+        if row is None:
+            return None
+        return {"summary": row.summary, "input_tokens": row.input_tokens, "output_tokens": row.output_tokens}
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            stmt = pg_insert(ResponseCacheEntry).values(cache_key=key, created_at=func.now(), **value)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ResponseCacheEntry.cache_key],
+                set_={**value, "created_at": func.now()}
+            )
+            engine = DatabaseManager.get_instance().get_engine()
+            with engine.begin() as conn:
+                conn.execute(stmt)
+        except Exception as e:
+            raise DatabaseError(MESSAGES["DATABASE_RESPONSE_CACHE_ERROR"].format(error=str(e)))
+
+    def purge(self) -> int:
+        """有効期限を過ぎた行を削除し、削除した件数を返す"""
+        try:
+            engine = DatabaseManager.get_instance().get_engine()
+            with engine.begin() as conn:
+                result = conn.execute(
+                    delete(ResponseCacheEntry).where(ResponseCacheEntry.created_at < self._expires_before())
+                )
+                return result.rowcount
+        except Exception as e:
+            raise DatabaseError(MESSAGES["DATABASE_RESPONSE_CACHE_ERROR"].format(error=str(e)))
+
+
+class ResponseCache:
+    """
+    同じリクエストに対する生成結果の応答キャッシュ
+
+    保存先に読み書きできない場合は、キャッシュを使用せずにAPIを呼び出す。
+    """
+
+    def __init__(self, store: Any = None, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.enabled = enabled
+        self._store = store or MemoryResponseStore()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    def _record_error(self, action: str, error: Exception) -> None:
+        with self._lock:
+            self._errors += 1
+        print(f"応答キャッシュの{action}に失敗しました: {str(error)}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            value = self._store.get(key)
+        except (DatabaseError, OSError) as e:
+            self._record_error("読み込み", e)
+            return None
+
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key: str, summary: str, input_tokens: int, output_tokens: int) -> None:
+        if not self.enabled:
+            return
+        try:
+            self._store.set(key, {"summary": summary, "input_tokens": input_tokens, "output_tokens": output_tokens})
+        except (DatabaseError, OSError) as e:
+            self._record_error("書き込み", e)
+
+    def purge(self) -> int:
+        """有効期限を過ぎたエントリを削除する（ディスクとPostgreSQLの場合）"""
+        if not self.enabled:
+            return 0
+        return self._store.purge()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "errors": self._errors,
+            }
+
+
+def create_response_store(backend: str = RESPONSE_CACHE_BACKEND):
+    if backend not in RESPONSE_CACHE_BACKENDS:
+        raise ValueError(
+            f"RESPONSE_CACHE_BACKENDは{', '.join(RESPONSE_CACHE_BACKENDS)}のいずれかを指定してください: {backend}"
+        )
+    if backend == "postgres":
+        return PostgresResponseStore()
+    if backend == "disk":
+        return DiskResponseStore()
+    return MemoryResponseStore()
+
+
+response_cache = ResponseCache(create_response_store())
@@ -0,0 +1,291 @@
+import math
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.config import get_retry_settings
+from utils.constants import MESSAGES
+from utils.exceptions import APIError
+
+Emit = Callable[[str], None]
+AttemptFunction = Callable[[Emit, threading.Event], Tuple[str, int, int]]
+
+# 一時的なエラーとして再試行するHTTPステータス（529はAnthropicの過負荷）
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+# SDKの例外クラス名に含まれる場合に再試行する文字列
+RETRYABLE_ERROR_NAMES = (
+    "RateLimit", "Throttling", "Timeout", "Connection", "Overloaded", "ServiceUnavailable", "InternalServer",
+)
+# APIErrorに変換された後のメッセージに含まれる場合に再試行する文字列
+RETRYABLE_MESSAGES = (
+    "RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "ThrottlingException", "Too many requests",
+    "overloaded", "rate limit",
+)
+
+
+class AttemptCancelled(Exception):
+    """ヘッジで負けた呼び出しを中断するための例外"""
+
+
+class DeadlineExceededError(APIError):
+    """再試行を含めて期限までに完了しなかった場合の例外"""
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    再試行すれば成功する可能性のある一時的なエラー（429・5xx・タイムアウト・接続エラー）かどうかを判定する
+
+    各クライアントはSDKの例外をAPIErrorに変換して送出するため、元の例外（__cause__・__context__）もたどって判定する。
+    """
+    for cause in _error_chain(error):
+        status = getattr(cause, "status_code", None) or getattr(cause, "code", None)
+        if isinstance(status, int) and status in RETRYABLE_STATUS_CODES:
+            return True
+        if any(name in type(cause).__name__ for name in RETRYABLE_ERROR_NAMES):
+            return True
+
+    message = str(error).lower()
+    return any(keyword.lower() in message for keyword in RETRYABLE_MESSAGES)
+
+
+class LatencyTracker:
+    """直近のレイテンシからパーセンタイルを計算する"""
+
+    def __init__(self, max_samples: int = 200):
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=max_samples)
+
+    def add(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, percent: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class HedgedCall:
+    """
+    1回の試行を別スレッドで実行し、応答がhedge_delay秒を超えて遅い場合は同じ呼び出しをもう1件送る
+
+    最初のトークンが先に届いた呼び出しを採用し、他方は次のトークンを受け取る前に中断する。
+    hedge_delayがNoneの場合はスレッドを作成せず、呼び出し元のスレッドで1回だけ実行する。
+    """
+
+    def __init__(self, attempt_fn: AttemptFunction, on_delta: Optional[Emit] = None):
+        self._attempt_fn = attempt_fn
+        self._on_delta = on_delta
+        self._events: queue.Queue = queue.Queue()
+        self._cancel_events: List[threading.Event] = []
+        self.emitted = False
+        self.hedged = False
+        self.hedge_won = False
+        self.first_response_time: Optional[float] = None
+
+    def _start(self) -> None:
+        index = len(self._cancel_events)
+        cancelled = threading.Event()
+        self._cancel_events.append(cancelled)
+
+        def emit(delta: str) -> None:
+            self._events.put((index, "delta", delta))
+
+        def run() -> None:
+            try:
+                self._events.put((index, "done", self._attempt_fn(emit, cancelled)))
+            except AttemptCancelled:
+                pass
+            except Exception as e:
+                self._events.put((index, "error", e))
+
+        threading.Thread(target=run, name=f"api-attempt-{index}", daemon=True).start()
+
+    def _cancel_except(self, winner: Optional[int]) -> None:
+        for index, cancelled in enumerate(self._cancel_events):
+            if index != winner:
+                cancelled.set()
+
+    def _run_inline(self, timeout: float) -> Tuple[str, int, int]:
+        """
+        呼び出し元のスレッドで実行する
+
+        期限を過ぎた場合はトークンを受け取った時点で中断する。一括生成の呼び出しは途中で中断できないため、
+        期限を過ぎても完了（またはSDKのタイムアウト）まで待ち、その結果を返す。
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        if timeout <= 0:
+            raise DeadlineExceededError(MESSAGES["API_DEADLINE_EXCEEDED"].format(deadline=timeout))
+        cancelled = threading.Event()
+
+        def emit(delta: str) -> None:
+            if self.first_response_time is None:
+                self.first_response_time = time.monotonic() - start
+            self.emitted = True
+            if self._on_delta:
+                self._on_delta(delta)
+            if time.monotonic() >= deadline:
+                cancelled.set()
+
+        try:
+            result = self._attempt_fn(emit, cancelled)
+        except AttemptCancelled:
+            raise DeadlineExceededError(MESSAGES["API_DEADLINE_EXCEEDED"].format(deadline=timeout))
+
+        if self.first_response_time is None:
+            self.first_response_time = time.monotonic() - start
+        return result
+
+    def run(self, hedge_delay: Optional[float], timeout: float) -> Tuple[str, int, int]:
+        if hedge_delay is None:
+            return self._run_inline(timeout)
+
+        start = time.monotonic()
+        deadline = start + timeout
+        winner: Optional[int] = None
+        live = 1
+        self._start()
+
+        while True:
+            wait_until = deadline
+            if not self.hedged and winner is None:
+                wait_until = min(wait_until, start + hedge_delay)
+
+            try:
+                index, kind, payload = self._events.get(timeout=max(wait_until - time.monotonic(), 0))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    self._cancel_except(None)
+                    raise DeadlineExceededError(MESSAGES["API_DEADLINE_EXCEEDED"].format(deadline=timeout))
+                self.hedged = True
+                live += 1
+                self._start()
+                continue
+
+            if winner is not None and index != winner:
+                continue
+
+            if kind == "error":
+                live -= 1
+                if index == winner or live == 0:
+                    self._cancel_except(None)
+                    raise payload
+                continue
+
+            if winner is None:
+                winner = index
+                self.hedge_won = index > 0
+                self.first_response_time = time.monotonic() - start
+                self._cancel_except(winner)
+
+            if kind == "delta":
+                self.emitted = True
+                if self._on_delta:
+                    self._on_delta(payload)
+            else:
+                return payload
+
+
+class RetryPolicy:
+    """指数バックオフ（ジッターあり）による再試行と、期限・ヘッジリクエストを含むAPI呼び出しの実行方針"""
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            base_delay: float = 1.0,
+            max_delay: float = 20.0,
+            deadline: float = 300.0,
+            hedge_enabled: bool = False,
+            hedge_min_samples: int = 20,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self._sleep = sleep
+        # 一括生成は応答時間、ストリーミングは最初のトークンまでの時間
+        self._latencies = {False: LatencyTracker(), True: LatencyTracker()}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "RetryPolicy":
+        return cls(**settings)
+
+    def backoff(self, retry: int) -> float:
+        """retry回目の再試行までの待機時間（0から上限までのランダムな値）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def hedge_delay(self, streaming: bool) -> Optional[float]:
+        """
+        ヘッジリクエストを送るまでの待機時間（ヘッジしない場合はNone）
+
+        一括生成は負けた呼び出しを中断できず、消費したトークンが使用量やレート制限に反映されないため、
+        ヘッジはストリーミングの場合のみ行う。
+        """
+        if not self.hedge_enabled or not streaming:
+            return None
+        return self._latencies[streaming].percentile(95, self.hedge_min_samples)
+
+    def execute(
+            self,
+            attempt_fn: AttemptFunction,
+            on_delta: Optional[Emit] = None,
+            streaming: bool = False
+    ) -> Tuple[Tuple[str, int, int], Dict[str, Any]]:
+        """
+        attempt_fnを実行し、(結果, {"retry_count": 再試行回数, "hedged": ヘッジリクエストが採用されたか})を返す
+
+        一時的なエラーの場合は期限までmax_attempts回まで再試行する。
+        生成途中のテキストを表示済みの場合は、再試行すると重複して表示されるため再試行しない。
+        一括生成の呼び出しは期限を過ぎても中断されず、期限は次の再試行を始めるかどうかの判定に使用する。
+        """
+        deadline = time.monotonic() + self.deadline
+        retry_count = 0
+
+        while True:
+            call = HedgedCall(attempt_fn, on_delta)
+            try:
+                result = call.run(self.hedge_delay(streaming), max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                if call.emitted or retry_count + 1 >= self.max_attempts or not is_retryable_error(e):
+                    raise
+                delay = self.backoff(retry_count + 1)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                retry_count += 1
+                print(f"一時的なエラーのため{delay:.1f}秒後に再試行します（{retry_count}回目）: {str(e)}")
+                self._sleep(delay)
+                continue
+
+            if call.first_response_time is not None:
+                self._latencies[streaming].add(call.first_response_time)
+            return result, {"retry_count": retry_count, "hedged": call.hedge_won}
+
+
+_policies: Dict[str, RetryPolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_retry_policy(provider: str) -> RetryPolicy:
+    """プロバイダーごとの実行方針を返す（レイテンシの実績をプロセス内で共有する）"""
+    with _policies_lock:
+        policy = _policies.get(provider)
+        if policy is None:
+            policy = _policies[provider] = RetryPolicy.from_settings(get_retry_settings(provider))
+        return policy
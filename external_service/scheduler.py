@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.config import (
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_MAX_QUEUE_PER_KEY,
+    SCHEDULER_MAX_QUEUE_SIZE,
+    SCHEDULER_MAX_WAIT,
+    SCHEDULER_PROVIDER_CONCURRENCY,
+    SCHEDULER_WEIGHTS,
+)
+from utils.constants import MESSAGES
+from utils.exceptions import APIError
+
+QueueKey = Tuple[str, str]
+
+
+class _Waiter:
+    __slots__ = ("key", "event", "granted", "cancelled")
+
+    def __init__(self, key: QueueKey):
+        self.key = key
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class _ProviderState:
+    def __init__(self, limit: int, initial_service_time: float):
+        self.limit = limit
+        self.active = 0
+        self.queued = 0
+        self.depths: Dict[QueueKey, int] = {}
+        self.heap: List[Tuple[float, int, _Waiter]] = []
+        self.last_finish: Dict[QueueKey, float] = {}
+        self.virtual_time = 0.0
+        self.avg_service_time = initial_service_time
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+
+class FairScheduler:
+    """
+    LLM呼び出しの受付制御と、診療科・医師ごとの重み付き公平キューによるスケジューラー
+
+    プロバイダーごとに同時実行数の上限を設け、上限に達している間の呼び出しは診療科・医師ごとのキューで待機する。
+    空きができると重み付き公平キューイング（各キューの仮想終了時刻が最も小さい呼び出しから開始）で次を選ぶため、
+    1つの診療科が大量に呼び出しても他の診療科の呼び出しは順番を待たされない。
+    待機数が上限を超える場合は、待ち時間の目安を含むAPIErrorを送出して受け付けない。
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+            provider_concurrency: Optional[Dict[str, float]] = None,
+            max_queue_size: int = SCHEDULER_MAX_QUEUE_SIZE,
+            max_queue_per_key: int = SCHEDULER_MAX_QUEUE_PER_KEY,
+            weights: Optional[Dict[str, float]] = None,
+            max_wait: float = SCHEDULER_MAX_WAIT,
+            initial_service_time: float = 30.0
+    ):
+        self._max_concurrency = max_concurrency
+        self._provider_concurrency = provider_concurrency or {}
+        self._max_queue_size = max_queue_size
+        self._max_queue_per_key = max_queue_per_key
+        self._weights = weights or {}
+        self._max_wait = max_wait
+        self._initial_service_time = initial_service_time
+        self._lock = threading.Lock()
+        self._providers: Dict[str, _ProviderState] = {}
+        self._sequence = itertools.count()
+
+    def _state(self, provider: str) -> _ProviderState:
+        state = self._providers.get(provider)
+        if state is None:
+            limit = int(self._provider_concurrency.get(provider, self._max_concurrency))
+            state = self._providers[provider] = _ProviderState(max(limit, 1), self._initial_service_time)
+        return state
+
+    def weight_for(self, department: str, doctor: str) -> float:
+        """「診療科/医師」、診療科の順に重みを探す（未指定は1）"""
+        weight = self._weights.get(f"{department}/{doctor}", self._weights.get(department, 1.0))
+        return weight if weight > 0 else 1.0
+
+    @staticmethod
+    def _estimate_wait(state: _ProviderState) -> int:
+        """待機中の呼び出しがすべて開始されるまでの秒数の目安"""
+        return math.ceil(math.ceil((state.queued + 1) / state.limit) * state.avg_service_time)
+
+    def acquire(self, provider: str, department: str = "default", doctor: str = "default") -> None:
+        """実行枠を確保する（空きがない場合は順番が来るまで待機する）"""
+        key = (department, doctor)
+        with self._lock:
+            state = self._state(provider)
+            if state.active < state.limit and state.queued == 0:
+                state.active += 1
+                state.admitted += 1
+                return
+
+            if state.queued >= self._max_queue_size or state.depths.get(key, 0) >= self._max_queue_per_key:
+                state.rejected += 1
+                raise APIError(MESSAGES["SCHEDULER_QUEUE_FULL"].format(wait_seconds=self._estimate_wait(state)))
+
+            tag = max(state.virtual_time, state.last_finish.get(key, 0.0)) + 1.0 / self.weight_for(department, doctor)
+            state.last_finish[key] = tag
+            waiter = _Waiter(key)
+            heapq.heappush(state.heap, (tag, next(self._sequence), waiter))
+            state.queued += 1
+            state.depths[key] = state.depths.get(key, 0) + 1
+
+        if waiter.event.wait(self._max_wait):
+            return
+
+        with self._lock:
+            # タイムアウトとほぼ同時に順番が来た場合はそのまま実行する
+            if waiter.granted:
+                return
+            waiter.cancelled = True
+            self._dequeue(state, key)
+            state.timed_out += 1
+        raise APIError(MESSAGES["SCHEDULER_WAIT_TIMEOUT"].format(timeout=self._max_wait))
+
+    def release(self, provider: str, service_time: Optional[float] = None) -> None:
+        """実行枠を解放し、待機中の呼び出しを開始する"""
+        with self._lock:
+            state = self._state(provider)
+            state.active = max(state.active - 1, 0)
+            if service_time is not None:
+                state.avg_service_time = 0.8 * state.avg_service_time + 0.2 * service_time
+            self._dispatch(state)
+
+    @contextmanager
+    def slot(self, provider: str, department: str = "default", doctor: str = "default") -> Iterator[None]:
+        self.acquire(provider, department, doctor)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(provider, time.monotonic() - start)
+
+    @staticmethod
+    def _dequeue(state: _ProviderState, key: QueueKey) -> None:
+        state.queued -= 1
+        state.depths[key] -= 1
+        if state.depths[key] == 0:
+            del state.depths[key]
+
+    def _dispatch(self, state: _ProviderState) -> None:
+        while state.active < state.limit and state.heap:
+            tag, _, waiter = heapq.heappop(state.heap)
+            if waiter.cancelled:
+                continue
+            state.virtual_time = tag
+            self._dequeue(state, waiter.key)
+            state.active += 1
+            state.admitted += 1
+            waiter.granted = True
+            waiter.event.set()
+
+        if not state.heap:
+            # 待機中の呼び出しがなくなったら公平性の履歴をリセットする
+            state.last_finish.clear()
+            state.virtual_time = 0.0
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """プロバイダーごとの実行中・待機中の呼び出し数と、診療科/医師ごとの待機数を返す"""
+        with self._lock:
+            return {
+                provider: {
+                    "limit": state.limit,
+                    "active": state.active,
+                    "queued": state.queued,
+                    "queues": {f"{department}/{doctor}": depth for (department, doctor), depth in state.depths.items()},
+                    "admitted": state.admitted,
+                    "rejected": state.rejected,
+                    "timed_out": state.timed_out,
+                    "avg_service_time": state.avg_service_time,
+                    "estimated_wait": self._estimate_wait(state) if state.queued else 0,
+                }
+                for provider, state in self._providers.items()
+            }
+
+
+llm_scheduler = FairScheduler(provider_concurrency=SCHEDULER_PROVIDER_CONCURRENCY, weights=SCHEDULER_WEIGHTS)
@@ -0,0 +1,122 @@
+import argparse
+import random
+import re
+import timeit
+
+from utils.constants import DEFAULT_SECTION_NAMES, SECTION_DETECTION_PATTERNS
+from utils.text_processor import parse_output_summary, section_aliases
+
+HEADER_FORMATS = [
+    "【{section}】",
+    "【{section}】{content}",
+    "{section}: {content}",
+    "{section}：{content}",
+    "■{section}",
+    "[{section}] {content}",
+    "{section}",
+]
+
+BODY_LINES = [
+    "高血圧症に対して降圧薬を継続し、血圧は130/80mmHg前後で安定している。",
+    "糖尿病はHbA1c 7.2%で推移しており、食事療法と内服治療を継続中。",
+    "転倒歴あり。歩行時は杖を使用している。",
+    "認知機能の低下を認めるが、日常生活はおおむね自立している。",
+    "次回受診時に採血予定。",
+    "",
+    "  ",
+]
+
+
+def legacy_parse_output_summary(summary_text):
+    """行・セクション・検出パターンごとに正規表現を組み立てていた従来の実装（比較用）"""
+    sections = {section: "" for section in DEFAULT_SECTION_NAMES}
+    lines = summary_text.split('\n')
+    current_section = None
+
+    all_section_names = list(sections.keys()) + list(section_aliases.keys())
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        found_section = False
+        detected_section = None
+        remaining_content = ""
+
+        for section in all_section_names:
+            patterns = [
+                pattern.format(section=re.escape(section)) for pattern in SECTION_DETECTION_PATTERNS
+            ]
+
+            for pattern in patterns:
+                match = re.match(pattern, line)
+                if match:
+                    if section in section_aliases:
+                        detected_section = section_aliases[section]
+                    else:
+                        detected_section = section
+
+                    if match.groups():
+                        remaining_content = match.group(1).strip()
+                    else:
+                        remaining_content = ""
+
+                    found_section = True
+                    break
+
+            if found_section:
+                break
+
+        if found_section:
+            current_section = detected_section
+            if remaining_content and current_section:
+                sections[current_section] = remaining_content
+        elif current_section and line:
+            if sections[current_section]:
+                sections[current_section] += "\n" + line
+            else:
+                sections[current_section] = line
+
+    return {k: sections.get(k, "") for k in DEFAULT_SECTION_NAMES}
+
+
+def generate_synthetic_output(line_count: int, seed: int = 0) -> str:
+    """見出し・本文・空行が混在する合成出力を生成する"""
+    rng = random.Random(seed)
+    section_names = list(DEFAULT_SECTION_NAMES) + list(section_aliases.keys())
+    lines = []
+
+    for _ in range(line_count):
+        if rng.random() < 0.15:
+            header_format = rng.choice(HEADER_FORMATS)
+            lines.append(header_format.format(section=rng.choice(section_names), content=rng.choice(BODY_LINES)))
+        else:
+            lines.append(rng.choice(BODY_LINES))
+
+    return "\n".join(lines)
+
+
+def main():
+    # 実行方法: python -m scripts.benchmark_section_parser --lines 20000
+    parser = argparse.ArgumentParser(description="parse_output_summaryのベンチマーク")
+    parser.add_argument("--lines", type=int, default=20000, help="合成出力の行数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    text = generate_synthetic_output(args.lines)
+
+    if parse_output_summary(text) != legacy_parse_output_summary(text):
+        raise SystemExit("エラー: 従来の実装と解析結果が一致しません")
+
+    legacy_time = min(timeit.repeat(lambda: legacy_parse_output_summary(text), number=1, repeat=args.repeat))
+    current_time = min(timeit.repeat(lambda: parse_output_summary(text), number=1, repeat=args.repeat))
+
+    print(f"行数: {args.lines}")
+    print(f"従来の実装: {legacy_time * 1000:.1f}ms")
+    print(f"現在の実装: {current_time * 1000:.1f}ms")
+    print(f"高速化: {legacy_time / current_time:.1f}倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import datetime
+import random
+import timeit
+
+import pandas as pd
+
+from services.statistics_service import MODEL_MAPPING
+from views.statistics_page import JST, format_department_data, format_detail_data
+
+MODEL_DETAILS = ["Claude", "gemini-2.5-pro", "gemini-2.0-flash", "anthropic.claude-sonnet-4", None]
+DOCUMENT_TYPES = ["主治医意見書", "診療情報提供書", None, ""]
+DEPARTMENTS = ["default", "内科", "外科", "眼科"]
+DOCTORS = ["default", "田中医師", "鈴木医師"]
+
+
+def legacy_format_department_data(dept_stats):
+    """1行ずつ辞書を作成していた従来の実装（比較用）"""
+    data = []
+    for stat in dept_stats:
+        dept_name = "全科共通" if stat["department"] == "default" else stat["department"]
+        doctor_name = "医師共通" if stat["doctor"] == "default" else stat["doctor"]
+        document_types = stat["document_types"] or "不明"
+        data.append({
+            "文書名": document_types,
+            "診療科": dept_name,
+            "医師名": doctor_name,
+            "作成件数": stat["count"],
+            "入力トークン": stat["input_tokens"],
+            "出力トークン": stat["output_tokens"],
+            "合計トークン": stat["total_tokens"],
+        })
+    return pd.DataFrame(data)
+
+
+def legacy_format_detail_data(records):
+    """1行ずつタイムゾーン変換・書式化・モデル判定をしていた従来の実装（比較用）"""
+    detail_data = []
+    for record in records:
+        model_detail = str(record.get("model_detail", "")).lower()
+        model_info = "Gemini_Pro"
+
+        for model_name, pattern in MODEL_MAPPING.items():
+            if pattern in model_detail:
+                model_info = model_name
+                break
+
+        record_date = record["date"]
+        if record_date.tzinfo:
+            jst_date = record_date.astimezone(JST)
+        else:
+            jst_date = JST.localize(record_date)
+
+        detail_data.append({
+            "作成日": jst_date.strftime("%Y/%m/%d"),
+            "文書名": record.get("document_types") or "不明",
+            "診療科": "全科共通" if record.get("department") == "default" else record.get("department"),
+            "医師名": "医師共通" if record.get("doctor") == "default" else record.get("doctor"),
+            "AIモデル": model_info,
+            "入力トークン": record["input_tokens"],
+            "出力トークン": record["output_tokens"],
+            "処理時間(秒)": round(record["processing_time"]) if record["processing_time"] else 0,
+        })
+    return pd.DataFrame(detail_data)
+
+
+def generate_records(count: int, seed: int = 0):
+    """PostgreSQLから取得した場合と同じくUTCのタイムゾーン付き日時を持つ合成レコードを生成する"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+    return [
+        {
+            "date": start + datetime.timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+            "document_types": rng.choice(DOCUMENT_TYPES),
+            "model_detail": rng.choice(MODEL_DETAILS),
+            "department": rng.choice(DEPARTMENTS),
+            "doctor": rng.choice(DOCTORS),
+            "input_tokens": rng.randrange(100, 50000),
+            "output_tokens": rng.randrange(100, 5000),
+            "processing_time": rng.randrange(0, 120),
+        }
+        for _ in range(count)
+    ]
+
+
+def generate_dept_stats(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    stats = []
+    for _ in range(count):
+        input_tokens = rng.randrange(100, 500000)
+        output_tokens = rng.randrange(100, 50000)
+        stats.append({
+            "department": rng.choice(DEPARTMENTS),
+            "doctor": rng.choice(DOCTORS),
+            "document_types": rng.choice(DOCUMENT_TYPES),
+            "count": rng.randrange(1, 1000),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "processing_time": rng.randrange(0, 10000),
+        })
+    return stats
+
+
+def benchmark(label, legacy, current, data, repeat):
+    pd.testing.assert_frame_equal(current(data), legacy(data))
+
+    legacy_time = min(timeit.repeat(lambda: legacy(data), number=1, repeat=repeat))
+    current_time = min(timeit.repeat(lambda: current(data), number=1, repeat=repeat))
+
+    print(f"{label}（{len(data)}件）")
+    print(f"  従来の実装: {legacy_time * 1000:.1f}ms")
+    print(f"  現在の実装: {current_time * 1000:.1f}ms")
+    print(f"  高速化: {legacy_time / current_time:.1f}倍")
+
+
+def main():
+    # 実行方法: python -m scripts.benchmark_statistics_format --rows 100000
+    parser = argparse.ArgumentParser(description="統計画面のDataFrame作成のベンチマーク")
+    parser.add_argument("--rows", type=int, default=100000, help="合成レコードの件数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    try:
+        benchmark("詳細レコード", legacy_format_detail_data, format_detail_data,
+                  generate_records(args.rows), args.repeat)
+        benchmark("診療科別統計", legacy_format_department_data, format_department_data,
+                  generate_dept_stats(args.rows), args.repeat)
+    except AssertionError as e:
+        raise SystemExit(f"エラー: 従来の実装と結果が一致しません\n{e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import argparse
+import datetime
+
+from services.usage_rollup import JST, rebuild_daily_rollup
+
+
+def main():
+    # 実行方法: python -m scripts.compact_usage_rollup --days 7
+    parser = argparse.ArgumentParser(description="summary_usage_dailyをsummary_usageから再集計する")
+    parser.add_argument("--days", type=int, default=7, help="当日を含めて遡る日数（--fromを指定した場合は無視）")
+    parser.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat, help="開始日（YYYY-MM-DD）")
+    parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat,
+                        help="終了日（YYYY-MM-DD、この日を含む。省略時は当日）")
+    args = parser.parse_args()
+
+    today = datetime.datetime.now(JST).date()
+    date_to = args.date_to or today
+    date_from = args.date_from or today - datetime.timedelta(days=args.days - 1)
+
+    print(f"{date_from}〜{date_to}のロールアップを再集計しています...")
+    rebuilt = rebuild_daily_rollup(date_from, date_to + datetime.timedelta(days=1))
+    print(f"再集計が完了しました: {rebuilt}件")
+
+
+if __name__ == "__main__":
+    main()
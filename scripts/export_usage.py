@@ -0,0 +1,48 @@
+import argparse
+import datetime
+import os
+import time
+
+from services.usage_export import EXPORT_FORMATS, write_usage_export
+from services.usage_rollup import jst_day_start
+from utils.config import USAGE_EXPORT_BATCH_SIZE
+
+
+def main():
+    # 実行方法: python -m scripts.export_usage --from 2026-01-01 --to 2026-01-31 --output usage_202601.parquet
+    parser = argparse.ArgumentParser(description="summary_usageを期間を指定してCSVまたはParquetに書き出す")
+    parser.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat, required=True,
+                        help="開始日（YYYY-MM-DD、JST）")
+    parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat, required=True,
+                        help="終了日（YYYY-MM-DD、JST、この日を含む）")
+    parser.add_argument("--output", required=True, help="出力先のパス")
+    parser.add_argument("--format", dest="export_format", choices=EXPORT_FORMATS,
+                        help="出力形式（省略時は出力先の拡張子から判定）")
+    parser.add_argument("--model", default="すべて", help="AIモデル（Claude / Gemini_Pro）")
+    parser.add_argument("--document-type", default="すべて", help="文書名")
+    parser.add_argument("--batch-size", type=int, default=USAGE_EXPORT_BATCH_SIZE, help="1回に取得・書き出す件数")
+    args = parser.parse_args()
+
+    export_format = args.export_format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if export_format not in EXPORT_FORMATS:
+        parser.error("--formatを指定するか、出力先の拡張子を.csvまたは.parquetにしてください")
+
+    # 終了日を含むよう、翌日0時の直前までを対象にする
+    end_datetime = jst_day_start(args.date_to + datetime.timedelta(days=1)) - datetime.timedelta(microseconds=1)
+
+    print(f"{args.date_from}〜{args.date_to}の使用量を{args.output}に書き出しています...")
+    start = time.perf_counter()
+    exported = write_usage_export(
+        args.output,
+        export_format,
+        jst_day_start(args.date_from),
+        end_datetime,
+        args.model,
+        args.document_type,
+        args.batch_size
+    )
+    print(f"書き出しが完了しました: {exported}件（{time.perf_counter() - start:.1f}秒）")
+
+
+if __name__ == "__main__":
+    main()
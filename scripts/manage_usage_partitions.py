@@ -0,0 +1,35 @@
+import argparse
+
+from database.partitions import RETIRE_ACTIONS, ensure_partitions, retire_expired_partitions
+from utils.config import USAGE_ARCHIVE_DIR, USAGE_PARTITION_MONTHS_AHEAD, USAGE_RETENTION_MONTHS
+
+
+def main():
+    # 実行方法: python -m scripts.manage_usage_partitions --retention-months 24 --action archive
+    parser = argparse.ArgumentParser(description="summary_usageの月別パーティションを作成・切り離す")
+    parser.add_argument("--months-ahead", type=int, default=USAGE_PARTITION_MONTHS_AHEAD,
+                        help="当月から何か月先までパーティションを作成するか")
+    parser.add_argument("--retention-months", type=int, default=USAGE_RETENTION_MONTHS,
+                        help="当月を除いて保持する月数（0の場合は切り離さない）")
+    parser.add_argument("--action", choices=RETIRE_ACTIONS, default="detach",
+                        help="保持期間を過ぎたパーティションの扱い")
+    parser.add_argument("--archive-dir", default=USAGE_ARCHIVE_DIR, help="archiveの書き出し先")
+    parser.add_argument("--dry-run", action="store_true", help="対象を表示するだけで変更しない")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        created = ensure_partitions(args.months_ahead)
+        print(f"作成したパーティション: {', '.join(created) if created else 'なし'}")
+
+    retired = retire_expired_partitions(
+        args.retention_months,
+        action=args.action,
+        archive_dir=args.archive_dir,
+        dry_run=args.dry_run
+    )
+    label = "保持期間を過ぎたパーティション" if args.dry_run else f"{args.action}したパーティション"
+    print(f"{label}: {', '.join(retired) if retired else 'なし'}")
+
+
+if __name__ == "__main__":
+    main()
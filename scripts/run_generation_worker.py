@@ -0,0 +1,32 @@
+import argparse
+import signal
+
+from services.generation_worker import GenerationWorker
+from services.usage_writer import usage_writer
+from utils.config import GENERATION_WORKER_CONCURRENCY
+
+
+def main():
+    # 実行方法: python -m scripts.run_generation_worker --concurrency 4
+    parser = argparse.ArgumentParser(description="generation_jobsの文書作成ジョブを実行するワーカーを起動する")
+    parser.add_argument("--concurrency", type=int, default=GENERATION_WORKER_CONCURRENCY,
+                        help="同時に実行するジョブ数")
+    args = parser.parse_args()
+
+    worker = GenerationWorker(concurrency=args.concurrency)
+
+    def handle_signal(signum, frame):
+        print("終了要求を受け取りました。実行中のジョブの完了を待って終了します")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"文書作成ワーカーを起動しました: {worker.worker_id}（同時実行数 {args.concurrency}）")
+    worker.run()
+    usage_writer.flush()
+    print(f"文書作成ワーカーを終了しました: {worker.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
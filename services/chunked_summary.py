@@ -0,0 +1,208 @@
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from external_service.api_factory import generate_summary, generate_summary_stream
+from external_service.rate_limiter import estimate_tokens
+from utils.cache import TTLLRUCache
+from utils.config import (
+    CHUNK_CACHE_MAX_SIZE,
+    CHUNK_CACHE_TTL,
+    CHUNKED_SUMMARY_CHUNK_SIZE,
+    CHUNKED_SUMMARY_MAX_WORKERS,
+)
+from utils.constants import DEFAULT_DOCUMENT_TYPE
+from utils.prompt_manager import get_prompt
+
+# 受診・記載の区切りとみなす日付で始まる行（2024/1/5、2024-01-05、2024年1月5日、R6.1.5、令和6年1月5日、1/5 など）
+VISIT_BOUNDARY_PATTERN = re.compile(
+    r"^\s*[【\[(（<＜]?\s*(?:"
+    r"\d{4}\s*[/\-.年]\s*\d{1,2}\s*[/\-.月]\s*\d{1,2}"
+    r"|(?:[RHS]|令和|平成|昭和)\s*\d{1,2}\s*[/\-.年]\s*\d{1,2}\s*[/\-.月]\s*\d{1,2}"
+    r"|\d{1,2}\s*[/月]\s*\d{1,2}(?![\d/])"
+    r")"
+)
+
+# 部分の順番を含めると部分の数が変わったときにキャッシュが使えなくなるため、指示は部分によらず同じにする
+CHUNK_INSTRUCTION = "※以下はカルテを日付で分割した一部です。この期間の内容のみを記載してください。"
+REDUCE_INSTRUCTION = (
+    "※以下はカルテを期間ごとに分割して作成した文書です。"
+    "重複を除いて時系列に統合し、治療経過・特記事項・備考などの見出しごとに1つの文書として記載してください。"
+)
+
+# 分割した部分ごとの作成結果（キーはモデル・プロンプト・追加情報・部分のテキストのハッシュ）
+chunk_cache = TTLLRUCache(maxsize=CHUNK_CACHE_MAX_SIZE, ttl=CHUNK_CACHE_TTL)
+
+
+def get_chunk_cache_stats() -> Dict[str, Any]:
+    return chunk_cache.get_stats()
+
+
+def _split_visits(text: str) -> List[str]:
+    """日付で始まる行の前で区切り、受診・記載ごとのブロックに分ける"""
+    blocks: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines(keepends=True):
+        if current and VISIT_BOUNDARY_PATTERN.match(line):
+            blocks.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
+
+def _split_oversized(block: str, chunk_size: int) -> List[str]:
+    """1つのブロックがchunk_sizeを超える場合は行ごと、1行が超える場合は文字数で分ける"""
+    pieces: List[str] = []
+    for line in block.splitlines(keepends=True):
+        pieces.extend(line[start:start + chunk_size] for start in range(0, len(line), chunk_size))
+    return pieces
+
+
+def _pack(pieces: List[str], chunk_size: int) -> List[List[str]]:
+    """先頭から順に合計がchunk_size文字を超えない範囲でまとめる"""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) > chunk_size:
+            groups.append(current)
+            current = []
+            size = 0
+        current.append(piece)
+        size += len(piece)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_chart_text(text: str, chunk_size: int = CHUNKED_SUMMARY_CHUNK_SIZE) -> List[str]:
+    """
+    カルテを受診・記載の日付の区切りでchunk_size文字以下の部分に分割する
+
+    区切りのない長いブロックは行の区切りで分割する。
+    """
+    chunk_size = max(chunk_size, 1)
+    pieces: List[str] = []
+    for block in _split_visits(text):
+        pieces.extend([block] if len(block) <= chunk_size else _split_oversized(block, chunk_size))
+    chunks = ["".join(group) for group in _pack(pieces, chunk_size)]
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _chunk_cache_key(model_name: Optional[str], prompt_content: str, additional_info: str, text: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model_name or "", prompt_content, additional_info, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _merge_call_stats(total: Dict[str, Any], call_stats: Dict[str, Any]) -> None:
+    total["retry_count"] = total.get("retry_count", 0) + call_stats.get("retry_count", 0)
+    total["hedged"] = total.get("hedged", False) or call_stats.get("hedged", False)
+
+
+def generate_chunked_summary(
+        provider: str,
+        model_name: Optional[str],
+        medical_text: str,
+        additional_info: str = "",
+        department: str = "default",
+        document_type: str = DEFAULT_DOCUMENT_TYPE,
+        doctor: str = "default",
+        previous_record: str = "",
+        on_delta: Optional[Callable[[str], None]] = None,
+        call_stats: Optional[Dict[str, Any]] = None,
+        chunk_size: int = CHUNKED_SUMMARY_CHUNK_SIZE,
+        max_workers: int = CHUNKED_SUMMARY_MAX_WORKERS,
+        use_cache: bool = True
+) -> Tuple[str, int, int]:
+    """
+    長いカルテを分割して部分ごとに並列で作成し（map）、作成結果を統合して1つの文書にする（reduce）
+
+    部分ごとの作成結果はキャッシュし、再実行時は変更された部分だけを作成する。
+    統合する文書の合計がchunk_sizeを超える場合は、収まるまで段階的に統合する。
+    前回の記載は最後の統合でのみ使用し、統合はon_deltaが指定されている場合はストリーミングで作成する。
+    use_cacheがFalseの場合は部分ごとのキャッシュと応答キャッシュを読み書きしない。
+    """
+    prompt_data = get_prompt(department, document_type, doctor)
+    prompt_content = prompt_data["content"] if prompt_data else ""
+    totals: Dict[str, Any] = {
+        "input_tokens": 0, "output_tokens": 0, "retry_count": 0, "hedged": False, "cached_chunks": 0, "api_calls": 0,
+    }
+    totals_lock = threading.Lock()
+
+    def call(text: str, stats: Dict[str, Any], previous: str = "",
+             stream_to: Optional[Callable[[str], None]] = None) -> Tuple[str, int, int]:
+        if stream_to is not None:
+            return generate_summary_stream(
+                provider=provider, medical_text=text, additional_info=additional_info, department=department,
+                document_type=document_type, doctor=doctor, model_name=model_name, previous_record=previous,
+                on_delta=stream_to, call_stats=stats, use_cache=use_cache
+            )
+        return generate_summary(
+            provider=provider, medical_text=text, additional_info=additional_info, department=department,
+            document_type=document_type, doctor=doctor, model_name=model_name, previous_record=previous,
+            call_stats=stats, use_cache=use_cache
+        )
+
+    def summarize(text: str) -> str:
+        cache_key = _chunk_cache_key(model_name, prompt_content, additional_info, text)
+        found, cached_summary = chunk_cache.get(cache_key) if use_cache else (False, None)
+        if found:
+            with totals_lock:
+                totals["cached_chunks"] += 1
+            return str(cached_summary)
+
+        stats: Dict[str, Any] = {}
+        summary, input_tokens, output_tokens = call(text, stats)
+        if use_cache and summary.strip():
+            chunk_cache.set(cache_key, summary)
+        with totals_lock:
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            totals["api_calls"] += 0 if stats.get("cache_hit") else 1
+            _merge_call_stats(totals, stats)
+        return summary
+
+    def summarize_all(texts: List[str]) -> List[str]:
+        if len(texts) == 1:
+            return [summarize(texts[0])]
+        with ThreadPoolExecutor(max_workers=max(min(max_workers, len(texts)), 1),
+                                thread_name_prefix="chunked-summary") as pool:
+            return list(pool.map(summarize, texts))
+
+    def reduce_input(summaries: List[str]) -> str:
+        parts = [f"【{index}/{len(summaries)}】\n{summary}" for index, summary in enumerate(summaries, 1)]
+        return REDUCE_INSTRUCTION + "\n\n" + "\n\n".join(parts)
+
+    chunks = split_chart_text(medical_text, chunk_size)
+    summaries = summarize_all([f"{CHUNK_INSTRUCTION}\n\n{chunk}" for chunk in chunks])
+
+    # 統合する文書が大きすぎる場合は、まとめられる範囲ごとに統合してから最後の統合を行う
+    while len(summaries) > 1 and estimate_tokens(*summaries) > chunk_size:
+        groups = _pack(summaries, chunk_size)
+        if len(groups) >= len(summaries):
+            break
+        summaries = summarize_all([reduce_input(group) for group in groups])
+
+    reduce_stats: Dict[str, Any] = {}
+    output_summary, input_tokens, output_tokens = call(
+        reduce_input(summaries), reduce_stats, previous=previous_record, stream_to=on_delta
+    )
+    _merge_call_stats(totals, reduce_stats)
+
+    if call_stats is not None:
+        call_stats.update({
+            "retry_count": totals["retry_count"],
+            "hedged": totals["hedged"],
+            "chunk_count": len(chunks),
+            "cached_chunks": totals["cached_chunks"],
+            # 部分ごとの作成と統合のいずれもAPIを呼び出さなかった場合のみ応答キャッシュの結果とみなす
+            "cache_hit": totals["api_calls"] == 0 and bool(reduce_stats.get("cache_hit")),
+        })
+    return output_summary, totals["input_tokens"] + input_tokens, totals["output_tokens"] + output_tokens
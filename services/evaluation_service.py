@@ -1,7 +1,6 @@
 import datetime
 import queue
-import threading
-import time
+from concurrent.futures import Future
 from typing import Any, Dict, Optional, Tuple
 
 import streamlit as st
@@ -9,19 +8,43 @@ from streamlit.delta_generator import DeltaGenerator
 
 from database.db import DatabaseManager
 from database.models import EvaluationPrompt
+from database.notifier import notify_prompt_change, prompt_change_listener
 from external_service.gemini_evaluation import GeminiAPIClient
-from utils.config import GEMINI_EVALUATION_MODEL, GOOGLE_CREDENTIALS_JSON
+from services.executor import task_executor, wait_with_progress
+from utils.cache import TTLLRUCache
+from utils.config import GEMINI_EVALUATION_MODEL, GOOGLE_CREDENTIALS_JSON, PROMPT_CACHE_MAX_SIZE, PROMPT_CACHE_TTL
 from utils.error_handlers import handle_error
 from utils.exceptions import APIError, DatabaseError
 
 
+# 文書タイプごとのget_evaluation_promptの結果
+evaluation_prompt_cache = TTLLRUCache(maxsize=PROMPT_CACHE_MAX_SIZE, ttl=PROMPT_CACHE_TTL)
+
+
+def _on_evaluation_prompt_change(keys: Optional[Dict[str, Any]]) -> None:
+    if keys is None:
+        evaluation_prompt_cache.clear()
+        return
+    evaluation_prompt_cache.invalidate(keys.get("document_type"))
+
+
+prompt_change_listener.register_handler("evaluation_prompts", _on_evaluation_prompt_change)
+
+
 def get_evaluation_prompt(document_type: str) -> Optional[Dict[str, Any]]:
+    found, cached_prompt = evaluation_prompt_cache.get(document_type)
+    if found:
+        return dict(cached_prompt) if cached_prompt else cached_prompt
+
     try:
         db_manager = DatabaseManager.get_instance()
-        return db_manager.query_one(EvaluationPrompt, {"document_type": document_type})
+        prompt = db_manager.query_one(EvaluationPrompt, {"document_type": document_type})
     except Exception as e:
         raise DatabaseError(f"評価プロンプトの取得に失敗しました: {str(e)}")
 
+    evaluation_prompt_cache.set(document_type, prompt)
+    return dict(prompt) if prompt else prompt
+
 
 def create_or_update_evaluation_prompt(document_type: str, content: str) -> Tuple[bool, str]:
     try:
@@ -29,27 +52,19 @@ def create_or_update_evaluation_prompt(document_type: str, content: str) -> Tupl
             return False, "評価プロンプトを作成してください"
 
         db_manager = DatabaseManager.get_instance()
-        existing = db_manager.query_one(EvaluationPrompt, {"document_type": document_type})
-
-        if existing:
-            db_manager.update(
-                EvaluationPrompt,
-                {"document_type": document_type},
-                {"content": content, "updated_at": datetime.datetime.now()}
-            )
-            return True, "評価プロンプトを更新しました"
-        else:
-            db_manager.insert(
-                EvaluationPrompt,
-                {
-                    "document_type": document_type,
-                    "content": content,
-                    "is_active": True,
-                    "created_at": datetime.datetime.now(),
-                    "updated_at": datetime.datetime.now()
-                }
-            )
+        now = datetime.datetime.now()
+        _, created = db_manager.upsert_with_status(
+            EvaluationPrompt,
+            {"document_type": document_type},
+            {"content": content, "updated_at": now},
+            insert_only={"is_active": True, "created_at": now}
+        )
+        evaluation_prompt_cache.invalidate(document_type)
+        notify_prompt_change("evaluation_prompts", {"document_type": document_type})
+
+        if created:
             return True, "評価プロンプトを新規作成しました"
+        return True, "評価プロンプトを更新しました"
     except Exception as e:
         return False, f"エラーが発生しました: {str(e)}"
 
@@ -122,17 +137,22 @@ def evaluate_output_task(
 
 
 def display_evaluation_progress(
-    thread: threading.Thread,
+    future: Future,
     placeholder: DeltaGenerator,
     start_time: datetime.datetime
 ) -> None:
     elapsed_time = 0
+
+    def update_elapsed_time() -> None:
+        nonlocal elapsed_time
+        current_elapsed = int((datetime.datetime.now() - start_time).total_seconds())
+        if current_elapsed != elapsed_time:
+            elapsed_time = current_elapsed
+            placeholder.text(f"⏱️ 評価時間: {elapsed_time}秒")
+
     with st.spinner("評価中..."):
         placeholder.text(f"⏱️ 評価時間: {elapsed_time}秒")
-        while thread.is_alive():
-            time.sleep(1)
-            elapsed_time = int((datetime.datetime.now() - start_time).total_seconds())
-            placeholder.text(f"⏱️ 評価時間: {elapsed_time}秒")
+        wait_with_progress(future, update_elapsed_time)
 
 
 @handle_error
@@ -157,15 +177,14 @@ def process_evaluation(
     start_time = datetime.datetime.now()
     result_queue = queue.Queue()
 
-    evaluation_thread = threading.Thread(
-        target=evaluate_output_task,
-        args=(document_type, previous_record, input_text, additional_info, output_summary, result_queue)
+    evaluation_future = task_executor.submit(
+        evaluate_output_task,
+        document_type, previous_record, input_text, additional_info, output_summary, result_queue
     )
-    evaluation_thread.start()
 
-    display_evaluation_progress(evaluation_thread, progress_placeholder, start_time)
+    display_evaluation_progress(evaluation_future, progress_placeholder, start_time)
 
-    evaluation_thread.join()
+    evaluation_future.result()
     progress_placeholder.empty()
     result = result_queue.get()
 
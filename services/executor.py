@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict
+
+from utils.config import EXECUTOR_MAX_QUEUE_SIZE, EXECUTOR_MAX_WORKERS, EXECUTOR_POLL_INTERVAL
+from utils.constants import MESSAGES
+from utils.exceptions import APIError
+
+
+class BoundedExecutor:
+    """
+    実行中のワーカー数と待機中のタスク数に上限のあるスレッドプール
+
+    リクエストごとにスレッドを作成しないよう、文書作成・評価などのAPI呼び出しをプロセス全体で共有する。
+    実行中と待機中の合計がmax_workers + max_queue_sizeを超える場合は受け付けずにAPIErrorを送出する。
+    """
+
+    def __init__(self, max_workers: int = EXECUTOR_MAX_WORKERS, max_queue_size: int = EXECUTOR_MAX_QUEUE_SIZE,
+                 thread_name_prefix: str = "task-executor"):
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise APIError(MESSAGES["EXECUTOR_QUEUE_FULL"])
+
+        with self._lock:
+            self._queued += 1
+
+        try:
+            return self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def _run(self, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def shutdown(self, wait_for_tasks: bool = True) -> None:
+        self._executor.shutdown(wait=wait_for_tasks)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self._max_workers,
+                "max_queue_size": self._max_queue_size,
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+task_executor = BoundedExecutor()
+
+
+def get_executor_stats() -> Dict[str, int]:
+    return task_executor.get_stats()
+
+
+def wait_with_progress(future: Future, on_tick: Callable[[], None], interval: float = EXECUTOR_POLL_INTERVAL) -> None:
+    """完了するまでinterval秒ごとにon_tickを呼び出す（完了した時点ですぐに戻る）"""
+    while True:
+        done, _ = wait([future], timeout=interval)
+        if done:
+            return
+        on_tick()
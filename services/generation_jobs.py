@@ -0,0 +1,221 @@
+import datetime
+import secrets
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, func, update
+
+from database.db import DatabaseManager
+from database.models import GenerationJob
+from utils.config import (
+    GENERATION_JOB_LEASE_SECONDS,
+    GENERATION_JOB_MAX_ATTEMPTS,
+    GENERATION_JOB_RETENTION_HOURS,
+)
+from utils.constants import MESSAGES
+from utils.exceptions import DatabaseError
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = [JOB_SUCCEEDED, JOB_FAILED]
+
+# ワーカーが生成に使用するパラメータ（generate_summary_taskの引数名との対応）
+JOB_PARAMETERS = {
+    "department": "selected_department",
+    "document_type": "selected_document_type",
+    "doctor": "selected_doctor",
+    "selected_model": "selected_model",
+    "model_explicitly_selected": "model_explicitly_selected",
+    "use_response_cache": "use_response_cache",
+}
+
+
+def job_to_dict(job: GenerationJob) -> Dict[str, Any]:
+    return {column.name: getattr(job, column.name) for column in GenerationJob.__table__.columns}
+
+
+def _get_session():
+    return DatabaseManager.get_instance().get_session()
+
+
+def _lease_expired(lease_seconds: int):
+    return GenerationJob.heartbeat_at < func.now() - datetime.timedelta(seconds=lease_seconds)
+
+
+def submit_generation_job(
+        input_text: str,
+        additional_info: str,
+        previous_record: str,
+        session_params: Dict[str, Any]
+) -> str:
+    """文書作成ジョブを登録し、画面から参照するためのトークンを返す"""
+    session = _get_session()
+    try:
+        token = secrets.token_urlsafe(32)
+        session.add(GenerationJob(
+            token=token,
+            status=JOB_PENDING,
+            input_text=input_text,
+            additional_info=additional_info,
+            previous_record=previous_record,
+            **{column: session_params.get(param) for column, param in JOB_PARAMETERS.items()}
+        ))
+        session.commit()
+        return token
+    except Exception as e:
+        session.rollback()
+        raise DatabaseError(MESSAGES["DATABASE_GENERATION_JOB_ERROR"].format(error=str(e)))
+    finally:
+        session.close()
+
+
+def claim_generation_job(
+        worker_id: str,
+        lease_seconds: int = GENERATION_JOB_LEASE_SECONDS,
+        max_attempts: int = GENERATION_JOB_MAX_ATTEMPTS
+) -> Optional[Dict[str, Any]]:
+    """
+    次に実行するジョブを取得して実行中にする（実行するジョブがない場合はNone）
+
+    SELECT ... FOR UPDATE SKIP LOCKEDで取得するため、複数のワーカーが同時に呼び出しても同じジョブは取得しない。
+    未実行のジョブを古い順に取得し、ない場合は生存確認がlease_seconds秒途絶えたジョブ（ワーカーの停止など）を再実行する。
+    """
+    session = _get_session()
+    try:
+        candidates = [
+            GenerationJob.status == JOB_PENDING,
+            and_(GenerationJob.status == JOB_RUNNING, _lease_expired(lease_seconds),
+                 GenerationJob.attempts < max_attempts),
+        ]
+
+        for condition in candidates:
+            candidate = session.query(GenerationJob.id).filter(
+                condition
+            ).order_by(
+                GenerationJob.created_at,
+                GenerationJob.id
+            ).with_for_update(skip_locked=True).first()
+
+            if candidate is None:
+                continue
+
+            job = session.execute(
+                update(GenerationJob).where(
+                    GenerationJob.id == candidate.id
+                ).values(
+                    status=JOB_RUNNING,
+                    worker_id=worker_id,
+                    attempts=func.coalesce(GenerationJob.attempts, 0) + 1,
+                    started_at=func.now(),
+                    heartbeat_at=func.now()
+                ).returning(*GenerationJob.__table__.columns)
+            ).mappings().one()
+            session.commit()
+            return dict(job)
+
+        session.commit()
+        return None
+    except Exception as e:
+        session.rollback()
+        raise DatabaseError(MESSAGES["DATABASE_GENERATION_JOB_ERROR"].format(error=str(e)))
+    finally:
+        session.close()
+
+
+def _update_running_job(job_id: int, worker_id: str, values: Dict[str, Any]) -> bool:
+    """
+    自分が実行中のジョブを更新する
+
+    生存確認が途絶えて他のワーカーが再実行している場合は更新せずにFalseを返す。
+    """
+    session = _get_session()
+    try:
+        updated = session.query(GenerationJob).filter(
+            GenerationJob.id == job_id,
+            GenerationJob.worker_id == worker_id,
+            GenerationJob.status == JOB_RUNNING
+        ).update({**values, "heartbeat_at": func.now()}, synchronize_session=False)
+        session.commit()
+        return updated == 1
+    except Exception as e:
+        session.rollback()
+        raise DatabaseError(MESSAGES["DATABASE_GENERATION_JOB_ERROR"].format(error=str(e)))
+    finally:
+        session.close()
+
+
+def heartbeat_generation_job(job_id: int, worker_id: str, partial_output: Optional[str] = None) -> bool:
+    """生存確認の日時と生成途中のテキストを書き込む"""
+    values = {} if partial_output is None else {"partial_output": partial_output}
+    return _update_running_job(job_id, worker_id, values)
+
+
+def complete_generation_job(job_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+    return _update_running_job(job_id, worker_id, {
+        "status": JOB_SUCCEEDED,
+        "result": result,
+        "partial_output": None,
+        "finished_at": func.now(),
+    })
+
+
+def fail_generation_job(job_id: int, worker_id: str, error: str) -> bool:
+    return _update_running_job(job_id, worker_id, {
+        "status": JOB_FAILED,
+        "error": error,
+        "finished_at": func.now(),
+    })
+
+
+def get_generation_job(token: str) -> Optional[Dict[str, Any]]:
+    session = _get_session()
+    try:
+        job = session.query(GenerationJob).filter(GenerationJob.token == token).first()
+        return job_to_dict(job) if job else None
+    except Exception as e:
+        raise DatabaseError(MESSAGES["DATABASE_GENERATION_JOB_ERROR"].format(error=str(e)))
+    finally:
+        session.close()
+
+
+def fail_abandoned_generation_jobs(
+        lease_seconds: int = GENERATION_JOB_LEASE_SECONDS,
+        max_attempts: int = GENERATION_JOB_MAX_ATTEMPTS
+) -> int:
+    """max_attempts回実行しても完了しなかったジョブを失敗にし、件数を返す"""
+    session = _get_session()
+    try:
+        updated = session.query(GenerationJob).filter(
+            GenerationJob.status == JOB_RUNNING,
+            _lease_expired(lease_seconds),
+            GenerationJob.attempts >= max_attempts
+        ).update({
+            "status": JOB_FAILED,
+            "error": f"{max_attempts}回実行しましたが完了しませんでした",
+            "finished_at": func.now(),
+        }, synchronize_session=False)
+        session.commit()
+        return updated
+    except Exception as e:
+        session.rollback()
+        raise DatabaseError(MESSAGES["DATABASE_GENERATION_JOB_ERROR"].format(error=str(e)))
+    finally:
+        session.close()
+
+
+def purge_generation_jobs(retention_hours: int = GENERATION_JOB_RETENTION_HOURS) -> int:
+    """登録からretention_hours時間を過ぎた実行中以外のジョブ（入力したカルテ記載を含む）を削除し、件数を返す"""
+    session = _get_session()
+    try:
+        deleted = session.query(GenerationJob).filter(
+            GenerationJob.status != JOB_RUNNING,
+            GenerationJob.created_at < func.now() - datetime.timedelta(hours=retention_hours)
+        ).delete(synchronize_session=False)
+        session.commit()
+        return deleted
+    except Exception as e:
+        session.rollback()
+        raise DatabaseError(MESSAGES["DATABASE_GENERATION_JOB_ERROR"].format(error=str(e)))
+    finally:
+        session.close()
@@ -0,0 +1,191 @@
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from database.partitions import ensure_partitions
+from services.executor import BoundedExecutor, wait_with_progress
+from services.generation_jobs import (
+    JOB_PARAMETERS,
+    claim_generation_job,
+    complete_generation_job,
+    fail_abandoned_generation_jobs,
+    fail_generation_job,
+    heartbeat_generation_job,
+    purge_generation_jobs,
+)
+from services.statistics_service import notify_usage_written
+from services.summary_service import build_usage_data, drain_delta_queue, generate_summary_task
+from services.usage_writer import usage_writer
+from utils.config import (
+    GENERATION_JOB_HEARTBEAT_INTERVAL,
+    GENERATION_WORKER_CONCURRENCY,
+    GENERATION_WORKER_POLL_INTERVAL,
+    USAGE_PARTITION_MONTHS_AHEAD,
+)
+
+# 結果として画面に返す項目（入力したカルテ記載などはジョブのカラムに保持済みのため含めない）
+RESULT_FIELDS = [
+    "success", "output_summary", "parsed_summary", "input_tokens", "output_tokens", "model_detail", "provider",
+    "model_switched", "original_model", "switch_reason", "time_to_first_token", "processing_time", "cache_hit",
+]
+
+
+class GenerationWorker:
+    """
+    generation_jobsのジョブを取得して文書を作成するワーカー（Procfileのworkerとして画面とは別のプロセスで実行する）
+
+    concurrency個のスレッドがそれぞれジョブを取得し、生成中はheartbeat_interval秒ごとに
+    生存確認の日時と生成途中のテキストを書き込む。使用量はワーカーから書き込むため、画面側では保存しない。
+    取得したジョブが実行待ちで断られないよう、生成はconcurrency個の枠を持つワーカー専用のスレッドプールで実行する。
+    """
+
+    def __init__(
+            self,
+            worker_id: Optional[str] = None,
+            concurrency: int = GENERATION_WORKER_CONCURRENCY,
+            poll_interval: float = GENERATION_WORKER_POLL_INTERVAL,
+            heartbeat_interval: float = GENERATION_JOB_HEARTBEAT_INTERVAL,
+            maintenance_interval: float = 60.0
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._heartbeat_interval = heartbeat_interval
+        self._maintenance_interval = maintenance_interval
+        self._executor = BoundedExecutor(
+            max_workers=concurrency, max_queue_size=0, thread_name_prefix="generation-worker-task"
+        )
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._succeeded = 0
+        self._failed = 0
+
+    def run_once(self) -> bool:
+        """ジョブを1件実行する（実行するジョブがなかった場合はFalse）"""
+        job = claim_generation_job(self.worker_id)
+        if job is None:
+            return False
+
+        self.execute(job)
+        return True
+
+    def execute(self, job: Dict[str, Any]) -> None:
+        session_params = {param: job[column] for column, param in JOB_PARAMETERS.items()}
+        result_queue: queue.Queue = queue.Queue()
+        delta_queue: queue.Queue = queue.Queue()
+        start = time.monotonic()
+        partial_output = ""
+        lease_lost = False
+
+        def send_heartbeat() -> None:
+            nonlocal partial_output, lease_lost
+            deltas = drain_delta_queue(delta_queue, timeout=0)
+            partial_output += "".join(deltas)
+            if lease_lost:
+                return
+            try:
+                if not heartbeat_generation_job(job["id"], self.worker_id, partial_output if deltas else None):
+                    lease_lost = True
+                    print(f"文書作成ジョブ{job['id']}は他のワーカーが再実行しています")
+            except Exception as e:
+                # 一時的な接続エラーでは生成を中断しない（生存確認が途絶えた場合は他のワーカーが再実行する）
+                print(f"文書作成ジョブ{job['id']}の生存確認に失敗しました: {str(e)}")
+
+        try:
+            future = self._executor.submit(
+                generate_summary_task,
+                job["input_text"],
+                session_params["selected_department"],
+                session_params["selected_model"],
+                result_queue,
+                job["additional_info"] or "",
+                session_params["selected_document_type"],
+                session_params["selected_doctor"],
+                bool(session_params["model_explicitly_selected"]),
+                job["previous_record"] or "",
+                delta_queue,
+                session_params["use_response_cache"] is not False
+            )
+            wait_with_progress(future, send_heartbeat, self._heartbeat_interval)
+            result = result_queue.get_nowait()
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        if not result["success"]:
+            with self._lock:
+                self._failed += 1
+            fail_generation_job(job["id"], self.worker_id, result["error"])
+            return
+
+        result["processing_time"] = time.monotonic() - start
+        # 生成済みのトークンは課金されているため、他のワーカーが再実行している場合も使用量は記録する
+        usage_writer.submit(build_usage_data(result, session_params))
+        with self._lock:
+            self._succeeded += 1
+
+        job_result = {field: result.get(field) for field in RESULT_FIELDS}
+        if not complete_generation_job(job["id"], self.worker_id, job_result):
+            print(f"文書作成ジョブ{job['id']}は他のワーカーが再実行しているため、結果を破棄しました")
+
+    def _run_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"文書作成ジョブの処理中にエラーが発生しました: {str(e)}")
+            self._stop_event.wait(self._poll_interval)
+
+    def run_maintenance(self) -> None:
+        """完了しなかったジョブを失敗にし、保持期間を過ぎたジョブを削除する。summary_usageの月別パーティションも先の月まで作成しておく"""
+        try:
+            abandoned = fail_abandoned_generation_jobs()
+            purged = purge_generation_jobs()
+            if abandoned or purged:
+                print(f"文書作成ジョブ: 失敗にしたジョブ {abandoned}件、削除したジョブ {purged}件")
+        except Exception as e:
+            print(f"文書作成ジョブの整理に失敗しました: {str(e)}")
+
+        try:
+            created = ensure_partitions(USAGE_PARTITION_MONTHS_AHEAD)
+            if created:
+                print(f"作成したパーティション: {', '.join(created)}")
+        except Exception as e:
+            print(f"summary_usageのパーティションの作成に失敗しました: {str(e)}")
+
+    def run(self) -> None:
+        """stop()が呼ばれるまでジョブを実行する（実行中のジョブは完了を待って終了する）"""
+        # 使用量はこのプロセスで書き込むため、画面のプロセスに統計のキャッシュの破棄を通知する
+        usage_writer.add_flush_listener(notify_usage_written)
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._run_loop, name=f"generation-worker-{index}", daemon=True)
+            for index in range(self._concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        while not self._stop_event.is_set():
+            self.run_maintenance()
+            self._stop_event.wait(self._maintenance_interval)
+
+        for thread in self._threads:
+            thread.join()
+        self._executor.shutdown()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "worker_id": self.worker_id,
+                "concurrency": self._concurrency,
+                "succeeded": self._succeeded,
+                "failed": self._failed,
+            }
@@ -0,0 +1,496 @@
+import copy
+import datetime
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import Float, and_, cast, func, literal, tuple_
+
+from database.db import DatabaseManager
+from database.notifier import notify_prompt_change, prompt_change_listener
+from database.models import SummaryUsage, SummaryUsageDaily
+from services.usage_rollup import JST, jst_day_start, to_jst
+from services.usage_writer import usage_writer
+from utils.cache import TTLLRUCache
+from utils.config import STATISTICS_CACHE_MAX_ROWS, STATISTICS_CACHE_TTL, STATISTICS_PAGE_SIZE
+from utils.exceptions import DatabaseError
+
+# 画面で選択するAIモデルとsummary_usage.providerの対応
+MODEL_MAPPING = {
+    "Gemini_Pro": "gemini",
+    "Claude": "claude",
+}
+
+# 詳細レコードの並び順(date, id)の降順における、直前のページの最後のレコード
+PageCursor = Tuple[datetime.datetime, int]
+# 集計に使用するテーブル（summary_usageとロールアップは次元と合計のカラムが共通）
+UsageModel = Type[SummaryUsage] | Type[SummaryUsageDaily]
+
+
+def _cached_rows(value: Any) -> int:
+    """キャッシュの上限（行数）に対する結果の大きさ"""
+    if isinstance(value, list):
+        return 1 + len(value)
+    return 1 + len(value.get("by_department", ())) + len(value.get("records", ()))
+
+
+# 画面の再実行ごとに同じ条件で集計しないよう、検索条件ごとに結果をキャッシュする
+# キーは(種類, 開始日時, 終了日時, AIモデル, 文書名, 当日の日付, 種類ごとの追加条件...)
+usage_statistics_cache = TTLLRUCache(
+    maxsize=STATISTICS_CACHE_MAX_ROWS, ttl=STATISTICS_CACHE_TTL, getsizeof=_cached_rows
+)
+
+
+# 他のプロセスに使用量の書き込みを通知する際のテーブル名
+USAGE_CHANGE_TABLE = "summary_usage"
+
+
+def invalidate_usage_statistics_cache(rows: List[Dict[str, Any]]) -> int:
+    """
+    書き込まれた使用量の日時を期間に含むキャッシュを破棄する
+
+    このプロセスのusage_writerが書き込んだ分は即時に反映される。他のプロセス（ジョブキューのワーカーなど）が
+    書き込んだ分は、PROMPT_CHANGE_LISTENER_ENABLEDの場合は変更通知で、それ以外はSTATISTICS_CACHE_TTLの経過後に反映される。
+    """
+    dates = [to_jst(row["date"]) for row in rows if row.get("date")]
+    if not dates:
+        return 0
+
+    def covers_written_row(key) -> bool:
+        start, end = to_jst(key[1]), to_jst(key[2])
+        return any(start <= date <= end for date in dates)
+
+    return usage_statistics_cache.invalidate_where(covers_written_row)
+
+
+def notify_usage_written(rows: List[Dict[str, Any]]) -> None:
+    """書き込んだ使用量の最初と最後の日時を他のプロセスに通知する（通知の大きさの上限を超えないよう日時の範囲のみ送る）"""
+    dates = [to_jst(row["date"]) for row in rows if row.get("date")]
+    if dates:
+        notify_prompt_change(USAGE_CHANGE_TABLE, {"start": min(dates).isoformat(), "end": max(dates).isoformat()})
+
+
+def _on_usage_change(keys: Optional[Dict[str, Any]]) -> None:
+    """他のプロセスが書き込んだ使用量の日時の範囲と期間が重なるキャッシュを破棄する"""
+    if keys is None or "start" not in keys or "end" not in keys:
+        usage_statistics_cache.clear()
+        return
+
+    first = datetime.datetime.fromisoformat(keys["start"])
+    last = datetime.datetime.fromisoformat(keys["end"])
+
+    def overlaps_written_rows(key) -> bool:
+        return to_jst(key[1]) <= last and first <= to_jst(key[2])
+
+    usage_statistics_cache.invalidate_where(overlaps_written_rows)
+
+
+usage_writer.add_flush_listener(invalidate_usage_statistics_cache)
+prompt_change_listener.register_handler(USAGE_CHANGE_TABLE, _on_usage_change)
+
+
+def get_usage_statistics_cache_stats() -> Dict[str, Any]:
+    return usage_statistics_cache.get_stats()
+
+
+def _cache_key(kind: str, start_datetime: datetime.datetime, end_datetime: datetime.datetime,
+               selected_model: str, selected_document_type: str, now: Optional[datetime.datetime], *extra) -> tuple:
+    # 日付が変わるとロールアップで集計できる範囲が変わるため当日の日付もキーに含める
+    today = to_jst(now or datetime.datetime.now(JST)).date()
+    return (kind, start_datetime, end_datetime, selected_model, selected_document_type, today) + extra
+
+
+def build_dimension_filters(model_class: UsageModel, selected_model: str, selected_document_type: str) -> List[Any]:
+    """AIモデル・文書名の選択から検索条件を作成する（summary_usageとロールアップで共通）"""
+    filters = []
+
+    if selected_model != "すべて":
+        provider = MODEL_MAPPING.get(selected_model)
+        if provider:
+            filters.append(model_class.provider == provider)
+
+    if selected_document_type != "すべて":
+        if selected_document_type == "不明":
+            filters.append(model_class.document_types.is_(None))
+        else:
+            filters.append(model_class.document_types == selected_document_type)
+
+    return filters
+
+
+def build_usage_filters(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str,
+        selected_document_type: str
+) -> List[Any]:
+    """期間・AIモデル・文書名の選択からSummaryUsageの検索条件を作成する"""
+    return [
+        SummaryUsage.date >= start_datetime,
+        SummaryUsage.date <= end_datetime
+    ] + build_dimension_filters(SummaryUsage, selected_model, selected_document_type)
+
+
+def split_usage_range(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        now: datetime.datetime
+) -> Tuple[Optional[Tuple[datetime.date, datetime.date]], List[Tuple[datetime.datetime, datetime.datetime]]]:
+    """
+    集計期間をロールアップで集計できる日と、summary_usageから集計する部分に分ける
+
+    ロールアップを使えるのはJSTで1日全体が期間に含まれ、かつ当日より前の日のみ。
+
+    Returns:
+        (ロールアップの期間(開始日, 終了日の翌日) or None, summary_usageの期間[(開始, 終了の直後)]のリスト)
+    """
+    start = to_jst(start_datetime)
+    # 終了日時を含むよう、半開区間の終端に変換する
+    end = to_jst(end_datetime) + datetime.timedelta(microseconds=1)
+    today = to_jst(now).date()
+
+    first_full_day = start.date() if start == jst_day_start(start.date()) else start.date() + datetime.timedelta(days=1)
+    last_full_day_end = min(end.date(), today)
+
+    if first_full_day >= last_full_day_end:
+        return None, [(start, end)]
+
+    raw_ranges = []
+    if start < jst_day_start(first_full_day):
+        raw_ranges.append((start, jst_day_start(first_full_day)))
+    if jst_day_start(last_full_day_end) < end:
+        raw_ranges.append((jst_day_start(last_full_day_end), end))
+
+    return (first_full_day, last_full_day_end), raw_ranges
+
+
+def _query_totals(session, model_class: UsageModel, count_expression, filters: List[Any]) -> Tuple[int, int, int]:
+    row = session.query(
+        count_expression,
+        func.sum(model_class.input_tokens),
+        func.sum(model_class.output_tokens)
+    ).filter(and_(*filters)).first()
+
+    if not row:
+        return 0, 0, 0
+    return int(row[0] or 0), int(row[1] or 0), int(row[2] or 0)
+
+
+def _query_by_department(session, model_class: UsageModel, count_expression, filters: List[Any]) -> List[Any]:
+    department = func.coalesce(model_class.department, 'default')
+    doctor = func.coalesce(model_class.doctor, 'default')
+
+    return session.query(
+        department.label("department"),
+        doctor.label("doctor"),
+        model_class.document_types,
+        count_expression.label("count"),
+        func.sum(model_class.input_tokens).label("input_tokens"),
+        func.sum(model_class.output_tokens).label("output_tokens"),
+        func.sum(model_class.processing_time).label("processing_time")
+    ).filter(and_(*filters)).group_by(
+        department,
+        doctor,
+        model_class.document_types
+    ).all()
+
+
+def get_usage_statistics(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str,
+        selected_document_type: str,
+        now: Optional[datetime.datetime] = None
+) -> Dict[str, Any]:
+    """
+    期間全体の集計と診療科・医師・文書タイプ別の集計を取得する
+
+    前日までの1日全体はsummary_usage_dailyから、当日や日の途中から始まる部分だけを
+    summary_usageから集計するため、期間の長さによらず集計する行数はほぼ一定になる。
+    結果は検索条件ごとにキャッシュする。
+
+    詳細レコードは件数に比例して重くなるため含めない。total.countをページ数の計算に使い、
+    レコード自体はget_usage_records_pageで1ページずつ取得する。
+    """
+    cache_key = _cache_key("statistics", start_datetime, end_datetime, selected_model, selected_document_type, now)
+    found, cached = usage_statistics_cache.get(cache_key)
+    if found:
+        return copy.deepcopy(cached)
+
+    statistics = _fetch_usage_statistics(start_datetime, end_datetime, selected_model, selected_document_type, now)
+    usage_statistics_cache.set(cache_key, statistics)
+    return copy.deepcopy(statistics)
+
+
+def _fetch_usage_statistics(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str,
+        selected_document_type: str,
+        now: Optional[datetime.datetime]
+) -> Dict[str, Any]:
+    db_manager = DatabaseManager.get_instance()
+    session = db_manager.get_session()
+
+    try:
+        rollup_range, raw_ranges = split_usage_range(start_datetime, end_datetime, now or datetime.datetime.now(JST))
+
+        # (集計対象のモデル, 件数の集計式, 検索条件)のリスト
+        sources = []
+        if rollup_range:
+            sources.append((
+                SummaryUsageDaily,
+                func.sum(SummaryUsageDaily.count),
+                [
+                    SummaryUsageDaily.usage_date >= rollup_range[0],
+                    SummaryUsageDaily.usage_date < rollup_range[1]
+                ] + build_dimension_filters(SummaryUsageDaily, selected_model, selected_document_type)
+            ))
+        for range_start, range_end in raw_ranges:
+            sources.append((
+                SummaryUsage,
+                func.count(SummaryUsage.id),
+                [
+                    SummaryUsage.date >= range_start,
+                    SummaryUsage.date < range_end
+                ] + build_dimension_filters(SummaryUsage, selected_model, selected_document_type)
+            ))
+
+        count = total_input_tokens = total_output_tokens = 0
+        for model_class, count_expression, filters in sources:
+            source_count, source_input, source_output = _query_totals(session, model_class, count_expression, filters)
+            count += source_count
+            total_input_tokens += source_input
+            total_output_tokens += source_output
+
+        if count == 0:
+            return {"total": None, "by_department": []}
+
+        # 診療科・医師・文書タイプ別の統計を取得し、ロールアップと当日分を合算する
+        by_department: Dict[Tuple[str, str, Optional[str]], Dict[str, Any]] = {}
+        for model_class, count_expression, filters in sources:
+            for row in _query_by_department(session, model_class, count_expression, filters):
+                key = (row.department, row.doctor, row.document_types)
+                entry = by_department.setdefault(key, {
+                    "department": row.department,
+                    "doctor": row.doctor,
+                    "document_types": row.document_types,
+                    "count": 0,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "total_tokens": 0,
+                    "processing_time": 0
+                })
+                entry["count"] += int(row.count or 0)
+                entry["input_tokens"] += int(row.input_tokens or 0)
+                entry["output_tokens"] += int(row.output_tokens or 0)
+                entry["processing_time"] += int(row.processing_time or 0)
+                entry["total_tokens"] = entry["input_tokens"] + entry["output_tokens"]
+
+        return {
+            "total": {
+                "count": count,
+                "total_input_tokens": total_input_tokens,
+                "total_output_tokens": total_output_tokens,
+                "total_tokens": total_input_tokens + total_output_tokens
+            },
+            "by_department": sorted(by_department.values(), key=lambda entry: entry["count"], reverse=True)
+        }
+
+    except Exception as e:
+        raise DatabaseError(f"統計データの取得に失敗しました: {str(e)}")
+    finally:
+        session.close()
+
+
+def get_usage_records_page(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str,
+        selected_document_type: str,
+        cursor: Optional[PageCursor] = None,
+        page_size: int = STATISTICS_PAGE_SIZE
+) -> Dict[str, Any]:
+    """
+    詳細レコードを(date, id)の降順でキーセットページングして1ページ分取得する
+
+    OFFSETを使わず直前のページの最後のレコードを起点に検索するため、
+    どのページを表示してもインデックスを範囲検索するだけで済む。
+    結果は検索条件とカーソルごとにキャッシュする。
+
+    Args:
+        start_datetime: 開始日時
+        end_datetime: 終了日時
+        selected_model: AIモデル
+        selected_document_type: 文書名
+        cursor: 直前のページのnext_cursor（最初のページはNone）
+        page_size: 1ページあたりの件数
+
+    Returns:
+        records: 詳細レコードのリスト
+        next_cursor: 次のページのカーソル（最後のページの場合はNone）
+    """
+    cache_key = _cache_key("records", start_datetime, end_datetime, selected_model, selected_document_type, None,
+                           cursor, page_size)
+    found, cached = usage_statistics_cache.get(cache_key)
+    if found:
+        return copy.deepcopy(cached)
+
+    page = _fetch_usage_records_page(start_datetime, end_datetime, selected_model, selected_document_type,
+                                     cursor, page_size)
+    usage_statistics_cache.set(cache_key, page)
+    return copy.deepcopy(page)
+
+
+def _fetch_usage_records_page(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str,
+        selected_document_type: str,
+        cursor: Optional[PageCursor],
+        page_size: int
+) -> Dict[str, Any]:
+    db_manager = DatabaseManager.get_instance()
+    session = db_manager.get_session()
+
+    try:
+        filters = build_usage_filters(start_datetime, end_datetime, selected_model, selected_document_type)
+        if cursor is not None:
+            cursor_date, cursor_id = cursor
+            filters.append(
+                tuple_(SummaryUsage.date, SummaryUsage.id) < tuple_(literal(cursor_date), literal(cursor_id))
+            )
+
+        # 次のページの有無を判定するため1件多く取得する
+        rows = session.query(
+            SummaryUsage.id,
+            SummaryUsage.date,
+            SummaryUsage.document_types,
+            SummaryUsage.model_detail,
+            SummaryUsage.department,
+            SummaryUsage.doctor,
+            SummaryUsage.input_tokens,
+            SummaryUsage.output_tokens,
+            SummaryUsage.processing_time
+        ).filter(and_(*filters)).order_by(
+            SummaryUsage.date.desc(),
+            SummaryUsage.id.desc()
+        ).limit(page_size + 1).all()
+
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        return {
+            "records": [
+                {
+                    "date": row.date,
+                    "document_types": row.document_types,
+                    "model_detail": row.model_detail,
+                    "department": row.department,
+                    "doctor": row.doctor,
+                    "input_tokens": row.input_tokens,
+                    "output_tokens": row.output_tokens,
+                    "processing_time": row.processing_time
+                }
+                for row in rows
+            ],
+            "next_cursor": (rows[-1].date, rows[-1].id) if has_next else None
+        }
+
+    except Exception as e:
+        raise DatabaseError(f"統計データの取得に失敗しました: {str(e)}")
+    finally:
+        session.close()
+
+
+LATENCY_BUCKETS = {
+    "day": "day",
+    "hour": "hour",
+}
+
+
+def get_latency_statistics(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str,
+        selected_document_type: str,
+        bucket: str = "day"
+) -> List[Dict[str, Any]]:
+    """
+    処理時間のパーセンタイル（p50/p90/p99）と1秒あたりの出力トークン数を取得する
+
+    JSTの日または時間ごと、モデル・文書タイプごとにPostgreSQLのpercentile_contで集計する。
+    パーセンタイルは合算できないためロールアップは使わずsummary_usageから集計する。
+    応答キャッシュの結果を返したレコードはプロバイダーの応答時間ではないため含めない。
+    結果は検索条件ごとにキャッシュする。
+
+    Args:
+        start_datetime: 開始日時
+        end_datetime: 終了日時
+        selected_model: AIモデル
+        selected_document_type: 文書名
+        bucket: 集計単位（day / hour）
+
+    Returns:
+        bucket（JSTの日時）・model_detail・document_types・count・p50・p90・p99・tokens_per_secondの辞書のリスト
+    """
+    if bucket not in LATENCY_BUCKETS:
+        raise ValueError(f"集計単位は{', '.join(LATENCY_BUCKETS)}のいずれかを指定してください: {bucket}")
+
+    cache_key = _cache_key("latency", start_datetime, end_datetime, selected_model, selected_document_type, None,
+                           bucket)
+    found, cached = usage_statistics_cache.get(cache_key)
+    if found:
+        return copy.deepcopy(cached)
+
+    db_manager = DatabaseManager.get_instance()
+    session = db_manager.get_session()
+
+    try:
+        bucket_start = func.date_trunc(LATENCY_BUCKETS[bucket], func.timezone('Asia/Tokyo', SummaryUsage.date))
+        processing_time = SummaryUsage.processing_time
+
+        rows = session.query(
+            bucket_start.label("bucket"),
+            SummaryUsage.model_detail,
+            SummaryUsage.document_types,
+            # Rowのcount()メソッドと区別するため、件数はcall_countとして取得する
+            func.count(SummaryUsage.id).label("call_count"),
+            func.percentile_cont(0.5).within_group(processing_time).label("p50"),
+            func.percentile_cont(0.9).within_group(processing_time).label("p90"),
+            func.percentile_cont(0.99).within_group(processing_time).label("p99"),
+            # 整数どうしの除算は小数点以下が切り捨てられるため、浮動小数点数に変換してから割る
+            (
+                cast(func.sum(SummaryUsage.output_tokens), Float) / func.nullif(func.sum(processing_time), 0)
+            ).label("tokens_per_second")
+        ).filter(
+            and_(*build_usage_filters(start_datetime, end_datetime, selected_model, selected_document_type)),
+            # 応答キャッシュの結果はAPIを呼び出していない（処理時間・トークン数がほぼ0）ため除外する
+            SummaryUsage.cache_hit.isnot(True)
+        ).group_by(
+            bucket_start,
+            SummaryUsage.model_detail,
+            SummaryUsage.document_types
+        ).order_by(
+            bucket_start
+        ).all()
+
+        latency = [
+            {
+                "bucket": row.bucket,
+                "model_detail": row.model_detail,
+                "document_types": row.document_types,
+                "count": int(row.call_count or 0),
+                "p50": float(row.p50) if row.p50 is not None else None,
+                "p90": float(row.p90) if row.p90 is not None else None,
+                "p99": float(row.p99) if row.p99 is not None else None,
+                "tokens_per_second": float(row.tokens_per_second) if row.tokens_per_second is not None else None,
+            }
+            for row in rows
+        ]
+
+    except Exception as e:
+        raise DatabaseError(f"統計データの取得に失敗しました: {str(e)}")
+    finally:
+        session.close()
+
+    usage_statistics_cache.set(cache_key, latency)
+    return copy.deepcopy(latency)
@@ -1,34 +1,61 @@
 import datetime
 import queue
-import threading
 import time
-from typing import Any, Dict, Tuple
+from concurrent.futures import Future, wait
+from typing import Any, Dict, List, Optional, Tuple
 
 import pytz
 import streamlit as st
 from streamlit.delta_generator import DeltaGenerator
 
-from database.db import DatabaseManager
-from database.models import SummaryUsage
-from external_service.api_factory import generate_summary
+from external_service.api_factory import generate_summary, generate_summary_stream
+from external_service.circuit_breaker import circuit_breakers
+from external_service.rate_limiter import estimate_tokens
+from services.chunked_summary import generate_chunked_summary
+from services.executor import task_executor, wait_with_progress
+from services.generation_jobs import (
+    FINISHED_STATUSES,
+    JOB_FAILED,
+    JOB_PENDING,
+    get_generation_job,
+    submit_generation_job,
+)
+from services.usage_rollup import detect_provider
+from services.usage_writer import usage_writer
 from utils.config import (
     ANTHROPIC_MODEL,
     APP_TYPE,
+    CHUNKED_SUMMARY_ENABLED,
     CLAUDE_API_KEY,
+    EXECUTOR_POLL_INTERVAL,
     GEMINI_MODEL,
+    GENERATION_JOB_POLL_INTERVAL,
+    GENERATION_JOB_QUEUE_ENABLED,
     GOOGLE_CREDENTIALS_JSON,
     MAX_INPUT_TOKENS,
     MAX_TOKEN_THRESHOLD,
     MIN_INPUT_TOKENS,
 )
-from utils.constants import DEFAULT_DEPARTMENT, DEFAULT_DOCUMENT_TYPE, DOCUMENT_TYPES, MESSAGES
+from utils.constants import DEFAULT_DEPARTMENT, DEFAULT_DOCUMENT_TYPE, DOCUMENT_TYPES, MESSAGES, TAB_NAMES
 from utils.error_handlers import handle_error
 from utils.exceptions import APIError
 from utils.prompt_manager import get_prompt
-from utils.text_processor import format_output_summary, parse_output_summary
+from utils.text_processor import SectionStreamParser, format_output_summary, parse_output_summary
 
 JST = pytz.timezone('Asia/Tokyo')
 
+# 再読み込みや再接続の後も作成中のジョブの結果を受け取れるよう、ジョブのトークンを保持するURLのクエリパラメータ
+GENERATION_JOB_QUERY_PARAM = "generation_job"
+
+# モデルを切り替えた理由（summary_usage.switch_reasonに記録する）
+SWITCH_REASON_TOKEN_THRESHOLD = "token_threshold"
+SWITCH_REASON_CIRCUIT_OPEN = "circuit_open"
+# プロバイダーのサーキットブレーカーが遮断中の場合の切り替え先
+FAILOVER_MODELS = {
+    "Claude": "Gemini_Pro",
+    "Gemini_Pro": "Claude",
+}
+
 
 def generate_summary_task(
         input_text: str,
@@ -39,14 +66,28 @@ def generate_summary_task(
         selected_document_type: str = DEFAULT_DOCUMENT_TYPE,
         selected_doctor: str = "default",
         model_explicitly_selected: bool = False,
-        previous_record: str = ""
+        previous_record: str = "",
+        delta_queue: Optional[queue.Queue] = None,
+        use_cache: bool = True
 ) -> None:
+    task_start = time.monotonic()
+    time_to_first_token: Optional[float] = None
+
+    def on_delta(delta: str) -> None:
+        nonlocal time_to_first_token
+        if time_to_first_token is None:
+            time_to_first_token = time.monotonic() - task_start
+        if delta_queue is not None:
+            delta_queue.put(format_output_summary(delta))
+
+    call_stats: Dict[str, Any] = {}
+
     try:
         normalized_dept, normalized_doc_type = normalize_selection_params(
             selected_department, selected_document_type
         )
 
-        final_model, model_switched, original_model = determine_final_model(
+        final_model, model_switched, original_model, switch_reason = determine_final_model(
             normalized_dept, normalized_doc_type, selected_doctor,
             selected_model, model_explicitly_selected, input_text, additional_info
         )
@@ -54,16 +95,47 @@ def generate_summary_task(
         provider, model_name = get_provider_and_model(final_model)
         validate_api_credentials_for_provider(provider)
 
-        output_summary, input_tokens, output_tokens = generate_summary(
-            provider=provider,
-            medical_text=input_text,
-            additional_info=additional_info,
-            department=normalized_dept,
-            document_type=normalized_doc_type,
-            doctor=selected_doctor,
-            model_name=model_name,
-            previous_record=previous_record
-        )
+        if CHUNKED_SUMMARY_ENABLED and estimate_tokens(input_text, additional_info) > MAX_TOKEN_THRESHOLD:
+            output_summary, input_tokens, output_tokens = generate_chunked_summary(
+                provider=provider,
+                model_name=model_name,
+                medical_text=input_text,
+                additional_info=additional_info,
+                department=normalized_dept,
+                document_type=normalized_doc_type,
+                doctor=selected_doctor,
+                previous_record=previous_record,
+                on_delta=on_delta if delta_queue is not None else None,
+                call_stats=call_stats,
+                use_cache=use_cache
+            )
+        elif delta_queue is not None:
+            output_summary, input_tokens, output_tokens = generate_summary_stream(
+                provider=provider,
+                medical_text=input_text,
+                additional_info=additional_info,
+                department=normalized_dept,
+                document_type=normalized_doc_type,
+                doctor=selected_doctor,
+                model_name=model_name,
+                previous_record=previous_record,
+                on_delta=on_delta,
+                call_stats=call_stats,
+                use_cache=use_cache
+            )
+        else:
+            output_summary, input_tokens, output_tokens = generate_summary(
+                provider=provider,
+                medical_text=input_text,
+                additional_info=additional_info,
+                department=normalized_dept,
+                document_type=normalized_doc_type,
+                doctor=selected_doctor,
+                model_name=model_name,
+                previous_record=previous_record,
+                call_stats=call_stats,
+                use_cache=use_cache
+            )
 
         model_detail = model_name if provider == "gemini" else final_model
         output_summary = format_output_summary(output_summary)
@@ -76,8 +148,15 @@ def generate_summary_task(
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
             "model_detail": model_detail,
+            "provider": provider,
             "model_switched": model_switched,
-            "original_model": original_model if model_switched else None
+            "original_model": original_model if model_switched else None,
+            "switch_reason": switch_reason,
+            "time_to_first_token": time_to_first_token,
+            "retry_count": call_stats.get("retry_count", 0),
+            "hedged": call_stats.get("hedged", False),
+            "chunk_count": call_stats.get("chunk_count"),
+            "cache_hit": call_stats.get("cache_hit", False)
         })
 
     except Exception as e:
@@ -96,12 +175,18 @@ def process_summary(input_text: str, additional_info: str = "", previous_record:
     try:
         session_params = get_session_parameters()
 
-        result = execute_summary_generation_with_ui(
-            input_text, additional_info, session_params, previous_record
-        )
+        if GENERATION_JOB_QUEUE_ENABLED:
+            result = execute_summary_generation_with_job_queue(
+                input_text, additional_info, session_params, previous_record
+            )
+        else:
+            result = execute_summary_generation_with_ui(
+                input_text, additional_info, session_params, previous_record
+            )
 
         if result["success"]:
-            handle_success_result(result, session_params)
+            # ジョブキューの場合、使用量はワーカーが記録する
+            handle_success_result(result, session_params, save_usage=not GENERATION_JOB_QUEUE_ENABLED)
         else:
             raise APIError(result['error'])
 
@@ -136,7 +221,8 @@ def get_session_parameters() -> Dict[str, Any]:
         "selected_department": getattr(st.session_state, "selected_department", "default"),
         "selected_document_type": getattr(st.session_state, "selected_document_type", DEFAULT_DOCUMENT_TYPE),
         "selected_doctor": getattr(st.session_state, "selected_doctor", "default"),
-        "model_explicitly_selected": getattr(st.session_state, "model_explicitly_selected", False)
+        "model_explicitly_selected": getattr(st.session_state, "model_explicitly_selected", False),
+        "use_response_cache": getattr(st.session_state, "use_response_cache", True)
     }
 
 
@@ -148,28 +234,33 @@ def execute_summary_generation_with_ui(
 ) -> Dict[str, Any]:
     start_time = datetime.datetime.now()
     status_placeholder = st.empty()
+    stream_placeholder = st.empty()
     result_queue = queue.Queue()
-
-    summary_thread = threading.Thread(
-        target=generate_summary_task,
-        args=(
-            input_text,
-            session_params["selected_department"],
-            session_params["selected_model"],
-            result_queue,
-            additional_info,
-            session_params["selected_document_type"],
-            session_params["selected_doctor"],
-            session_params["model_explicitly_selected"],
-            previous_record
-        ),
+    delta_queue = queue.Queue()
+    output_placeholders = create_stream_placeholders(stream_placeholder)
+
+    summary_future = task_executor.submit(
+        generate_summary_task,
+        input_text,
+        session_params["selected_department"],
+        session_params["selected_model"],
+        result_queue,
+        additional_info,
+        session_params["selected_document_type"],
+        session_params["selected_doctor"],
+        session_params["model_explicitly_selected"],
+        previous_record,
+        delta_queue,
+        session_params.get("use_response_cache", True)
     )
-    summary_thread.start()
-
-    display_progress_with_timer(summary_thread, status_placeholder, start_time)
 
-    summary_thread.join()
-    status_placeholder.empty()
+    try:
+        display_progress_with_timer(summary_future, status_placeholder, start_time, delta_queue, output_placeholders)
+        # generate_summary_taskは失敗時も結果をキューに入れてから例外を送出するため、例外は受け取らずに完了だけを待つ
+        wait([summary_future])
+    finally:
+        status_placeholder.empty()
+        stream_placeholder.empty()
     result = result_queue.get()
 
     if result["success"]:
@@ -180,48 +271,207 @@ def execute_summary_generation_with_ui(
     return result
 
 
+def create_stream_placeholders(stream_placeholder: DeltaGenerator) -> List[DeltaGenerator]:
+    """生成途中のテキストを表示する各タブのプレースホルダーを作成する"""
+    stream_tabs = stream_placeholder.container().tabs([
+        TAB_NAMES["ALL"], TAB_NAMES["TREATMENT"], TAB_NAMES["SPECIAL"], TAB_NAMES["NOTE"]])
+    return [tab.empty() for tab in stream_tabs]
+
+
+def render_stream_output(
+        streamed_text: str,
+        section_parser: SectionStreamParser,
+        output_placeholders: List[DeltaGenerator],
+        rendered_sections: Dict[str, str]
+) -> None:
+    """生成途中のテキストを全文タブに、振り分けたセクションを各タブに表示する（変化のないタブは更新しない）"""
+    output_placeholders[0].code(streamed_text, language=None, height=150)
+
+    sections = section_parser.get_sections()
+    section_names = [TAB_NAMES["TREATMENT"], TAB_NAMES["SPECIAL"], TAB_NAMES["NOTE"]]
+    for section, section_placeholder in zip(section_names, output_placeholders[1:]):
+        section_content = sections.get(section, "")
+        if rendered_sections.get(section) != section_content:
+            section_placeholder.code(section_content, language=None, height=150)
+            rendered_sections[section] = section_content
+
+
 def display_progress_with_timer(
-        thread: threading.Thread,
+        future: Future,
         placeholder: DeltaGenerator,
-        start_time: datetime.datetime
+        start_time: datetime.datetime,
+        delta_queue: Optional[queue.Queue] = None,
+        output_placeholders: Optional[List[DeltaGenerator]] = None
 ) -> None:
     elapsed_time = 0
+
+    def update_elapsed_time() -> None:
+        nonlocal elapsed_time
+        current_elapsed = int((datetime.datetime.now() - start_time).total_seconds())
+        if current_elapsed != elapsed_time:
+            elapsed_time = current_elapsed
+            placeholder.text(f"⏱️ 作成時間: {elapsed_time}秒")
+
     with st.spinner("作成中..."):
         placeholder.text(f"⏱️ 作成時間: {elapsed_time}秒")
-        while thread.is_alive():
-            time.sleep(1)
-            elapsed_time = int((datetime.datetime.now() - start_time).total_seconds())
-            placeholder.text(f"⏱️ 作成時間: {elapsed_time}秒")
 
+        if delta_queue is None or not output_placeholders:
+            wait_with_progress(future, update_elapsed_time)
+            return
+
+        streamed_text = ""
+        section_parser = SectionStreamParser()
+        rendered_sections: Dict[str, str] = {}
+
+        while not future.done() or not delta_queue.empty():
+            deltas = drain_delta_queue(delta_queue, timeout=EXECUTOR_POLL_INTERVAL)
+            if deltas:
+                chunk = "".join(deltas)
+                streamed_text += chunk
+                section_parser.feed(chunk)
+                render_stream_output(streamed_text, section_parser, output_placeholders, rendered_sections)
+
+            update_elapsed_time()
+
+
+def execute_summary_generation_with_job_queue(
+        input_text: str,
+        additional_info: str,
+        session_params: Dict[str, Any],
+        previous_record: str = ""
+) -> Dict[str, Any]:
+    """文書作成ジョブを登録し、ワーカーでの作成が完了するまで待つ"""
+    token = submit_generation_job(input_text, additional_info, previous_record, session_params)
+    st.query_params[GENERATION_JOB_QUERY_PARAM] = token
+    return wait_for_generation_job(token)
+
+
+def wait_for_generation_job(token: str, poll_interval: float = GENERATION_JOB_POLL_INTERVAL) -> Dict[str, Any]:
+    """
+    ジョブの完了をpoll_interval秒ごとに確認し、生成途中のテキストと経過時間を表示する
+
+    再読み込みや再接続で待機が中断されてもワーカーは作成を続けるため、同じトークンで呼び出せば結果を受け取れる。
+    経過時間はジョブの登録時点から数える。
+    """
+    status_placeholder = st.empty()
+    stream_placeholder = st.empty()
+    output_placeholders = create_stream_placeholders(stream_placeholder)
+
+    streamed_text = ""
+    section_parser = SectionStreamParser()
+    rendered_sections: Dict[str, str] = {}
 
-def handle_success_result(result: Dict[str, Any], session_params: Dict[str, Any]) -> None:
+    with st.spinner("作成中..."):
+        while True:
+            job = get_generation_job(token)
+            if job is None:
+                st.query_params.pop(GENERATION_JOB_QUERY_PARAM, None)
+                raise APIError(MESSAGES["GENERATION_JOB_NOT_FOUND"])
+
+            if job["status"] in FINISHED_STATUSES:
+                break
+
+            elapsed_time = int((datetime.datetime.now(datetime.timezone.utc) - job["created_at"]).total_seconds())
+            label = "作成待ち" if job["status"] == JOB_PENDING else "作成時間"
+            status_placeholder.text(f"⏱️ {label}: {elapsed_time}秒")
+
+            partial_output = job["partial_output"] or ""
+            if not partial_output.startswith(streamed_text):
+                # 他のワーカーが最初から再実行している
+                streamed_text = ""
+                section_parser = SectionStreamParser()
+            if len(partial_output) > len(streamed_text):
+                section_parser.feed(partial_output[len(streamed_text):])
+                streamed_text = partial_output
+                render_stream_output(streamed_text, section_parser, output_placeholders, rendered_sections)
+
+            time.sleep(poll_interval)
+
+    status_placeholder.empty()
+    stream_placeholder.empty()
+    st.query_params.pop(GENERATION_JOB_QUERY_PARAM, None)
+
+    if job["status"] == JOB_FAILED:
+        return {"success": False, "error": job["error"]}
+
+    result = dict(job["result"])
+    processing_time = (job["finished_at"] - job["created_at"]).total_seconds()
+    st.session_state.summary_generation_time = processing_time
+    result["processing_time"] = processing_time
+    return result
+
+
+@handle_error
+def resume_generation_job() -> None:
+    """URLに作成中のジョブが残っている場合（再読み込み・再接続の後）は、完了を待って結果を表示する"""
+    token = st.query_params.get(GENERATION_JOB_QUERY_PARAM)
+    if not token:
+        return
+
+    try:
+        result = wait_for_generation_job(token)
+
+        if result["success"]:
+            handle_success_result(result, get_session_parameters(), save_usage=False)
+        else:
+            raise APIError(result['error'])
+
+    except Exception as e:
+        raise APIError(f"作成中にエラーが発生しました: {str(e)}")
+
+
+def drain_delta_queue(delta_queue: queue.Queue, timeout: float) -> List[str]:
+    """キューに溜まったテキスト差分をまとめて取り出す（最初の1件はtimeout秒まで待つ）"""
+    deltas = []
+    try:
+        deltas.append(delta_queue.get(timeout=timeout))
+        while True:
+            deltas.append(delta_queue.get_nowait())
+    except queue.Empty:
+        pass
+    return deltas
+
+
+def handle_success_result(result: Dict[str, Any], session_params: Dict[str, Any], save_usage: bool = True) -> None:
     st.session_state.output_summary = result["output_summary"]
     st.session_state.parsed_summary = result["parsed_summary"]
 
-    if result.get("model_switched"):
+    if result.get("switch_reason") == SWITCH_REASON_CIRCUIT_OPEN:
+        st.info(MESSAGES["MODEL_SWITCHED_CIRCUIT_OPEN"].format(
+            original_model=result["original_model"], model=FAILOVER_MODELS.get(result["original_model"])
+        ))
+    elif result.get("model_switched"):
         st.info(f"⚠️ 入力テキストが長いため{result['original_model']} から Gemini_Pro に切り替えました")
 
-    save_usage_to_database(result, session_params)
+    if save_usage:
+        save_usage_to_database(result, session_params)
+
+
+def build_usage_data(result: Dict[str, Any], session_params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "date": datetime.datetime.now().astimezone(JST),
+        "app_type": APP_TYPE,
+        "document_types": session_params["selected_document_type"],
+        "model_detail": result["model_detail"],
+        "provider": result.get("provider") or detect_provider(result["model_detail"]),
+        "department": session_params["selected_department"],
+        "doctor": session_params["selected_doctor"],
+        "input_tokens": result["input_tokens"],
+        "output_tokens": result["output_tokens"],
+        "processing_time": round(result["processing_time"]),
+        "time_to_first_token": result.get("time_to_first_token"),
+        "retry_count": result.get("retry_count", 0),
+        "hedged": result.get("hedged", False),
+        "model_switched": bool(result.get("model_switched")),
+        "switch_reason": result.get("switch_reason"),
+        "cache_hit": bool(result.get("cache_hit"))
+    }
 
 
 def save_usage_to_database(result: Dict[str, Any], session_params: Dict[str, Any]) -> None:
+    """使用量をバックグラウンドの書き込みキューに追加する（データベースへの書き込みは待たない）"""
     try:
-        db_manager = DatabaseManager.get_instance()
-        now_jst = datetime.datetime.now().astimezone(JST)
-
-        usage_data = {
-            "date": now_jst,
-            "app_type": APP_TYPE,
-            "document_types": session_params["selected_document_type"],
-            "model_detail": result["model_detail"],
-            "department": session_params["selected_department"],
-            "doctor": session_params["selected_doctor"],
-            "input_tokens": result["input_tokens"],
-            "output_tokens": result["output_tokens"],
-            "processing_time": round(result["processing_time"])
-        }
-
-        db_manager.insert(SummaryUsage, usage_data)
+        usage_writer.submit(build_usage_data(result, session_params))
 
     except Exception as db_error:
         st.warning(f"データベース保存中にエラーが発生しました: {str(db_error)}")
@@ -241,25 +491,66 @@ def determine_final_model(
         model_explicitly_selected: bool,
         input_text: str,
         additional_info: str
-) -> Tuple[str, bool, str]:
+) -> Tuple[str, bool, str, Optional[str]]:
+    """
+    使用するモデルを決定し、(モデル, 切り替えたか, 元のモデル, 切り替えた理由)を返す
+
+    入力が長い場合はClaudeからGemini_Proに切り替え（CHUNKED_SUMMARY_ENABLEDの場合は分割して作成するため切り替えない）、
+    プロバイダーのサーキットブレーカーが遮断中の場合はFAILOVER_MODELSのモデルに切り替える。
+    """
     prompt_data = get_prompt(department, document_type, doctor)
     prompt_selected_model = prompt_data.get("selected_model") if prompt_data else None
 
     if prompt_selected_model and not model_explicitly_selected:
         selected_model = prompt_selected_model
 
-    estimated_tokens = len(input_text) + len(additional_info or "")
+    estimated_tokens = estimate_tokens(input_text, additional_info)
     original_model = selected_model
     model_switched = False
+    switch_reason = None
 
-    if selected_model == "Claude" and estimated_tokens > MAX_TOKEN_THRESHOLD:
+    # 分割して作成する場合はどのモデルでも作成できるため切り替えない
+    if selected_model == "Claude" and estimated_tokens > MAX_TOKEN_THRESHOLD and not CHUNKED_SUMMARY_ENABLED:
         if GOOGLE_CREDENTIALS_JSON and GEMINI_MODEL:
             selected_model = "Gemini_Pro"
             model_switched = True
+            switch_reason = SWITCH_REASON_TOKEN_THRESHOLD
         else:
             raise APIError(MESSAGES["TOKEN_THRESHOLD_EXCEEDED_NO_GEMINI"])
 
-    return selected_model, model_switched, original_model
+    failover_model = select_failover_model(selected_model, estimated_tokens)
+    if failover_model:
+        selected_model = failover_model
+        model_switched = True
+        switch_reason = SWITCH_REASON_CIRCUIT_OPEN
+
+    return selected_model, model_switched, original_model, switch_reason
+
+
+def select_failover_model(selected_model: str, estimated_tokens: int) -> Optional[str]:
+    """
+    選択したモデルのプロバイダーが遮断中の場合の切り替え先を返す（切り替えない場合はNone）
+
+    切り替え先も遮断中・未設定の場合や、入力が長くClaudeに切り替えられない場合（分割して作成する場合を除く）は切り替えず、
+    呼び出し時にタイムアウトを待たずにエラーになる。
+    """
+    failover_model = FAILOVER_MODELS.get(selected_model)
+    if failover_model is None:
+        return None
+
+    provider, _ = get_provider_and_model(selected_model)
+    if circuit_breakers.is_available(provider):
+        return None
+
+    failover_provider, failover_model_name = get_provider_and_model(failover_model)
+    if not failover_model_name or not has_api_credentials(failover_provider):
+        return None
+    if failover_model == "Claude" and estimated_tokens > MAX_TOKEN_THRESHOLD and not CHUNKED_SUMMARY_ENABLED:
+        return None
+    if not circuit_breakers.is_available(failover_provider):
+        return None
+
+    return failover_model
 
 
 def get_provider_and_model(selected_model: str) -> Tuple[str, str | None]:
@@ -274,11 +565,15 @@ def get_provider_and_model(selected_model: str) -> Tuple[str, str | None]:
     return provider_mapping[selected_model]
 
 
-def validate_api_credentials_for_provider(provider: str) -> None:
+def has_api_credentials(provider: str) -> bool:
     credentials_check = {
         "claude": CLAUDE_API_KEY,
         "gemini": GOOGLE_CREDENTIALS_JSON,
     }
 
-    if not credentials_check.get(provider):
+    return bool(credentials_check.get(provider))
+
+
+def validate_api_credentials_for_provider(provider: str) -> None:
+    if not has_api_credentials(provider):
         raise APIError(MESSAGES["NO_API_CREDENTIALS"])
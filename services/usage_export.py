@@ -0,0 +1,125 @@
+import datetime
+from typing import Any, BinaryIO, Iterator, List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import and_, select
+
+from database.db import DatabaseManager
+from database.models import SummaryUsage
+from services.statistics_service import build_usage_filters
+from utils.config import USAGE_EXPORT_BATCH_SIZE
+from utils.exceptions import DatabaseError
+
+EXPORT_FORMATS = ["csv", "parquet"]
+
+# 出力するカラムとArrowの型（日時はJSTで出力する）
+EXPORT_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("date", pa.timestamp("us", tz="Asia/Tokyo")),
+    ("app_type", pa.string()),
+    ("document_types", pa.string()),
+    ("model_detail", pa.string()),
+    ("provider", pa.string()),
+    ("department", pa.string()),
+    ("doctor", pa.string()),
+    ("input_tokens", pa.int64()),
+    ("output_tokens", pa.int64()),
+    ("processing_time", pa.int64()),
+    ("time_to_first_token", pa.float64()),
+    ("retry_count", pa.int64()),
+    ("hedged", pa.bool_()),
+    ("model_switched", pa.bool_()),
+    ("switch_reason", pa.string()),
+    ("cache_hit", pa.bool_()),
+])
+
+
+def iter_usage_batches(
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str = "すべて",
+        selected_document_type: str = "すべて",
+        batch_size: int = USAGE_EXPORT_BATCH_SIZE,
+        max_rows: Optional[int] = None
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    使用量レコードを(date, id)の昇順でbatch_size件ずつ返す（max_rowsを指定した場合はその件数まで）
+
+    サーバーサイドカーソルで取得するため、件数によらずメモリに保持するのは1バッチ分のみ。
+    """
+    session = DatabaseManager.get_instance().get_session()
+    try:
+        columns = [getattr(SummaryUsage, field.name) for field in EXPORT_SCHEMA]
+        stmt = select(*columns).where(
+            and_(*build_usage_filters(start_datetime, end_datetime, selected_model, selected_document_type))
+        ).order_by(
+            SummaryUsage.date,
+            SummaryUsage.id
+        ).execution_options(stream_results=True, yield_per=batch_size)
+        if max_rows is not None:
+            stmt = stmt.limit(max_rows)
+
+        for partition in session.execute(stmt).partitions():
+            yield [tuple(row) for row in partition]
+
+    except Exception as e:
+        raise DatabaseError(f"使用量のエクスポートに失敗しました: {str(e)}")
+    finally:
+        session.close()
+
+
+def to_record_batch(rows: List[Tuple[Any, ...]]) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, EXPORT_SCHEMA)],
+        schema=EXPORT_SCHEMA
+    )
+
+
+def write_usage_export(
+        output: Union[str, BinaryIO],
+        export_format: str,
+        start_datetime: datetime.datetime,
+        end_datetime: datetime.datetime,
+        selected_model: str = "すべて",
+        selected_document_type: str = "すべて",
+        batch_size: int = USAGE_EXPORT_BATCH_SIZE,
+        max_rows: Optional[int] = None
+) -> int:
+    """
+    使用量レコードをCSVまたはParquetに書き出す
+
+    batch_size件ずつ書き出すため（Parquetでは1バッチが1つのRow Groupになる）、
+    件数によらず使用するメモリはほぼ一定になる。
+
+    Args:
+        output: 出力先のパスまたはバイナリのファイルオブジェクト
+        export_format: csv / parquet
+        start_datetime: 開始日時
+        end_datetime: 終了日時
+        selected_model: AIモデル
+        selected_document_type: 文書名
+        batch_size: 1回に取得・書き出す件数
+        max_rows: 書き出す件数の上限（Noneの場合は上限なし）
+
+    Returns:
+        書き出した件数
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"出力形式は{', '.join(EXPORT_FORMATS)}のいずれかを指定してください: {export_format}")
+
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(output, EXPORT_SCHEMA)
+    else:
+        writer = pa_csv.CSVWriter(output, EXPORT_SCHEMA)
+
+    exported = 0
+    with writer:
+        for rows in iter_usage_batches(start_datetime, end_datetime, selected_model, selected_document_type,
+                                       batch_size, max_rows):
+            writer.write_batch(to_record_batch(rows))
+            exported += len(rows)
+
+    return exported
@@ -0,0 +1,138 @@
+import datetime
+from typing import Any, Dict, List, Optional
+
+import pytz
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database.db import DatabaseManager
+from database.models import SummaryUsage, SummaryUsageDaily
+from utils.exceptions import DatabaseError
+
+JST = pytz.timezone('Asia/Tokyo')
+
+ROLLUP_DIMENSIONS = ["usage_date", "model_detail", "document_types", "department", "doctor"]
+ROLLUP_MEASURES = ["count", "input_tokens", "output_tokens", "processing_time"]
+
+# model_detailに含まれる文字列で判定するAPIプロバイダー（マイグレーションのバックフィルと同じ順序で判定する）
+PROVIDERS = ["claude", "gemini"]
+
+
+def detect_provider(model_detail: Optional[str]) -> Optional[str]:
+    """model_detailからAPIプロバイダーを判定する（判定できない場合はNone）"""
+    model_detail = (model_detail or "").lower()
+    for provider in PROVIDERS:
+        if provider in model_detail:
+            return provider
+    return None
+
+
+def to_jst(value: datetime.datetime) -> datetime.datetime:
+    """タイムゾーンのない日時はJSTとみなしてJSTの日時に変換する"""
+    if value.tzinfo:
+        return value.astimezone(JST)
+    return JST.localize(value)
+
+
+def jst_day_start(day: datetime.date) -> datetime.datetime:
+    return JST.localize(datetime.datetime.combine(day, datetime.time.min))
+
+
+def aggregate_usage_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """使用量レコードをロールアップの単位（JSTの日付・モデル・文書タイプ・診療科・医師）ごとに集計する"""
+    totals: Dict[tuple, Dict[str, Any]] = {}
+
+    for row in rows:
+        key = (
+            to_jst(row["date"]).date(),
+            row.get("model_detail"),
+            row.get("document_types"),
+            row.get("department"),
+            row.get("doctor"),
+        )
+        entry = totals.setdefault(key, {
+            "provider": row.get("provider") or detect_provider(row.get("model_detail")),
+            **{measure: 0 for measure in ROLLUP_MEASURES}
+        })
+        entry["count"] += 1
+        entry["input_tokens"] += row.get("input_tokens") or 0
+        entry["output_tokens"] += row.get("output_tokens") or 0
+        entry["processing_time"] += row.get("processing_time") or 0
+
+    # 同時に加算する他のワーカーとデッドロックしないよう、常に同じ順序で更新する
+    ordered_keys = sorted(totals, key=lambda key: tuple("" if value is None else str(value) for value in key))
+    return [{**dict(zip(ROLLUP_DIMENSIONS, key)), **totals[key]} for key in ordered_keys]
+
+
+def increment_daily_rollup(session, rows: List[Dict[str, Any]]) -> None:
+    """使用量レコードの一括挿入と同じトランザクションで、ロールアップに件数とトークン数を加算する"""
+    rollup_rows = aggregate_usage_rows(rows)
+    if not rollup_rows:
+        return
+
+    stmt = pg_insert(SummaryUsageDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=ROLLUP_DIMENSIONS,
+        set_={
+            **{
+                measure: getattr(SummaryUsageDaily, measure) + stmt.excluded[measure]
+                for measure in ROLLUP_MEASURES
+            },
+            "updated_at": func.now(),
+        }
+    )
+    session.execute(stmt, rollup_rows)
+
+
+def rebuild_daily_rollup(date_from: datetime.date, date_to: datetime.date) -> int:
+    """
+    指定期間（date_toは含まない）のロールアップをsummary_usageから再集計する
+
+    加算による更新で生じたずれ（退避ファイルの手動削除や使用量レコードの削除など）を補正する。
+
+    Returns:
+        再作成したロールアップの件数
+    """
+    session = DatabaseManager.get_instance().get_session()
+    try:
+        usage_date = cast(func.timezone('Asia/Tokyo', SummaryUsage.date), Date)
+        aggregated = select(
+            usage_date,
+            SummaryUsage.model_detail,
+            SummaryUsage.document_types,
+            SummaryUsage.department,
+            SummaryUsage.doctor,
+            # providerはmodel_detailから決まるため集計単位に含めない
+            func.max(SummaryUsage.provider),
+            func.count(SummaryUsage.id),
+            func.coalesce(func.sum(SummaryUsage.input_tokens), 0),
+            func.coalesce(func.sum(SummaryUsage.output_tokens), 0),
+            func.coalesce(func.sum(SummaryUsage.processing_time), 0)
+        ).where(
+            SummaryUsage.date >= jst_day_start(date_from),
+            SummaryUsage.date < jst_day_start(date_to)
+        ).group_by(
+            usage_date,
+            SummaryUsage.model_detail,
+            SummaryUsage.document_types,
+            SummaryUsage.department,
+            SummaryUsage.doctor
+        )
+
+        session.execute(
+            delete(SummaryUsageDaily).where(
+                SummaryUsageDaily.usage_date >= date_from,
+                SummaryUsageDaily.usage_date < date_to
+            )
+        )
+        result = session.execute(
+            insert(SummaryUsageDaily).from_select(ROLLUP_DIMENSIONS + ["provider"] + ROLLUP_MEASURES, aggregated)
+        )
+        session.commit()
+        return result.rowcount
+
+    except Exception as e:
+        session.rollback()
+        raise DatabaseError(f"使用量ロールアップの再集計に失敗しました: {str(e)}")
+    finally:
+        session.close()
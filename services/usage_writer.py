@@ -0,0 +1,254 @@
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from sqlalchemy import DateTime
+
+from database.db import DatabaseManager
+from database.models import Base, SummaryUsage
+from services.usage_rollup import increment_daily_rollup
+from utils.config import (
+    USAGE_WRITER_BATCH_SIZE,
+    USAGE_WRITER_FLUSH_INTERVAL,
+    USAGE_WRITER_MAX_QUEUE_SIZE,
+    USAGE_WRITER_SPILL_PATH,
+)
+
+# 書き込み後に呼び出すリスナー（戻り値は使用しない）
+FlushListener = Callable[[List[Dict[str, Any]]], object]
+WriteHook = Callable[[Any, List[Dict[str, Any]]], None]
+
+
+class UsageWriter:
+    """
+    使用量レコードをバックグラウンドでまとめてデータベースに書き込むライター
+
+    レコードは上限付きキューに溜め、件数または経過時間で一括挿入する。
+    PostgreSQLに書き込めない場合やキューが一杯の場合はローカルファイルに退避し、
+    次に書き込みに成功した時点で再投入する。
+    on_writeを指定すると、一括挿入と同じトランザクションで追加の書き込み（ロールアップの加算など）を行う。
+    """
+
+    def __init__(
+            self,
+            model_class: Type[Base] = SummaryUsage,
+            batch_size: int = USAGE_WRITER_BATCH_SIZE,
+            flush_interval: float = USAGE_WRITER_FLUSH_INTERVAL,
+            max_queue_size: int = USAGE_WRITER_MAX_QUEUE_SIZE,
+            spill_path: str = USAGE_WRITER_SPILL_PATH,
+            on_write: Optional[WriteHook] = None
+    ):
+        self._model_class = model_class
+        self._on_write = on_write
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._spill_path = spill_path
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._flush_listeners: List[FlushListener] = []
+        self._datetime_columns = {
+            column.name for column in model_class.__table__.columns if isinstance(column.type, DateTime)
+        }
+        self._written = 0
+        self._spilled = 0
+        self._replayed = 0
+        self._failed_batches = 0
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """レコードをキューに追加する（呼び出し元はデータベースへの書き込みを待たない）"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._spill([row])
+
+    def add_flush_listener(self, listener: FlushListener) -> None:
+        """書き込みに成功したレコードを受け取る関数を登録する"""
+        with self._lock:
+            if listener not in self._flush_listeners:
+                self._flush_listeners.append(listener)
+
+    def flush(self) -> int:
+        """キューに溜まっているレコードをすべて書き込み、書き込んだ件数を返す"""
+        written = 0
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return written
+            written += self._write_batch(batch)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """バックグラウンドスレッドを停止し、残っているレコードを書き込む"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self._written,
+                "spilled": self._spilled,
+                "replayed": self._replayed,
+                "failed_batches": self._failed_batches,
+            }
+
+    def replay_spill(self) -> int:
+        """退避ファイルのレコードをデータベースに再投入し、再投入した件数を返す"""
+        with self._write_lock:
+            return self._replay_spill()
+
+    def _replay_spill(self) -> int:
+        replay_path = f"{self._spill_path}.replay"
+
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self._spill_path):
+                    return 0
+                os.replace(self._spill_path, replay_path)
+
+        rows = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(self._decode_row(json.loads(line)))
+                except ValueError as e:
+                    print(f"使用量の退避ファイルの不正な行を読み飛ばしました: {str(e)}")
+
+        try:
+            for start in range(0, len(rows), self._batch_size):
+                batch = rows[start:start + self._batch_size]
+                DatabaseManager.get_instance().bulk_insert(self._model_class, batch, on_write=self._on_write)
+                self._notify_listeners(batch)
+                # 途中で失敗した場合に二重登録しないよう、書き込み済みの行を退避ファイルから取り除く
+                self._rewrite_replay_file(replay_path, rows[start + self._batch_size:])
+        except Exception as e:
+            print(f"退避した使用量の再投入に失敗しました: {str(e)}")
+            return 0
+
+        os.remove(replay_path)
+        with self._lock:
+            self._replayed += len(rows)
+        return len(rows)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="usage-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        self.replay_spill()
+        while not self._stop_event.is_set():
+            batch = self._take_batch(block=True)
+            if batch:
+                self._write_batch(batch)
+
+    def _take_batch(self, block: bool) -> List[Dict[str, Any]]:
+        """batch_size件溜まるか、最初のレコードからflush_interval秒経過するまでレコードを集める"""
+        batch: List[Dict[str, Any]] = []
+
+        if block:
+            try:
+                batch.append(self._queue.get(timeout=self._flush_interval))
+            except queue.Empty:
+                return batch
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size and not self._stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        else:
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> int:
+        with self._write_lock:
+            try:
+                DatabaseManager.get_instance().bulk_insert(self._model_class, batch, on_write=self._on_write)
+            except Exception as e:
+                print(f"使用量の書き込みに失敗したため、ローカルファイルに退避します: {str(e)}")
+                with self._lock:
+                    self._failed_batches += 1
+                self._spill(batch)
+                return 0
+
+            with self._lock:
+                self._written += len(batch)
+            self._notify_listeners(batch)
+
+            # データベースが復旧した場合に備えて、退避済みのレコードを再投入する
+            if os.path.exists(self._spill_path) or os.path.exists(f"{self._spill_path}.replay"):
+                self.replay_spill()
+            return len(batch)
+
+    def _notify_listeners(self, rows: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            listeners = list(self._flush_listeners)
+
+        for listener in listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                print(f"使用量の書き込み後処理に失敗しました: {str(e)}")
+
+    def _spill(self, rows: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(self._encode_row(row), ensure_ascii=False) + "\n" for row in rows)
+        try:
+            with self._spill_lock:
+                with open(self._spill_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            print(f"使用量の退避に失敗しました（{len(rows)}件が失われました）: {str(e)}")
+            return
+
+        with self._lock:
+            self._spilled += len(rows)
+
+    def _rewrite_replay_file(self, replay_path: str, remaining_rows: List[Dict[str, Any]]) -> None:
+        with open(replay_path, "w", encoding="utf-8") as f:
+            for row in remaining_rows:
+                f.write(json.dumps(self._encode_row(row), ensure_ascii=False) + "\n")
+
+    def _encode_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: value.isoformat() if isinstance(value, datetime.datetime) else value
+            for key, value in row.items()
+        }
+
+    def _decode_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: datetime.datetime.fromisoformat(value)
+            if key in self._datetime_columns and isinstance(value, str) else value
+            for key, value in row.items()
+        }
+
+
+usage_writer = UsageWriter(on_write=increment_daily_rollup)
+atexit.register(usage_writer.shutdown)
@@ -97,6 +97,21 @@ def sample_prompt_data():
     }
 
 
+@pytest.fixture(autouse=True)
+def clear_prompt_cache():
+    """テスト間でプロンプト・統計のキャッシュが共有されないようにする"""
+    from services.evaluation_service import evaluation_prompt_cache
+    from services.statistics_service import usage_statistics_cache
+    from utils.prompt_manager import prompt_cache
+    caches = (prompt_cache, evaluation_prompt_cache, usage_statistics_cache)
+    for cache in caches:
+        cache.clear()
+        cache.reset_stats()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def reset_environment():
     """各テスト前後で環境変数をリセット"""
@@ -0,0 +1,113 @@
+import threading
+from typing import Tuple
+from unittest.mock import Mock, patch
+
+import pytest
+
+from external_service.base_api import BaseAPIClient
+from external_service.retry_policy import AttemptCancelled, RetryPolicy
+from utils.exceptions import APIError
+
+
+class DummyClient(BaseAPIClient):
+    """テスト用のクライアント"""
+
+    def __init__(self):
+        super().__init__(None, "dummy-model")
+
+    def initialize(self) -> bool:
+        return True
+
+    def _generate_content(self, prompt: str, model_name: str) -> Tuple[str, int, int]:
+        return "一括生成されたテキスト", 10, 20
+
+
+class StreamingDummyClient(DummyClient):
+    """ストリーミングに対応したテスト用のクライアント"""
+
+    def _generate_content_stream(self, prompt: str, model_name: str):
+        yield "治療経過:"
+        yield ""
+        yield "経過良好"
+        return 30, 40
+
+
+class TestGenerateSummaryStream:
+    """generate_summary_streamメソッドのテスト"""
+
+    @patch('external_service.base_api.get_prompt')
+    def test_stream_deltas_and_usage(self, mock_get_prompt):
+        """差分が順にコールバックされ、全文とトークン数が返されるテスト"""
+        mock_get_prompt.return_value = {"content": "テストプロンプト", "selected_model": None}
+        on_delta = Mock()
+
+        text, input_tokens, output_tokens = StreamingDummyClient().generate_summary_stream(
+            "カルテ", on_delta=on_delta
+        )
+
+        assert text == "治療経過:経過良好"
+        assert (input_tokens, output_tokens) == (30, 40)
+        assert [call.args[0] for call in on_delta.call_args_list] == ["治療経過:", "経過良好"]
+
+    @patch('external_service.base_api.get_prompt')
+    def test_stream_fallback_without_streaming_support(self, mock_get_prompt):
+        """ストリーミング非対応のクライアントでは一括で返されるテスト"""
+        mock_get_prompt.return_value = None
+        on_delta = Mock()
+
+        with patch('external_service.base_api.get_config') as mock_config:
+            mock_config.return_value = {'PROMPTS': {'summary': 'デフォルトプロンプト'}}
+            text, input_tokens, output_tokens = DummyClient().generate_summary_stream(
+                "カルテ", on_delta=on_delta
+            )
+
+        assert text == "一括生成されたテキスト"
+        assert (input_tokens, output_tokens) == (10, 20)
+        on_delta.assert_called_once_with("一括生成されたテキスト")
+
+    @patch('external_service.base_api.get_prompt')
+    def test_stream_error_wrapped(self, mock_get_prompt):
+        """予期しない例外がAPIErrorに変換されるテスト"""
+        mock_get_prompt.side_effect = Exception("DBエラー")
+
+        with pytest.raises(APIError, match="DummyClientでエラーが発生しました"):
+            DummyClient().generate_summary_stream("カルテ")
+
+
+class TestRetry:
+    """再試行のテスト"""
+
+    @patch('external_service.base_api.get_retry_policy')
+    @patch('external_service.base_api.get_prompt')
+    def test_retry_is_recorded(self, mock_get_prompt, mock_get_policy):
+        """一時的なエラーの場合に再試行され、再試行回数が記録されるテスト"""
+        mock_get_prompt.return_value = {"content": "テストプロンプト", "selected_model": None}
+        mock_get_policy.return_value = RetryPolicy(sleep=Mock())
+        client = DummyClient()
+        client._generate_content = Mock(side_effect=[APIError("503 UNAVAILABLE"), ("要約", 10, 20)])
+
+        assert client.generate_summary("カルテ") == ("要約", 10, 20)
+        assert client.last_call_stats == {"retry_count": 1, "hedged": False, "cache_hit": False}
+
+    def test_cancelled_stream_is_closed(self):
+        """中断された場合はストリームを閉じるテスト"""
+        closed = []
+
+        class ClosingClient(DummyClient):
+            def _generate_content_stream(self, prompt: str, model_name: str):
+                try:
+                    yield "治療経過:"
+                    yield "経過良好"
+                finally:
+                    closed.append(True)
+                return 0, 0
+
+        cancelled = threading.Event()
+
+        def emit(delta):
+            cancelled.set()
+
+        with pytest.raises(AttemptCancelled):
+            ClosingClient()._attempt("プロンプト", "dummy-model", True, emit, cancelled)
+
+        assert closed == [True]
@@ -0,0 +1,89 @@
+from utils.cache import TTLLRUCache
+
+
+class TestTTLLRUCache:
+    """TTLLRUCacheクラスのテスト"""
+
+    def test_get_and_set(self):
+        """値の保存と取得のテスト"""
+        cache = TTLLRUCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+
+        assert cache.get("key") == (True, "value")
+        assert cache.get("missing") == (False, None)
+
+    def test_none_value_is_cached(self):
+        """Noneもキャッシュされるテスト"""
+        cache = TTLLRUCache(maxsize=10, ttl=60)
+        cache.set("key", None)
+
+        assert cache.get("key") == (True, None)
+
+    def test_lru_eviction(self):
+        """上限を超えると最も使われていない値が削除されるテスト"""
+        cache = TTLLRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == (True, 1)
+        assert cache.get("b") == (False, None)
+        assert cache.get("c") == (True, 3)
+
+    def test_ttl_expiration(self):
+        """TTLを過ぎた値が取得されないテスト"""
+        now = [100.0]
+        cache = TTLLRUCache(maxsize=10, ttl=60, timer=lambda: now[0])
+        cache.set("key", "value")
+
+        now[0] = 159.0
+        assert cache.get("key") == (True, "value")
+
+        now[0] = 161.0
+        assert cache.get("key") == (False, None)
+
+    def test_invalidate(self):
+        """個別の削除のテスト"""
+        cache = TTLLRUCache(maxsize=10, ttl=60)
+        cache.set("key", None)
+        cache.invalidate("key")
+        cache.invalidate("missing")
+
+        assert cache.get("key") == (False, None)
+        assert cache.get_stats()["invalidations"] == 1
+
+    def test_invalidate_where(self):
+        """条件に一致する値の削除のテスト"""
+        cache = TTLLRUCache(maxsize=10, ttl=60)
+        cache.set(("内科", 1), "a")
+        cache.set(("内科", 2), "b")
+        cache.set(("外科", 1), "c")
+
+        removed = cache.invalidate_where(lambda key: key[0] == "内科")
+
+        assert removed == 2
+        assert cache.get(("外科", 1)) == (True, "c")
+
+    def test_getsizeof_limit(self):
+        """サイズ上限を超える値はキャッシュされないテスト"""
+        cache = TTLLRUCache(maxsize=5, ttl=60, getsizeof=len)
+        cache.set("small", [1, 2])
+        cache.set("large", list(range(10)))
+
+        assert cache.get("small") == (True, [1, 2])
+        assert cache.get("large") == (False, None)
+
+    def test_stats(self):
+        """ヒット率の統計のテスト"""
+        cache = TTLLRUCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+        cache.get("key")
+        cache.get("key")
+        cache.get("missing")
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+        assert abs(stats["hit_rate"] - 2 / 3) < 1e-9
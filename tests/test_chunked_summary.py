@@ -0,0 +1,140 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from services.chunked_summary import CHUNK_INSTRUCTION, REDUCE_INSTRUCTION, chunk_cache, generate_chunked_summary, \
+    split_chart_text
+
+CHART = (
+    "2024/1/5 初診\n発熱と咳嗽あり。\n"
+    "2024/1/12 再診\n解熱。咳嗽は持続。\n"
+    "R6.2.1 再診\n症状消失。\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_chunk_cache():
+    chunk_cache.clear()
+    yield
+    chunk_cache.clear()
+
+
+@pytest.fixture
+def mock_generate():
+    """部分ごとの作成は部分の2行目の先頭4文字、統合は固定の文書を返すモック"""
+    with patch('services.chunked_summary.get_prompt', return_value={"content": "テストプロンプト"}), \
+            patch('services.chunked_summary.generate_summary') as mock_generate_summary:
+        def fake_generate(**kwargs):
+            kwargs["call_stats"].update({"retry_count": 1, "hedged": False})
+            text = kwargs["medical_text"]
+            if text.startswith(REDUCE_INSTRUCTION):
+                return "治療経過:\n統合された経過", 50, 20
+            return f"要約:{text.splitlines()[3][:4]}", 10, 5
+
+        mock_generate_summary.side_effect = fake_generate
+        yield mock_generate_summary
+
+
+class TestSplitChartText:
+    """split_chart_text関数のテスト"""
+
+    def test_split_on_dates(self):
+        """日付で始まる行で区切り、大きさの上限までまとめるテスト"""
+        chunks = split_chart_text(CHART, chunk_size=30)
+
+        assert chunks == [
+            "2024/1/5 初診\n発熱と咳嗽あり。\n",
+            "2024/1/12 再診\n解熱。咳嗽は持続。\n",
+            "R6.2.1 再診\n症状消失。\n",
+        ]
+        assert split_chart_text(CHART, chunk_size=1000) == [CHART]
+
+    def test_split_oversized_block(self):
+        """日付の区切りがない長いブロックは行や文字数で分割するテスト"""
+        chunks = split_chart_text("あ" * 5 + "\n" + "い" * 12, chunk_size=6)
+
+        assert chunks == ["あああああ\n", "いいいいいい", "いいいいいい"]
+
+
+class TestGenerateChunkedSummary:
+    """generate_chunked_summary関数のテスト"""
+
+    def test_map_reduce(self, mock_generate):
+        """部分ごとに作成してから統合し、トークン数と再試行回数を合計するテスト"""
+        call_stats = {}
+
+        result = generate_chunked_summary(
+            "claude", "claude-sonnet", CHART, additional_info="追加", department="内科",
+            previous_record="前回", call_stats=call_stats, chunk_size=30
+        )
+
+        assert result == ("治療経過:\n統合された経過", 80, 35)
+        assert call_stats == {
+            "retry_count": 4, "hedged": False, "chunk_count": 3, "cached_chunks": 0, "cache_hit": False
+        }
+
+        map_calls = [call.kwargs for call in mock_generate.call_args_list[:3]]
+        assert all(call["medical_text"].startswith(CHUNK_INSTRUCTION) for call in map_calls)
+        assert all(call["previous_record"] == "" for call in map_calls)
+        reduce_call = mock_generate.call_args_list[3].kwargs
+        assert reduce_call["previous_record"] == "前回"
+        assert "要約:発熱と咳" in reduce_call["medical_text"]
+        assert reduce_call["model_name"] == "claude-sonnet"
+
+    def test_rerun_uses_cache(self, mock_generate):
+        """再実行時は変更された部分だけを作成するテスト"""
+        generate_chunked_summary("claude", "claude-sonnet", CHART, chunk_size=30)
+        mock_generate.reset_mock()
+        call_stats = {}
+
+        generate_chunked_summary(
+            "claude", "claude-sonnet", CHART.replace("症状消失。", "症状再燃。"), call_stats=call_stats, chunk_size=30
+        )
+
+        assert mock_generate.call_count == 2
+        assert "症状再燃。" in mock_generate.call_args_list[0].kwargs["medical_text"]
+        assert call_stats["cached_chunks"] == 2
+
+    def test_opt_out_does_not_cache(self, mock_generate):
+        """use_cacheがFalseの場合は部分ごとの作成結果をキャッシュに保存しないテスト"""
+        generate_chunked_summary("claude", "claude-sonnet", CHART, chunk_size=30, use_cache=False)
+        mock_generate.reset_mock()
+
+        generate_chunked_summary("claude", "claude-sonnet", CHART, chunk_size=30)
+
+        assert mock_generate.call_count == 4
+
+    def test_cache_depends_on_model(self, mock_generate):
+        """モデルが異なる場合はキャッシュを使用しないテスト"""
+        generate_chunked_summary("claude", "claude-sonnet", CHART, chunk_size=30)
+        mock_generate.reset_mock()
+
+        generate_chunked_summary("gemini", "gemini-pro", CHART, chunk_size=30)
+
+        assert mock_generate.call_count == 4
+
+    def test_streaming_reduce(self, mock_generate):
+        """on_deltaが指定されている場合は統合をストリーミングで作成するテスト"""
+        on_delta = Mock()
+        with patch('services.chunked_summary.generate_summary_stream') as mock_stream:
+            mock_stream.return_value = ("統合", 50, 20)
+
+            result = generate_chunked_summary("claude", "claude-sonnet", CHART, on_delta=on_delta, chunk_size=30)
+
+        assert result == ("統合", 80, 35)
+        assert mock_stream.call_args.kwargs["on_delta"] is on_delta
+        assert mock_generate.call_count == 3
+
+    def test_hierarchical_reduce(self, mock_generate):
+        """統合する文書が大きすぎる場合は段階的に統合するテスト"""
+        chart = "".join(f"2024/1/{day} 再診\n経過観察。\n" for day in range(1, 9))
+
+        generate_chunked_summary("claude", "claude-sonnet", chart, previous_record="前回", chunk_size=20)
+
+        reduce_calls = [
+            call.kwargs for call in mock_generate.call_args_list
+            if call.kwargs["medical_text"].startswith(REDUCE_INSTRUCTION)
+        ]
+        assert len(reduce_calls) > 1
+        assert all(call["previous_record"] == "" for call in reduce_calls[:-1])
+        assert reduce_calls[-1]["previous_record"] == "前回"
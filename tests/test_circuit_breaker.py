@@ -0,0 +1,156 @@
+from unittest.mock import patch
+
+import pytest
+
+from external_service.api_factory import APIFactory
+from external_service.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, is_provider_failure
+from external_service.retry_policy import DeadlineExceededError
+from utils.exceptions import APIError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        "claude", window_size=4, min_calls=4, failure_rate=0.5, slow_call_seconds=10, slow_call_rate=0.75,
+        open_seconds=30, probe_successes=2, clock=clock
+    )
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(4):
+        breaker.record_failure()
+
+
+class TestIsProviderFailure:
+    """is_provider_failure関数のテスト"""
+
+    def test_classification(self):
+        """一時的なエラーと期限切れのみをプロバイダー側の障害とみなすテスト"""
+        assert is_provider_failure(APIError("503 UNAVAILABLE")) is True
+        assert is_provider_failure(DeadlineExceededError("期限切れ")) is True
+        assert is_provider_failure(APIError("プロンプトが不正です")) is False
+
+
+class TestCircuitBreaker:
+    """CircuitBreakerクラスのテスト"""
+
+    def test_opens_on_failure_rate(self, breaker):
+        """エラー率が閾値以上になると遮断するテスト"""
+        breaker.record_success(1)
+        breaker.record_success(1)
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+        assert breaker.acquire() is False
+        assert breaker.get_stats()["rejected"] == 1
+
+    def test_opens_on_slow_calls(self, breaker):
+        """遅い呼び出しの割合が閾値以上になると遮断するテスト"""
+        for _ in range(3):
+            breaker.record_success(11)
+        breaker.record_success(1)
+
+        assert breaker.state == "open"
+
+    def test_half_open_probes_close(self, breaker, clock):
+        """遮断から一定時間後に試験的な呼び出しを1件ずつ受け付け、続けて成功すると解除するテスト"""
+        trip(breaker)
+        clock.now = 30
+
+        assert breaker.is_available() is True
+        assert breaker.acquire() is True
+        assert breaker.acquire() is False
+        breaker.record_success(1)
+        assert breaker.state == "half_open"
+
+        assert breaker.acquire() is True
+        breaker.record_success(1)
+
+        assert breaker.state == "closed"
+
+    def test_half_open_probe_failure_reopens(self, breaker, clock):
+        """試験的な呼び出しが失敗すると再び遮断するテスト"""
+        trip(breaker)
+        clock.now = 30
+        breaker.acquire()
+
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+        assert breaker.get_stats()["opened"] == 2
+
+    def test_ignored_error_releases_probe(self, breaker, clock):
+        """プロバイダー側の障害ではないエラーの場合は試験的な呼び出しの枠だけ解放するテスト"""
+        trip(breaker)
+        clock.now = 30
+        breaker.acquire()
+
+        breaker.record_error(APIError("プロンプトが不正です"))
+
+        assert breaker.state == "half_open"
+        assert breaker.acquire() is True
+
+
+class TestCircuitBreakerRegistry:
+    """CircuitBreakerRegistryクラスのテスト"""
+
+    def test_acquire_raises_when_open(self):
+        """遮断中の場合はAPIErrorが送出されるテスト"""
+        registry = CircuitBreakerRegistry(enabled=True, window_size=1, min_calls=1)
+        registry.get("gemini").record_failure()
+
+        with pytest.raises(APIError, match="geminiのAPIで障害が発生しているため"):
+            registry.acquire("gemini")
+
+        assert registry.is_available("gemini") is False
+        assert registry.get_stats()["gemini"]["state"] == "open"
+
+    def test_disabled(self):
+        """無効の場合は常に呼び出せるテスト"""
+        registry = CircuitBreakerRegistry(enabled=False)
+
+        assert registry.acquire("claude") is None
+        assert registry.is_available("claude") is True
+
+
+class TestAPIFactoryCircuitBreaker:
+    """APIFactoryからサーキットブレーカーに記録するテスト"""
+
+    @patch('external_service.api_factory.circuit_breakers')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_records_success(self, mock_create_client, mock_breakers):
+        """成功した場合は応答時間が記録されるテスト"""
+        mock_create_client.return_value.generate_summary.return_value = ("要約", 10, 5)
+
+        APIFactory.generate_summary_with_provider("claude", "カルテ")
+
+        mock_breakers.acquire.assert_called_once_with("claude")
+        mock_breakers.acquire.return_value.record_success.assert_called_once()
+
+    @patch('external_service.api_factory.circuit_breakers')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_records_error(self, mock_create_client, mock_breakers):
+        """失敗した場合はエラーが記録されて送出されるテスト"""
+        error = APIError("503 UNAVAILABLE")
+        mock_create_client.return_value.generate_summary.side_effect = error
+
+        with pytest.raises(APIError):
+            APIFactory.generate_summary_with_provider("claude", "カルテ")
+
+        mock_breakers.acquire.return_value.record_error.assert_called_once_with(error)
@@ -0,0 +1,124 @@
+import threading
+from unittest.mock import Mock, patch
+
+from external_service.client_registry import ClientRegistry, credential_fingerprint
+
+
+class TestCredentialFingerprint:
+    """credential_fingerprint関数のテスト"""
+
+    def test_same_credentials_same_fingerprint(self):
+        """同じ認証情報から同じ値が生成されるテスト"""
+        assert credential_fingerprint("key", "secret") == credential_fingerprint("key", "secret")
+
+    def test_different_credentials_different_fingerprint(self):
+        """異なる認証情報から異なる値が生成されるテスト"""
+        assert credential_fingerprint("key", "secret") != credential_fingerprint("key", "other")
+        assert credential_fingerprint("ab", "c") != credential_fingerprint("a", "bc")
+
+    def test_secret_not_included(self):
+        """秘密情報そのものが含まれないことのテスト"""
+        assert "secret" not in credential_fingerprint("secret")
+
+
+class TestClientRegistry:
+    """ClientRegistryクラスのテスト"""
+
+    def test_get_or_create_reuses_client(self):
+        """同じキーでクライアントが再利用されるテスト"""
+        registry = ClientRegistry()
+        factory = Mock(side_effect=lambda: object())
+
+        first = registry.get_or_create(("claude", "us-east-1", "fp"), factory)
+        second = registry.get_or_create(("claude", "us-east-1", "fp"), factory)
+
+        assert first is second
+        factory.assert_called_once()
+        stats = registry.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_different_keys_create_different_clients(self):
+        """リージョンや認証情報が異なる場合は別のクライアントが作成されるテスト"""
+        registry = ClientRegistry()
+
+        first = registry.get_or_create(("claude", "us-east-1", "fp"), object)
+        second = registry.get_or_create(("claude", "ap-northeast-1", "fp"), object)
+
+        assert first is not second
+        assert registry.get_stats()["size"] == 2
+
+    def test_factory_error_is_not_cached(self):
+        """生成に失敗した場合はキャッシュされないテスト"""
+        registry = ClientRegistry()
+        factory = Mock(side_effect=[Exception("接続エラー"), "client"])
+
+        try:
+            registry.get_or_create("key", factory)
+        except Exception:
+            pass
+
+        assert registry.get_or_create("key", factory) == "client"
+        assert factory.call_count == 2
+
+    def test_concurrent_access_creates_single_client(self):
+        """並行アクセス時にクライアントが1つだけ作成されるテスト"""
+        registry = ClientRegistry()
+        created = []
+        barrier = threading.Barrier(8)
+
+        def factory():
+            client = object()
+            created.append(client)
+            return client
+
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(registry.get_or_create("key", factory))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(created) == 1
+        assert all(result is created[0] for result in results)
+
+    def test_invalidate(self):
+        """invalidateでクライアントが破棄されるテスト"""
+        registry = ClientRegistry()
+        first = registry.get_or_create("key", object)
+        registry.invalidate("key")
+        second = registry.get_or_create("key", object)
+
+        assert first is not second
+
+    @patch.object(ClientRegistry, "_ensure_refresh_thread")
+    def test_refresh_credentials(self, mock_ensure_thread):
+        """認証情報の更新関数にプール済みオブジェクトが渡されるテスト"""
+        registry = ClientRegistry()
+        refresher = Mock()
+
+        credentials = registry.get_or_create(("google_credentials", "fp"), object, refresher=refresher)
+        registry.refresh_credentials()
+
+        mock_ensure_thread.assert_called_once()
+        refresher.assert_called_once_with(credentials)
+        assert registry.get_stats()["refreshes"] == 1
+
+    @patch.object(ClientRegistry, "_ensure_refresh_thread")
+    @patch("builtins.print")
+    def test_refresh_credentials_error(self, mock_print, mock_ensure_thread):
+        """認証情報の更新エラーが記録されるテスト"""
+        registry = ClientRegistry()
+        registry.get_or_create(("google_credentials", "fp"), object, refresher=Mock(side_effect=Exception("失敗")))
+
+        registry.refresh_credentials()
+
+        assert registry.get_stats()["refresh_errors"] == 1
+        mock_print.assert_called_once()
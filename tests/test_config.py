@@ -5,7 +5,9 @@ from unittest.mock import patch, Mock
 # テスト対象のモジュールをインポート
 from utils.config import (
     get_config,
-    parse_database_url
+    get_retry_settings,
+    parse_database_url,
+    parse_mapping
 )
 
 
@@ -103,6 +105,31 @@ class TestParseDatabaseUrl:
         assert result == expected
 
 
+class TestParseMapping:
+    """parse_mapping関数のテスト"""
+
+    def test_parse(self):
+        """「キー=値」をカンマ区切りで指定した設定値が辞書に変換されるテスト"""
+        assert parse_mapping("内科=2, 整形外科/田中医師=0.5") == {"内科": 2.0, "整形外科/田中医師": 0.5}
+
+    def test_empty(self):
+        """未設定や不正な項目は無視されるテスト"""
+        assert parse_mapping("") == {}
+        assert parse_mapping("内科,=3") == {}
+
+
+class TestGetRetrySettings:
+    """get_retry_settings関数のテスト"""
+
+    def test_provider_specific_setting(self):
+        """プロバイダー別の環境変数が共通の環境変数より優先されるテスト"""
+        env_vars = {'RETRY_MAX_ATTEMPTS': '5', 'RETRY_MAX_ATTEMPTS_GEMINI': '2', 'RETRY_HEDGE_ENABLED': 'true'}
+        with patch.dict(os.environ, env_vars):
+            assert get_retry_settings('gemini')['max_attempts'] == 2
+            assert get_retry_settings('claude')['max_attempts'] == 5
+            assert get_retry_settings('claude')['hedge_enabled'] is True
+
+
 class TestEnvironmentVariables:
     """環境変数の設定テスト"""
     
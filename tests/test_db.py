@@ -140,6 +140,164 @@ class TestDatabaseManager:
         assert session == mock_sqlalchemy['session_factory'].return_value
 
 
+    def test_bulk_insert(self, mock_config, mock_sqlalchemy):
+        """bulk_insertで1回のexecuteにまとめて挿入されるテスト"""
+        from database.models import SummaryUsage
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        rows = [{"model_detail": "claude", "input_tokens": 1}, {"model_detail": "gemini", "input_tokens": 2}]
+
+        assert db_manager.bulk_insert(SummaryUsage, rows) == 2
+
+        session.execute.assert_called_once()
+        assert session.execute.call_args[0][1] == rows
+        session.commit.assert_called_once()
+        session.refresh.assert_not_called()
+        session.close.assert_called_once()
+
+    def test_bulk_insert_empty(self, mock_config, mock_sqlalchemy):
+        """空のリストではセッションを開かないテスト"""
+        from database.models import SummaryUsage
+
+        db_manager = DatabaseManager.get_instance()
+
+        assert db_manager.bulk_insert(SummaryUsage, []) == 0
+        mock_sqlalchemy['session_factory'].assert_not_called()
+
+    def test_bulk_insert_error(self, mock_config, mock_sqlalchemy):
+        """挿入エラー時にロールバックしてDatabaseErrorを送出するテスト"""
+        from database.models import SummaryUsage
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.execute.side_effect = SQLAlchemyError("挿入エラー")
+
+        with pytest.raises(DatabaseError):
+            db_manager.bulk_insert(SummaryUsage, [{"model_detail": "claude"}])
+
+        session.rollback.assert_called_once()
+        session.close.assert_called_once()
+
+    def test_upsert_postgresql_uses_on_conflict(self, mock_config, mock_sqlalchemy):
+        """PostgreSQLではINSERT ... ON CONFLICT ... RETURNINGの1文で実行されるテスト"""
+        from sqlalchemy.dialects import postgresql
+        from database.models import AppSetting
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.get_bind.return_value.dialect.name = "postgresql"
+        returned = {c.name: None for c in AppSetting.__table__.columns}
+        returned.update({"id": 1, "setting_key": "user_preferences_default", "selected_model": "Claude"})
+        session.execute.return_value.one.return_value._mapping = {**returned, "inserted": False}
+
+        record, created = db_manager.upsert_with_status(
+            AppSetting, {"setting_key": "user_preferences_default"}, {"selected_model": "Claude"}
+        )
+
+        assert record == returned
+        assert created is False
+        sql = str(session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (setting_key) DO UPDATE" in sql
+        assert "updated_at = now()" in sql
+        assert "RETURNING" in sql
+        session.query.assert_not_called()
+        session.commit.assert_called_once()
+
+    def test_upsert_fallback_inserts_new_record(self, mock_config, mock_sqlalchemy):
+        """ON CONFLICT非対応のデータベースでは検索してから挿入するテスト"""
+        from database.models import AppSetting
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.get_bind.return_value.dialect.name = "sqlite"
+        session.query.return_value.filter.return_value.first.return_value = None
+
+        record, created = db_manager.upsert_with_status(
+            AppSetting, {"setting_key": "user_preferences_default"}, {"selected_model": "Claude"}
+        )
+
+        assert created is True
+        assert record["setting_key"] == "user_preferences_default"
+        assert record["selected_model"] == "Claude"
+        session.add.assert_called_once()
+        session.commit.assert_called_once()
+
+    def test_upsert_error(self, mock_config, mock_sqlalchemy):
+        """upsertエラー時にロールバックしてDatabaseErrorを送出するテスト"""
+        from database.models import AppSetting
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.get_bind.return_value.dialect.name = "postgresql"
+        session.execute.side_effect = SQLAlchemyError("制約違反")
+
+        with pytest.raises(DatabaseError):
+            db_manager.upsert(AppSetting, {"setting_key": "key"}, {"selected_model": "Claude"})
+
+        session.rollback.assert_called_once()
+
+    def test_upsert_many_postgresql(self, mock_config, mock_sqlalchemy):
+        """upsert_manyで1回のexecutemanyにまとめて実行されるテスト"""
+        from sqlalchemy.dialects import postgresql
+        from database.models import Prompt
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.get_bind.return_value.dialect.name = "postgresql"
+        rows = [
+            {"department": "内科", "document_type": "主治医意見書", "doctor": "default", "content": "A"},
+            {"department": "外科", "document_type": "主治医意見書", "doctor": "default", "content": "B"},
+        ]
+
+        assert db_manager.upsert_many(Prompt, rows, ["department", "document_type", "doctor"]) == 2
+
+        session.execute.assert_called_once()
+        stmt, params = session.execute.call_args[0]
+        assert params == rows
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (department, document_type, doctor) DO UPDATE SET content = excluded.content" in sql
+        session.commit.assert_called_once()
+
+    def test_insert_missing_inserts_only_new_keys(self, mock_config, mock_sqlalchemy):
+        """既存キーを1回で取得し、未登録のレコードだけを一括挿入するテスト"""
+        from sqlalchemy.dialects import postgresql
+        from database.models import Prompt
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.get_bind.return_value.dialect.name = "postgresql"
+        session.query.return_value.all.return_value = [("内科", "主治医意見書", "default")]
+        session.execute.return_value.all.return_value = [(2,)]
+        rows = [
+            {"department": "内科", "document_type": "主治医意見書", "doctor": "default", "content": "A"},
+            {"department": "外科", "document_type": "主治医意見書", "doctor": "default", "content": "B"},
+        ]
+
+        inserted = db_manager.insert_missing(Prompt, ["department", "document_type", "doctor"], rows)
+
+        assert inserted == 1
+        session.query.assert_called_once()
+        session.execute.assert_called_once()
+        stmt, params = session.execute.call_args[0]
+        assert params == [rows[1]]
+        assert "ON CONFLICT (department, document_type, doctor) DO NOTHING" in str(
+            stmt.compile(dialect=postgresql.dialect())
+        )
+        session.commit.assert_called_once()
+
+    def test_insert_missing_all_existing(self, mock_config, mock_sqlalchemy):
+        """すべて登録済みの場合は挿入しないテスト"""
+        from database.models import Prompt
+
+        db_manager = DatabaseManager.get_instance()
+        session = mock_sqlalchemy['session_factory'].return_value
+        session.query.return_value.all.return_value = [("内科", "主治医意見書", "default")]
+        rows = [{"department": "内科", "document_type": "主治医意見書", "doctor": "default", "content": "A"}]
+
+        assert db_manager.insert_missing(Prompt, ["department", "document_type", "doctor"], rows) == 0
+        session.execute.assert_not_called()
+
 # テスト実行用のconftest.pyファイルに追加する設定例
 """
 # conftest.py
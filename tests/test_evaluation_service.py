@@ -1,7 +1,7 @@
 import datetime
 import queue
-import threading
-from unittest.mock import Mock, patch, MagicMock
+from concurrent.futures import Future
+from unittest.mock import ANY, Mock, patch, MagicMock
 
 import pytest
 
@@ -65,6 +65,39 @@ class TestGetEvaluationPrompt:
         assert "評価プロンプトの取得に失敗しました" in str(exc_info.value)
 
 
+    @patch('services.evaluation_service.DatabaseManager')
+    def test_get_evaluation_prompt_cached(self, mock_db_manager):
+        """2回目以降はキャッシュから返されるテスト"""
+        mock_db_instance = Mock()
+        mock_db_manager.get_instance.return_value = mock_db_instance
+        mock_db_instance.query_one.return_value = {'document_type': '診療録', 'content': 'テスト評価プロンプト'}
+
+        get_evaluation_prompt('診療録')
+        result = get_evaluation_prompt('診療録')
+
+        assert result['content'] == 'テスト評価プロンプト'
+        mock_db_instance.query_one.assert_called_once()
+
+    @patch('services.evaluation_service.notify_prompt_change')
+    @patch('services.evaluation_service.DatabaseManager')
+    def test_update_invalidates_cache_and_notifies(self, mock_db_manager, mock_notify):
+        """評価プロンプト更新時にキャッシュが破棄され、変更が通知されるテスト"""
+        mock_db_instance = Mock()
+        mock_db_manager.get_instance.return_value = mock_db_instance
+        mock_db_instance.query_one.side_effect = [
+            {'document_type': '診療録', 'content': '古いプロンプト'},
+            {'document_type': '診療録', 'content': '新しいプロンプト'},
+        ]
+        mock_db_instance.upsert_with_status.return_value = ({'document_type': '診療録'}, False)
+
+        get_evaluation_prompt('診療録')
+        create_or_update_evaluation_prompt('診療録', '新しいプロンプト')
+        result = get_evaluation_prompt('診療録')
+
+        assert result['content'] == '新しいプロンプト'
+        mock_notify.assert_called_once_with("evaluation_prompts", {"document_type": "診療録"})
+
+
 class TestCreateOrUpdateEvaluationPrompt:
     """評価プロンプト作成/更新のテストクラス"""
 
@@ -73,8 +106,7 @@ class TestCreateOrUpdateEvaluationPrompt:
         """評価プロンプト新規作成成功のテスト"""
         mock_db_instance = Mock()
         mock_db_manager.get_instance.return_value = mock_db_instance
-        mock_db_instance.query_one.return_value = None
-        mock_db_instance.insert.return_value = {'id': 1}
+        mock_db_instance.upsert_with_status.return_value = ({'id': 1}, True)
 
         success, message = create_or_update_evaluation_prompt(
             '診療録',
@@ -83,18 +115,20 @@ class TestCreateOrUpdateEvaluationPrompt:
 
         assert success is True
         assert '新規作成' in message
-        mock_db_instance.insert.assert_called_once()
+        mock_db_instance.upsert_with_status.assert_called_once()
+        args, kwargs = mock_db_instance.upsert_with_status.call_args
+        assert args[0] == EvaluationPrompt
+        assert args[1] == {'document_type': '診療録'}
+        assert kwargs['insert_only']['is_active'] is True
 
     @patch('services.evaluation_service.DatabaseManager')
     def test_update_evaluation_prompt_success(self, mock_db_manager):
         """評価プロンプト更新成功のテスト"""
         mock_db_instance = Mock()
         mock_db_manager.get_instance.return_value = mock_db_instance
-        mock_db_instance.query_one.return_value = {
-            'document_type': '診療録',
-            'content': '古いプロンプト'
-        }
-        mock_db_instance.update.return_value = True
+        mock_db_instance.upsert_with_status.return_value = (
+            {'document_type': '診療録', 'content': '更新されたプロンプト'}, False
+        )
 
         success, message = create_or_update_evaluation_prompt(
             '診療録',
@@ -103,7 +137,8 @@ class TestCreateOrUpdateEvaluationPrompt:
 
         assert success is True
         assert '更新' in message
-        mock_db_instance.update.assert_called_once()
+        mock_db_instance.upsert_with_status.assert_called_once()
+        assert mock_db_instance.upsert_with_status.call_args[0][2]['content'] == '更新されたプロンプト'
 
     def test_create_or_update_evaluation_prompt_empty_content(self):
         """空のプロンプト内容のテスト"""
@@ -117,7 +152,7 @@ class TestCreateOrUpdateEvaluationPrompt:
         """データベースエラーのテスト"""
         mock_db_instance = Mock()
         mock_db_manager.get_instance.return_value = mock_db_instance
-        mock_db_instance.query_one.side_effect = Exception("DB接続エラー")
+        mock_db_instance.upsert_with_status.side_effect = Exception("DB接続エラー")
 
         success, message = create_or_update_evaluation_prompt(
             '診療録',
@@ -286,29 +321,33 @@ class TestDisplayEvaluationProgress:
     """評価進捗表示のテストクラス"""
 
     @patch('services.evaluation_service.st.spinner')
-    @patch('services.evaluation_service.time.sleep')
-    def test_display_evaluation_progress(self, mock_sleep, mock_spinner):
+    def test_display_evaluation_progress(self, mock_spinner):
         """評価進捗表示のテスト"""
-        mock_thread = Mock()
-        mock_thread.is_alive.side_effect = [True, True, False]
+        future = Future()
         mock_placeholder = Mock()
-        start_time = datetime.datetime.now()
+        start_time = datetime.datetime.now() - datetime.timedelta(seconds=1)
+
+        def wait_with_progress(waited_future, on_tick):
+            on_tick()
+            on_tick()
+            waited_future.set_result(None)
 
         mock_spinner_context = MagicMock()
         mock_spinner.return_value.__enter__ = Mock(return_value=mock_spinner_context)
         mock_spinner.return_value.__exit__ = Mock(return_value=False)
 
-        display_evaluation_progress(mock_thread, mock_placeholder, start_time)
+        with patch('services.evaluation_service.wait_with_progress', side_effect=wait_with_progress):
+            display_evaluation_progress(future, mock_placeholder, start_time)
 
-        assert mock_sleep.call_count >= 2
-        assert mock_placeholder.text.call_count >= 3
+        # 経過秒数が変わった場合のみ表示を更新する
+        assert mock_placeholder.text.call_count == 2
+        mock_placeholder.text.assert_called_with("⏱️ 評価時間: 1秒")
 
     @patch('services.evaluation_service.st.spinner')
-    @patch('services.evaluation_service.time.sleep')
-    def test_display_evaluation_progress_immediate_completion(self, mock_sleep, mock_spinner):
+    def test_display_evaluation_progress_immediate_completion(self, mock_spinner):
         """評価がすぐに完了する場合のテスト"""
-        mock_thread = Mock()
-        mock_thread.is_alive.return_value = False
+        future = Future()
+        future.set_result(None)
         mock_placeholder = Mock()
         start_time = datetime.datetime.now()
 
@@ -316,7 +355,7 @@ class TestDisplayEvaluationProgress:
         mock_spinner.return_value.__enter__ = Mock(return_value=mock_spinner_context)
         mock_spinner.return_value.__exit__ = Mock(return_value=False)
 
-        display_evaluation_progress(mock_thread, mock_placeholder, start_time)
+        display_evaluation_progress(future, mock_placeholder, start_time)
 
         assert mock_placeholder.text.call_count == 1
 
@@ -379,7 +418,7 @@ class TestProcessEvaluation:
 
     @patch('services.evaluation_service.GOOGLE_CREDENTIALS_JSON', 'test_creds')
     @patch('services.evaluation_service.GEMINI_EVALUATION_MODEL', 'gemini-pro')
-    @patch('services.evaluation_service.threading.Thread')
+    @patch('services.evaluation_service.task_executor')
     @patch('services.evaluation_service.display_evaluation_progress')
     @patch('streamlit.session_state', create=True)
     @patch('streamlit.spinner')
@@ -388,13 +427,13 @@ class TestProcessEvaluation:
         mock_spinner,
         mock_session_state,
         mock_display_progress,
-        mock_thread
+        mock_executor
     ):
         """評価処理成功のテスト"""
         mock_placeholder = Mock()
-        mock_thread_instance = Mock()
-        mock_thread.return_value = mock_thread_instance
-        mock_thread_instance.is_alive.return_value = False
+        future = Future()
+        future.set_result(None)
+        mock_executor.submit.return_value = future
 
         result_queue = queue.Queue()
         result_queue.put({
@@ -414,26 +453,28 @@ class TestProcessEvaluation:
                 mock_placeholder
             )
 
+        assert mock_executor.submit.call_args[0][0] == evaluate_output_task
+        mock_display_progress.assert_called_once_with(future, mock_placeholder, ANY)
         assert mock_session_state.evaluation_result == '評価結果'
         assert hasattr(mock_session_state, 'evaluation_processing_time')
         assert mock_session_state.evaluation_just_completed is True
 
     @patch('services.evaluation_service.GOOGLE_CREDENTIALS_JSON', 'test_creds')
     @patch('services.evaluation_service.GEMINI_EVALUATION_MODEL', 'gemini-pro')
-    @patch('services.evaluation_service.threading.Thread')
+    @patch('services.evaluation_service.task_executor')
     @patch('services.evaluation_service.display_evaluation_progress')
     @patch('streamlit.error')
     def test_process_evaluation_failure(
         self,
         mock_error,
         mock_display_progress,
-        mock_thread
+        mock_executor
     ):
         """評価処理失敗のテスト"""
         mock_placeholder = Mock()
-        mock_thread_instance = Mock()
-        mock_thread.return_value = mock_thread_instance
-        mock_thread_instance.is_alive.return_value = False
+        future = Future()
+        future.set_result(None)
+        mock_executor.submit.return_value = future
 
         result_queue = queue.Queue()
         result_queue.put({
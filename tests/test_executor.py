@@ -0,0 +1,96 @@
+import threading
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+import pytest
+
+from services.executor import BoundedExecutor, wait_with_progress
+from utils.exceptions import APIError
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor(max_workers=1, max_queue_size=1)
+    yield executor
+    executor.shutdown()
+
+
+class TestBoundedExecutor:
+    """BoundedExecutorクラスのテスト"""
+
+    def test_submit_returns_future(self, executor):
+        """タスクの結果がFutureで返されるテスト"""
+        future = executor.submit(lambda a, b: a + b, 1, b=2)
+
+        assert future.result(timeout=1) == 3
+        assert executor.get_stats()["completed"] == 1
+
+    def test_gauges(self, executor):
+        """実行中と待機中のタスク数が取得できるテスト"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_task():
+            started.set()
+            release.wait(timeout=1)
+
+        first = executor.submit(blocking_task)
+        started.wait(timeout=1)
+        second = executor.submit(lambda: None)
+
+        stats = executor.get_stats()
+        assert stats["active"] == 1
+        assert stats["queued"] == 1
+
+        release.set()
+        first.result(timeout=1)
+        second.result(timeout=1)
+        stats = executor.get_stats()
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
+
+    def test_rejects_when_full(self, executor):
+        """実行中と待機中の合計が上限を超える場合はAPIErrorが送出されるテスト"""
+        release = threading.Event()
+        executor.submit(release.wait, 1)
+        executor.submit(lambda: None)
+
+        with pytest.raises(APIError, match="処理が混み合っています"):
+            executor.submit(lambda: None)
+
+        assert executor.get_stats()["rejected"] == 1
+        release.set()
+
+    def test_exception_releases_slot(self, executor):
+        """タスクが例外を送出しても上限の枠が解放されるテスト"""
+        def failing_task():
+            raise ValueError("失敗")
+
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                executor.submit(failing_task).result(timeout=1)
+
+        assert executor.get_stats()["completed"] == 3
+
+
+class TestWaitWithProgress:
+    """wait_with_progress関数のテスト"""
+
+    def test_returns_immediately_when_done(self):
+        """完了済みの場合はon_tickを呼び出さずに戻るテスト"""
+        future = Future()
+        future.set_result(None)
+        on_tick = Mock()
+
+        wait_with_progress(future, on_tick, interval=0.01)
+
+        on_tick.assert_not_called()
+
+    def test_ticks_until_done(self):
+        """完了するまでinterval秒ごとにon_tickが呼び出されるテスト"""
+        future = Future()
+        on_tick = Mock(side_effect=lambda: on_tick.call_count == 3 and future.set_result(None))
+
+        wait_with_progress(future, on_tick, interval=0.01)
+
+        assert on_tick.call_count == 3
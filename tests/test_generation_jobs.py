@@ -0,0 +1,193 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from database.models import GenerationJob
+from services.generation_jobs import (
+    JOB_PENDING,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    claim_generation_job,
+    complete_generation_job,
+    get_generation_job,
+    heartbeat_generation_job,
+    submit_generation_job,
+)
+from utils.exceptions import DatabaseError
+
+SESSION_PARAMS = {
+    "selected_department": "内科",
+    "selected_document_type": "主治医意見書",
+    "selected_doctor": "default",
+    "selected_model": "Claude",
+    "model_explicitly_selected": True,
+}
+
+
+@pytest.fixture
+def mock_session():
+    with patch('services.generation_jobs.DatabaseManager') as mock_db_manager:
+        session = Mock()
+        mock_db_manager.get_instance.return_value.get_session.return_value = session
+        yield session
+
+
+def make_job(**overrides):
+    values = {
+        "id": 1,
+        "token": "token",
+        "status": JOB_PENDING,
+        "input_text": "カルテ記載",
+        "attempts": 0,
+        "created_at": datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc),
+    }
+    values.update(overrides)
+    return GenerationJob(**values)
+
+
+def candidate_query(session):
+    return session.query.return_value.filter.return_value.order_by.return_value.with_for_update.return_value
+
+
+def claimed_row(session):
+    return session.execute.return_value.mappings.return_value.one
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class TestSubmitGenerationJob:
+    """submit_generation_job関数のテスト"""
+
+    def test_adds_pending_job(self, mock_session):
+        """未実行のジョブが登録され、推測できないトークンが返されるテスト"""
+        token = submit_generation_job("カルテ記載", "追加情報", "前回の記載", SESSION_PARAMS)
+
+        job = mock_session.add.call_args[0][0]
+        assert job.token == token
+        assert len(token) >= 32
+        assert job.status == JOB_PENDING
+        assert job.department == "内科"
+        assert job.document_type == "主治医意見書"
+        assert job.model_explicitly_selected is True
+        mock_session.commit.assert_called_once()
+        mock_session.close.assert_called_once()
+
+    def test_tokens_are_unique(self, mock_session):
+        """ジョブごとに異なるトークンが発行されるテスト"""
+        tokens = {submit_generation_job("カルテ記載", "", "", SESSION_PARAMS) for _ in range(10)}
+
+        assert len(tokens) == 10
+
+    def test_database_error(self, mock_session):
+        """登録エラー時にロールバックしてDatabaseErrorが送出されるテスト"""
+        mock_session.commit.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="文書作成ジョブの操作中にエラーが発生しました"):
+            submit_generation_job("カルテ記載", "", "", SESSION_PARAMS)
+
+        mock_session.rollback.assert_called_once()
+        mock_session.close.assert_called_once()
+
+
+class TestClaimGenerationJob:
+    """claim_generation_job関数のテスト"""
+
+    def test_claims_pending_job_with_skip_locked(self, mock_session):
+        """未実行のジョブをFOR UPDATE SKIP LOCKEDで取得して実行中にするテスト"""
+        candidate_query(mock_session).first.return_value = SimpleNamespace(id=1)
+        claimed_row(mock_session).return_value = {"id": 1, "status": JOB_RUNNING, "worker_id": "worker-1"}
+
+        claimed = claim_generation_job("worker-1")
+
+        mock_session.query.return_value.filter.return_value.order_by.return_value.with_for_update.assert_called_with(
+            skip_locked=True
+        )
+        assert claimed == {"id": 1, "status": JOB_RUNNING, "worker_id": "worker-1"}
+        sql = compile_sql(mock_session.execute.call_args[0][0])
+        assert sql.startswith("UPDATE generation_jobs SET status='running'")
+        assert "worker_id='worker-1'" in sql
+        assert "attempts=(coalesce(generation_jobs.attempts, 0) + 1)" in sql
+        assert "WHERE generation_jobs.id = 1 RETURNING" in sql
+        mock_session.commit.assert_called_once()
+
+    def test_reclaims_expired_job(self, mock_session):
+        """未実行のジョブがない場合は生存確認が途絶えたジョブを取得するテスト"""
+        candidate_query(mock_session).first.side_effect = [None, SimpleNamespace(id=2)]
+        claimed_row(mock_session).return_value = {"id": 2, "worker_id": "worker-1", "attempts": 2}
+
+        claimed = claim_generation_job("worker-1")
+
+        assert claimed["worker_id"] == "worker-1"
+        assert "generation_jobs.id = 2" in compile_sql(mock_session.execute.call_args[0][0])
+        assert mock_session.query.call_count == 2
+
+    def test_no_job(self, mock_session):
+        """実行するジョブがない場合はNoneを返すテスト"""
+        candidate_query(mock_session).first.return_value = None
+
+        assert claim_generation_job("worker-1") is None
+        mock_session.close.assert_called_once()
+
+
+class TestUpdateRunningJob:
+    """実行中のジョブの更新のテスト"""
+
+    def test_heartbeat_writes_partial_output(self, mock_session):
+        """生成途中のテキストと生存確認の日時が書き込まれるテスト"""
+        mock_session.query.return_value.filter.return_value.update.return_value = 1
+
+        assert heartbeat_generation_job(1, "worker-1", "途中") is True
+
+        values = mock_session.query.return_value.filter.return_value.update.call_args[0][0]
+        assert values["partial_output"] == "途中"
+        assert "heartbeat_at" in values
+
+    def test_heartbeat_without_output(self, mock_session):
+        """テキストに変化がない場合は生存確認の日時のみ書き込まれるテスト"""
+        mock_session.query.return_value.filter.return_value.update.return_value = 1
+
+        heartbeat_generation_job(1, "worker-1")
+
+        values = mock_session.query.return_value.filter.return_value.update.call_args[0][0]
+        assert "partial_output" not in values
+
+    def test_lease_lost(self, mock_session):
+        """他のワーカーが再実行している場合はFalseを返すテスト"""
+        mock_session.query.return_value.filter.return_value.update.return_value = 0
+
+        assert complete_generation_job(1, "worker-1", {"success": True}) is False
+
+    def test_complete(self, mock_session):
+        """完了時に結果が書き込まれ、生成途中のテキストが消去されるテスト"""
+        mock_session.query.return_value.filter.return_value.update.return_value = 1
+
+        assert complete_generation_job(1, "worker-1", {"success": True}) is True
+
+        values = mock_session.query.return_value.filter.return_value.update.call_args[0][0]
+        assert values["status"] == JOB_SUCCEEDED
+        assert values["result"] == {"success": True}
+        assert values["partial_output"] is None
+
+
+class TestGetGenerationJob:
+    """get_generation_job関数のテスト"""
+
+    def test_returns_dict(self, mock_session):
+        """トークンでジョブを取得し、辞書で返すテスト"""
+        mock_session.query.return_value.filter.return_value.first.return_value = make_job(partial_output="途中")
+
+        job = get_generation_job("token")
+
+        assert job["status"] == JOB_PENDING
+        assert job["partial_output"] == "途中"
+
+    def test_not_found(self, mock_session):
+        """ジョブがない場合はNoneを返すテスト"""
+        mock_session.query.return_value.filter.return_value.first.return_value = None
+
+        assert get_generation_job("unknown") is None
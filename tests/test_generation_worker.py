@@ -0,0 +1,137 @@
+from unittest.mock import patch
+
+import pytest
+
+from services.generation_worker import GenerationWorker
+
+JOB = {
+    "id": 1,
+    "input_text": "カルテ記載",
+    "additional_info": None,
+    "previous_record": None,
+    "department": "内科",
+    "document_type": "主治医意見書",
+    "doctor": "default",
+    "selected_model": "Claude",
+    "model_explicitly_selected": False,
+    "use_response_cache": None,
+}
+
+RESULT = {
+    "success": True,
+    "output_summary": "治療経過: 経過良好",
+    "parsed_summary": {"治療経過": "経過良好"},
+    "input_tokens": 100,
+    "output_tokens": 20,
+    "model_detail": "claude-sonnet",
+    "provider": "claude",
+    "model_switched": False,
+    "original_model": None,
+    "time_to_first_token": 0.5,
+}
+
+
+@pytest.fixture
+def worker():
+    return GenerationWorker(worker_id="worker-1", heartbeat_interval=0.01)
+
+
+@pytest.fixture
+def job_store():
+    with patch('services.generation_worker.heartbeat_generation_job', return_value=True) as heartbeat, \
+            patch('services.generation_worker.complete_generation_job', return_value=True) as complete, \
+            patch('services.generation_worker.fail_generation_job', return_value=True) as fail, \
+            patch('services.generation_worker.usage_writer') as usage_writer:
+        yield {"heartbeat": heartbeat, "complete": complete, "fail": fail, "usage_writer": usage_writer}
+
+
+class TestGenerationWorker:
+    """GenerationWorkerクラスのテスト"""
+
+    @patch('services.generation_worker.generate_summary_task')
+    def test_execute_success(self, mock_task, worker, job_store):
+        """作成結果がジョブに書き込まれ、使用量がワーカーから記録されるテスト"""
+        def task(input_text, department, model, result_queue, *args):
+            delta_queue = args[-2]
+            delta_queue.put("治療経過: ")
+            result_queue.put(dict(RESULT))
+
+        mock_task.side_effect = task
+
+        worker.execute(JOB)
+
+        args = mock_task.call_args[0]
+        assert args[0] == "カルテ記載"
+        assert args[1] == "内科"
+        assert args[4] == ""
+        assert args[-1] is True
+        job_id, worker_id, result = job_store["complete"].call_args[0]
+        assert (job_id, worker_id) == (1, "worker-1")
+        assert result["output_summary"] == "治療経過: 経過良好"
+        assert result["processing_time"] >= 0
+        usage = job_store["usage_writer"].submit.call_args[0][0]
+        assert usage["department"] == "内科"
+        assert usage["document_types"] == "主治医意見書"
+        assert usage["provider"] == "claude"
+        assert worker.get_stats()["succeeded"] == 1
+
+    @patch('services.generation_worker.generate_summary_task')
+    def test_execute_failure(self, mock_task, worker, job_store):
+        """作成に失敗した場合はエラーがジョブに書き込まれ、使用量は記録されないテスト"""
+        def task(input_text, department, model, result_queue, *args):
+            result_queue.put({"success": False, "error": "API呼び出しエラー"})
+            raise Exception("API呼び出しエラー")
+
+        mock_task.side_effect = task
+
+        worker.execute(JOB)
+
+        job_store["fail"].assert_called_once_with(1, "worker-1", "API呼び出しエラー")
+        job_store["complete"].assert_not_called()
+        job_store["usage_writer"].submit.assert_not_called()
+        assert worker.get_stats()["failed"] == 1
+
+    @patch('services.generation_worker.generate_summary_task')
+    def test_heartbeat_sends_partial_output(self, mock_task, worker, job_store):
+        """生成中は生成途中のテキストが生存確認とともに書き込まれるテスト"""
+        def task(input_text, department, model, result_queue, *args):
+            delta_queue = args[-2]
+            delta_queue.put("治療経過: ")
+            while job_store["heartbeat"].call_count == 0:
+                pass
+            result_queue.put(dict(RESULT))
+
+        mock_task.side_effect = task
+
+        worker.execute(JOB)
+
+        assert job_store["heartbeat"].call_args_list[0][0] == (1, "worker-1", "治療経過: ")
+
+    @patch('services.generation_worker.generate_summary_task')
+    def test_execute_uses_worker_executor(self, mock_task, job_store):
+        """共有のスレッドプールが一杯でも、ワーカー専用のスレッドプールで続けてジョブを実行できるテスト"""
+        worker = GenerationWorker(worker_id="worker-1", concurrency=1, heartbeat_interval=0.01)
+        mock_task.side_effect = lambda input_text, department, model, result_queue, *args: \
+            result_queue.put(dict(RESULT))
+
+        with patch('services.executor.task_executor.submit', side_effect=Exception("EXECUTOR_QUEUE_FULL")):
+            worker.execute(JOB)
+            worker.execute(JOB)
+
+        assert job_store["complete"].call_count == 2
+        job_store["fail"].assert_not_called()
+
+    @patch('services.generation_worker.claim_generation_job', return_value=None)
+    def test_run_once_without_job(self, mock_claim, worker):
+        """実行するジョブがない場合はFalseを返すテスト"""
+        assert worker.run_once() is False
+        mock_claim.assert_called_once_with("worker-1")
+
+    @patch('services.generation_worker.ensure_partitions', return_value=["summary_usage_2027_01"])
+    @patch('services.generation_worker.purge_generation_jobs', return_value=0)
+    @patch('services.generation_worker.fail_abandoned_generation_jobs', side_effect=Exception("接続エラー"))
+    def test_maintenance_creates_partitions(self, mock_fail_abandoned, mock_purge, mock_ensure, worker):
+        """ジョブの整理に失敗した場合も月別パーティションが作成されるテスト"""
+        worker.run_maintenance()
+
+        mock_ensure.assert_called_once()
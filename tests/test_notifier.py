@@ -0,0 +1,190 @@
+import json
+from unittest.mock import MagicMock, Mock, patch
+
+from database.notifier import PROMPT_CHANGE_CHANNEL, PromptChangeListener, notify_prompt_change
+from services.evaluation_service import evaluation_prompt_cache
+from utils.prompt_manager import prompt_cache
+
+
+class TestNotifyPromptChange:
+    """notify_prompt_change関数のテスト"""
+
+    @patch('database.notifier.PROMPT_CHANGE_LISTENER_ENABLED', True)
+    @patch('database.notifier.DatabaseManager')
+    def test_notify_sends_pg_notify(self, mock_db_manager):
+        """pg_notifyでテーブルとキーが送信されるテスト"""
+        mock_conn = MagicMock()
+        mock_engine = Mock()
+        mock_engine.begin.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_engine.begin.return_value.__exit__ = Mock(return_value=False)
+        mock_db_manager.get_instance.return_value.get_engine.return_value = mock_engine
+
+        notify_prompt_change("prompts", {"department": "内科", "document_type": "主治医意見書", "doctor": "default"})
+
+        params = mock_conn.execute.call_args[0][1]
+        assert params["channel"] == PROMPT_CHANGE_CHANNEL
+        assert json.loads(params["payload"]) == {
+            "table": "prompts",
+            "keys": {"department": "内科", "document_type": "主治医意見書", "doctor": "default"}
+        }
+
+    @patch('database.notifier.PROMPT_CHANGE_LISTENER_ENABLED', False)
+    @patch('database.notifier.DatabaseManager')
+    def test_notify_disabled(self, mock_db_manager):
+        """リスナーが無効な場合は通知しないテスト"""
+        notify_prompt_change("prompts", {})
+
+        mock_db_manager.get_instance.assert_not_called()
+
+    @patch('database.notifier.PROMPT_CHANGE_LISTENER_ENABLED', True)
+    @patch('database.notifier.DatabaseManager')
+    @patch('builtins.print')
+    def test_notify_error_does_not_raise(self, mock_print, mock_db_manager):
+        """通知に失敗しても例外が送出されないテスト"""
+        mock_db_manager.get_instance.side_effect = Exception("接続エラー")
+
+        notify_prompt_change("prompts", {})
+
+        mock_print.assert_called_once()
+
+
+class TestPromptChangeListener:
+    """PromptChangeListenerクラスのテスト"""
+
+    def test_dispatch_calls_table_handler(self):
+        """通知されたテーブルのハンドラーだけが呼ばれるテスト"""
+        listener = PromptChangeListener()
+        prompt_handler = Mock()
+        evaluation_handler = Mock()
+        listener.register_handler("prompts", prompt_handler)
+        listener.register_handler("evaluation_prompts", evaluation_handler)
+
+        listener.dispatch(json.dumps({"table": "prompts", "keys": {"department": "内科"}}))
+
+        prompt_handler.assert_called_once_with({"department": "内科"})
+        evaluation_handler.assert_not_called()
+        assert listener.get_stats()["received"] == 1
+
+    @patch('builtins.print')
+    def test_dispatch_ignores_invalid_payload(self, mock_print):
+        """不正なペイロードが無視されるテスト"""
+        listener = PromptChangeListener()
+        handler = Mock()
+        listener.register_handler("prompts", handler)
+
+        listener.dispatch("invalid json")
+        listener.dispatch(json.dumps({"keys": {}}))
+
+        handler.assert_not_called()
+        assert mock_print.call_count == 2
+
+    @patch('builtins.print')
+    def test_dispatch_handler_error(self, mock_print):
+        """ハンドラーのエラーが他のハンドラーに影響しないテスト"""
+        listener = PromptChangeListener()
+        failing_handler = Mock(side_effect=Exception("失敗"))
+        handler = Mock()
+        listener.register_handler("prompts", failing_handler)
+        listener.register_handler("prompts", handler)
+
+        listener.dispatch(json.dumps({"table": "prompts", "keys": {}}))
+
+        handler.assert_called_once_with({})
+        mock_print.assert_called_once()
+
+    def test_register_handler_is_idempotent(self):
+        """同じハンドラーが重複して登録されないテスト"""
+        listener = PromptChangeListener()
+        handler = Mock()
+        listener.register_handler("prompts", handler)
+        listener.register_handler("prompts", handler)
+
+        listener.dispatch(json.dumps({"table": "prompts", "keys": {}}))
+
+        handler.assert_called_once()
+
+    def test_reset_all(self):
+        """リセット時にすべてのハンドラーにNoneが渡されるテスト"""
+        listener = PromptChangeListener()
+        prompt_handler = Mock()
+        evaluation_handler = Mock()
+        listener.register_handler("prompts", prompt_handler)
+        listener.register_handler("evaluation_prompts", evaluation_handler)
+
+        listener.reset_all()
+
+        prompt_handler.assert_called_once_with(None)
+        evaluation_handler.assert_called_once_with(None)
+
+    @patch('builtins.print')
+    def test_run_resets_caches_on_connection_error(self, mock_print):
+        """接続エラー時にキャッシュをリセットして再接続を待つテスト"""
+        listener = PromptChangeListener(max_backoff=1.0)
+        handler = Mock()
+        listener.register_handler("prompts", handler)
+
+        def fail_and_stop():
+            listener.stop()
+            raise Exception("接続が切断されました")
+
+        with patch.object(listener, '_listen', side_effect=fail_and_stop):
+            listener._run()
+
+        handler.assert_called_once_with(None)
+
+
+class TestCacheHandlers:
+    """登録済みのキャッシュ破棄ハンドラーのテスト"""
+
+    def test_prompt_change_evicts_prompt_cache(self):
+        """プロンプトの変更通知で該当キーが破棄されるテスト"""
+        from database.notifier import prompt_change_listener
+
+        prompt_cache.set(("内科", "主治医意見書", "田中医師"), {"id": 1})
+        prompt_cache.set(("外科", "主治医意見書", "default"), {"id": 2})
+
+        prompt_change_listener.dispatch(json.dumps({
+            "table": "prompts",
+            "keys": {"department": "内科", "document_type": "主治医意見書", "doctor": "田中医師"}
+        }))
+
+        assert prompt_cache.get(("内科", "主治医意見書", "田中医師")) == (False, None)
+        assert prompt_cache.get(("外科", "主治医意見書", "default")) == (True, {"id": 2})
+
+    def test_prompt_change_without_keys_clears_prompt_cache(self):
+        """キーが欠けている変更通知ではプロンプトのキャッシュがすべて破棄されるテスト"""
+        from database.notifier import prompt_change_listener
+
+        prompt_cache.set(("内科", "主治医意見書", "田中医師"), {"id": 1})
+
+        prompt_change_listener.dispatch(json.dumps({
+            "table": "prompts",
+            "keys": {"department": "内科", "document_type": "主治医意見書"}
+        }))
+
+        assert prompt_cache.get_stats()["size"] == 0
+
+    def test_evaluation_prompt_change_evicts_evaluation_cache(self):
+        """評価プロンプトの変更通知で該当キーが破棄されるテスト"""
+        from database.notifier import prompt_change_listener
+
+        evaluation_prompt_cache.set("主治医意見書", {"content": "旧"})
+
+        prompt_change_listener.dispatch(json.dumps({
+            "table": "evaluation_prompts",
+            "keys": {"document_type": "主治医意見書"}
+        }))
+
+        assert evaluation_prompt_cache.get("主治医意見書") == (False, None)
+
+    def test_reset_clears_all_caches(self):
+        """リセット時にプロンプトと評価プロンプトのキャッシュがすべて破棄されるテスト"""
+        from database.notifier import prompt_change_listener
+
+        prompt_cache.set(("内科", "主治医意見書", "田中医師"), {"id": 1})
+        evaluation_prompt_cache.set("主治医意見書", {"content": "旧"})
+
+        prompt_change_listener.reset_all()
+
+        assert prompt_cache.get_stats()["size"] == 0
+        assert evaluation_prompt_cache.get_stats()["size"] == 0
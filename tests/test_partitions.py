@@ -0,0 +1,162 @@
+import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from database.partitions import (
+    add_months,
+    create_partition_sql,
+    ensure_default_partition,
+    ensure_partitions,
+    expired_partitions,
+    partition_month,
+    partition_name,
+    retire_expired_partitions,
+)
+from utils.exceptions import DatabaseError
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+@pytest.fixture
+def mock_conn():
+    with patch('database.partitions.DatabaseManager') as mock_db_manager:
+        conn = MagicMock()
+        engine = mock_db_manager.get_instance.return_value.get_engine.return_value
+        engine.begin.return_value.__enter__.return_value = conn
+        engine.connect.return_value.__enter__.return_value = conn
+        yield conn
+
+
+def executed_sql(conn):
+    return [str(call[0][0]) for call in conn.execute.call_args_list]
+
+
+class TestPartitionNames:
+    """パーティション名と期間の計算のテスト"""
+
+    def test_add_months(self):
+        """年をまたいで月を加算・減算できるテスト"""
+        assert add_months(datetime.date(2026, 11, 1), 3) == datetime.date(2027, 2, 1)
+        assert add_months(datetime.date(2026, 1, 1), -1) == datetime.date(2025, 12, 1)
+
+    def test_partition_name_roundtrip(self):
+        """パーティション名から対象月を取得できるテスト"""
+        name = partition_name(datetime.date(2026, 1, 1))
+
+        assert name == "summary_usage_2026_01"
+        assert partition_month(name) == datetime.date(2026, 1, 1)
+        assert partition_month("summary_usage_default") is None
+
+    def test_create_partition_sql_uses_jst_bounds(self):
+        """JSTの月初0時を境界にするテスト"""
+        sql = create_partition_sql(datetime.date(2026, 12, 1))
+
+        assert "summary_usage_2026_12 PARTITION OF summary_usage" in sql
+        assert "FROM ('2026-12-01 00:00:00+09') TO ('2027-01-01 00:00:00+09')" in sql
+
+
+class TestExpiredPartitions:
+    """expired_partitions関数のテスト"""
+
+    NAMES = [
+        "summary_usage_default",
+        "summary_usage_2026_10",
+        "summary_usage_2025_09",
+        "summary_usage_2025_10",
+        "summary_usage_2025_08",
+    ]
+
+    def test_keeps_retention_months(self):
+        """当月を除いて保持期間より前の月だけが古い順に返されるテスト"""
+        assert expired_partitions(self.NAMES, 12, TODAY) == ["summary_usage_2025_08", "summary_usage_2025_09"]
+
+    def test_zero_retention(self):
+        """保持期間が0の場合は何も返さないテスト"""
+        assert expired_partitions(self.NAMES, 0, TODAY) == []
+
+
+class TestEnsurePartitions:
+    """ensure_partitions関数のテスト"""
+
+    def test_creates_missing_partitions(self, mock_conn):
+        """未作成の月とデフォルトパーティションだけが作成されるテスト"""
+        mock_conn.execute.return_value = [("summary_usage_2026_10",)]
+
+        created = ensure_partitions(2, today=TODAY)
+
+        assert created == ["summary_usage_default", "summary_usage_2026_11", "summary_usage_2026_12"]
+        sql = executed_sql(mock_conn)
+        assert "PARTITION OF summary_usage DEFAULT" in sql[1]
+        assert "summary_usage_2026_11" in sql[2]
+
+    def test_skips_month_with_rows_in_default(self, mock_conn):
+        """デフォルトパーティションに該当月のレコードがある月は作成せずに続けるテスト"""
+        existing = [("summary_usage_default",), ("summary_usage_2026_10",)]
+        has_rows = MagicMock()
+        has_rows.scalar.side_effect = [True, False]
+        mock_conn.execute.side_effect = [existing, has_rows, has_rows, None]
+
+        created = ensure_partitions(2, today=TODAY)
+
+        assert created == ["summary_usage_2026_12"]
+        sql = executed_sql(mock_conn)
+        assert "FROM summary_usage_default WHERE date >= '2026-11-01 00:00:00+09'" in sql[1]
+        assert "summary_usage_2026_12 PARTITION OF" in sql[3]
+
+    def test_error(self, mock_conn):
+        """作成に失敗した場合はDatabaseErrorが送出されるテスト"""
+        mock_conn.execute.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="パーティションの管理中にエラーが発生しました"):
+            ensure_partitions(1, today=TODAY)
+
+
+class TestEnsureDefaultPartition:
+    """ensure_default_partition関数のテスト"""
+
+    def test_creates_only_default(self, mock_conn):
+        """起動時はデフォルトパーティションだけが作成されるテスト"""
+        ensure_default_partition()
+
+        assert executed_sql(mock_conn) == [
+            "CREATE TABLE IF NOT EXISTS summary_usage_default PARTITION OF summary_usage DEFAULT"
+        ]
+
+
+class TestRetireExpiredPartitions:
+    """retire_expired_partitions関数のテスト"""
+
+    def test_dry_run(self, mock_conn):
+        """dry_runの場合は対象を返すだけで変更しないテスト"""
+        mock_conn.execute.return_value = [("summary_usage_2024_01",), ("summary_usage_2026_10",)]
+
+        retired = retire_expired_partitions(12, today=TODAY, dry_run=True)
+
+        assert retired == ["summary_usage_2024_01"]
+        assert mock_conn.execute.call_count == 1
+
+    def test_drop(self, mock_conn):
+        """切り離した後に削除されるテスト"""
+        mock_conn.execute.return_value = [("summary_usage_2024_01",)]
+
+        retire_expired_partitions(12, action="drop", today=TODAY)
+
+        sql = executed_sql(mock_conn)
+        assert sql[1] == "ALTER TABLE summary_usage DETACH PARTITION summary_usage_2024_01"
+        assert sql[2] == "DROP TABLE summary_usage_2024_01"
+
+    def test_archive(self, mock_conn, tmp_path):
+        """CSV.gzに書き出してから削除されるテスト"""
+        mock_conn.execute.return_value = [("summary_usage_2024_01",)]
+
+        with patch('database.partitions.archive_partition') as mock_archive, patch('builtins.print'):
+            retire_expired_partitions(12, action="archive", archive_dir=str(tmp_path), today=TODAY)
+
+        mock_archive.assert_called_once_with("summary_usage_2024_01", str(tmp_path))
+        assert executed_sql(mock_conn)[-1] == "DROP TABLE summary_usage_2024_01"
+
+    def test_invalid_action(self):
+        """不正なactionの場合はValueErrorが送出されるテスト"""
+        with pytest.raises(ValueError):
+            retire_expired_partitions(12, action="truncate")
@@ -3,6 +3,7 @@ from unittest.mock import Mock, patch
 
 import pytest
 
+from database.models import Prompt
 from utils.exceptions import DatabaseError
 from utils.prompt_manager import (
     create_or_update_prompt,
@@ -11,6 +12,7 @@ from utils.prompt_manager import (
     get_all_prompts,
     get_current_datetime,
     get_prompt,
+    get_prompt_cache_stats,
     initialize_database,
     initialize_default_prompt,
 )
@@ -74,9 +76,7 @@ class TestCreateOrUpdatePrompt:
     def test_create_or_update_prompt_update_existing(self, mock_database_manager):
         """既存プロンプトの更新テスト"""
         # 既存のプロンプトが存在する場合
-        existing_prompt = {"id": 1, "content": "既存プロンプト"}
-        mock_database_manager.query_one.return_value = existing_prompt
-        mock_database_manager.update.return_value = {"id": 1, "content": "新しいプロンプト"}
+        mock_database_manager.upsert_with_status.return_value = ({"id": 1, "content": "新しいプロンプト"}, False)
 
         with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
             success, message = create_or_update_prompt(
@@ -85,14 +85,16 @@ class TestCreateOrUpdatePrompt:
 
             assert success is True
             assert message == "プロンプトを更新しました"
-            mock_database_manager.query_one.assert_called_once()
-            mock_database_manager.update.assert_called_once()
+            mock_database_manager.upsert_with_status.assert_called_once()
+            args, kwargs = mock_database_manager.upsert_with_status.call_args
+            assert args[1] == {"department": "内科", "document_type": "主治医意見書", "doctor": "田中医師"}
+            assert args[2] == {"content": "新しいプロンプト", "selected_model": "gemini"}
+            assert "created_at" in kwargs["insert_only"]
 
     def test_create_or_update_prompt_create_new(self, mock_database_manager):
         """新規プロンプトの作成テスト"""
         # 既存のプロンプトが存在しない場合
-        mock_database_manager.query_one.return_value = None
-        mock_database_manager.insert.return_value = {"id": 1}
+        mock_database_manager.upsert_with_status.return_value = ({"id": 1}, True)
 
         with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
             with patch('utils.prompt_manager.get_current_datetime') as mock_datetime:
@@ -105,7 +107,9 @@ class TestCreateOrUpdatePrompt:
 
                 assert success is True
                 assert message == "プロンプトを新規作成しました"
-                mock_database_manager.insert.assert_called_once()
+                mock_database_manager.upsert_with_status.assert_called_once()
+                insert_only = mock_database_manager.upsert_with_status.call_args[1]["insert_only"]
+                assert insert_only == {"is_default": False, "created_at": mock_now, "updated_at": mock_now}
 
     def test_create_or_update_prompt_invalid_input(self):
         """無効な入力のテスト"""
@@ -116,7 +120,7 @@ class TestCreateOrUpdatePrompt:
 
     def test_create_or_update_prompt_database_error(self, mock_database_manager):
         """データベースエラーのテスト"""
-        mock_database_manager.query_one.side_effect = DatabaseError("DB接続エラー")
+        mock_database_manager.upsert_with_status.side_effect = DatabaseError("DB接続エラー")
 
         with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
             success, message = create_or_update_prompt(
@@ -231,6 +235,111 @@ class TestGetPrompt:
                 get_prompt("内科", "主治医意見書", "田中医師")
 
 
+class TestPromptCache:
+    """get_promptのキャッシュのテスト"""
+
+    def test_get_prompt_cache_hit(self, mock_database_manager):
+        """2回目以降はデータベースに問い合わせないテスト"""
+        mock_database_manager.query_one.return_value = {"id": 1, "content": "内科用プロンプト"}
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            first = get_prompt("内科", "主治医意見書", "田中医師")
+            second = get_prompt("内科", "主治医意見書", "田中医師")
+
+        assert first == second
+        assert mock_database_manager.query_one.call_count == 1
+        stats = get_prompt_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_get_prompt_cache_returns_copy(self, mock_database_manager):
+        """呼び出し側の変更がキャッシュに影響しないテスト"""
+        mock_database_manager.query_one.return_value = {"id": 1, "content": "内科用プロンプト"}
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            first = get_prompt("内科", "主治医意見書", "田中医師")
+            first["content"] = "変更"
+            second = get_prompt("内科", "主治医意見書", "田中医師")
+
+        assert second["content"] == "内科用プロンプト"
+
+    def test_get_prompt_caches_missing_prompt(self, mock_database_manager):
+        """プロンプトが存在しない結果もキャッシュされるテスト"""
+        mock_database_manager.query_one.return_value = None
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            assert get_prompt("内科", "主治医意見書", "田中医師") is None
+            assert get_prompt("内科", "主治医意見書", "田中医師") is None
+
+        assert mock_database_manager.query_one.call_count == 2
+
+    def test_get_prompt_error_not_cached(self, mock_database_manager):
+        """エラー時はキャッシュされないテスト"""
+        mock_database_manager.query_one.side_effect = [Exception("DB接続エラー"), {"id": 1}]
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            with pytest.raises(DatabaseError):
+                get_prompt("内科", "主治医意見書", "田中医師")
+            assert get_prompt("内科", "主治医意見書", "田中医師") == {"id": 1}
+
+    def test_update_invalidates_cache(self, mock_database_manager):
+        """プロンプト更新時にキャッシュが破棄されるテスト"""
+        mock_database_manager.query_one.side_effect = [
+            {"id": 1, "content": "旧プロンプト"},
+            {"id": 1, "content": "新プロンプト"},
+        ]
+        mock_database_manager.upsert_with_status.return_value = ({"id": 1, "content": "新プロンプト"}, False)
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            get_prompt("内科", "主治医意見書", "田中医師")
+            create_or_update_prompt("内科", "主治医意見書", "田中医師", "新プロンプト")
+            result = get_prompt("内科", "主治医意見書", "田中医師")
+
+        assert result["content"] == "新プロンプト"
+
+    def test_delete_invalidates_cache(self, mock_database_manager):
+        """プロンプト削除時にキャッシュが破棄されるテスト"""
+        default_prompt = {"id": 1, "content": "デフォルトプロンプト"}
+        mock_database_manager.query_one.side_effect = [{"id": 2, "content": "内科用"}, None, default_prompt]
+        mock_database_manager.delete.return_value = True
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            get_prompt("内科", "主治医意見書", "田中医師")
+            delete_prompt("内科", "主治医意見書", "田中医師")
+            result = get_prompt("内科", "主治医意見書", "田中医師")
+
+        assert result == default_prompt
+
+    def test_default_prompt_update_clears_fallback_entries(self, mock_database_manager):
+        """デフォルトプロンプトの更新でフォールバック結果も破棄されるテスト"""
+        mock_database_manager.query_one.side_effect = [
+            None, {"id": 1, "content": "旧デフォルト"},
+            None, {"id": 1, "content": "新デフォルト"},
+        ]
+        mock_database_manager.upsert_with_status.return_value = ({"id": 1, "content": "新デフォルト"}, False)
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            with patch('utils.prompt_manager.DEFAULT_DOCUMENT_TYPE', '主治医意見書'):
+                get_prompt("内科", "主治医意見書", "田中医師")
+                create_or_update_prompt("default", "主治医意見書", "default", "新デフォルト")
+                result = get_prompt("内科", "主治医意見書", "田中医師")
+
+        assert result["content"] == "新デフォルト"
+
+
+    @patch('utils.prompt_manager.notify_prompt_change')
+    def test_write_notifies_other_workers(self, mock_notify, mock_database_manager):
+        """プロンプトの書き込み時に他のワーカーへ変更が通知されるテスト"""
+        mock_database_manager.upsert_with_status.return_value = ({"id": 1}, True)
+
+        with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
+            create_or_update_prompt("内科", "主治医意見書", "田中医師", "新プロンプト")
+
+        mock_notify.assert_called_once_with(
+            "prompts", {"department": "内科", "document_type": "主治医意見書", "doctor": "田中医師"}
+        )
+
+
 class TestInitializeDefaultPrompt:
     """initialize_default_prompt関数のテスト"""
 
@@ -290,44 +399,54 @@ class TestInitializeDatabase:
         mock_config = Mock()
         mock_config.__getitem__ = Mock(return_value={'summary': 'デフォルトプロンプト内容'})
 
-        # 既存プロンプトが存在しない場合をシミュレート
-        mock_database_manager.query_one.return_value = None
-        mock_database_manager.insert.return_value = {"id": 1}
+        mock_database_manager.insert_missing.return_value = 2
 
         with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
             with patch('utils.prompt_manager.get_config', return_value=mock_config):
-                with patch('utils.prompt_manager.DEFAULT_DEPARTMENT', ['内科']):
+                with patch('utils.prompt_manager.DEFAULT_DEPARTMENT', ['内科', '外科']):
                     with patch('utils.prompt_manager.DOCUMENT_TYPES', ['主治医意見書']):
                         with patch('utils.prompt_manager.DEPARTMENT_DOCTORS_MAPPING', {'内科': ['田中医師']}):
                             with patch('utils.prompt_manager.get_current_datetime') as mock_datetime:
                                 mock_now = datetime.datetime(2024, 1, 1, 12)
                                 mock_datetime.return_value = mock_now
 
-                                initialize_database()
+                                inserted = initialize_database()
 
                                 # スキーマ初期化とデフォルトプロンプト初期化が呼ばれることを確認
                                 mock_init_schema.assert_called_once()
                                 mock_init_default.assert_called_once()
 
-                                # 新しいプロンプトが挿入されることを確認
-                                mock_database_manager.insert.assert_called()
+                                # すべての組み合わせが1回の一括挿入に渡されることを確認
+                                assert inserted == 2
+                                mock_database_manager.insert_missing.assert_called_once()
+                                model_class, key_columns, rows = mock_database_manager.insert_missing.call_args[0]
+                                assert model_class == Prompt
+                                assert key_columns == ["department", "document_type", "doctor"]
+                                assert [(row["department"], row["doctor"]) for row in rows] == [
+                                    ('内科', '田中医師'), ('外科', 'default')
+                                ]
+                                assert rows[0]["content"] == 'デフォルトプロンプト内容'
+                                assert rows[0]["created_at"] == mock_now
+                                mock_database_manager.query_one.assert_not_called()
+                                mock_database_manager.insert.assert_not_called()
 
     @patch('utils.prompt_manager.init_schema')
     @patch('utils.prompt_manager.initialize_default_prompt')
     def test_initialize_database_existing_prompts(self, mock_init_default, mock_init_schema, mock_database_manager):
         """既存プロンプトがある場合のテスト"""
         # 既存プロンプトが存在する場合をシミュレート
-        existing_prompt = {"id": 1, "content": "既存プロンプト"}
-        mock_database_manager.query_one.return_value = existing_prompt
+        mock_database_manager.insert_missing.return_value = 0
 
         with patch('utils.prompt_manager.get_db_manager', return_value=mock_database_manager):
             with patch('utils.prompt_manager.DEFAULT_DEPARTMENT', ['内科']):
                 with patch('utils.prompt_manager.DOCUMENT_TYPES', ['主治医意見書']):
                     with patch('utils.prompt_manager.DEPARTMENT_DOCTORS_MAPPING', {'内科': ['田中医師']}):
-                        initialize_database()
+                        with patch('utils.prompt_manager.publish_prompt_change') as mock_publish:
+                            assert initialize_database() == 0
 
-                        # 既存プロンプトがあるため、新しい挿入は行われない
-                        mock_database_manager.insert.assert_not_called()
+                            # 既存プロンプトがあるため、キャッシュの破棄は行われない
+                            mock_database_manager.insert.assert_not_called()
+                            mock_publish.assert_not_called()
 
     @patch('utils.prompt_manager.init_schema')
     def test_initialize_database_error(self, mock_init_schema):
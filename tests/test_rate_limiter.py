@@ -0,0 +1,227 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from external_service.api_factory import APIFactory
+from external_service.rate_limiter import MemoryBucketStore, PostgresBucketStore, RateLimiter, estimate_tokens
+from utils.exceptions import APIError, DatabaseError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(clock):
+    return MemoryBucketStore(clock=clock)
+
+
+class TestEstimateTokens:
+    """estimate_tokens関数のテスト"""
+
+    def test_sum_of_lengths(self):
+        """テキストの文字数の合計を返し、Noneは0とするテスト"""
+        assert estimate_tokens("あいう", None, "ab") == 5
+
+
+class TestMemoryBucketStore:
+    """MemoryBucketStoreクラスのテスト"""
+
+    def test_refill(self, store, clock):
+        """経過時間に応じて補充され、容量を超えないテスト"""
+        assert store.take("claude:rpm", 60, 1.0, 60) == 0
+        clock.now = 10
+        assert store.take("claude:rpm", 60, 1.0, 0) == 10
+        clock.now = 1000
+        assert store.take("claude:rpm", 60, 1.0, 0) == 60
+
+    def test_refund_is_capped(self, store):
+        """返却しても容量を超えないテスト"""
+        store.take("claude:tpm", 100, 1.0, 30)
+
+        assert store.take("claude:tpm", 100, 1.0, -50) == 100
+
+
+class TestRateLimiter:
+    """RateLimiterクラスのテスト"""
+
+    def test_unlimited(self, store):
+        """上限が未設定の場合は待機しないテスト"""
+        sleep = Mock()
+        limiter = RateLimiter(store=store, sleep=sleep)
+
+        reservation = limiter.acquire("claude", "sonnet", 1000)
+
+        assert reservation.tokens == 0
+        sleep.assert_not_called()
+
+    def test_waits_for_rpm(self, store):
+        """1分あたりのリクエスト数を超える場合は補充されるまで待機するテスト"""
+        sleep = Mock()
+        limiter = RateLimiter(rpm_limits={"claude": 2}, store=store, sleep=sleep)
+
+        limiter.acquire("claude", "sonnet", 0)
+        limiter.acquire("claude", "sonnet", 0)
+        sleep.assert_not_called()
+
+        limiter.acquire("claude", "sonnet", 0)
+        sleep.assert_called_once_with(pytest.approx(30.0))
+        limiter.acquire("claude", "sonnet", 0)
+        assert sleep.call_args[0][0] == pytest.approx(60.0)
+        assert limiter.get_stats()["waited"] == 2
+
+    def test_model_specific_limit(self, store):
+        """「プロバイダー/モデル」の上限がプロバイダーの上限より優先され、モデルごとに別のバケットになるテスト"""
+        sleep = Mock()
+        limiter = RateLimiter(rpm_limits={"claude": 1, "claude/haiku": 100}, store=store, sleep=sleep)
+
+        limiter.acquire("claude", "haiku", 0)
+        limiter.acquire("claude", "haiku", 0)
+        limiter.acquire("claude", "sonnet", 0)
+
+        sleep.assert_not_called()
+
+    def test_reserves_estimated_tokens(self, store):
+        """推定入力トークン数と出力トークン数の目安が予約されるテスト"""
+        limiter = RateLimiter(tpm_limits={"claude": 10000}, store=store, output_token_estimate=2000, sleep=Mock())
+
+        reservation = limiter.acquire("claude", "sonnet", 3000)
+
+        assert reservation.tokens == 5000
+        assert limiter.get_stats()["levels"]["claude/sonnet:tpm"] == 5000
+
+    def test_reconcile(self, store):
+        """実際のトークン数との差が精算されるテスト"""
+        limiter = RateLimiter(tpm_limits={"claude": 10000}, store=store, output_token_estimate=2000, sleep=Mock())
+
+        reservation = limiter.acquire("claude", "sonnet", 3000)
+        limiter.reconcile(reservation, 3500)
+        assert limiter.get_stats()["levels"]["claude/sonnet:tpm"] == 6500
+
+        reservation = limiter.acquire("claude", "sonnet", 3000)
+        limiter.reconcile(reservation, 7000)
+        assert limiter.get_stats()["levels"]["claude/sonnet:tpm"] == -500
+
+    def test_waits_for_tpm(self, store):
+        """トークン数が不足する場合は不足分が補充されるまで待機するテスト"""
+        sleep = Mock()
+        limiter = RateLimiter(tpm_limits={"gemini": 6000}, store=store, output_token_estimate=0, sleep=sleep)
+
+        limiter.acquire("gemini", "pro", 6000)
+        limiter.acquire("gemini", "pro", 1500)
+
+        sleep.assert_called_once_with(pytest.approx(15.0))
+
+    def test_rejects_when_wait_too_long(self, store):
+        """待機時間が上限を超える場合は予約を取り消してAPIErrorが送出されるテスト"""
+        limiter = RateLimiter(rpm_limits={"claude": 1}, store=store, max_wait=10, sleep=Mock())
+        limiter.acquire("claude", "sonnet", 0)
+
+        with pytest.raises(APIError, match="約60秒後に再度実行してください"):
+            limiter.acquire("claude", "sonnet", 0)
+
+        assert limiter.get_stats()["levels"]["claude/sonnet:rpm"] == 0
+        assert limiter.get_stats()["rejected"] == 1
+
+    def test_store_error_does_not_block(self):
+        """共有の記録に失敗した場合は待機せずに実行するテスト"""
+        store = Mock()
+        store.take.side_effect = DatabaseError("接続エラー")
+        limiter = RateLimiter(rpm_limits={"claude": 1}, store=store, sleep=Mock())
+
+        reservation = limiter.acquire("claude", "sonnet", 0)
+
+        assert reservation.tokens == 0
+        assert limiter.get_stats()["store_errors"] == 1
+
+
+    def test_store_error_on_release(self):
+        """予約の取り消しに失敗した場合も記録の失敗として数え、APIErrorが送出されるテスト"""
+        store = Mock()
+        store.take.side_effect = [-1.0, DatabaseError("接続エラー")]
+        limiter = RateLimiter(rpm_limits={"claude": 1}, store=store, max_wait=10, sleep=Mock())
+
+        with pytest.raises(APIError, match="約60秒後に再度実行してください"):
+            limiter.acquire("claude", "sonnet", 0)
+
+        assert limiter.get_stats()["store_errors"] == 1
+        assert limiter.get_stats()["rejected"] == 1
+
+
+class TestPostgresBucketStore:
+    """PostgresBucketStoreクラスのテスト"""
+
+    @patch('external_service.rate_limiter.DatabaseManager')
+    def test_single_upsert(self, mock_db_manager):
+        """補充と差し引きを1つのupsertで行い、残量を返すテスト"""
+        engine = mock_db_manager.get_instance.return_value.get_engine.return_value
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.scalar_one.return_value = -5.0
+
+        assert PostgresBucketStore().take("claude/sonnet:rpm", 60, 1.0, 1) == -5.0
+
+        sql = str(conn.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (bucket_key) DO UPDATE" in sql
+        assert "RETURNING rate_limit_buckets.tokens" in sql
+
+    @patch('external_service.rate_limiter.DatabaseManager')
+    def test_database_error(self, mock_db_manager):
+        """書き込みエラー時にDatabaseErrorが送出されるテスト"""
+        mock_db_manager.get_instance.return_value.get_engine.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="利用上限の記録中にエラーが発生しました"):
+            PostgresBucketStore().take("claude/sonnet:rpm", 60, 1.0, 1)
+
+
+class TestAPIFactoryRateLimit:
+    """APIFactoryから利用上限を予約して呼び出すテスト"""
+
+    @patch('external_service.api_factory.rate_limiter')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_reserve_and_reconcile(self, mock_create_client, mock_rate_limiter):
+        """入力の推定トークン数で予約し、実際の入力+出力トークン数で精算するテスト"""
+        mock_create_client.return_value.generate_summary_stream.return_value = ("要約", 120, 30)
+
+        APIFactory.generate_summary_stream_with_provider(
+            "gemini", "カルテ", additional_info="追加", model_name="gemini-pro", previous_record="前回"
+        )
+
+        mock_rate_limiter.acquire.assert_called_once_with("gemini", "gemini-pro", 7)
+        mock_rate_limiter.reconcile.assert_called_once_with(mock_rate_limiter.acquire.return_value, 150)
+
+    @patch('external_service.api_factory.llm_scheduler')
+    @patch('external_service.api_factory.rate_limiter')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_reserve_before_slot(self, mock_create_client, mock_rate_limiter, mock_scheduler):
+        """利用上限を予約してから実行枠を確保するテスト"""
+        calls = Mock()
+        calls.attach_mock(mock_rate_limiter.acquire, "acquire")
+        calls.attach_mock(mock_scheduler.slot, "slot")
+        mock_create_client.return_value.generate_summary.return_value = ("要約", 120, 30)
+
+        APIFactory.generate_summary_with_provider("gemini", "カルテ", model_name="gemini-pro")
+
+        assert [call[0] for call in calls.mock_calls[:2]] == ["acquire", "slot"]
+
+    @patch('external_service.api_factory.llm_scheduler')
+    @patch('external_service.api_factory.rate_limiter')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_refund_when_slot_rejected(self, mock_create_client, mock_rate_limiter, mock_scheduler):
+        """実行枠を確保できずにAPIを呼び出さなかった場合は予約したトークン数を戻すテスト"""
+        mock_scheduler.slot.side_effect = APIError("混雑しています")
+
+        with pytest.raises(APIError, match="混雑しています"):
+            APIFactory.generate_summary_with_provider("gemini", "カルテ", model_name="gemini-pro")
+
+        mock_rate_limiter.reconcile.assert_called_once_with(mock_rate_limiter.acquire.return_value, 0)
+        mock_create_client.return_value.generate_summary.assert_not_called()
@@ -0,0 +1,216 @@
+from typing import Tuple
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from external_service.api_factory import APIFactory
+from external_service.base_api import BaseAPIClient
+from external_service.response_cache import (
+    DiskResponseStore,
+    MemoryResponseStore,
+    PostgresResponseStore,
+    ResponseCache,
+    create_response_store,
+    response_cache_key,
+)
+from utils.exceptions import DatabaseError
+
+VALUE = {"summary": "治療経過: 経過良好", "input_tokens": 100, "output_tokens": 20}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class DummyClient(BaseAPIClient):
+    """テスト用のクライアント"""
+
+    provider = "dummy"
+
+    def __init__(self):
+        super().__init__(None, "dummy-model")
+        self.calls = 0
+
+    def initialize(self) -> bool:
+        return True
+
+    def _generate_content(self, prompt: str, model_name: str) -> Tuple[str, int, int]:
+        self.calls += 1
+        return "治療経過: 経過良好", 100, 20
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(MemoryResponseStore(), enabled=True)
+    with patch('external_service.base_api.response_cache', cache), \
+            patch('external_service.api_factory.response_cache', cache), \
+            patch('external_service.base_api.get_prompt', return_value={"content": "プロンプト"}):
+        yield cache
+
+
+class TestResponseCacheKey:
+    """response_cache_key関数のテスト"""
+
+    def test_key_depends_on_all_parts(self):
+        """プロバイダー・モデル・プロンプト・生成パラメータのいずれかが異なるとキーが変わるテスト"""
+        key = response_cache_key("claude", "sonnet", "プロンプト", {"max_tokens": 6000})
+
+        assert key == response_cache_key("claude", "sonnet", "プロンプト", {"max_tokens": 6000})
+        assert len(key) == 64
+        assert key != response_cache_key("gemini", "sonnet", "プロンプト", {"max_tokens": 6000})
+        assert key != response_cache_key("claude", "opus", "プロンプト", {"max_tokens": 6000})
+        assert key != response_cache_key("claude", "sonnet", "プロンプト2", {"max_tokens": 6000})
+        assert key != response_cache_key("claude", "sonnet", "プロンプト", {"max_tokens": 4000})
+
+
+class TestDiskResponseStore:
+    """DiskResponseStoreクラスのテスト"""
+
+    def test_set_and_get(self, tmp_path):
+        """保存した結果が別のインスタンスからも取得できるテスト"""
+        DiskResponseStore(str(tmp_path), ttl=60).set("ab" + "0" * 62, VALUE)
+
+        assert DiskResponseStore(str(tmp_path), ttl=60).get("ab" + "0" * 62) == VALUE
+        assert DiskResponseStore(str(tmp_path), ttl=60).get("cd" + "0" * 62) is None
+        assert not list(tmp_path.glob("*/*.tmp"))
+
+    def test_expired(self, tmp_path):
+        """有効期限を過ぎた結果は返さずに削除するテスト"""
+        clock = FakeClock()
+        store = DiskResponseStore(str(tmp_path), ttl=60, clock=clock)
+        store.set("ab" + "0" * 62, VALUE)
+        clock.now += 61
+
+        assert store.get("ab" + "0" * 62) is None
+        assert not list(tmp_path.glob("*/*.json"))
+
+
+class TestPostgresResponseStore:
+    """PostgresResponseStoreクラスのテスト"""
+
+    @patch('external_service.response_cache.DatabaseManager')
+    def test_upsert(self, mock_db_manager):
+        """同じキーの結果は上書きされるテスト"""
+        engine = mock_db_manager.get_instance.return_value.get_engine.return_value
+        conn = engine.begin.return_value.__enter__.return_value
+
+        PostgresResponseStore().set("0" * 64, VALUE)
+
+        sql = str(conn.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (cache_key) DO UPDATE" in sql
+
+    @patch('external_service.response_cache.DatabaseManager')
+    def test_database_error(self, mock_db_manager):
+        """読み込みエラー時にDatabaseErrorが送出されるテスト"""
+        mock_db_manager.get_instance.return_value.get_engine.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="応答キャッシュの読み書き中にエラーが発生しました"):
+            PostgresResponseStore().get("0" * 64)
+
+
+class TestResponseCache:
+    """ResponseCacheクラスのテスト"""
+
+    def test_hit_and_miss(self):
+        """ヒット数とミス数が記録されるテスト"""
+        cache = ResponseCache(MemoryResponseStore(), enabled=True)
+        cache.set("key", **VALUE)
+
+        assert cache.get("key") == VALUE
+        assert cache.get("other") is None
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    def test_store_error_fails_open(self):
+        """保存先に読み書きできない場合はキャッシュを使用しないテスト"""
+        store = Mock()
+        store.get.side_effect = DatabaseError("接続エラー")
+        store.set.side_effect = DatabaseError("接続エラー")
+        cache = ResponseCache(store, enabled=True)
+
+        cache.set("key", **VALUE)
+
+        assert cache.get("key") is None
+        assert cache.get_stats()["errors"] == 2
+
+    def test_disabled(self):
+        """無効の場合は保存も取得もしないテスト"""
+        store = Mock()
+        cache = ResponseCache(store, enabled=False)
+
+        cache.set("key", **VALUE)
+
+        assert cache.get("key") is None
+        store.set.assert_not_called()
+
+    def test_invalid_backend(self):
+        """不正な保存先を指定した場合はValueErrorが送出されるテスト"""
+        with pytest.raises(ValueError):
+            create_response_store("redis")
+
+
+class TestAPIFactoryResponseCache:
+    """APIFactoryから応答キャッシュを使用するテスト"""
+
+    @patch('external_service.api_factory.llm_scheduler')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_hit_skips_api(self, mock_create_client, mock_scheduler, cache):
+        """同じリクエストの2回目はAPIと実行枠を使用せず、トークン数0で返すテスト"""
+        client = DummyClient()
+        mock_create_client.return_value = client
+        APIFactory.generate_summary_with_provider("claude", "カルテ")
+        mock_scheduler.reset_mock()
+        call_stats = {}
+
+        result = APIFactory.generate_summary_with_provider("claude", "カルテ", call_stats=call_stats)
+
+        assert result == ("治療経過: 経過良好", 0, 0)
+        assert client.calls == 1
+        assert call_stats["cache_hit"] is True
+        mock_scheduler.slot.assert_not_called()
+
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_streaming_hit(self, mock_create_client, cache):
+        """ストリーミングの場合はキャッシュの結果を一括でコールバックするテスト"""
+        client = DummyClient()
+        mock_create_client.return_value = client
+        APIFactory.generate_summary_with_provider("claude", "カルテ")
+        on_delta = Mock()
+
+        APIFactory.generate_summary_stream_with_provider("claude", "カルテ", on_delta=on_delta)
+
+        on_delta.assert_called_once_with("治療経過: 経過良好")
+        assert client.calls == 1
+
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_opt_out(self, mock_create_client, cache):
+        """use_cacheがFalseの場合はAPIを呼び出し、結果をキャッシュに保存しないテスト"""
+        client = DummyClient()
+        mock_create_client.return_value = client
+        call_stats = {}
+
+        result = APIFactory.generate_summary_with_provider("claude", "カルテ", call_stats=call_stats, use_cache=False)
+
+        assert result == ("治療経過: 経過良好", 100, 20)
+        assert client.calls == 1
+        assert call_stats["cache_hit"] is False
+        assert cache.get_stats()["hits"] == 0
+        APIFactory.generate_summary_with_provider("claude", "カルテ")
+        assert client.calls == 2
+
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_empty_result_not_cached(self, mock_create_client, cache):
+        """生成結果が空の場合はキャッシュに保存しないテスト"""
+        client = DummyClient()
+        client._generate_content = Mock(return_value=("レスポンスが空です", 100, 0))
+        mock_create_client.return_value = client
+
+        APIFactory.generate_summary_with_provider("claude", "カルテ")
+        APIFactory.generate_summary_with_provider("claude", "カルテ")
+
+        assert client._generate_content.call_count == 2
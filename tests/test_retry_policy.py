@@ -0,0 +1,200 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from external_service.api_factory import APIFactory
+from external_service.retry_policy import AttemptCancelled, LatencyTracker, RetryPolicy, is_retryable_error
+from utils.exceptions import APIError
+
+
+class RateLimitError(Exception):
+    """SDKのレート制限エラーを模した例外"""
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def wrapped(error: Exception) -> APIError:
+    """クライアントと同様にSDKの例外をAPIErrorに変換して送出し、送出されたAPIErrorを返す"""
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise APIError(f"API呼び出しエラー: {str(e)}")
+    except APIError as api_error:
+        return api_error
+
+
+class TestIsRetryableError:
+    """is_retryable_error関数のテスト"""
+
+    def test_status_code_in_cause(self):
+        """APIErrorに変換される前の例外のステータスコードで判定するテスト"""
+        assert is_retryable_error(wrapped(StatusError(503))) is True
+        assert is_retryable_error(wrapped(StatusError(400))) is False
+
+    def test_error_class_name(self):
+        """例外クラス名で判定するテスト"""
+        assert is_retryable_error(RateLimitError("制限")) is True
+
+    def test_message(self):
+        """メッセージに含まれるエラーコードで判定するテスト"""
+        assert is_retryable_error(APIError("Vertex AI APIエラー: 429 RESOURCE_EXHAUSTED")) is True
+        assert is_retryable_error(APIError("プロンプトが不正です")) is False
+
+
+class TestLatencyTracker:
+    """LatencyTrackerクラスのテスト"""
+
+    def test_percentile(self):
+        """パーセンタイルが計算され、実績が最小件数に満たない場合はNoneを返すテスト"""
+        tracker = LatencyTracker()
+        for latency in range(1, 101):
+            tracker.add(float(latency))
+
+        assert tracker.percentile(95) == 95.0
+        assert tracker.percentile(95, min_samples=101) is None
+
+
+class TestRetryPolicy:
+    """RetryPolicyクラスのテスト"""
+
+    def test_retries_transient_error(self):
+        """一時的なエラーの場合は待機してから再試行し、再試行回数を返すテスト"""
+        sleep = Mock()
+        attempt = Mock(side_effect=[RateLimitError("制限"), StatusError(503), ("要約", 10, 20)])
+        policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=1.5, sleep=sleep)
+
+        result, stats = policy.execute(attempt)
+
+        assert result == ("要約", 10, 20)
+        assert stats == {"retry_count": 2, "hedged": False}
+        assert sleep.call_count == 2
+        assert all(0 <= call.args[0] <= 1.5 for call in sleep.call_args_list)
+
+    def test_does_not_retry_permanent_error(self):
+        """再試行しても成功しないエラーは再試行しないテスト"""
+        attempt = Mock(side_effect=ValueError("不正なモデル名"))
+        policy = RetryPolicy(sleep=Mock())
+
+        with pytest.raises(ValueError):
+            policy.execute(attempt)
+
+        assert attempt.call_count == 1
+
+    def test_gives_up_after_max_attempts(self):
+        """最大試行回数に達した場合は最後のエラーが送出されるテスト"""
+        attempt = Mock(side_effect=StatusError(429))
+        policy = RetryPolicy(max_attempts=2, sleep=Mock())
+
+        with pytest.raises(StatusError):
+            policy.execute(attempt)
+
+        assert attempt.call_count == 2
+
+    def test_does_not_retry_after_emitted(self):
+        """生成途中のテキストを表示済みの場合は再試行しないテスト"""
+        calls = []
+
+        def attempt(emit, cancelled):
+            calls.append(1)
+            emit("治療経過:")
+            raise StatusError(503)
+
+        on_delta = Mock()
+        with pytest.raises(StatusError):
+            RetryPolicy(sleep=Mock()).execute(attempt, on_delta, streaming=True)
+
+        assert len(calls) == 1
+        on_delta.assert_called_once_with("治療経過:")
+
+    def test_deadline(self):
+        """期限を過ぎた場合は次のトークンを受け取る前に中断され、APIErrorが送出されるテスト"""
+        cancelled_events = []
+
+        def attempt(emit, cancelled):
+            cancelled_events.append(cancelled)
+            emit("治療経過:")
+            time.sleep(0.1)
+            emit("経過良好")
+            if cancelled.is_set():
+                raise AttemptCancelled()
+            return "治療経過:経過良好", 1, 1
+
+        with pytest.raises(APIError, match="秒以内に完了しませんでした"):
+            RetryPolicy(deadline=0.05).execute(attempt, Mock(), streaming=True)
+
+        assert cancelled_events[0].is_set()
+
+    def test_deadline_does_not_cancel_non_streaming(self):
+        """一括生成は期限を過ぎても中断せず、呼び出し元のスレッドで実行した結果を返すテスト"""
+        threads = []
+
+        def attempt(emit, cancelled):
+            threads.append(threading.current_thread())
+            time.sleep(0.1)
+            return "要約", 1, 1
+
+        result, stats = RetryPolicy(deadline=0.05).execute(attempt)
+
+        assert result == ("要約", 1, 1)
+        assert threads == [threading.current_thread()]
+
+    def test_hedged_request(self):
+        """応答が遅い場合に追加で送った呼び出しが採用され、遅い呼び出しは中断されるテスト"""
+        policy = RetryPolicy(hedge_enabled=True, hedge_min_samples=1)
+        policy.execute(lambda emit, cancelled: ("速い応答", 1, 1), Mock(), streaming=True)
+        cancelled_events = []
+        lock = threading.Lock()
+
+        def attempt(emit, cancelled):
+            with lock:
+                cancelled_events.append(cancelled)
+                index = len(cancelled_events)
+            if index == 1:
+                cancelled.wait(1)
+                raise AttemptCancelled()
+            emit("ヘッジ")
+            return "ヘッジ", 1, 1
+
+        on_delta = Mock()
+        result, stats = policy.execute(attempt, on_delta, streaming=True)
+
+        assert result == ("ヘッジ", 1, 1)
+        assert stats == {"retry_count": 0, "hedged": True}
+        on_delta.assert_called_once_with("ヘッジ")
+        assert cancelled_events[0].is_set()
+
+    def test_no_hedge_for_non_streaming(self):
+        """一括生成は負けた呼び出しを中断できないため、実績があってもヘッジしないテスト"""
+        policy = RetryPolicy(hedge_enabled=True, hedge_min_samples=1)
+        policy.execute(lambda emit, cancelled: ("速い応答", 1, 1))
+
+        assert policy.hedge_delay(streaming=False) is None
+
+    def test_no_hedge_without_samples(self):
+        """レイテンシの実績が不足している場合はヘッジしないテスト"""
+        policy = RetryPolicy(hedge_enabled=True, hedge_min_samples=20)
+
+        assert policy.hedge_delay(streaming=True) is None
+
+
+class TestAPIFactoryCallStats:
+    """APIFactoryから再試行回数を受け取るテスト"""
+
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_call_stats(self, mock_create_client):
+        """クライアントの再試行回数とヘッジの有無がcall_statsに設定されるテスト"""
+        client = mock_create_client.return_value
+        client.generate_summary.return_value = ("要約", 10, 5)
+        client.last_call_stats = {"retry_count": 1, "hedged": False}
+        call_stats = {}
+
+        APIFactory.generate_summary_with_provider("claude", "カルテ", call_stats=call_stats)
+
+        assert call_stats == {"retry_count": 1, "hedged": False}
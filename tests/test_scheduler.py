@@ -0,0 +1,168 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from external_service.api_factory import APIFactory
+from external_service.scheduler import FairScheduler
+from utils.exceptions import APIError
+
+
+def wait_until(condition, timeout: float = 1.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "条件を満たしませんでした"
+        time.sleep(0.001)
+
+
+def start_waiters(scheduler: FairScheduler, departments, order: list) -> list:
+    """呼び出しを1件ずつ待機させ、開始した順にorderへ記録するスレッドを返す"""
+    threads = []
+    queued = scheduler.get_stats()["claude"]["queued"]
+    for index, department in enumerate(departments):
+        def run(department=department, index=index):
+            scheduler.acquire("claude", department)
+            order.append(f"{department}{queued + index}")
+            scheduler.release("claude")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        wait_until(lambda: scheduler.get_stats()["claude"]["queued"] == queued + index + 1)
+        threads.append(thread)
+    return threads
+
+
+class TestFairScheduler:
+    """FairSchedulerクラスのテスト"""
+
+    def test_admits_within_limit(self):
+        """上限までは待機せずに実行されるテスト"""
+        scheduler = FairScheduler(max_concurrency=2)
+
+        scheduler.acquire("claude")
+        scheduler.acquire("claude")
+
+        stats = scheduler.get_stats()["claude"]
+        assert stats["active"] == 2
+        assert stats["queued"] == 0
+
+    def test_provider_limits_are_independent(self):
+        """プロバイダーごとに同時実行数の上限が適用されるテスト"""
+        scheduler = FairScheduler(max_concurrency=1, provider_concurrency={"gemini": 2})
+
+        scheduler.acquire("claude")
+        scheduler.acquire("gemini")
+        scheduler.acquire("gemini")
+
+        stats = scheduler.get_stats()
+        assert stats["claude"]["limit"] == 1
+        assert stats["gemini"]["active"] == 2
+
+    def test_fair_order_between_departments(self):
+        """大量に待機している診療科があっても、他の診療科の呼び出しが先に開始されるテスト"""
+        scheduler = FairScheduler(max_concurrency=1)
+        scheduler.acquire("claude")
+        order = []
+
+        threads = start_waiters(scheduler, ["内科", "内科", "内科", "外科"], order)
+        scheduler.release("claude")
+        for thread in threads:
+            thread.join(timeout=1)
+
+        assert order == ["内科0", "外科3", "内科1", "内科2"]
+
+    def test_weighted_order(self):
+        """重みの大きい診療科ほど多く開始されるテスト"""
+        scheduler = FairScheduler(max_concurrency=1, weights={"内科": 2})
+        scheduler.acquire("claude")
+        order = []
+
+        threads = start_waiters(scheduler, ["内科", "内科", "内科", "外科"], order)
+        scheduler.release("claude")
+        for thread in threads:
+            thread.join(timeout=1)
+
+        assert order == ["内科0", "内科1", "外科3", "内科2"]
+
+    def test_rejects_with_estimated_wait(self):
+        """待機数が上限を超える場合は待ち時間の目安を含むAPIErrorが送出されるテスト"""
+        scheduler = FairScheduler(max_concurrency=1, max_queue_size=1, initial_service_time=20)
+        scheduler.acquire("claude")
+        threads = start_waiters(scheduler, ["内科"], [])
+
+        with pytest.raises(APIError, match="約40秒後に再度実行してください"):
+            scheduler.acquire("claude", "外科")
+
+        assert scheduler.get_stats()["claude"]["rejected"] == 1
+        scheduler.release("claude")
+        threads[0].join(timeout=1)
+
+    def test_rejects_per_key(self):
+        """診療科・医師ごとの待機数の上限を超える場合は受け付けないテスト"""
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_key=1)
+        scheduler.acquire("claude")
+        threads = start_waiters(scheduler, ["内科"], [])
+
+        with pytest.raises(APIError):
+            scheduler.acquire("claude", "内科")
+
+        threads += start_waiters(scheduler, ["外科"], [])
+        assert scheduler.get_stats()["claude"]["queues"] == {"内科/default": 1, "外科/default": 1}
+        scheduler.release("claude")
+        for thread in threads:
+            thread.join(timeout=1)
+
+    def test_wait_timeout(self):
+        """待機時間の上限を過ぎた場合はAPIErrorが送出され、待機数から除かれるテスト"""
+        scheduler = FairScheduler(max_concurrency=1, max_wait=0.01)
+        scheduler.acquire("claude")
+
+        with pytest.raises(APIError, match="待っても開始できませんでした"):
+            scheduler.acquire("claude", "内科")
+
+        stats = scheduler.get_stats()["claude"]
+        assert stats["queued"] == 0
+        assert stats["queues"] == {}
+        assert stats["timed_out"] == 1
+
+        scheduler.release("claude")
+        assert scheduler.get_stats()["claude"]["active"] == 0
+
+    def test_slot_releases_on_error(self):
+        """実行中に例外が発生しても実行枠が解放されるテスト"""
+        scheduler = FairScheduler(max_concurrency=1)
+
+        with pytest.raises(ValueError):
+            with scheduler.slot("claude", "内科"):
+                raise ValueError("失敗")
+
+        assert scheduler.get_stats()["claude"]["active"] == 0
+
+
+class TestAPIFactoryScheduling:
+    """APIFactoryからスケジューラーを経由して呼び出すテスト"""
+
+    @patch('external_service.api_factory.llm_scheduler')
+    @patch('external_service.api_factory.APIFactory.create_client')
+    def test_generate_summary_uses_slot(self, mock_create_client, mock_scheduler):
+        """プロバイダー・診療科・医師を指定して実行枠を確保するテスト"""
+        mock_create_client.return_value.generate_summary.return_value = ("要約", 10, 5)
+
+        result = APIFactory.generate_summary_with_provider("Claude", "カルテ", department="内科", doctor="田中医師")
+
+        assert result == ("要約", 10, 5)
+        mock_scheduler.slot.assert_called_once_with("claude", "内科", "田中医師")
+
+    @patch('external_service.api_factory.llm_scheduler')
+    def test_unsupported_provider_does_not_acquire(self, mock_scheduler):
+        """未対応のプロバイダーの場合は実行枠を確保せずにエラーになるテスト"""
+        with pytest.raises(APIError):
+            APIFactory.generate_summary_with_provider("unknown", "カルテ")
+
+        mock_scheduler.slot.assert_not_called()
+
+    def test_get_scheduler_stats(self):
+        """スケジューラーの統計が取得できるテスト"""
+        with patch('external_service.api_factory.llm_scheduler', Mock(get_stats=Mock(return_value={"claude": {}}))):
+            assert APIFactory.get_scheduler_stats() == {"claude": {}}
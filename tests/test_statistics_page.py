@@ -0,0 +1,197 @@
+import datetime
+import os
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from views.statistics_page import JST, format_department_data, format_detail_data, format_latency_data, render_export
+
+
+def make_record(**overrides):
+    record = {
+        "date": datetime.datetime(2026, 1, 1, 15, 30, tzinfo=datetime.timezone.utc),
+        "document_types": "主治医意見書",
+        "model_detail": "Claude",
+        "department": "内科",
+        "doctor": "田中医師",
+        "input_tokens": 1000,
+        "output_tokens": 200,
+        "processing_time": 12,
+    }
+    record.update(overrides)
+    return record
+
+
+class TestFormatDetailData:
+    """format_detail_data関数のテスト"""
+
+    def test_converts_to_jst_date(self):
+        """UTCの日時がJSTの日付で表示されるテスト"""
+        df = format_detail_data([
+            make_record(),
+            make_record(date=datetime.datetime(2026, 1, 1, 14, 59, tzinfo=datetime.timezone.utc)),
+        ])
+
+        assert df["作成日"].tolist() == ["2026/01/02", "2026/01/01"]
+
+    def test_naive_datetime_is_treated_as_jst(self):
+        """タイムゾーンのない日時はJSTとして扱われるテスト"""
+        df = format_detail_data([make_record(date=datetime.datetime(2026, 1, 1, 23, 0))])
+
+        assert df["作成日"].tolist() == ["2026/01/01"]
+
+    def test_jst_aware_datetime(self):
+        """JSTの日時はそのままの日付で表示されるテスト"""
+        df = format_detail_data([make_record(date=JST.localize(datetime.datetime(2026, 3, 31, 0, 5)))])
+
+        assert df["作成日"].tolist() == ["2026/03/31"]
+
+    def test_model_classification(self):
+        """model_detailからAIモデル名が判定されるテスト"""
+        df = format_detail_data([
+            make_record(model_detail="Claude"),
+            make_record(model_detail="gemini-2.5-pro"),
+            make_record(model_detail="anthropic.claude-sonnet-4"),
+            make_record(model_detail=None),
+        ])
+
+        assert df["AIモデル"].tolist() == ["Claude", "Gemini_Pro", "Claude", "Gemini_Pro"]
+
+    def test_labels(self):
+        """共通・不明の表示名に置き換えられるテスト"""
+        df = format_detail_data([
+            make_record(department="default", doctor="default", document_types=None),
+            make_record(document_types=""),
+        ])
+
+        assert df["診療科"].tolist() == ["全科共通", "内科"]
+        assert df["医師名"].tolist() == ["医師共通", "田中医師"]
+        assert df["文書名"].tolist() == ["不明", "不明"]
+
+    def test_output_frame(self):
+        """カラムの順序と値のテスト"""
+        df = format_detail_data([make_record(), make_record(processing_time=None)])
+
+        expected = pd.DataFrame({
+            "作成日": ["2026/01/02", "2026/01/02"],
+            "文書名": ["主治医意見書", "主治医意見書"],
+            "診療科": ["内科", "内科"],
+            "医師名": ["田中医師", "田中医師"],
+            "AIモデル": ["Claude", "Claude"],
+            "入力トークン": [1000, 1000],
+            "出力トークン": [200, 200],
+            "処理時間(秒)": [12, 0],
+        })
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_empty(self):
+        """レコードがない場合は空のDataFrameを返すテスト"""
+        assert format_detail_data([]).empty
+
+
+class TestFormatDepartmentData:
+    """format_department_data関数のテスト"""
+
+    def test_output_frame(self):
+        """カラムの順序と値のテスト"""
+        df = format_department_data([
+            {
+                "department": "default", "doctor": "default", "document_types": None,
+                "count": 3, "input_tokens": 300, "output_tokens": 30, "total_tokens": 330, "processing_time": 9
+            },
+            {
+                "department": "内科", "doctor": "田中医師", "document_types": "主治医意見書",
+                "count": 1, "input_tokens": 100, "output_tokens": 10, "total_tokens": 110, "processing_time": 3
+            },
+        ])
+
+        expected = pd.DataFrame({
+            "文書名": ["不明", "主治医意見書"],
+            "診療科": ["全科共通", "内科"],
+            "医師名": ["医師共通", "田中医師"],
+            "作成件数": [3, 1],
+            "入力トークン": [300, 100],
+            "出力トークン": [30, 10],
+            "合計トークン": [330, 110],
+        })
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_empty(self):
+        """統計がない場合は空のDataFrameを返すテスト"""
+        assert format_department_data([]).empty
+
+
+class TestFormatLatencyData:
+    """format_latency_data関数のテスト"""
+
+    def test_pivot_by_model_and_document_type(self):
+        """日時を行、モデル・文書名を列とする時系列に変換されるテスト"""
+        latency = [
+            {"bucket": datetime.datetime(2026, 1, 2), "model_detail": "Claude", "document_types": None, "p90": 30.0},
+            {"bucket": datetime.datetime(2026, 1, 1), "model_detail": "Claude", "document_types": None, "p90": 20.0},
+            {"bucket": datetime.datetime(2026, 1, 1), "model_detail": "gemini-2.5-pro",
+             "document_types": "主治医意見書", "p90": 10.0},
+        ]
+
+        df = format_latency_data(latency, "p90")
+
+        assert list(df.columns) == ["Claude / 不明", "gemini-2.5-pro / 主治医意見書"]
+        assert list(df.index) == [datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 2)]
+        assert df.loc[datetime.datetime(2026, 1, 2), "Claude / 不明"] == 30.0
+        assert pd.isna(df.loc[datetime.datetime(2026, 1, 2), "gemini-2.5-pro / 主治医意見書"])
+
+    def test_empty(self):
+        """データがない場合は空のDataFrameを返すテスト"""
+        assert format_latency_data([], "p50").empty
+
+
+class SessionState(dict):
+    """属性としても参照できるst.session_stateの代わり"""
+
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+class TestRenderExport:
+    """render_export関数のテスト"""
+
+    @patch('views.statistics_page.st')
+    @patch('views.statistics_page.write_usage_export')
+    def test_temp_file_is_removed(self, mock_write, mock_st):
+        """作成したエクスポートは内容をダウンロードボタンに渡し、一時ファイルは削除されるテスト"""
+        written_paths = []
+
+        def fake_write(path, *args, **kwargs):
+            written_paths.append(path)
+            with open(path, "wb") as f:
+                f.write(b"id,date\n")
+            return 1
+
+        mock_write.side_effect = fake_write
+        mock_st.columns.return_value = [MagicMock(), MagicMock()]
+        mock_st.selectbox.return_value = "csv"
+        mock_st.button.return_value = True
+        mock_st.session_state = SessionState()
+        filter_key = (datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 31), "すべて", "すべて")
+
+        render_export(filter_key)
+
+        assert not os.path.exists(written_paths[0])
+        assert mock_st.download_button.call_args[0][1] == b"id,date\n"
+        assert mock_write.call_args.kwargs["max_rows"] == 100000
+        mock_st.warning.assert_not_called()
+
+    @patch('views.statistics_page.USAGE_EXPORT_UI_MAX_ROWS', 2)
+    @patch('views.statistics_page.st')
+    def test_warns_when_capped(self, mock_st):
+        """上限の件数に達した場合はscripts/export_usage.pyの使用を案内するテスト"""
+        filter_key = (datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 31), "すべて", "すべて")
+        mock_st.columns.return_value = [MagicMock(), MagicMock()]
+        mock_st.button.return_value = False
+        mock_st.session_state = SessionState(
+            usage_export={"data": b"id,date\n", "format": "csv", "filter_key": filter_key, "count": 2}
+        )
+
+        render_export(filter_key)
+
+        assert "scripts/export_usage.py" in mock_st.warning.call_args[0][0]
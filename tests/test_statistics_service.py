@@ -0,0 +1,406 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services.statistics_service import (
+    JST,
+    build_usage_filters,
+    get_latency_statistics,
+    get_usage_records_page,
+    get_usage_statistics,
+    invalidate_usage_statistics_cache,
+    notify_usage_written,
+    split_usage_range,
+    usage_statistics_cache,
+)
+from utils.exceptions import DatabaseError
+
+START = datetime.datetime(2026, 1, 1, 0, 0)
+END = datetime.datetime(2026, 1, 31, 23, 59)
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def make_row(record_id: int, date: datetime.datetime):
+    return SimpleNamespace(
+        id=record_id,
+        date=date,
+        document_types="主治医意見書",
+        model_detail="claude-sonnet",
+        department="内科",
+        doctor="default",
+        input_tokens=100,
+        output_tokens=50,
+        processing_time=3
+    )
+
+
+@pytest.fixture
+def mock_session():
+    with patch('services.statistics_service.DatabaseManager') as mock_db_manager:
+        session = Mock()
+        query = Mock()
+        session.query.return_value = query
+        query.filter.return_value = query
+        query.order_by.return_value = query
+        query.limit.return_value = query
+        query.group_by.return_value = query
+        mock_db_manager.get_instance.return_value.get_session.return_value = session
+        yield session
+
+
+class TestBuildUsageFilters:
+    """build_usage_filters関数のテスト"""
+
+    def test_all_filters(self):
+        """期間のみの場合のテスト"""
+        filters = build_usage_filters(START, END, "すべて", "すべて")
+
+        assert len(filters) == 2
+
+    def test_model_filter(self):
+        """AIモデルの条件がproviderの一致で追加されるテスト"""
+        filters = build_usage_filters(START, END, "Claude", "すべて")
+
+        assert len(filters) == 3
+        assert compile_sql(filters[2]) == "summary_usage.provider = 'claude'"
+
+    def test_document_type_filter(self):
+        """AIモデルと文書名の両方を指定した場合のテスト"""
+        filters = build_usage_filters(START, END, "Gemini_Pro", "主治医意見書")
+
+        assert len(filters) == 4
+        assert compile_sql(filters[2]) == "summary_usage.provider = 'gemini'"
+        assert compile_sql(filters[3]) == "summary_usage.document_types = '主治医意見書'"
+
+    def test_unknown_document_type(self):
+        """文書名が不明の場合はNULLを検索するテスト"""
+        filters = build_usage_filters(START, END, "すべて", "不明")
+
+        assert "document_types IS NULL" in compile_sql(filters[2])
+
+
+class TestGetUsageRecordsPage:
+    """get_usage_records_page関数のテスト"""
+
+    def test_first_page_has_next(self, mock_session):
+        """1件多く取得できた場合に次のページのカーソルが返されるテスト"""
+        rows = [make_row(3, END), make_row(2, END), make_row(1, START)]
+        mock_session.query.return_value.all.return_value = rows
+
+        page = get_usage_records_page(START, END, "すべて", "すべて", page_size=2)
+
+        assert len(page["records"]) == 2
+        assert page["records"][0]["model_detail"] == "claude-sonnet"
+        assert page["next_cursor"] == (END, 2)
+        mock_session.query.return_value.limit.assert_called_once_with(3)
+        mock_session.close.assert_called_once()
+
+    def test_last_page(self, mock_session):
+        """最後のページでは次のページのカーソルがNoneになるテスト"""
+        mock_session.query.return_value.all.return_value = [make_row(1, START)]
+
+        page = get_usage_records_page(START, END, "すべて", "すべて", page_size=2)
+
+        assert len(page["records"]) == 1
+        assert page["next_cursor"] is None
+
+    def test_cursor_adds_keyset_condition(self, mock_session):
+        """カーソル指定時に(date, id)の比較条件が追加されるテスト"""
+        mock_session.query.return_value.all.return_value = []
+
+        get_usage_records_page(START, END, "すべて", "すべて", cursor=(END, 10), page_size=2)
+
+        condition = mock_session.query.return_value.filter.call_args[0][0]
+        sql = compile_sql(condition)
+        assert "(summary_usage.date, summary_usage.id) < ('2026-01-31 23:59:00', 10)" in sql
+
+    def test_orders_by_date_and_id_desc(self, mock_session):
+        """(date, id)の降順で取得されるテスト"""
+        mock_session.query.return_value.all.return_value = []
+
+        get_usage_records_page(START, END, "すべて", "すべて")
+
+        order_by = [compile_sql(clause) for clause in mock_session.query.return_value.order_by.call_args[0]]
+        assert order_by == ["summary_usage.date DESC", "summary_usage.id DESC"]
+
+    def test_database_error(self, mock_session):
+        """取得エラー時にDatabaseErrorが送出されるテスト"""
+        mock_session.query.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="統計データの取得に失敗しました"):
+            get_usage_records_page(START, END, "すべて", "すべて")
+
+        mock_session.close.assert_called_once()
+
+
+class TestSplitUsageRange:
+    """split_usage_range関数のテスト"""
+
+    NOW = JST.localize(datetime.datetime(2026, 1, 31, 15, 0))
+
+    def test_past_days_use_rollup_and_today_uses_raw(self):
+        """前日までの日はロールアップ、当日はsummary_usageから集計されるテスト"""
+        rollup_range, raw_ranges = split_usage_range(
+            JST.localize(datetime.datetime(2026, 1, 1)),
+            JST.localize(datetime.datetime.combine(datetime.date(2026, 1, 31), datetime.time.max)),
+            self.NOW
+        )
+
+        assert rollup_range == (datetime.date(2026, 1, 1), datetime.date(2026, 1, 31))
+        assert raw_ranges == [
+            (JST.localize(datetime.datetime(2026, 1, 31)), JST.localize(datetime.datetime(2026, 2, 1)))
+        ]
+
+    def test_today_only(self):
+        """当日のみの場合はロールアップを使わないテスト"""
+        rollup_range, raw_ranges = split_usage_range(
+            JST.localize(datetime.datetime(2026, 1, 31)),
+            JST.localize(datetime.datetime.combine(datetime.date(2026, 1, 31), datetime.time.max)),
+            self.NOW
+        )
+
+        assert rollup_range is None
+        assert len(raw_ranges) == 1
+
+    def test_partial_first_day(self):
+        """日の途中から始まる場合は最初の日だけsummary_usageから集計されるテスト"""
+        rollup_range, raw_ranges = split_usage_range(
+            JST.localize(datetime.datetime(2026, 1, 1, 12, 0)),
+            JST.localize(datetime.datetime.combine(datetime.date(2026, 1, 10), datetime.time.max)),
+            self.NOW
+        )
+
+        assert rollup_range == (datetime.date(2026, 1, 2), datetime.date(2026, 1, 11))
+        assert raw_ranges == [
+            (JST.localize(datetime.datetime(2026, 1, 1, 12, 0)), JST.localize(datetime.datetime(2026, 1, 2)))
+        ]
+
+
+class TestGetUsageStatistics:
+    """get_usage_statistics関数のテスト"""
+
+    NOW = JST.localize(datetime.datetime(2026, 1, 31, 15, 0))
+    START = JST.localize(datetime.datetime(2026, 1, 1))
+    END = JST.localize(datetime.datetime.combine(datetime.date(2026, 1, 31), datetime.time.max))
+
+    @staticmethod
+    def department_row(department, count, input_tokens):
+        return SimpleNamespace(
+            department=department, doctor="default", document_types="主治医意見書",
+            count=count, input_tokens=input_tokens, output_tokens=10, processing_time=5
+        )
+
+    def test_merges_rollup_and_today(self, mock_session):
+        """ロールアップと当日分の集計が合算されるテスト"""
+        with patch('services.statistics_service._query_totals', side_effect=[(10, 1000, 100), (2, 200, 20)]), \
+                patch('services.statistics_service._query_by_department', side_effect=[
+                    [self.department_row("内科", 8, 800), self.department_row("外科", 2, 200)],
+                    [self.department_row("外科", 2, 200)],
+                ]) as mock_by_department:
+            result = get_usage_statistics(self.START, self.END, "すべて", "すべて", now=self.NOW)
+
+        assert result["total"] == {
+            "count": 12, "total_input_tokens": 1200, "total_output_tokens": 120, "total_tokens": 1320
+        }
+        assert [(row["department"], row["count"]) for row in result["by_department"]] == [("内科", 8), ("外科", 4)]
+        assert result["by_department"][1]["total_tokens"] == 420
+
+        from database.models import SummaryUsage, SummaryUsageDaily
+        assert mock_by_department.call_args_list[0][0][1] == SummaryUsageDaily
+        assert mock_by_department.call_args_list[1][0][1] == SummaryUsage
+        mock_session.close.assert_called_once()
+
+    def test_no_data(self, mock_session):
+        """データがない場合はtotalがNoneになるテスト"""
+        with patch('services.statistics_service._query_totals', return_value=(0, 0, 0)):
+            result = get_usage_statistics(self.START, self.END, "すべて", "すべて", now=self.NOW)
+
+        assert result == {"total": None, "by_department": []}
+
+    def test_database_error(self, mock_session):
+        """集計エラー時にDatabaseErrorが送出されるテスト"""
+        with patch('services.statistics_service._query_totals', side_effect=Exception("接続エラー")):
+            with pytest.raises(DatabaseError, match="統計データの取得に失敗しました"):
+                get_usage_statistics(self.START, self.END, "すべて", "すべて", now=self.NOW)
+
+
+class TestUsageStatisticsCache:
+    """統計結果のキャッシュのテスト"""
+
+    NOW = JST.localize(datetime.datetime(2026, 1, 31, 15, 0))
+    START = JST.localize(datetime.datetime(2026, 1, 25))
+    END = JST.localize(datetime.datetime.combine(datetime.date(2026, 1, 31), datetime.time.max))
+
+    def get_statistics(self, model="すべて"):
+        return get_usage_statistics(self.START, self.END, model, "すべて", now=self.NOW)
+
+    def test_same_filters_use_cache(self, mock_session):
+        """同じ検索条件では2回目にデータベースを参照しないテスト"""
+        with patch('services.statistics_service._query_totals', return_value=(0, 0, 0)) as mock_totals:
+            self.get_statistics()
+            self.get_statistics()
+
+        assert mock_totals.call_count == 2  # ロールアップと当日分の1回ずつ
+        assert usage_statistics_cache.get_stats()["hits"] == 1
+
+    def test_different_filters(self, mock_session):
+        """検索条件が異なる場合は集計し直すテスト"""
+        with patch('services.statistics_service._query_totals', return_value=(0, 0, 0)) as mock_totals:
+            self.get_statistics()
+            self.get_statistics(model="Claude")
+
+        assert mock_totals.call_count == 4
+
+    def test_cached_result_is_copied(self, mock_session):
+        """キャッシュした結果を呼び出し元が変更しても影響しないテスト"""
+        with patch('services.statistics_service._query_totals', return_value=(1, 10, 5)), \
+                patch('services.statistics_service._query_by_department', return_value=[]):
+            self.get_statistics()["total"]["count"] = 999
+
+            assert self.get_statistics()["total"]["count"] == 2
+
+    def test_error_is_not_cached(self, mock_session):
+        """エラーの場合はキャッシュしないテスト"""
+        with patch('services.statistics_service._query_totals', side_effect=Exception("接続エラー")):
+            with pytest.raises(DatabaseError):
+                self.get_statistics()
+
+        assert usage_statistics_cache.get_stats()["size"] == 0
+
+    def test_records_page_uses_cache(self, mock_session):
+        """詳細レコードのページもカーソルごとにキャッシュされるテスト"""
+        mock_session.query.return_value.all.return_value = [make_row(1, START)]
+
+        get_usage_records_page(START, END, "すべて", "すべて")
+        get_usage_records_page(START, END, "すべて", "すべて")
+        get_usage_records_page(START, END, "すべて", "すべて", cursor=(END, 10))
+
+        assert mock_session.query.call_count == 2
+
+    def test_written_rows_invalidate_covering_ranges(self, mock_session):
+        """書き込まれた使用量の日時を期間に含むキャッシュだけが破棄されるテスト"""
+        with patch('services.statistics_service._query_totals', return_value=(0, 0, 0)):
+            self.get_statistics()
+            get_usage_statistics(
+                JST.localize(datetime.datetime(2025, 12, 1)),
+                JST.localize(datetime.datetime(2025, 12, 31, 23, 59)),
+                "すべて", "すべて", now=self.NOW
+            )
+
+        invalidated = invalidate_usage_statistics_cache([{"date": self.NOW}])
+
+        assert invalidated == 1
+        assert usage_statistics_cache.get_stats()["size"] == 1
+
+    def test_registered_as_flush_listener(self):
+        """usage_writerの書き込み後に破棄されるよう登録されているテスト"""
+        from services.usage_writer import usage_writer
+
+        assert invalidate_usage_statistics_cache in usage_writer._flush_listeners
+
+    @patch('services.statistics_service.notify_prompt_change')
+    def test_notify_written_range(self, mock_notify):
+        """書き込んだ使用量の最初と最後の日時を他のプロセスに通知するテスト"""
+        earlier = self.NOW - datetime.timedelta(hours=1)
+
+        notify_usage_written([{"date": self.NOW}, {"date": earlier}])
+
+        mock_notify.assert_called_once_with(
+            "summary_usage", {"start": earlier.isoformat(), "end": self.NOW.isoformat()}
+        )
+
+    def test_change_notification_invalidates_overlapping_ranges(self, mock_session):
+        """他のプロセスからの通知で、書き込まれた日時の範囲と期間が重なるキャッシュだけが破棄されるテスト"""
+        from database.notifier import prompt_change_listener
+
+        with patch('services.statistics_service._query_totals', return_value=(0, 0, 0)):
+            self.get_statistics()
+            get_usage_statistics(
+                JST.localize(datetime.datetime(2025, 12, 1)),
+                JST.localize(datetime.datetime(2025, 12, 31, 23, 59)),
+                "すべて", "すべて", now=self.NOW
+            )
+
+        prompt_change_listener.dispatch(
+            '{"table": "summary_usage", "keys": {"start": "%s", "end": "%s"}}'
+            % (self.NOW.isoformat(), self.NOW.isoformat())
+        )
+
+        assert usage_statistics_cache.get_stats()["size"] == 1
+
+
+class TestGetLatencyStatistics:
+    """get_latency_statistics関数のテスト"""
+
+    @staticmethod
+    def latency_row(**overrides):
+        row = {
+            "bucket": datetime.datetime(2026, 1, 1), "model_detail": "Claude", "document_types": "主治医意見書",
+            "call_count": 10, "p50": 12.0, "p90": 30.5, "p99": 58.0, "tokens_per_second": 21.5,
+        }
+        row.update(overrides)
+        return SimpleNamespace(**row)
+
+    def test_percentile_query(self, mock_session):
+        """percentile_contで処理時間のパーセンタイルをJSTの時間ごとに集計するテスト"""
+        mock_session.query.return_value.all.return_value = []
+
+        get_latency_statistics(START, END, "すべて", "すべて", bucket="hour")
+
+        columns = [compile_sql(column) for column in mock_session.query.call_args[0]]
+        assert columns[0].startswith("date_trunc('hour', timezone('Asia/Tokyo', summary_usage.date))")
+        assert "percentile_cont(0.5) WITHIN GROUP (ORDER BY summary_usage.processing_time)" in columns[4]
+        assert "percentile_cont(0.99) WITHIN GROUP (ORDER BY summary_usage.processing_time)" in columns[6]
+        assert columns[7].startswith("CAST(sum(summary_usage.output_tokens) AS FLOAT) / ")
+        assert "nullif(sum(summary_usage.processing_time), 0)" in columns[7]
+        group_by = [compile_sql(clause) for clause in mock_session.query.return_value.group_by.call_args[0]]
+        assert group_by[1:] == ["summary_usage.model_detail", "summary_usage.document_types"]
+
+    def test_excludes_cache_hits(self, mock_session):
+        """応答キャッシュの結果を返したレコードは集計しないテスト"""
+        mock_session.query.return_value.all.return_value = []
+
+        get_latency_statistics(START, END, "すべて", "すべて")
+
+        filters = [compile_sql(clause) for clause in mock_session.query.return_value.filter.call_args[0]]
+        assert "summary_usage.cache_hit IS NOT true" in filters
+
+    def test_result(self, mock_session):
+        """集計結果が辞書のリストで返されるテスト"""
+        mock_session.query.return_value.all.return_value = [self.latency_row(tokens_per_second=None)]
+
+        result = get_latency_statistics(START, END, "すべて", "すべて")
+
+        assert result == [{
+            "bucket": datetime.datetime(2026, 1, 1), "model_detail": "Claude", "document_types": "主治医意見書",
+            "count": 10, "p50": 12.0, "p90": 30.5, "p99": 58.0, "tokens_per_second": None,
+        }]
+        mock_session.close.assert_called_once()
+
+    def test_cached_per_bucket(self, mock_session):
+        """集計単位ごとにキャッシュされるテスト"""
+        mock_session.query.return_value.all.return_value = []
+
+        get_latency_statistics(START, END, "すべて", "すべて", bucket="day")
+        get_latency_statistics(START, END, "すべて", "すべて", bucket="day")
+        get_latency_statistics(START, END, "すべて", "すべて", bucket="hour")
+
+        assert mock_session.query.call_count == 2
+
+    def test_invalid_bucket(self):
+        """未対応の集計単位の場合はValueErrorが送出されるテスト"""
+        with pytest.raises(ValueError):
+            get_latency_statistics(START, END, "すべて", "すべて", bucket="week")
+
+    def test_database_error(self, mock_session):
+        """集計エラー時にDatabaseErrorが送出されるテスト"""
+        mock_session.query.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="統計データの取得に失敗しました"):
+            get_latency_statistics(START, END, "すべて", "すべて")
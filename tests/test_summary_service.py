@@ -1,10 +1,12 @@
+import datetime
 import queue
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 
 # テスト対象のモジュールをインポート
 from services.summary_service import (
+    drain_delta_queue,
     generate_summary_task,
     validate_api_credentials,
     validate_input_text,
@@ -14,8 +16,11 @@ from services.summary_service import (
     normalize_selection_params,
     determine_final_model,
     get_provider_and_model,
-    validate_api_credentials_for_provider
+    validate_api_credentials_for_provider,
+    execute_summary_generation_with_ui,
+    wait_for_generation_job
 )
+from services.executor import BoundedExecutor
 
 # テスト用定数
 TEST_INPUT_TEXT = "これはテスト用の医療テキストです。" * 100
@@ -174,13 +179,14 @@ class TestDetermineFinalModel:
         """プロンプトでモデルが指定されていない場合のテスト"""
         mock_get_prompt.return_value = {'selected_model': None}
 
-        model, switched, original = determine_final_model(
+        model, switched, original, reason = determine_final_model(
             '内科', '診療録', '医師', 'Claude', False, 'テスト', ''
         )
 
         assert model == 'Claude'
         assert switched == False
         assert original == 'Claude'
+        assert reason is None
 
     @patch('services.summary_service.get_prompt')
     @patch('services.summary_service.MAX_TOKEN_THRESHOLD', 1000)
@@ -188,7 +194,7 @@ class TestDetermineFinalModel:
         """プロンプトでモデルが指定されている場合のテスト"""
         mock_get_prompt.return_value = {'selected_model': 'Gemini_Pro'}
 
-        model, switched, original = determine_final_model(
+        model, switched, original, reason = determine_final_model(
             '内科', '診療録', '医師', 'Claude', False, 'テスト', ''
         )
 
@@ -204,13 +210,14 @@ class TestDetermineFinalModel:
         """トークン数制限を超えた場合のモデル切り替えテスト"""
         mock_get_prompt.return_value = None
 
-        model, switched, original = determine_final_model(
+        model, switched, original, reason = determine_final_model(
             '内科', '診療録', '医師', 'Claude', False, 'とても長いテキスト' * 100, ''
         )
 
         assert model == 'Gemini_Pro'
         assert switched == True
         assert original == 'Claude'
+        assert reason == 'token_threshold'
 
     @patch('services.summary_service.get_prompt')
     @patch('services.summary_service.MAX_TOKEN_THRESHOLD', 10)
@@ -225,6 +232,58 @@ class TestDetermineFinalModel:
                 '内科', '診療録', '医師', 'Claude', False, 'とても長いテキスト' * 100, ''
             )
 
+    @patch('services.summary_service.get_prompt')
+    @patch('services.summary_service.MAX_TOKEN_THRESHOLD', 10)
+    @patch('services.summary_service.CHUNKED_SUMMARY_ENABLED', True)
+    @patch('services.summary_service.GOOGLE_CREDENTIALS_JSON', None)
+    def test_determine_final_model_chunked(self, mock_get_prompt):
+        """分割して作成する場合は入力が長くてもモデルを切り替えないテスト"""
+        mock_get_prompt.return_value = None
+
+        model, switched, _, reason = determine_final_model(
+            '内科', '診療録', '医師', 'Claude', False, 'とても長いテキスト' * 100, ''
+        )
+
+        assert model == 'Claude'
+        assert switched == False
+        assert reason is None
+
+    @patch('services.summary_service.get_prompt')
+    @patch('services.summary_service.circuit_breakers')
+    @patch('services.summary_service.GOOGLE_CREDENTIALS_JSON', 'test_creds')
+    @patch('services.summary_service.GEMINI_MODEL', 'gemini-pro')
+    def test_determine_final_model_failover(self, mock_breakers, mock_get_prompt):
+        """プロバイダーが遮断中の場合に他のプロバイダーのモデルに切り替えるテスト"""
+        mock_get_prompt.return_value = None
+        mock_breakers.is_available.side_effect = lambda provider: provider != 'claude'
+
+        model, switched, original, reason = determine_final_model(
+            '内科', '診療録', '医師', 'Claude', False, 'テスト', ''
+        )
+
+        assert model == 'Gemini_Pro'
+        assert switched == True
+        assert original == 'Claude'
+        assert reason == 'circuit_open'
+
+    @patch('services.summary_service.get_prompt')
+    @patch('services.summary_service.circuit_breakers')
+    @patch('services.summary_service.MAX_TOKEN_THRESHOLD', 10)
+    @patch('services.summary_service.CLAUDE_API_KEY', True)
+    @patch('services.summary_service.ANTHROPIC_MODEL', 'claude-sonnet')
+    def test_determine_final_model_no_failover_for_long_input(self, mock_breakers, mock_get_prompt):
+        """入力が長い場合はGemini_ProからClaudeに切り替えないテスト"""
+        mock_get_prompt.return_value = None
+        mock_breakers.is_available.side_effect = lambda provider: provider != 'gemini'
+
+        model, switched, _, reason = determine_final_model(
+            '内科', '診療録', '医師', 'Gemini_Pro', True, 'とても長いテキスト' * 100, ''
+        )
+
+        assert model == 'Gemini_Pro'
+        assert switched == False
+        assert reason is None
+
 
 class TestGetSessionParameters:
     """セッションパラメータ取得のテストクラス"""
@@ -267,7 +326,7 @@ class TestGenerateSummaryTask:
         """サマリー生成タスクの成功テスト"""
         # モックの設定
         mock_normalize.return_value = ('内科', '診療録')
-        mock_determine.return_value = ('Claude', False, 'Claude')
+        mock_determine.return_value = ('Claude', False, 'Claude', None)
         mock_get_provider.return_value = ('claude', 'claude-3-sonnet')
         mock_generate.return_value = ('生成されたサマリー', 100, 200)
         mock_format.return_value = 'フォーマット済みサマリー'
@@ -286,8 +345,114 @@ class TestGenerateSummaryTask:
         assert result['input_tokens'] == 100
         assert result['output_tokens'] == 200
         assert result['model_detail'] == 'Claude'  # providerが'gemini'以外の場合はfinal_modelが使用される
+        assert result['provider'] == 'claude'
         assert result['model_switched'] == False
         assert result['original_model'] is None
+        assert result['switch_reason'] is None
+        assert result['time_to_first_token'] is None
+        assert result['retry_count'] == 0
+        assert result['hedged'] is False
+        assert result['cache_hit'] is False
+        assert mock_generate.call_args.kwargs['use_cache'] is True
+
+    @patch('services.summary_service.normalize_selection_params')
+    @patch('services.summary_service.determine_final_model')
+    @patch('services.summary_service.get_provider_and_model')
+    @patch('services.summary_service.validate_api_credentials_for_provider')
+    @patch('services.summary_service.generate_summary_stream')
+    def test_generate_summary_task_streaming(
+            self, mock_generate_stream, mock_validate, mock_get_provider, mock_determine, mock_normalize
+    ):
+        """ストリーミング生成時に差分がキューに送られ、初回トークンまでの時間が記録されるテスト"""
+        mock_normalize.return_value = ('内科', '診療録')
+        mock_determine.return_value = ('Claude', False, 'Claude', None)
+        mock_get_provider.return_value = ('claude', 'claude-3-sonnet')
+
+        def fake_stream(**kwargs):
+            kwargs['on_delta']('治療経過: *薬物*')
+            kwargs['on_delta']('療法を実施')
+            kwargs['call_stats'].update({'retry_count': 2, 'hedged': True})
+            return '治療経過: *薬物*療法を実施', 100, 200
+
+        mock_generate_stream.side_effect = fake_stream
+
+        result_queue = queue.Queue()
+        delta_queue = queue.Queue()
+
+        generate_summary_task(TEST_INPUT_TEXT, '内科', 'Claude', result_queue, TEST_ADDITIONAL_INFO, '診療録',
+                              '田中医師', False, '', delta_queue)
+
+        result = result_queue.get()
+
+        assert result['success'] == True
+        assert result['output_summary'] == '治療経過:薬物療法を実施'
+        assert result['time_to_first_token'] is not None
+        assert result['time_to_first_token'] >= 0
+        assert result['retry_count'] == 2
+        assert result['hedged'] is True
+        assert drain_delta_queue(delta_queue, timeout=0) == ['治療経過:薬物', '療法を実施']
+
+    @patch('services.summary_service.normalize_selection_params')
+    @patch('services.summary_service.determine_final_model')
+    @patch('services.summary_service.get_provider_and_model')
+    @patch('services.summary_service.validate_api_credentials_for_provider')
+    @patch('services.summary_service.generate_summary')
+    def test_generate_summary_task_response_cache(
+            self, mock_generate, mock_validate, mock_get_provider, mock_determine, mock_normalize
+    ):
+        """応答キャッシュを使用するかが渡され、キャッシュの結果を返したかが記録されるテスト"""
+        mock_normalize.return_value = ('内科', '診療録')
+        mock_determine.return_value = ('Claude', False, 'Claude', None)
+        mock_get_provider.return_value = ('claude', 'claude-3-sonnet')
+
+        def fake_generate(**kwargs):
+            kwargs['call_stats'].update({'retry_count': 0, 'hedged': False, 'cache_hit': True})
+            return '治療経過: 経過良好', 0, 0
+
+        mock_generate.side_effect = fake_generate
+        result_queue = queue.Queue()
+
+        generate_summary_task(TEST_INPUT_TEXT, '内科', 'Claude', result_queue, TEST_ADDITIONAL_INFO, '診療録',
+                              '田中医師', False, '', None, False)
+
+        result = result_queue.get()
+        assert mock_generate.call_args.kwargs['use_cache'] is False
+        assert result['cache_hit'] is True
+        assert (result['input_tokens'], result['output_tokens']) == (0, 0)
+
+    @patch('services.summary_service.normalize_selection_params')
+    @patch('services.summary_service.determine_final_model')
+    @patch('services.summary_service.get_provider_and_model')
+    @patch('services.summary_service.validate_api_credentials_for_provider')
+    @patch('services.summary_service.generate_chunked_summary')
+    @patch('services.summary_service.generate_summary')
+    @patch('services.summary_service.MAX_TOKEN_THRESHOLD', 10)
+    @patch('services.summary_service.CHUNKED_SUMMARY_ENABLED', True)
+    def test_generate_summary_task_chunked(
+            self, mock_generate, mock_chunked, mock_validate, mock_get_provider, mock_determine, mock_normalize
+    ):
+        """入力が長い場合は分割して作成するテスト"""
+        mock_normalize.return_value = ('内科', '診療録')
+        mock_determine.return_value = ('Claude', False, 'Claude', None)
+        mock_get_provider.return_value = ('claude', 'claude-3-sonnet')
+
+        def fake_chunked(**kwargs):
+            kwargs['call_stats'].update({'retry_count': 0, 'hedged': False, 'chunk_count': 3, 'cached_chunks': 1})
+            return '治療経過: 統合された経過', 300, 100
+
+        mock_chunked.side_effect = fake_chunked
+        result_queue = queue.Queue()
+
+        generate_summary_task('とても長いテキスト' * 100, '内科', 'Claude', result_queue, '', '診療録', '田中医師',
+                              False, '前回の記載')
+
+        result = result_queue.get()
+        assert result['success'] == True
+        assert result['input_tokens'] == 300
+        assert result['chunk_count'] == 3
+        mock_generate.assert_not_called()
+        assert mock_chunked.call_args.kwargs['previous_record'] == '前回の記載'
+        assert mock_chunked.call_args.kwargs['on_delta'] is None
 
     @patch('services.summary_service.normalize_selection_params')
     def test_generate_summary_task_exception(self, mock_normalize):
@@ -309,18 +474,30 @@ class TestGenerateSummaryTask:
 
 
 
+class TestDrainDeltaQueue:
+    """テキスト差分キューの取り出しテストクラス"""
+
+    def test_drain_delta_queue_returns_all_pending(self):
+        """溜まっている差分がすべて取り出されるテスト"""
+        delta_queue = queue.Queue()
+        for delta in ['a', 'b', 'c']:
+            delta_queue.put(delta)
+
+        assert drain_delta_queue(delta_queue, timeout=0) == ['a', 'b', 'c']
+        assert delta_queue.empty()
+
+    def test_drain_delta_queue_empty(self):
+        """差分がない場合は空のリストを返すテスト"""
+        assert drain_delta_queue(queue.Queue(), timeout=0.01) == []
+
+
 class TestSaveUsageToDatabase:
     """データベース保存のテストクラス"""
 
-    @patch('services.summary_service.DatabaseManager')
+    @patch('services.summary_service.usage_writer')
     @patch('streamlit.warning')
-    def test_save_usage_to_database_success(self, mock_warning, mock_db_manager):
-        """データベース保存成功のテスト"""
-        from database.models import SummaryUsage
-        mock_db_instance = Mock()
-        mock_db_manager.get_instance.return_value = mock_db_instance
-        mock_db_instance.insert.return_value = {"id": 1}
-
+    def test_save_usage_to_database_success(self, mock_warning, mock_usage_writer):
+        """使用量が書き込みキューに追加されるテスト"""
         result = {
             'model_detail': 'claude-3-sonnet',
             'input_tokens': 100,
@@ -336,16 +513,24 @@ class TestSaveUsageToDatabase:
 
         save_usage_to_database(result, session_params)
 
-        mock_db_instance.insert.assert_called_once()
-        call_args = mock_db_instance.insert.call_args
-        assert call_args[0][0] == SummaryUsage
+        mock_usage_writer.submit.assert_called_once()
+        usage_data = mock_usage_writer.submit.call_args[0][0]
+        assert usage_data['model_detail'] == 'claude-3-sonnet'
+        assert usage_data['provider'] == 'claude'
+        assert usage_data['processing_time'] == 6
+        assert usage_data['department'] == '内科'
+        assert usage_data['retry_count'] == 0
+        assert usage_data['hedged'] is False
+        assert usage_data['model_switched'] is False
+        assert usage_data['switch_reason'] is None
+        assert usage_data['cache_hit'] is False
         mock_warning.assert_not_called()
 
-    @patch('services.summary_service.DatabaseManager')
+    @patch('services.summary_service.usage_writer')
     @patch('streamlit.warning')
-    def test_save_usage_to_database_exception(self, mock_warning, mock_db_manager):
-        """データベース保存エラーのテスト"""
-        mock_db_manager.get_instance.side_effect = Exception("DB接続エラー")
+    def test_save_usage_to_database_exception(self, mock_warning, mock_usage_writer):
+        """書き込みキューへの追加エラーのテスト"""
+        mock_usage_writer.submit.side_effect = Exception("キューエラー")
 
         result = {
             'model_detail': 'claude-3-sonnet',
@@ -413,6 +598,133 @@ class TestHandleSuccessResult:
         mock_info.assert_called_once()
         mock_save.assert_called_once_with(result, session_params)
 
+    @patch('streamlit.session_state')
+    @patch('streamlit.info')
+    @patch('services.summary_service.save_usage_to_database')
+    def test_handle_success_result_with_failover(self, mock_save, mock_info, mock_session_state):
+        """障害による切り替えの場合は切り替えた理由を表示するテスト"""
+        result = {
+            'output_summary': 'テストサマリー',
+            'parsed_summary': {'summary': 'パース済み'},
+            'model_switched': True,
+            'original_model': 'Claude',
+            'switch_reason': 'circuit_open'
+        }
+
+        handle_success_result(result, {'selected_department': '内科'})
+
+        mock_info.assert_called_once_with("⚠️ ClaudeのAPIで障害が発生しているためGemini_Proに切り替えました")
+
+    @patch('streamlit.session_state')
+    @patch('services.summary_service.save_usage_to_database')
+    def test_handle_success_result_without_saving_usage(self, mock_save, mock_session_state):
+        """ワーカーが使用量を記録済みの場合は保存しないテスト"""
+        result = {
+            'output_summary': 'テストサマリー',
+            'parsed_summary': {'summary': 'パース済み'},
+            'model_switched': False
+        }
+
+        handle_success_result(result, {'selected_department': '内科'}, save_usage=False)
+
+        assert mock_session_state.output_summary == 'テストサマリー'
+        mock_save.assert_not_called()
+
+
+class TestExecuteSummaryGenerationWithUI:
+    """execute_summary_generation_with_ui関数のテストクラス"""
+
+    @patch('services.summary_service.normalize_selection_params', side_effect=Exception("boom"))
+    @patch('services.summary_service.st')
+    def test_returns_error_and_clears_placeholders_on_failure(self, mock_st, mock_normalize):
+        """作成に失敗した場合は例外を送出せずにエラーを返し、表示中のプレースホルダーを消去するテスト"""
+        status_placeholder = MagicMock()
+        stream_placeholder = MagicMock()
+        mock_st.empty.side_effect = [status_placeholder, stream_placeholder]
+        executor = BoundedExecutor(max_workers=1, max_queue_size=0)
+        session_params = {
+            'selected_department': '内科',
+            'selected_model': 'Claude',
+            'selected_document_type': '診療録',
+            'selected_doctor': '田中医師',
+            'model_explicitly_selected': False,
+        }
+
+        with patch('services.summary_service.task_executor', executor):
+            result = execute_summary_generation_with_ui(TEST_INPUT_TEXT, '', session_params)
+
+        assert result == {'success': False, 'error': 'boom'}
+        status_placeholder.empty.assert_called()
+        stream_placeholder.empty.assert_called()
+        executor.shutdown()
+
+
+class TestWaitForGenerationJob:
+    """wait_for_generation_job関数のテストクラス"""
+
+    CREATED_AT = datetime.datetime(2026, 1, 1, 0, 0, tzinfo=datetime.timezone.utc)
+
+    def make_job(self, status, **overrides):
+        job = {
+            'status': status,
+            'partial_output': None,
+            'result': None,
+            'error': None,
+            'created_at': self.CREATED_AT,
+            'finished_at': None,
+        }
+        job.update(overrides)
+        return job
+
+    @pytest.fixture
+    def mock_st(self):
+        with patch('services.summary_service.st') as mock_st:
+            mock_st.query_params = {'generation_job': 'token'}
+            mock_st.empty.return_value.container.return_value.tabs.return_value = [MagicMock() for _ in range(4)]
+            yield mock_st
+
+    @patch('services.summary_service.get_generation_job')
+    def test_returns_result_when_succeeded(self, mock_get_job, mock_st):
+        """ジョブの完了まで確認し、結果と登録からの経過時間を返すテスト"""
+        mock_get_job.side_effect = [
+            self.make_job('pending'),
+            self.make_job('running', partial_output='【治療経過】\n経過'),
+            self.make_job(
+                'succeeded',
+                result={'success': True, 'output_summary': '【治療経過】\n経過良好', 'parsed_summary': {}},
+                finished_at=self.CREATED_AT + datetime.timedelta(seconds=30)
+            ),
+        ]
+
+        result = wait_for_generation_job('token', poll_interval=0)
+
+        assert result['success'] is True
+        assert result['output_summary'] == '【治療経過】\n経過良好'
+        assert result['processing_time'] == 30
+        assert mock_st.session_state.summary_generation_time == 30
+        assert 'generation_job' not in mock_st.query_params
+        stream_tabs = mock_st.empty.return_value.container.return_value.tabs.return_value
+        stream_tabs[0].empty.return_value.code.assert_called_once_with('【治療経過】\n経過', language=None, height=150)
+
+    @patch('services.summary_service.get_generation_job')
+    def test_returns_error_when_failed(self, mock_get_job, mock_st):
+        """ジョブが失敗した場合はエラーを返すテスト"""
+        mock_get_job.return_value = self.make_job('failed', error='API呼び出しエラー')
+
+        result = wait_for_generation_job('token', poll_interval=0)
+
+        assert result == {'success': False, 'error': 'API呼び出しエラー'}
+
+    @patch('services.summary_service.get_generation_job', return_value=None)
+    def test_job_not_found(self, mock_get_job, mock_st):
+        """ジョブが見つからない場合はAPIErrorが送出され、URLのトークンが削除されるテスト"""
+        from utils.exceptions import APIError
+
+        with pytest.raises(APIError, match="文書作成ジョブが見つかりません"):
+            wait_for_generation_job('token', poll_interval=0)
+
+        assert 'generation_job' not in mock_st.query_params
+
 
 # フィクスチャーの定義
 @pytest.fixture
@@ -1,6 +1,8 @@
 from unittest.mock import patch
 
-from utils.text_processor import format_output_summary, parse_output_summary, section_aliases
+import pytest
+
+from utils.text_processor import SectionStreamParser, format_output_summary, parse_output_summary, section_aliases
 
 
 class TestFormatOutputSummary:
@@ -207,3 +209,100 @@ class TestSectionAliases:
         for key, value in section_aliases.items():
             assert isinstance(key, str)
             assert isinstance(value, str)
+
+
+class TestSectionStreamParser:
+    """SectionStreamParserクラスのテスト"""
+
+    SAMPLE_OUTPUT = """【治療経過】
+高血圧症に対して薬物療法を実施
+血圧は安定
+特記事項: 転倒リスクあり
+その他
+経過観察を継続
+メモ: 次回受診時に採血"""
+
+    def _feed_in_chunks(self, text, chunk_size):
+        parser = SectionStreamParser()
+        for i in range(0, len(text), chunk_size):
+            parser.feed(text[i:i + chunk_size])
+        return parser
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 50, 1000])
+    def test_finish_matches_batch_parser(self, chunk_size):
+        """どのような分割で受け取っても一括解析と同じ結果になるテスト"""
+        parser = self._feed_in_chunks(self.SAMPLE_OUTPUT, chunk_size)
+
+        assert parser.finish() == parse_output_summary(self.SAMPLE_OUTPUT)
+
+    @patch('utils.text_processor.DEFAULT_SECTION_NAMES', ['診断名', '症状', '治療経過', '備考'])
+    def test_finish_matches_batch_parser_with_custom_sections(self):
+        """セクション名が変更されていても一括解析と同じ結果になるテスト"""
+        text = "診断名: 高血圧症\n症状: 頭痛\nめまい\n治療内容: 薬物療法\n補足: なし\n"
+
+        parser = self._feed_in_chunks(text, 4)
+
+        assert parser.finish() == parse_output_summary(text)
+
+    def test_get_sections_during_streaming(self):
+        """ストリーミング途中でもセクションごとの内容を取得できるテスト"""
+        parser = SectionStreamParser()
+        parser.feed("治療経過: 薬物療法を")
+
+        assert parser.get_sections()["治療経過"] == "薬物療法を"
+
+        parser.feed("実施\n特記事項")
+        sections = parser.get_sections()
+
+        assert sections["治療経過"] == "薬物療法を実施"
+        assert parser.current_section == "治療経過"
+
+        parser.feed(": 特になし")
+        sections = parser.get_sections()
+
+        assert sections["特記事項"] == "特になし"
+        assert sections["備考"] == ""
+
+    def test_get_sections_does_not_consume_pending_line(self):
+        """途中経過の取得が解析状態を変更しないテスト"""
+        parser = SectionStreamParser()
+        parser.feed("備考: 経過")
+        parser.get_sections()
+        parser.feed("良好")
+
+        assert parser.finish()["備考"] == "経過良好"
+
+    def test_empty_stream(self):
+        """何も受け取らない場合のテスト"""
+        assert SectionStreamParser().finish() == parse_output_summary("")
+
+
+class TestSectionDetectorEquivalence:
+    """コンパイル済みセクション検出と従来の実装の一致テスト"""
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_legacy_parser_on_synthetic_output(self, seed):
+        """合成出力に対して従来の実装と同じ解析結果になるテスト"""
+        from scripts.benchmark_section_parser import generate_synthetic_output, legacy_parse_output_summary
+
+        text = generate_synthetic_output(500, seed=seed)
+
+        assert parse_output_summary(text) == legacy_parse_output_summary(text)
+
+    def test_header_variants(self):
+        """各種見出し形式で従来の実装と同じ解析結果になるテスト"""
+        from scripts.benchmark_section_parser import legacy_parse_output_summary
+
+        text = "\n".join([
+            "【治療経過】",
+            "内容1",
+            "■特記事項：転倒注意",
+            "[備考] 補足あり",
+            "治療内容",
+            "内容2",
+            "メモ:",
+            "内容3",
+            "治療経過について説明します",
+        ])
+
+        assert parse_output_summary(text) == legacy_parse_output_summary(text)
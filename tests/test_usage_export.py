@@ -0,0 +1,124 @@
+import datetime
+from unittest.mock import Mock, patch
+
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+from services.usage_export import EXPORT_SCHEMA, iter_usage_batches, write_usage_export
+from utils.exceptions import DatabaseError
+
+START = datetime.datetime(2026, 1, 1, 0, 0)
+END = datetime.datetime(2026, 1, 31, 23, 59)
+
+
+def make_row(record_id: int):
+    return (
+        record_id,
+        datetime.datetime(2026, 1, 1, 0, record_id, tzinfo=datetime.timezone.utc),
+        "主治医意見書作成",
+        "主治医意見書",
+        "Claude",
+        "claude",
+        "内科",
+        "default",
+        1000 + record_id,
+        200,
+        12,
+        None,
+        0,
+        False,
+        False,
+        None,
+        False,
+    )
+
+
+@pytest.fixture
+def mock_session():
+    with patch('services.usage_export.DatabaseManager') as mock_db_manager:
+        session = Mock()
+        mock_db_manager.get_instance.return_value.get_session.return_value = session
+        yield session
+
+
+class TestIterUsageBatches:
+    """iter_usage_batches関数のテスト"""
+
+    def test_streams_with_server_side_cursor(self, mock_session):
+        """サーバーサイドカーソルでbatch_size件ずつ取得するテスト"""
+        mock_session.execute.return_value.partitions.return_value = [[make_row(1), make_row(2)], [make_row(3)]]
+
+        batches = list(iter_usage_batches(START, END, batch_size=2))
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        stmt = mock_session.execute.call_args[0][0]
+        assert stmt.get_execution_options()["stream_results"] is True
+        assert stmt.get_execution_options()["yield_per"] == 2
+        mock_session.close.assert_called_once()
+
+    def test_max_rows(self, mock_session):
+        """max_rowsを指定した場合はその件数までに制限するテスト"""
+        mock_session.execute.return_value.partitions.return_value = []
+
+        list(iter_usage_batches(START, END, max_rows=10))
+
+        stmt = mock_session.execute.call_args[0][0]
+        assert stmt._limit == 10
+
+    def test_database_error(self, mock_session):
+        """取得エラー時にDatabaseErrorが送出されるテスト"""
+        mock_session.execute.side_effect = Exception("接続エラー")
+
+        with pytest.raises(DatabaseError, match="使用量のエクスポートに失敗しました"):
+            list(iter_usage_batches(START, END))
+
+        mock_session.close.assert_called_once()
+
+
+class TestWriteUsageExport:
+    """write_usage_export関数のテスト"""
+
+    def test_parquet_row_groups(self, mock_session, tmp_path):
+        """バッチごとにRow Groupとして書き出されるテスト"""
+        mock_session.execute.return_value.partitions.return_value = [[make_row(1), make_row(2)], [make_row(3)]]
+        path = str(tmp_path / "usage.parquet")
+
+        exported = write_usage_export(path, "parquet", START, END, batch_size=2)
+
+        assert exported == 3
+        parquet_file = pq.ParquetFile(path)
+        assert parquet_file.num_row_groups == 2
+        table = parquet_file.read()
+        assert table.schema == EXPORT_SCHEMA
+        assert table.column("input_tokens").to_pylist() == [1001, 1002, 1003]
+
+    def test_csv(self, mock_session, tmp_path):
+        """CSVにJSTの日時で書き出されるテスト"""
+        mock_session.execute.return_value.partitions.return_value = [[make_row(1)]]
+        path = str(tmp_path / "usage.csv")
+
+        exported = write_usage_export(path, "csv", START, END)
+
+        assert exported == 1
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert lines[0].startswith('"id","date","app_type"')
+        assert "2026-01-01 09:01:00.000000+0900" in lines[1]
+        assert '"主治医意見書"' in lines[1]
+
+    def test_empty(self, mock_session, tmp_path):
+        """レコードがない場合はヘッダーのみ書き出されるテスト"""
+        mock_session.execute.return_value.partitions.return_value = []
+        path = str(tmp_path / "usage.csv")
+
+        assert write_usage_export(path, "csv", START, END) == 0
+
+        table = pa_csv.read_csv(path)
+        assert table.num_rows == 0
+        assert table.column_names == EXPORT_SCHEMA.names
+
+    def test_invalid_format(self, tmp_path):
+        """未対応の出力形式の場合はValueErrorが送出されるテスト"""
+        with pytest.raises(ValueError):
+            write_usage_export(str(tmp_path / "usage.xlsx"), "xlsx", START, END)
@@ -0,0 +1,129 @@
+import datetime
+from unittest.mock import Mock
+
+import pytz
+from sqlalchemy.dialects import postgresql
+
+from services.usage_rollup import aggregate_usage_rows, detect_provider, increment_daily_rollup, to_jst
+
+JST = pytz.timezone('Asia/Tokyo')
+
+
+def make_row(date: datetime.datetime, department: str = "内科", input_tokens: int = 100):
+    return {
+        "date": date,
+        "model_detail": "claude-sonnet",
+        "document_types": "主治医意見書",
+        "department": department,
+        "doctor": "default",
+        "input_tokens": input_tokens,
+        "output_tokens": 50,
+        "processing_time": 3,
+    }
+
+
+class TestToJst:
+    """to_jst関数のテスト"""
+
+    def test_naive_datetime_is_treated_as_jst(self):
+        """タイムゾーンのない日時はJSTとして扱われるテスト"""
+        result = to_jst(datetime.datetime(2026, 1, 1, 9, 0))
+
+        assert result.utcoffset() == datetime.timedelta(hours=9)
+        assert result.hour == 9
+
+    def test_aware_datetime_is_converted(self):
+        """UTCの日時がJSTに変換されるテスト"""
+        result = to_jst(datetime.datetime(2026, 1, 1, 16, 0, tzinfo=datetime.timezone.utc))
+
+        assert result.date() == datetime.date(2026, 1, 2)
+
+
+class TestDetectProvider:
+    """detect_provider関数のテスト"""
+
+    def test_claude(self):
+        """Claudeのモデル名からclaudeと判定されるテスト"""
+        assert detect_provider("Claude") == "claude"
+        assert detect_provider("anthropic.claude-sonnet-4") == "claude"
+
+    def test_gemini(self):
+        """Geminiのモデル名からgeminiと判定されるテスト"""
+        assert detect_provider("gemini-2.5-pro") == "gemini"
+
+    def test_unknown(self):
+        """判定できない場合はNoneになるテスト"""
+        assert detect_provider("gpt-4o") is None
+        assert detect_provider(None) is None
+
+
+class TestAggregateUsageRows:
+    """aggregate_usage_rows関数のテスト"""
+
+    def test_groups_by_jst_day_and_dimensions(self):
+        """JSTの日付と各項目ごとに件数とトークン数が合計されるテスト"""
+        rows = [
+            make_row(JST.localize(datetime.datetime(2026, 1, 1, 10, 0)), input_tokens=100),
+            make_row(JST.localize(datetime.datetime(2026, 1, 1, 23, 0)), input_tokens=200),
+            make_row(datetime.datetime(2026, 1, 1, 16, 0, tzinfo=datetime.timezone.utc)),
+            make_row(JST.localize(datetime.datetime(2026, 1, 1, 12, 0)), department="外科"),
+        ]
+
+        result = aggregate_usage_rows(rows)
+
+        by_key = {(row["usage_date"], row["department"]): row for row in result}
+        assert len(result) == 3
+        assert by_key[(datetime.date(2026, 1, 1), "内科")]["count"] == 2
+        assert by_key[(datetime.date(2026, 1, 1), "内科")]["input_tokens"] == 300
+        assert by_key[(datetime.date(2026, 1, 1), "内科")]["processing_time"] == 6
+        assert by_key[(datetime.date(2026, 1, 2), "内科")]["count"] == 1
+        assert by_key[(datetime.date(2026, 1, 1), "外科")]["count"] == 1
+        assert by_key[(datetime.date(2026, 1, 1), "外科")]["provider"] == "claude"
+
+    def test_null_values(self):
+        """文書タイプがNoneやトークン数がNoneのレコードも集計されるテスト"""
+        row = make_row(JST.localize(datetime.datetime(2026, 1, 1, 10, 0)))
+        row["document_types"] = None
+        row["input_tokens"] = None
+
+        result = aggregate_usage_rows([row, dict(row)])
+
+        assert len(result) == 1
+        assert result[0]["document_types"] is None
+        assert result[0]["count"] == 2
+        assert result[0]["input_tokens"] == 0
+
+    def test_ordered_consistently(self):
+        """入力の順序によらず同じ順序で返されるテスト"""
+        rows = [
+            make_row(JST.localize(datetime.datetime(2026, 1, 2, 10, 0)), department="外科"),
+            make_row(JST.localize(datetime.datetime(2026, 1, 1, 10, 0)), department="内科"),
+        ]
+
+        assert aggregate_usage_rows(rows) == aggregate_usage_rows(list(reversed(rows)))
+
+
+class TestIncrementDailyRollup:
+    """increment_daily_rollup関数のテスト"""
+
+    def test_upsert_adds_to_existing_counts(self):
+        """既存のロールアップに件数とトークン数を加算するupsertが実行されるテスト"""
+        session = Mock()
+
+        increment_daily_rollup(session, [make_row(JST.localize(datetime.datetime(2026, 1, 1, 10, 0)))])
+
+        stmt, params = session.execute.call_args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (usage_date, model_detail, document_types, department, doctor) DO UPDATE" in sql
+        assert "count = (summary_usage_daily.count + excluded.count)" in sql
+        assert "input_tokens = (summary_usage_daily.input_tokens + excluded.input_tokens)" in sql
+        assert params[0]["usage_date"] == datetime.date(2026, 1, 1)
+        assert params[0]["count"] == 1
+
+    def test_empty_rows(self):
+        """レコードがない場合は何も実行しないテスト"""
+        session = Mock()
+
+        increment_daily_rollup(session, [])
+
+        session.execute.assert_not_called()
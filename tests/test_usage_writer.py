@@ -0,0 +1,143 @@
+import datetime
+import json
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from database.models import SummaryUsage
+from services.usage_writer import UsageWriter
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / "usage_spill.jsonl")
+
+
+@pytest.fixture
+def mock_db_instance():
+    with patch('services.usage_writer.DatabaseManager') as mock_db_manager:
+        instance = Mock()
+        instance.bulk_insert.side_effect = lambda model_class, rows, on_write=None: len(rows)
+        mock_db_manager.get_instance.return_value = instance
+        yield instance
+
+
+def make_row(index: int = 0):
+    return {
+        "date": datetime.datetime(2026, 1, 1, 9, 0, index),
+        "model_detail": "claude",
+        "input_tokens": 100 + index,
+        "output_tokens": 50,
+    }
+
+
+class TestUsageWriter:
+    """UsageWriterクラスのテスト"""
+
+    def test_flush_writes_in_batches(self, mock_db_instance, spill_path):
+        """batch_size件ずつ一括挿入されるテスト"""
+        writer = UsageWriter(batch_size=2, spill_path=spill_path)
+        for index in range(5):
+            writer._queue.put_nowait(make_row(index))
+
+        assert writer.flush() == 5
+
+        assert [len(call[0][1]) for call in mock_db_instance.bulk_insert.call_args_list] == [2, 2, 1]
+        assert mock_db_instance.bulk_insert.call_args[0][0] == SummaryUsage
+        assert writer.get_stats()["written"] == 5
+
+    def test_submit_writes_in_background(self, mock_db_instance, spill_path):
+        """submitしたレコードがバックグラウンドで書き込まれるテスト"""
+        writer = UsageWriter(batch_size=1, flush_interval=0.05, spill_path=spill_path)
+
+        writer.submit(make_row())
+        writer.shutdown(timeout=1.0)
+
+        mock_db_instance.bulk_insert.assert_called_once()
+        assert writer.get_stats()["written"] == 1
+
+    def test_database_error_spills_to_file(self, mock_db_instance, spill_path):
+        """データベースに書き込めない場合はファイルに退避されるテスト"""
+        mock_db_instance.bulk_insert.side_effect = Exception("接続エラー")
+        writer = UsageWriter(batch_size=10, spill_path=spill_path)
+        writer._queue.put_nowait(make_row(1))
+
+        with patch('builtins.print'):
+            assert writer.flush() == 0
+
+        with open(spill_path, encoding="utf-8") as f:
+            spilled = [json.loads(line) for line in f]
+        assert spilled[0]["input_tokens"] == 101
+        assert spilled[0]["date"] == "2026-01-01T09:00:01"
+        stats = writer.get_stats()
+        assert stats["spilled"] == 1
+        assert stats["failed_batches"] == 1
+
+    def test_full_queue_spills_to_file(self, mock_db_instance, spill_path):
+        """キューが一杯の場合はファイルに退避されるテスト"""
+        writer = UsageWriter(max_queue_size=1, spill_path=spill_path)
+
+        with patch.object(writer, '_ensure_started'):
+            writer.submit(make_row(1))
+            writer.submit(make_row(2))
+
+        assert writer.get_stats()["queued"] == 1
+        assert writer.get_stats()["spilled"] == 1
+
+    def test_replay_spill(self, mock_db_instance, spill_path):
+        """退避したレコードが日時を復元して再投入されるテスト"""
+        writer = UsageWriter(batch_size=10, spill_path=spill_path)
+        writer._spill([make_row(1), make_row(2)])
+
+        assert writer.replay_spill() == 2
+
+        rows = mock_db_instance.bulk_insert.call_args[0][1]
+        assert rows[0]["date"] == datetime.datetime(2026, 1, 1, 9, 0, 1)
+        assert not os.path.exists(spill_path)
+        assert not os.path.exists(f"{spill_path}.replay")
+
+    def test_replay_after_recovery(self, mock_db_instance, spill_path):
+        """書き込みに成功した時点で退避済みのレコードが再投入されるテスト"""
+        writer = UsageWriter(batch_size=10, spill_path=spill_path)
+        writer._spill([make_row(1)])
+        writer._queue.put_nowait(make_row(2))
+
+        writer.flush()
+
+        assert mock_db_instance.bulk_insert.call_count == 2
+        assert writer.get_stats()["replayed"] == 1
+        assert not os.path.exists(spill_path)
+
+    def test_replay_failure_keeps_file(self, mock_db_instance, spill_path):
+        """再投入に失敗した場合は退避ファイルが残るテスト"""
+        mock_db_instance.bulk_insert.side_effect = Exception("接続エラー")
+        writer = UsageWriter(batch_size=10, spill_path=spill_path)
+        writer._spill([make_row(1)])
+
+        with patch('builtins.print'):
+            assert writer.replay_spill() == 0
+
+        assert os.path.exists(f"{spill_path}.replay")
+
+    def test_on_write_passed_to_bulk_insert(self, mock_db_instance, spill_path):
+        """一括挿入と同じトランザクションで実行する書き込みが渡されるテスト"""
+        on_write = Mock()
+        writer = UsageWriter(batch_size=10, spill_path=spill_path, on_write=on_write)
+        writer._queue.put_nowait(make_row(1))
+
+        writer.flush()
+
+        assert mock_db_instance.bulk_insert.call_args[1]["on_write"] is on_write
+
+    def test_flush_listener(self, mock_db_instance, spill_path):
+        """書き込みに成功したレコードがリスナーに渡されるテスト"""
+        writer = UsageWriter(batch_size=10, spill_path=spill_path)
+        listener = Mock()
+        writer.add_flush_listener(listener)
+        writer._queue.put_nowait(make_row(1))
+
+        writer.flush()
+
+        listener.assert_called_once()
+        assert listener.call_args[0][0][0]["input_tokens"] == 101
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from cachetools import TTLCache
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """
+    件数上限付きLRUとTTLを組み合わせたスレッドセーフなキャッシュ
+
+    値がNoneの場合もキャッシュするため、get()はヒットしたかどうかと値の組を返す。
+    """
+
+    def __init__(self, maxsize: int, ttl: float, getsizeof: Optional[Callable[[Any], float]] = None,
+                 timer: Callable[[], float] = time.monotonic):
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer, getsizeof=getsizeof)
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self._misses += 1
+                return False, None
+            self._hits += 1
+            return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            try:
+                self._cache[key] = value
+            except ValueError:
+                # 1件で上限を超える値はキャッシュしない
+                pass
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._cache.pop(key, _MISSING) is not _MISSING:
+                self._invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """条件に一致するキーをすべて削除し、削除した件数を返す"""
+        with self._lock:
+            keys = [key for key in list(self._cache.keys()) if predicate(key)]
+            for key in keys:
+                self._cache.pop(key, None)
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._invalidations += len(self._cache)
+            self._cache.clear()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._invalidations = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "invalidations": self._invalidations,
+            }
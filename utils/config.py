@@ -71,3 +71,149 @@ MAX_TOKEN_THRESHOLD: int = int(os.environ.get("MAX_TOKEN_THRESHOLD", "100000"))
 PROMPT_MANAGEMENT: bool = os.environ.get("PROMPT_MANAGEMENT", "False").lower() == "true"
 
 APP_TYPE: str = os.environ.get("APP_TYPE", "default")
+
+CLIENT_CREDENTIAL_REFRESH_INTERVAL: int = int(os.environ.get("CLIENT_CREDENTIAL_REFRESH_INTERVAL", "300"))
+
+# 有効にすると他のワーカーでのプロンプト変更をLISTEN/NOTIFYで受け取り、キャッシュを即時に破棄する
+PROMPT_CHANGE_LISTENER_ENABLED: bool = os.environ.get("PROMPT_CHANGE_LISTENER_ENABLED", "False").lower() == "true"
+
+# 変更通知を受け取る場合は期限切れを待つ必要がないため、既定のTTLを長くする
+PROMPT_CACHE_TTL: int = int(os.environ.get("PROMPT_CACHE_TTL", "86400" if PROMPT_CHANGE_LISTENER_ENABLED else "600"))
+PROMPT_CACHE_MAX_SIZE: int = int(os.environ.get("PROMPT_CACHE_MAX_SIZE", "256"))
+
+# 文書作成・評価のAPI呼び出しを実行する共有スレッドプール
+EXECUTOR_MAX_WORKERS: int = int(os.environ.get("EXECUTOR_MAX_WORKERS", "8"))
+EXECUTOR_MAX_QUEUE_SIZE: int = int(os.environ.get("EXECUTOR_MAX_QUEUE_SIZE", "32"))
+# 完了待ちの間に経過時間の表示を更新する間隔（秒）
+EXECUTOR_POLL_INTERVAL: float = float(os.environ.get("EXECUTOR_POLL_INTERVAL", "0.2"))
+
+
+def parse_mapping(value: str) -> Dict[str, float]:
+    """「内科=2,外科=1」形式の設定値を辞書に変換する"""
+    mapping = {}
+    for item in value.split(","):
+        key, separator, number = item.partition("=")
+        if separator and key.strip():
+            mapping[key.strip()] = float(number)
+    return mapping
+
+
+# LLM呼び出しのスケジューラー：プロバイダーごとの同時実行数（「claude=4,gemini=4」形式で個別に指定可能）
+SCHEDULER_MAX_CONCURRENCY: int = int(os.environ.get("SCHEDULER_MAX_CONCURRENCY", str(EXECUTOR_MAX_WORKERS)))
+SCHEDULER_PROVIDER_CONCURRENCY: Dict[str, float] = parse_mapping(os.environ.get("SCHEDULER_PROVIDER_CONCURRENCY", ""))
+# プロバイダーごとの待機数と、診療科・医師ごとの待機数の上限（超えた場合は待ち時間の目安を表示して受け付けない）
+SCHEDULER_MAX_QUEUE_SIZE: int = int(os.environ.get("SCHEDULER_MAX_QUEUE_SIZE", "32"))
+SCHEDULER_MAX_QUEUE_PER_KEY: int = int(os.environ.get("SCHEDULER_MAX_QUEUE_PER_KEY", "8"))
+# 実行開始までの待機時間の上限（秒）
+SCHEDULER_MAX_WAIT: float = float(os.environ.get("SCHEDULER_MAX_WAIT", "300"))
+# 診療科（または「診療科/医師」）ごとの重み（「内科=2,整形外科=1」形式。未指定は1）
+SCHEDULER_WEIGHTS: Dict[str, float] = parse_mapping(os.environ.get("SCHEDULER_WEIGHTS", ""))
+
+# プロバイダー（または「プロバイダー/モデル」）ごとの1分あたりのリクエスト数・トークン数の上限（「claude=50,gemini=60」形式。未指定は無制限）
+RATE_LIMIT_RPM: Dict[str, float] = parse_mapping(os.environ.get("RATE_LIMIT_RPM", ""))
+RATE_LIMIT_TPM: Dict[str, float] = parse_mapping(os.environ.get("RATE_LIMIT_TPM", ""))
+# memory: プロセス内で共有 / postgres: rate_limit_bucketsテーブルで全プロセスに共有
+RATE_LIMIT_BACKEND: str = os.environ.get("RATE_LIMIT_BACKEND", "memory").lower()
+# 呼び出し前に予約する出力トークン数（完了後に実際のトークン数で精算する）
+RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE: int = int(os.environ.get("RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE", "6000"))
+# 上限に達している場合に待機する時間の上限（秒）
+RATE_LIMIT_MAX_WAIT: float = float(os.environ.get("RATE_LIMIT_MAX_WAIT", "120"))
+
+
+def get_retry_settings(provider: str) -> Dict[str, Any]:
+    """
+    API呼び出しの再試行の設定を返す
+
+    プロバイダー別の環境変数（例: RETRY_MAX_ATTEMPTS_GEMINI）、共通の環境変数（例: RETRY_MAX_ATTEMPTS）の順に参照する。
+    """
+    def setting(name: str, default: str) -> str:
+        return os.environ.get(f"{name}_{provider.upper()}", os.environ.get(name, default))
+
+    return {
+        # 1回目を含む最大試行回数
+        "max_attempts": int(setting("RETRY_MAX_ATTEMPTS", "3")),
+        # 再試行までの待機時間は base_delay * 2^(再試行回数-1) を上限とするランダムな値（max_delayまで）
+        "base_delay": float(setting("RETRY_BASE_DELAY", "1.0")),
+        "max_delay": float(setting("RETRY_MAX_DELAY", "20.0")),
+        # 再試行を含めて完了するまでの期限（秒）。一括生成の呼び出しは途中で中断できないため、期限を過ぎても完了まで待つ
+        "deadline": float(setting("RETRY_DEADLINE", "300")),
+        # 有効にすると、ストリーミングで最初のトークンがp95を超えて遅い場合に同じリクエストをもう1件送り、
+        # 先に応答した方を採用する。p95はhedge_min_samples件以上の実績がある場合のみ計算する
+        "hedge_enabled": setting("RETRY_HEDGE_ENABLED", "False").lower() == "true",
+        "hedge_min_samples": int(setting("RETRY_HEDGE_MIN_SAMPLES", "20")),
+    }
+
+
+# プロバイダーごとのサーキットブレーカー：直近CIRCUIT_BREAKER_WINDOW_SIZE件（CIRCUIT_BREAKER_MIN_CALLS件以上）の
+# エラー率または遅い呼び出し（CIRCUIT_BREAKER_SLOW_CALL_SECONDS秒超）の割合が閾値以上になると遮断し、他のプロバイダーに切り替える
+# 選択していないプロバイダーで文書が作成されることになるため、既定では無効
+CIRCUIT_BREAKER_ENABLED: bool = os.environ.get("CIRCUIT_BREAKER_ENABLED", "False").lower() == "true"
+CIRCUIT_BREAKER_WINDOW_SIZE: int = int(os.environ.get("CIRCUIT_BREAKER_WINDOW_SIZE", "20"))
+CIRCUIT_BREAKER_MIN_CALLS: int = int(os.environ.get("CIRCUIT_BREAKER_MIN_CALLS", "10"))
+CIRCUIT_BREAKER_FAILURE_RATE: float = float(os.environ.get("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = float(os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "120"))
+CIRCUIT_BREAKER_SLOW_CALL_RATE: float = float(os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8"))
+# 遮断してから試験的な呼び出しを再開するまでの秒数と、遮断を解除するまでに成功が必要な試験的な呼び出しの回数
+CIRCUIT_BREAKER_OPEN_SECONDS: float = float(os.environ.get("CIRCUIT_BREAKER_OPEN_SECONDS", "60"))
+CIRCUIT_BREAKER_PROBE_SUCCESSES: int = int(os.environ.get("CIRCUIT_BREAKER_PROBE_SUCCESSES", "2"))
+
+# 有効にすると入力がMAX_TOKEN_THRESHOLDを超える場合にモデルを切り替えず、カルテを日付の区切りで分割して並列に作成してから統合する
+CHUNKED_SUMMARY_ENABLED: bool = os.environ.get("CHUNKED_SUMMARY_ENABLED", "False").lower() == "true"
+# 分割する大きさ（文字数）と、同時に作成する数（SCHEDULER_MAX_QUEUE_PER_KEY以下にする）
+CHUNKED_SUMMARY_CHUNK_SIZE: int = int(os.environ.get("CHUNKED_SUMMARY_CHUNK_SIZE", str(MAX_TOKEN_THRESHOLD // 2)))
+CHUNKED_SUMMARY_MAX_WORKERS: int = int(os.environ.get("CHUNKED_SUMMARY_MAX_WORKERS", "4"))
+# 分割した部分ごとの作成結果のキャッシュ（再実行時は変更された部分だけを作成する）
+CHUNK_CACHE_TTL: int = int(os.environ.get("CHUNK_CACHE_TTL", "86400"))
+CHUNK_CACHE_MAX_SIZE: int = int(os.environ.get("CHUNK_CACHE_MAX_SIZE", "1024"))
+
+# 有効にすると、プロバイダー・モデル・プロンプト・生成パラメータが同じリクエストはAPIを呼び出さずに前回の結果を返す
+RESPONSE_CACHE_ENABLED: bool = os.environ.get("RESPONSE_CACHE_ENABLED", "False").lower() == "true"
+# memory: プロセス内のLRU / disk: RESPONSE_CACHE_DIRのファイル / postgres: response_cacheテーブルで全プロセスに共有
+RESPONSE_CACHE_BACKEND: str = os.environ.get("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_TTL: int = int(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_SIZE: int = int(os.environ.get("RESPONSE_CACHE_MAX_SIZE", "256"))
+RESPONSE_CACHE_DIR: str = os.environ.get("RESPONSE_CACHE_DIR", "response_cache")
+
+# 有効にすると文書作成をgeneration_jobsテーブルに登録し、別プロセスのワーカー（Procfileのworker）で実行する
+# 使用量はワーカーが記録するため、統計画面のキャッシュへの即時反映にはPROMPT_CHANGE_LISTENER_ENABLEDも有効にする
+GENERATION_JOB_QUEUE_ENABLED: bool = os.environ.get("GENERATION_JOB_QUEUE_ENABLED", "False").lower() == "true"
+# 画面がジョブの状態を確認する間隔（秒）
+GENERATION_JOB_POLL_INTERVAL: float = float(os.environ.get("GENERATION_JOB_POLL_INTERVAL", "0.5"))
+# ワーカーの同時実行数と、ジョブがないときに次のジョブを確認する間隔（秒）
+GENERATION_WORKER_CONCURRENCY: int = int(os.environ.get("GENERATION_WORKER_CONCURRENCY", "4"))
+GENERATION_WORKER_POLL_INTERVAL: float = float(os.environ.get("GENERATION_WORKER_POLL_INTERVAL", "1.0"))
+# 実行中のジョブの生存確認（生成途中のテキストの書き込み）の間隔と、
+# 生存確認が途絶えたジョブを他のワーカーが再実行するまでの秒数
+GENERATION_JOB_HEARTBEAT_INTERVAL: float = float(os.environ.get("GENERATION_JOB_HEARTBEAT_INTERVAL", "1.0"))
+GENERATION_JOB_LEASE_SECONDS: int = int(os.environ.get("GENERATION_JOB_LEASE_SECONDS", "60"))
+GENERATION_JOB_MAX_ATTEMPTS: int = int(os.environ.get("GENERATION_JOB_MAX_ATTEMPTS", "3"))
+# 完了したジョブ（入力したカルテ記載を含む）を削除するまでの時間
+GENERATION_JOB_RETENTION_HOURS: int = int(os.environ.get("GENERATION_JOB_RETENTION_HOURS", "24"))
+
+USAGE_WRITER_BATCH_SIZE: int = int(os.environ.get("USAGE_WRITER_BATCH_SIZE", "50"))
+USAGE_WRITER_FLUSH_INTERVAL: float = float(os.environ.get("USAGE_WRITER_FLUSH_INTERVAL", "2.0"))
+USAGE_WRITER_MAX_QUEUE_SIZE: int = int(os.environ.get("USAGE_WRITER_MAX_QUEUE_SIZE", "10000"))
+# PostgreSQLに書き込めない場合の退避先（追記専用のJSON Lines形式）
+USAGE_WRITER_SPILL_PATH: str = os.environ.get(
+    "USAGE_WRITER_SPILL_PATH", str(Path(__file__).parent.parent / "usage_spill.jsonl")
+)
+
+STATISTICS_PAGE_SIZE: int = int(os.environ.get("STATISTICS_PAGE_SIZE", "100"))
+# 統計画面の集計結果のキャッシュ（上限は集計結果と詳細レコードの合計行数）
+STATISTICS_CACHE_TTL: int = int(os.environ.get("STATISTICS_CACHE_TTL", "60"))
+STATISTICS_CACHE_MAX_ROWS: int = int(os.environ.get("STATISTICS_CACHE_MAX_ROWS", "100000"))
+
+# 使用量のエクスポートで1回に取得・書き出す件数（ParquetのRow Groupの行数）
+USAGE_EXPORT_BATCH_SIZE: int = int(os.environ.get("USAGE_EXPORT_BATCH_SIZE", "50000"))
+# 統計画面からエクスポートする件数の上限（ダウンロードするまでセッションのメモリに保持するため）
+# 上限を超える期間はscripts/export_usage.pyで書き出す
+USAGE_EXPORT_UI_MAX_ROWS: int = int(os.environ.get("USAGE_EXPORT_UI_MAX_ROWS", "100000"))
+
+# summary_usageの月別パーティションを当月から何か月先まで作成しておくか
+USAGE_PARTITION_MONTHS_AHEAD: int = int(os.environ.get("USAGE_PARTITION_MONTHS_AHEAD", "3"))
+# パーティションを保持する月数（当月を除く。0の場合は期限なし）
+USAGE_RETENTION_MONTHS: int = int(os.environ.get("USAGE_RETENTION_MONTHS", "0"))
+# 保持期間を過ぎたパーティションのアーカイブ先（CSV.gz）
+USAGE_ARCHIVE_DIR: str = os.environ.get(
+    "USAGE_ARCHIVE_DIR", str(Path(__file__).parent.parent / "usage_archive")
+)
@@ -42,6 +42,14 @@ MESSAGES = {
     "EMPTY_RESPONSE": "レスポンスが空です",
 
     "UNSUPPORTED_API_PROVIDER": "未対応のAPIプロバイダー: {provider}",
+    "EXECUTOR_QUEUE_FULL": "処理が混み合っています。しばらく待ってから再度実行してください。",
+    "SCHEDULER_QUEUE_FULL": "処理が混み合っています。約{wait_seconds}秒後に再度実行してください。",
+    "SCHEDULER_WAIT_TIMEOUT": "処理が混み合っているため、{timeout:.0f}秒待っても開始できませんでした。しばらく待ってから再度実行してください。",
+    "API_DEADLINE_EXCEEDED": "API呼び出しが{deadline:.0f}秒以内に完了しませんでした",
+    "CIRCUIT_OPEN": "{provider}のAPIで障害が発生しているため、一時的に呼び出しを停止しています。しばらく待ってから再度実行してください。",
+    "MODEL_SWITCHED_CIRCUIT_OPEN": "⚠️ {original_model}のAPIで障害が発生しているため{model}に切り替えました",
+    "RATE_LIMIT_EXCEEDED": "APIの利用上限に達しています。約{wait_seconds}秒後に再度実行してください。",
+    "GENERATION_JOB_NOT_FOUND": "文書作成ジョブが見つかりません。保持期間を過ぎて削除された可能性があります。",
 
     "DATABASE_URL_PARSE_ERROR": "DATABASE_URLの解析に失敗しました: {error}",
     "DATABASE_CONNECTION_INFO_MISSING": "PostgreSQL接続情報が設定されていません。環境変数または設定ファイルを確認してください。",
@@ -50,11 +58,16 @@ MESSAGES = {
     "DATABASE_QUERY_ERROR": "クエリ実行中にエラーが発生しました: {error}",
     "DATABASE_GET_RECORD_ERROR": "レコード取得中にエラーが発生しました: {error}",
     "DATABASE_INSERT_ERROR": "レコード挿入中にエラーが発生しました: {error}",
+    "DATABASE_BULK_INSERT_ERROR": "レコードの一括挿入中にエラーが発生しました: {error}",
     "DATABASE_UPDATE_ERROR": "レコード更新中にエラーが発生しました: {error}",
     "DATABASE_UPSERT_ERROR": "レコードのupsert中にエラーが発生しました: {error}",
     "DATABASE_DELETE_ERROR": "レコード削除中にエラーが発生しました: {error}",
     "DATABASE_COUNT_ERROR": "カウント実行中にエラーが発生しました: {error}",
     "DATABASE_TABLE_CREATE_ERROR": "テーブル作成中にエラーが発生しました: {error}",
+    "DATABASE_PARTITION_ERROR": "パーティションの管理中にエラーが発生しました: {error}",
+    "DATABASE_RESPONSE_CACHE_ERROR": "応答キャッシュの読み書き中にエラーが発生しました: {error}",
+    "DATABASE_RATE_LIMIT_ERROR": "利用上限の記録中にエラーが発生しました: {error}",
+    "DATABASE_GENERATION_JOB_ERROR": "文書作成ジョブの操作中にエラーが発生しました: {error}",
     "DATABASE_INIT_FAILED": "データベースの初期化に失敗しました: {error}",
 
     "COPY_INSTRUCTION": "💡 テキストエリアの右上にマウスを合わせて左クリックでコピーできます",
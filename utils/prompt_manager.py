@@ -1,13 +1,19 @@
 import datetime
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 from database.db import DatabaseManager
 from database.models import Prompt
+from database.notifier import notify_prompt_change, prompt_change_listener
 from database.schema import initialize_database as init_schema
-from utils.config import get_config
+from utils.cache import TTLLRUCache
+from utils.config import PROMPT_CACHE_MAX_SIZE, PROMPT_CACHE_TTL, get_config
 from utils.constants import DEFAULT_DEPARTMENT, DEFAULT_DOCUMENT_TYPE, DEPARTMENT_DOCTORS_MAPPING, DOCUMENT_TYPES
 from utils.exceptions import AppError, DatabaseError
 
+# (診療科, 文書タイプ, 医師名)ごとのget_promptの結果（デフォルトプロンプトへのフォールバックを含む）
+prompt_cache = TTLLRUCache(maxsize=PROMPT_CACHE_MAX_SIZE, ttl=PROMPT_CACHE_TTL)
+
 
 def get_db_manager() -> DatabaseManager:
     try:
@@ -32,11 +38,53 @@ def get_all_prompts() -> List[Dict[str, Any]]:
         raise DatabaseError(f"プロンプト一覧の取得に失敗しました: {str(e)}")
 
 
+def invalidate_prompt_cache(department: str, document_type: str, doctor: str) -> None:
+    """
+    プロンプトの変更をキャッシュに反映する
+
+    デフォルトプロンプトはフォールバック先として他のキーにもキャッシュされているため、
+    デフォルトプロンプトが変更された場合はすべて破棄する。
+    """
+    if department == "default" and document_type == DEFAULT_DOCUMENT_TYPE and doctor == "default":
+        prompt_cache.clear()
+    else:
+        prompt_cache.invalidate((department, document_type, doctor))
+
+
+def publish_prompt_change(department: str, document_type: str, doctor: str) -> None:
+    """自プロセスのキャッシュを破棄し、他のワーカーにも変更を通知する"""
+    invalidate_prompt_cache(department, document_type, doctor)
+    notify_prompt_change("prompts", {"department": department, "document_type": document_type, "doctor": doctor})
+
+
+def _on_prompt_change(keys: Optional[Dict[str, Any]]) -> None:
+    department = keys.get("department") if keys else None
+    document_type = keys.get("document_type") if keys else None
+    doctor = keys.get("doctor") if keys else None
+    # キーが欠けている通知は対象を特定できないため、すべて破棄する
+    if department is None or document_type is None or doctor is None:
+        prompt_cache.clear()
+        return
+    invalidate_prompt_cache(str(department), str(document_type), str(doctor))
+
+
+prompt_change_listener.register_handler("prompts", _on_prompt_change)
+
+
+def get_prompt_cache_stats() -> Dict[str, Any]:
+    return prompt_cache.get_stats()
+
+
 def get_prompt(
         department: str = "default",
         document_type: str = DEFAULT_DOCUMENT_TYPE,
         doctor: str = "default"
 ) -> Optional[Dict[str, Any]]:
+    cache_key = (department, document_type, doctor)
+    found, cached_prompt = prompt_cache.get(cache_key)
+    if found:
+        return dict(cached_prompt) if cached_prompt else cached_prompt
+
     try:
         db_manager = get_db_manager()
 
@@ -58,11 +106,12 @@ def get_prompt(
                 "is_default": True
             })
 
-        return prompt
-
     except Exception as e:
         raise DatabaseError(f"プロンプトの取得に失敗しました: {str(e)}")
 
+    prompt_cache.set(cache_key, prompt)
+    return dict(prompt) if prompt else prompt
+
 
 def create_or_update_prompt(
         department: str,
@@ -96,32 +145,18 @@ def create_or_update_prompt(
             "doctor": doctor
         }
 
-        existing = db_manager.query_one(Prompt, filters)
+        now = get_current_datetime()
+        _, created = db_manager.upsert_with_status(
+            Prompt,
+            filters,
+            {"content": content, "selected_model": selected_model},
+            insert_only={"is_default": False, "created_at": now, "updated_at": now}
+        )
+        publish_prompt_change(department, document_type, doctor)
 
-        if existing:
-            db_manager.update(
-                Prompt,
-                filters,
-                {
-                "content": content,
-                "selected_model": selected_model
-            })
-            return True, "プロンプトを更新しました"
-        else:
-            now = get_current_datetime()
-            db_manager.insert(
-                Prompt,
-                {
-                "department": department,
-                "document_type": document_type,
-                "doctor": doctor,
-                "content": content,
-                "selected_model": selected_model,
-                "is_default": False,
-                "created_at": now,
-                "updated_at": now
-            })
+        if created:
             return True, "プロンプトを新規作成しました"
+        return True, "プロンプトを更新しました"
 
     except DatabaseError as e:
         return False, str(e)
@@ -149,6 +184,7 @@ def delete_prompt(
         })
 
         if deleted:
+            publish_prompt_change(department, document_type, doctor)
             return True, "プロンプトを削除しました"
         else:
             return False, "プロンプトが見つかりません"
@@ -187,47 +223,53 @@ def initialize_default_prompt() -> None:
                 "created_at": now,
                 "updated_at": now
             })
+            publish_prompt_change("default", DEFAULT_DOCUMENT_TYPE, "default")
 
     except Exception as e:
         raise DatabaseError(f"デフォルトプロンプトの初期化に失敗しました: {str(e)}")
 
 
-def initialize_database() -> None:
+def initialize_database() -> int:
+    """
+    診療科・医師・文書タイプの組み合わせごとに未登録のプロンプトを一括作成する
+
+    Returns:
+        作成したプロンプトの件数
+    """
     try:
         init_schema()
         initialize_default_prompt()
 
+        start_time = time.perf_counter()
         db_manager = get_db_manager()
         config = get_config()
         default_prompt_content = config['PROMPTS']['summary']
-        departments = DEFAULT_DEPARTMENT
-        document_types = DOCUMENT_TYPES
-
-        for dept in departments:
-            doctors = DEPARTMENT_DOCTORS_MAPPING.get(dept, ["default"])
-            for doctor in doctors:
-                for doc_type in document_types:
-                    existing = db_manager.query_one(
-                        Prompt,
-                        {
-                        "department": dept,
-                        "document_type": doc_type,
-                        "doctor": doctor
-                    })
-
-                    if not existing:
-                        now = get_current_datetime()
-                        db_manager.insert(
-                            Prompt,
-                            {
-                            "department": dept,
-                            "document_type": doc_type,
-                            "doctor": doctor,
-                            "content": default_prompt_content,
-                            "is_default": False,
-                            "created_at": now,
-                            "updated_at": now
-                        })
+        now = get_current_datetime()
+
+        rows = [
+            {
+                "department": dept,
+                "document_type": doc_type,
+                "doctor": doctor,
+                "content": default_prompt_content,
+                "is_default": False,
+                "created_at": now,
+                "updated_at": now
+            }
+            for dept in DEFAULT_DEPARTMENT
+            for doctor in DEPARTMENT_DOCTORS_MAPPING.get(dept, ["default"])
+            for doc_type in DOCUMENT_TYPES
+        ]
+
+        inserted = db_manager.insert_missing(Prompt, ["department", "document_type", "doctor"], rows)
+        elapsed = time.perf_counter() - start_time
+        print(f"プロンプトの初期化が完了しました: {inserted}件を作成（{len(rows)}件中、{elapsed:.2f}秒）")
+
+        if inserted:
+            # 新規作成したプロンプトはデフォルトプロンプトへのフォールバック結果より優先されるため、すべて破棄する
+            publish_prompt_change("default", DEFAULT_DOCUMENT_TYPE, "default")
+
+        return inserted
 
     except Exception as e:
         raise DatabaseError(f"データベースの初期化に失敗しました: {str(e)}")
@@ -1,4 +1,6 @@
+import functools
 import re
+from typing import Dict, List, Optional, Tuple
 
 from utils.constants import DEFAULT_SECTION_NAMES, SECTION_DETECTION_PATTERNS
 
@@ -21,55 +23,140 @@ def format_output_summary(summary_text):
     return processed_text
 
 
+@functools.lru_cache(maxsize=8)
+def _compile_section_detector(all_section_names: Tuple[str, ...]) -> Tuple[Dict[str, int], List[re.Pattern]]:
+    """
+    セクション名とエイリアスを1つの選択パターンにまとめ、検出パターンごとに一度だけコンパイルする
+
+    選択パターンはセクション名の順に並べるため、先頭に近いセクションが優先される。
+    """
+    section_order: Dict[str, int] = {}
+    for index, section in enumerate(all_section_names):
+        section_order.setdefault(section, index)
+
+    alternation = "(?P<section>" + "|".join(re.escape(section) for section in all_section_names) + ")"
+    compiled_patterns = [
+        re.compile(pattern.format(section=alternation)) for pattern in SECTION_DETECTION_PATTERNS
+    ]
+    return section_order, compiled_patterns
+
+
+# 既定のセクション名の検出パターンはインポート時にコンパイルしておく
+_compile_section_detector(tuple(DEFAULT_SECTION_NAMES) + tuple(section_aliases.keys()))
+
+
+def _detect_section(line: str, all_section_names: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    """行がセクション見出しであれば(セクション名, 見出しに続く内容)を返す"""
+    section_order, compiled_patterns = _compile_section_detector(all_section_names)
+
+    best_match = None
+    best_order = len(all_section_names)
+    for compiled_pattern in compiled_patterns:
+        match = compiled_pattern.match(line)
+        if match:
+            order = section_order[match.group("section")]
+            if order < best_order:
+                best_match = match
+                best_order = order
+                if order == 0:
+                    break
+
+    if best_match is None:
+        return None
+
+    section = best_match.group("section")
+    detected_section = section_aliases.get(section, section)
+
+    # 名前付きグループの後に見出しに続く内容のグループがある
+    if best_match.re.groups > 1:
+        remaining_content = best_match.group(best_match.re.groups).strip()
+    else:
+        remaining_content = ""
+
+    return detected_section, remaining_content
+
+
+def _apply_line(
+        sections: Dict[str, str],
+        current_section: Optional[str],
+        line: str,
+        all_section_names: Tuple[str, ...]
+) -> Optional[str]:
+    """1行分の解析結果をsectionsに反映し、更新後の現在のセクションを返す"""
+    line = line.strip()
+    if not line:
+        return current_section
+
+    detected = _detect_section(line, all_section_names)
+
+    if detected:
+        current_section, remaining_content = detected
+        if remaining_content and current_section:
+            sections[current_section] = remaining_content
+    elif current_section and line:
+        # セクションヘッダーではない行を現在のセクションに追加
+        if sections[current_section]:
+            sections[current_section] += "\n" + line
+        else:
+            sections[current_section] = line
+
+    return current_section
+
+
 def parse_output_summary(summary_text):
     sections = {section: "" for section in DEFAULT_SECTION_NAMES}
     lines = summary_text.split('\n')
     current_section = None
 
-    all_section_names = list(sections.keys()) + list(section_aliases.keys())
+    all_section_names = tuple(sections.keys()) + tuple(section_aliases.keys())
 
     for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        found_section = False
-        detected_section = None
-        remaining_content = ""
-
-        for section in all_section_names:
-            patterns = [
-                pattern.format(section=re.escape(section)) for pattern in SECTION_DETECTION_PATTERNS
-            ]
-
-            for pattern in patterns:
-                match = re.match(pattern, line)
-                if match:
-                    if section in section_aliases:
-                        detected_section = section_aliases[section]
-                    else:
-                        detected_section = section
-
-                    if match.groups():
-                        remaining_content = match.group(1).strip()
-                    else:
-                        remaining_content = ""
-
-                    found_section = True
-                    break
-
-            if found_section:
-                break
-
-        if found_section:
-            current_section = detected_section
-            if remaining_content and current_section:
-                sections[current_section] = remaining_content
-        elif current_section and line:
-            # セクションヘッダーではない行を現在のセクションに追加
-            if sections[current_section]:
-                sections[current_section] += "\n" + line
-            else:
-                sections[current_section] = line
-
-    return {k: sections.get(k, "") for k in DEFAULT_SECTION_NAMES}
\ No newline at end of file
+        current_section = _apply_line(sections, current_section, line, all_section_names)
+
+    return {k: sections.get(k, "") for k in DEFAULT_SECTION_NAMES}
+
+
+class SectionStreamParser:
+    """
+    ストリーミング出力をチャンク単位で受け取り、セクションごとに振り分けるパーサー
+
+    改行で確定した行だけを解析するため、受信済みのテキスト全体を再解析せずに済む。
+    すべてのチャンクを受け取った後のfinish()の結果はparse_output_summaryと一致する。
+    """
+
+    def __init__(self):
+        self._section_names = list(DEFAULT_SECTION_NAMES)
+        self._all_section_names = tuple(self._section_names) + tuple(section_aliases.keys())
+        self._sections = {section: "" for section in self._section_names}
+        self._current_section: Optional[str] = None
+        self._pending_line = ""
+
+    @property
+    def current_section(self) -> Optional[str]:
+        return self._current_section
+
+    def feed(self, chunk: str) -> None:
+        """チャンクを追加し、改行で確定した行を解析する"""
+        self._pending_line += chunk
+        if "\n" not in chunk:
+            return
+
+        *lines, self._pending_line = self._pending_line.split("\n")
+        for line in lines:
+            self._current_section = _apply_line(
+                self._sections, self._current_section, line, self._all_section_names
+            )
+
+    def get_sections(self) -> Dict[str, str]:
+        """現時点のセクションごとの内容を返す（未確定の行も仮に反映する）"""
+        sections = dict(self._sections)
+        _apply_line(sections, self._current_section, self._pending_line, self._all_section_names)
+        return {k: sections.get(k, "") for k in self._section_names}
+
+    def finish(self) -> Dict[str, str]:
+        """残りの行を確定させ、最終的なセクションごとの内容を返す"""
+        self._current_section = _apply_line(
+            self._sections, self._current_section, self._pending_line, self._all_section_names
+        )
+        self._pending_line = ""
+        return {k: self._sections.get(k, "") for k in self._section_names}
@@ -1,7 +1,8 @@
 import streamlit as st
 
 from services.evaluation_service import process_evaluation
-from services.summary_service import process_summary
+from services.summary_service import process_summary, resume_generation_job
+from utils.config import RESPONSE_CACHE_ENABLED
 from utils.constants import DEFAULT_DOCUMENT_TYPE, MESSAGES, TAB_NAMES
 from utils.error_handlers import handle_error
 from ui_components.navigation import render_sidebar
@@ -46,6 +47,9 @@ def render_input_section():
         key="additional_info"
     )
 
+    if RESPONSE_CACHE_ENABLED:
+        st.checkbox("同じ入力の場合は前回の結果を再利用する", value=True, key="use_response_cache")
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
@@ -112,6 +116,7 @@ def render_evaluation_results():
 def main_page_app():
     render_sidebar()
     evaluation_progress_placeholder = render_input_section()
+    resume_generation_job()
     render_summary_results()
 
     if st.session_state.get("run_evaluation"):
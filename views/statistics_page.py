@@ -1,182 +1,105 @@
 import datetime
-from typing import Any, Dict, List
+import math
+import os
+import tempfile
+from typing import Any, Dict, List, cast
 
+import numpy as np
 import pandas as pd
 import pytz
 import streamlit as st
-from sqlalchemy import and_, func
 
-from database.db import DatabaseManager
-from database.models import SummaryUsage
+from services.statistics_service import (
+    MODEL_MAPPING,
+    get_latency_statistics,
+    get_usage_records_page,
+    get_usage_statistics,
+)
+from services.usage_export import EXPORT_FORMATS, write_usage_export
 from ui_components.navigation import change_page
+from utils.config import STATISTICS_PAGE_SIZE, USAGE_EXPORT_UI_MAX_ROWS
 from utils.constants import DOCUMENT_TYPE_OPTIONS
 from utils.error_handlers import handle_error
-from utils.exceptions import DatabaseError
 
 JST = pytz.timezone('Asia/Tokyo')
 
-MODEL_MAPPING = {
-    "Gemini_Pro": "gemini",
-    "Claude": "claude",
-}
+
+DEPARTMENT_COLUMNS = ["department", "doctor", "document_types", "count", "input_tokens", "output_tokens", "total_tokens"]
+DETAIL_COLUMNS = [
+    "date", "document_types", "model_detail", "department", "doctor", "input_tokens", "output_tokens", "processing_time"
+]
+
+
+def column(frame: pd.DataFrame, name: str) -> pd.Series:
+    """DataFrameの1カラムをSeriesとして取得する"""
+    return cast(pd.Series, frame[name])
+
+
+def label_common(values: pd.Series, label: str) -> pd.Series:
+    """"default"を共通の表示名に置き換える"""
+    return values.where(values != "default", label)
+
+
+def label_document_types(values: pd.Series) -> pd.Series:
+    """文書名が空の場合は「不明」にする"""
+    return values.where(values.notna() & (values != ""), "不明")
 
 
-def get_usage_statistics(
-        start_datetime: datetime.datetime,
-        end_datetime: datetime.datetime,
-        selected_model: str,
-        selected_document_type: str
-) -> Dict[str, Any]:
-
-    db_manager = DatabaseManager.get_instance()
-    session = db_manager.get_session()
-
-    try:
-        # 基本フィルタを構築
-        filters = [
-            SummaryUsage.date >= start_datetime,
-            SummaryUsage.date <= end_datetime
-        ]
-
-        # モデルフィルタを追加
-        if selected_model != "すべて":
-            pattern = MODEL_MAPPING.get(selected_model)
-            if pattern:
-                filters.append(SummaryUsage.model_detail.ilike(f"%{pattern}%"))
-
-        # 文書タイプフィルタを追加
-        if selected_document_type != "すべて":
-            if selected_document_type == "不明":
-                filters.append(SummaryUsage.document_types.is_(None))
-            else:
-                filters.append(SummaryUsage.document_types == selected_document_type)
-
-        total_query = session.query(
-            func.count(SummaryUsage.id).label("count"),
-            func.sum(SummaryUsage.input_tokens).label("total_input_tokens"),
-            func.sum(SummaryUsage.output_tokens).label("total_output_tokens"),
-            (func.sum(SummaryUsage.input_tokens) + func.sum(SummaryUsage.output_tokens)).label("total_tokens")
-        ).filter(and_(*filters))
-
-        total_result = total_query.first()
-
-        if not total_result or total_result.count == 0:
-            return {"total": None, "by_department": [], "records": []}
-
-        # 診療科・医師・文書タイプ別の統計を取得
-        dept_query = session.query(
-            func.coalesce(SummaryUsage.department, 'default').label("department"),
-            func.coalesce(SummaryUsage.doctor, 'default').label("doctor"),
-            SummaryUsage.document_types,
-            func.count(SummaryUsage.id).label("count"),
-            func.sum(SummaryUsage.input_tokens).label("input_tokens"),
-            func.sum(SummaryUsage.output_tokens).label("output_tokens"),
-            (func.sum(SummaryUsage.input_tokens) + func.sum(SummaryUsage.output_tokens)).label("total_tokens"),
-            func.sum(SummaryUsage.processing_time).label("processing_time")
-        ).filter(and_(*filters)).group_by(
-            SummaryUsage.department,
-            SummaryUsage.doctor,
-            SummaryUsage.document_types
-        ).order_by(func.count(SummaryUsage.id).desc())
-
-        dept_results = dept_query.all()
-
-        # 個別レコードを取得
-        records_query = session.query(SummaryUsage).filter(
-            and_(*filters)
-        ).order_by(SummaryUsage.date.desc())
-
-        records = records_query.all()
-
-        return {
-            "total": {
-                "count": total_result.count,
-                "total_input_tokens": total_result.total_input_tokens,
-                "total_output_tokens": total_result.total_output_tokens,
-                "total_tokens": total_result.total_tokens
-            },
-            "by_department": [
-                {
-                    "department": row.department,
-                    "doctor": row.doctor,
-                    "document_types": row.document_types,
-                    "count": row.count,
-                    "input_tokens": row.input_tokens,
-                    "output_tokens": row.output_tokens,
-                    "total_tokens": row.total_tokens,
-                    "processing_time": row.processing_time
-                }
-                for row in dept_results
-            ],
-            "records": [
-                {
-                    "date": record.date,
-                    "document_types": record.document_types,
-                    "model_detail": record.model_detail,
-                    "department": record.department,
-                    "doctor": record.doctor,
-                    "input_tokens": record.input_tokens,
-                    "output_tokens": record.output_tokens,
-                    "processing_time": record.processing_time
-                }
-                for record in records
-            ]
-        }
-
-    except Exception as e:
-        raise DatabaseError(f"統計データの取得に失敗しました: {str(e)}")
-    finally:
-        session.close()
+def classify_models(model_detail: pd.Series) -> np.ndarray:
+    """model_detailに含まれる文字列からAIモデル名を判定する（MODEL_MAPPINGの順に判定し、該当なしはGemini_Pro）"""
+    lowered = model_detail.fillna("").astype(str).str.lower()
+    conditions = [lowered.str.contains(pattern, regex=False) for pattern in MODEL_MAPPING.values()]
+    return np.select(conditions, list(MODEL_MAPPING.keys()), default="Gemini_Pro")
+
+
+def to_jst_dates(dates: pd.Series) -> pd.Series:
+    """日時をJSTに変換する（タイムゾーンのない日時はJSTとみなす）"""
+    # 同じカラムの値のため、タイムゾーンの有無はすべてのレコードで揃っている
+    if dates.iloc[0].tzinfo is None:
+        return pd.to_datetime(dates).dt.tz_localize(JST)
+    return pd.to_datetime(dates, utc=True).dt.tz_convert(JST)
+
+
+def format_dates(dates: pd.Series) -> np.ndarray:
+    """日時をJSTの「YYYY/MM/DD」に変換する"""
+    # strftimeは1件ずつ文字列を作成するため、日付の種類ごとに1回だけ書式化して各レコードに割り当てる
+    codes, days = pd.factorize(to_jst_dates(dates).dt.normalize())
+    return pd.DatetimeIndex(days).strftime("%Y/%m/%d").to_numpy()[codes]
 
 
 def format_department_data(dept_stats: List[Dict[str, Any]]) -> pd.DataFrame:
     """診療科別統計データをDataFrameに変換する"""
-    data = []
-    for stat in dept_stats:
-        dept_name = "全科共通" if stat["department"] == "default" else stat["department"]
-        doctor_name = "医師共通" if stat["doctor"] == "default" else stat["doctor"]
-        document_types = stat["document_types"] or "不明"
-        data.append({
-            "文書名": document_types,
-            "診療科": dept_name,
-            "医師名": doctor_name,
-            "作成件数": stat["count"],
-            "入力トークン": stat["input_tokens"],
-            "出力トークン": stat["output_tokens"],
-            "合計トークン": stat["total_tokens"],
-        })
-    return pd.DataFrame(data)
+    if not dept_stats:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame.from_records(dept_stats, columns=DEPARTMENT_COLUMNS)
+    return pd.DataFrame({
+        "文書名": label_document_types(column(frame, "document_types")),
+        "診療科": label_common(column(frame, "department"), "全科共通"),
+        "医師名": label_common(column(frame, "doctor"), "医師共通"),
+        "作成件数": frame["count"],
+        "入力トークン": frame["input_tokens"],
+        "出力トークン": frame["output_tokens"],
+        "合計トークン": frame["total_tokens"],
+    })
 
 
 def format_detail_data(records: List[Dict[str, Any]]) -> pd.DataFrame:
     """詳細レコードをDataFrameに変換する"""
-    detail_data = []
-    for record in records:
-        model_detail = str(record.get("model_detail", "")).lower()
-        model_info = "Gemini_Pro"
-
-        for model_name, pattern in MODEL_MAPPING.items():
-            if pattern in model_detail:
-                model_info = model_name
-                break
-
-        record_date = record["date"]
-        if record_date.tzinfo:
-            jst_date = record_date.astimezone(JST)
-        else:
-            jst_date = JST.localize(record_date)
-
-        detail_data.append({
-            "作成日": jst_date.strftime("%Y/%m/%d"),
-            "文書名": record.get("document_types") or "不明",
-            "診療科": "全科共通" if record.get("department") == "default" else record.get("department"),
-            "医師名": "医師共通" if record.get("doctor") == "default" else record.get("doctor"),
-            "AIモデル": model_info,
-            "入力トークン": record["input_tokens"],
-            "出力トークン": record["output_tokens"],
-            "処理時間(秒)": round(record["processing_time"]) if record["processing_time"] else 0,
-        })
-    return pd.DataFrame(detail_data)
+    if not records:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame.from_records(records, columns=DETAIL_COLUMNS)
+    return pd.DataFrame({
+        "作成日": format_dates(column(frame, "date")),
+        "文書名": label_document_types(column(frame, "document_types")),
+        "診療科": label_common(column(frame, "department"), "全科共通"),
+        "医師名": label_common(column(frame, "doctor"), "医師共通"),
+        "AIモデル": classify_models(column(frame, "model_detail")),
+        "入力トークン": frame["input_tokens"],
+        "出力トークン": frame["output_tokens"],
+        "処理時間(秒)": frame["processing_time"].fillna(0).round().astype("int64"),
+    })
 
 
 @handle_error
@@ -188,7 +111,7 @@ def usage_statistics_ui():
     col1, col2 = st.columns(2)
 
     with col1:
-        today = datetime.datetime.now().date()
+        today = datetime.datetime.now(JST).date()
         start_date = st.date_input("開始日", today - datetime.timedelta(days=7))
 
     with col2:
@@ -203,8 +126,9 @@ def usage_statistics_ui():
     with col4:
         selected_document_type = st.selectbox("文書名", DOCUMENT_TYPE_OPTIONS, index=0)
 
-    start_datetime = datetime.datetime.combine(start_date, datetime.time.min)
-    end_datetime = datetime.datetime.combine(end_date, datetime.time.max)
+    # 日付はJSTで指定されたものとして扱う（ロールアップもJSTの日付で集計している）
+    start_datetime = JST.localize(datetime.datetime.combine(start_date, datetime.time.min))
+    end_datetime = JST.localize(datetime.datetime.combine(end_date, datetime.time.max))
 
     # 統計データを取得
     stats = get_usage_statistics(start_datetime, end_datetime, selected_model, selected_document_type)
@@ -217,6 +141,159 @@ def usage_statistics_ui():
     dept_df = format_department_data(stats["by_department"])
     st.dataframe(dept_df, hide_index=True)
 
-    # 詳細レコードを表示
-    detail_df = format_detail_data(stats["records"])
+    filter_key = (start_datetime, end_datetime, selected_model, selected_document_type)
+
+    render_latency_charts(filter_key)
+
+    # 詳細レコードを1ページずつ表示
+    cursors = get_page_cursors(filter_key)
+    page = get_usage_records_page(
+        start_datetime, end_datetime, selected_model, selected_document_type,
+        cursor=cursors[-1], page_size=STATISTICS_PAGE_SIZE
+    )
+
+    detail_df = format_detail_data(page["records"])
     st.dataframe(detail_df, hide_index=True)
+
+    render_page_navigation(cursors, page["next_cursor"], stats["total"]["count"])
+
+    render_export(filter_key)
+
+
+def get_page_cursors(filter_key: tuple) -> List[Any]:
+    """
+    表示中のページまでのカーソルを返す（先頭は最初のページを表すNone）
+
+    検索条件が変わった場合は最初のページに戻す。
+    """
+    if st.session_state.get("usage_page_filter_key") != filter_key:
+        st.session_state.usage_page_filter_key = filter_key
+        st.session_state.usage_page_cursors = [None]
+    return st.session_state.usage_page_cursors
+
+
+def render_page_navigation(cursors: List[Any], next_cursor: Any, total_count: int) -> None:
+    total_pages = max(1, math.ceil(total_count / STATISTICS_PAGE_SIZE))
+    current_page = len(cursors)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if st.button("前へ", key="usage_page_prev", disabled=current_page <= 1):
+            cursors.pop()
+            st.rerun()
+
+    with col2:
+        st.caption(f"{current_page} / {total_pages} ページ（全{total_count}件）")
+
+    with col3:
+        if st.button("次へ", key="usage_page_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+
+
+LATENCY_METRICS = {
+    "処理時間 p50（秒）": "p50",
+    "処理時間 p90（秒）": "p90",
+    "処理時間 p99（秒）": "p99",
+    "出力トークン/秒": "tokens_per_second",
+}
+LATENCY_BUCKET_LABELS = {
+    "日": "day",
+    "時間": "hour",
+}
+
+
+def format_latency_data(latency: List[Dict[str, Any]], metric: str) -> pd.DataFrame:
+    """集計単位の日時を行、モデル・文書名を列とする時系列のDataFrameに変換する"""
+    if not latency:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame.from_records(latency)
+    frame["series"] = (
+        frame["model_detail"].fillna("不明") + " / " + label_document_types(column(frame, "document_types"))
+    )
+    return frame.pivot_table(index="bucket", columns="series", values=metric, aggfunc="first").sort_index()
+
+
+def render_latency_charts(filter_key: tuple) -> None:
+    """処理時間のパーセンタイルと1秒あたりの出力トークン数の推移を表示する"""
+    st.subheader("処理時間・スループットの推移")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        bucket_label = st.radio("集計単位", list(LATENCY_BUCKET_LABELS), horizontal=True, key="latency_bucket")
+
+    with col2:
+        metric_label = st.selectbox("指標", list(LATENCY_METRICS), key="latency_metric")
+
+    latency = get_latency_statistics(*filter_key, bucket=LATENCY_BUCKET_LABELS[bucket_label])
+    chart_df = format_latency_data(latency, LATENCY_METRICS[metric_label])
+
+    if chart_df.empty:
+        st.info("処理時間のデータがありません")
+        return
+
+    st.line_chart(chart_df)
+
+
+EXPORT_MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def render_export(filter_key: tuple) -> None:
+    """
+    検索条件の使用量レコードをCSVまたはParquetでダウンロードする
+
+    一時ファイルに少しずつ書き出し、内容を読み込んだ時点で一時ファイルは削除する
+    （セッションが破棄されると内容も解放されるため、サーバーに一時ファイルが残らない）。
+    内容はダウンロードするまでセッションに保持するため、件数はUSAGE_EXPORT_UI_MAX_ROWSまでとし、
+    それを超える期間はscripts/export_usage.pyで書き出す。
+    """
+    start_datetime, end_datetime, selected_model, selected_document_type = filter_key
+
+    col1, col2 = st.columns([1, 3])
+
+    with col1:
+        export_format = st.selectbox("出力形式", EXPORT_FORMATS, key="usage_export_format")
+
+    with col2:
+        if st.button("エクスポートを作成", key="usage_export_create"):
+            fd, path = tempfile.mkstemp(suffix=f".{export_format}")
+            os.close(fd)
+            try:
+                with st.spinner("エクスポートを作成しています..."):
+                    exported = write_usage_export(
+                        path, export_format, start_datetime, end_datetime, selected_model, selected_document_type,
+                        max_rows=USAGE_EXPORT_UI_MAX_ROWS
+                    )
+                with open(path, "rb") as f:
+                    data = f.read()
+            finally:
+                os.remove(path)
+
+            st.session_state.usage_export = {
+                "data": data,
+                "format": export_format,
+                "filter_key": filter_key,
+                "count": exported,
+            }
+
+    export = st.session_state.get("usage_export")
+    if export and export["filter_key"] == filter_key and "data" in export:
+        if export["count"] >= USAGE_EXPORT_UI_MAX_ROWS:
+            st.warning(
+                f"画面からのエクスポートは{USAGE_EXPORT_UI_MAX_ROWS}件までです。"
+                "すべてのレコードを書き出す場合は scripts/export_usage.py を使用してください。"
+            )
+        file_name = f"usage_{start_datetime:%Y%m%d}_{end_datetime:%Y%m%d}.{export['format']}"
+        st.download_button(
+            f"ダウンロード（{export['count']}件）",
+            export["data"],
+            file_name=file_name,
+            mime=EXPORT_MIME_TYPES[export["format"]],
+            key="usage_export_download"
+        )